@@ -0,0 +1,336 @@
+"""Vectorized per-user alert rules for Sajib Market Trading Monitor Bot
+
+Every subscriber used to get the same hard-coded 2% day-move alert. Users
+can now register their own rules with /alert:
+
+* ``above`` / ``below`` a price,
+* ``move`` of at least N% over the day or a 5/15/60-minute window,
+* ``ma``: the price crossing its 5/15/60-minute moving average.
+
+Rules are kept columnar, one block of NumPy arrays per symbol (kind,
+threshold, window, owner), so a quote update for a symbol checks every
+rule on it in a single vectorized pass, whether there are ten rules or
+ten thousand. Rules registered for a market are expanded into one rule
+per index of that market.
+
+Rules are edge-triggered with the same semantics as ``alert_state``: a
+rule fires once when its condition starts to hold, then stays quiet until
+the price moves back out of a hysteresis band (``price_band`` past a
+price level, ``rearm_ratio`` of a move threshold) and its cooldown is
+over. That state is two more columns per block (armed, fired_at).
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from alert_state import DEFAULT_COOLDOWN_SECONDS, DEFAULT_REARM_RATIO
+
+logger = logging.getLogger(__name__)
+
+ABOVE = "above"
+BELOW = "below"
+MOVE = "move"
+CROSS_MA = "ma"
+RULE_KINDS = (ABOVE, BELOW, MOVE, CROSS_MA)
+_KIND_CODES = {kind: code for code, kind in enumerate(RULE_KINDS)}
+
+DAY = 0  # window value for "since the open"
+
+INITIAL_BLOCK_CAPACITY = 16
+DEFAULT_PRICE_BAND = 0.005  # above/below rules re-arm 0.5% back on the other side of their level
+
+
+class AlertRule(NamedTuple):
+    rule_id: int
+    chat_id: str
+    symbol: str
+    kind: str
+    threshold: float
+    window: int = DAY  # minutes; DAY means the move since the session open
+    market: Optional[str] = None
+
+
+class RuleHit(NamedTuple):
+    """A rule whose condition held on a quote update, with the value that met it"""
+    rule: AlertRule
+    value: float
+    price: float
+
+
+def parse_rule_spec(tokens: Sequence[str], windows: Iterable[int]) -> Tuple[str, float, int]:
+    """Parse ``above 5200`` / ``move 1.5 15m`` / ``ma 60m`` into (kind, threshold, window)
+
+    Raises ValueError with a message meant for the user.
+    """
+    windows = tuple(windows)
+    if not tokens or tokens[0].lower() not in RULE_KINDS:
+        raise ValueError(f"Condition must be one of: {', '.join(RULE_KINDS)}")
+    kind = tokens[0].lower()
+    rest = list(tokens[1:])
+
+    window = DAY
+    if rest and rest[-1].lower().endswith("m"):
+        try:
+            window = int(rest.pop()[:-1])
+        except ValueError:
+            raise ValueError("Window must look like 5m, 15m or 60m")
+        if window not in windows:
+            raise ValueError(f"Window must be one of: {', '.join(f'{w}m' for w in windows)}")
+
+    if kind == CROSS_MA:
+        if window == DAY or rest:
+            raise ValueError("Usage: ma <window>, e.g. ma 60m")
+        return kind, 0.0, window
+
+    if len(rest) != 1:
+        raise ValueError(f"Usage: {kind} <number>" + (" [window]" if kind == MOVE else ""))
+    try:
+        threshold = float(rest[0].rstrip("%"))
+    except ValueError:
+        raise ValueError(f"Not a number: {rest[0]}")
+    if threshold <= 0:
+        raise ValueError("Threshold must be positive")
+    if kind != MOVE and window != DAY:
+        raise ValueError(f"{kind} rules don't take a window")
+    return kind, threshold, window
+
+
+class _RuleBlock:
+    """Columnar storage for every rule on one symbol"""
+
+    COLUMNS = ("rule_id", "kind", "threshold", "window", "active", "armed", "fired_at")
+
+    def __init__(self, capacity: int = INITIAL_BLOCK_CAPACITY):
+        self.size = 0
+        self.live = 0
+        self.rule_id = np.zeros(capacity, np.int64)
+        self.kind = np.zeros(capacity, np.int8)
+        self.threshold = np.zeros(capacity, np.float64)
+        self.window = np.zeros(capacity, np.int8)  # index into the symbol's signal vector
+        self.active = np.zeros(capacity, np.bool_)
+        self.armed = np.zeros(capacity, np.bool_)
+        self.fired_at = np.full(capacity, np.nan)
+        self.position: Dict[int, int] = {}  # rule_id -> row
+
+    def append(self, rule_ids, kinds, thresholds, windows):
+        count = len(rule_ids)
+        needed = self.size + count
+        if needed > len(self.rule_id):
+            capacity = max(needed, 2 * len(self.rule_id))
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        rows = slice(self.size, needed)
+        self.rule_id[rows] = rule_ids
+        self.kind[rows] = kinds
+        self.threshold[rows] = thresholds
+        self.window[rows] = windows
+        self.active[rows] = True
+        self.armed[rows] = True
+        self.fired_at[rows] = np.nan
+        for offset, rule_id in enumerate(rule_ids):
+            self.position[int(rule_id)] = self.size + offset
+        self.size = needed
+        self.live += count
+
+    def deactivate(self, rule_id: int) -> bool:
+        row = self.position.pop(rule_id, None)
+        if row is None:
+            return False
+        self.active[row] = False
+        self.live -= 1
+        if self.live < self.size // 2:
+            self.compact()
+        return True
+
+    def compact(self):
+        keep = np.flatnonzero(self.active[:self.size])
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+        self.size = len(keep)
+        self.position = {int(rule_id): row for row, rule_id in enumerate(self.rule_id[:self.size])}
+
+
+class AlertRuleEngine:
+    """Per-symbol rule blocks evaluated with NumPy on each quote update"""
+
+    def __init__(self, windows_minutes: Iterable[int],
+                 cooldown: float = DEFAULT_COOLDOWN_SECONDS,
+                 rearm_ratio: float = DEFAULT_REARM_RATIO,
+                 price_band: float = DEFAULT_PRICE_BAND):
+        self.windows_minutes = tuple(sorted(windows_minutes))
+        self.cooldown = cooldown
+        self.rearm_ratio = rearm_ratio
+        self.price_band = price_band
+        # Signal vectors are [day, window_1, window_2, ...]
+        self._window_index = {DAY: 0}
+        self._window_index.update({m: i + 1 for i, m in enumerate(self.windows_minutes)})
+
+        self._blocks: Dict[str, _RuleBlock] = {}
+        self._rules: Dict[int, AlertRule] = {}
+        self._last: Dict[str, Tuple[float, np.ndarray]] = {}  # symbol -> (price, averages)
+        self._changed: set = set()  # rule ids whose armed/fired_at changed since drain_state()
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def load(self, rules: Iterable[AlertRule]):
+        """Add many rules at once, one array append per symbol"""
+        by_symbol: Dict[str, List[AlertRule]] = {}
+        for rule in rules:
+            if rule.kind not in _KIND_CODES or rule.window not in self._window_index:
+                logger.warning(f"Skipping unsupported alert rule {rule}")
+                continue
+            by_symbol.setdefault(rule.symbol, []).append(rule)
+
+        with self._lock:
+            for symbol, group in by_symbol.items():
+                block = self._blocks.get(symbol)
+                if block is None:
+                    block = self._blocks[symbol] = _RuleBlock(max(INITIAL_BLOCK_CAPACITY, len(group)))
+                block.append(
+                    np.fromiter((r.rule_id for r in group), np.int64, len(group)),
+                    np.fromiter((_KIND_CODES[r.kind] for r in group), np.int8, len(group)),
+                    np.fromiter((r.threshold for r in group), np.float64, len(group)),
+                    np.fromiter((self._window_index[r.window] for r in group), np.int8, len(group))
+                )
+                for rule in group:
+                    self._rules[rule.rule_id] = rule
+
+    def add(self, rule: AlertRule):
+        self.load([rule])
+
+    def remove(self, rule_id: int) -> Optional[AlertRule]:
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is not None:
+                self._blocks[rule.symbol].deactivate(rule_id)
+            return rule
+
+    def all_rules(self) -> List[AlertRule]:
+        with self._lock:
+            return list(self._rules.values())
+
+    def rules_for(self, chat_id: str) -> List[AlertRule]:
+        with self._lock:
+            return sorted((r for r in self._rules.values() if r.chat_id == chat_id), key=lambda r: r.rule_id)
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return [symbol for symbol, block in self._blocks.items() if block.live]
+
+    def restore_state(self, entries: Iterable[Tuple[int, bool, float]]):
+        """Restore persisted (rule_id, armed, fired_at) state"""
+        with self._lock:
+            for rule_id, armed, fired_at in entries:
+                rule = self._rules.get(rule_id)
+                if rule is None:
+                    continue
+                block = self._blocks[rule.symbol]
+                row = block.position[rule_id]
+                block.armed[row] = bool(armed)
+                block.fired_at[row] = np.nan if fired_at is None else fired_at
+
+    def drain_state(self) -> Dict[int, Optional[Tuple[bool, float]]]:
+        """(armed, fired_at) of rules whose state changed since the last call; None means default"""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            state = {}
+            for rule_id in changed:
+                rule = self._rules.get(rule_id)
+                if rule is None:
+                    continue
+                block = self._blocks[rule.symbol]
+                row = block.position[rule_id]
+                fired_at = float(block.fired_at[row])
+                armed = bool(block.armed[row])
+                if np.isnan(fired_at):
+                    state[rule_id] = None if armed else (armed, None)
+                else:
+                    state[rule_id] = (armed, fired_at)
+            return state
+
+    def evaluate(self, symbol: str, price: float, day_change: Optional[float],
+                 window_returns: Dict[int, Optional[float]],
+                 window_averages: Dict[int, Optional[float]],
+                 now: Optional[float] = None) -> List[RuleHit]:
+        """Check every rule on ``symbol`` against one quote update; only rules that newly fire are returned"""
+        now = time.time() if now is None else now
+        nan = float("nan")
+        moves = np.array(
+            [nan if day_change is None else day_change]
+            + [nan if window_returns.get(m) is None else window_returns[m] for m in self.windows_minutes]
+        )
+        averages = np.array(
+            [nan] + [nan if window_averages.get(m) is None else window_averages[m] for m in self.windows_minutes]
+        )
+
+        with self._lock:
+            previous = self._last.get(symbol)
+            self._last[symbol] = (price, averages)
+            block = self._blocks.get(symbol)
+            if block is None or not block.live:
+                return []
+            self.evaluations += 1
+
+            n = block.size
+            kind = block.kind[:n]
+            threshold = block.threshold[:n]
+            window = block.window[:n]
+
+            move = moves[window]
+            distance = price - averages[window]
+            if previous is not None:
+                previous_distance = previous[0] - previous[1][window]
+                crossed = distance * previous_distance < 0
+            else:
+                crossed = np.zeros(n, np.bool_)
+
+            is_above = kind == _KIND_CODES[ABOVE]
+            is_below = kind == _KIND_CODES[BELOW]
+            is_move = kind == _KIND_CODES[MOVE]
+            is_cross = kind == _KIND_CODES[CROSS_MA]
+            active = block.active[:n]
+            armed = block.armed[:n]
+            with np.errstate(invalid="ignore"):
+                holds = (
+                    (is_above & (price >= threshold))
+                    | (is_below & (price <= threshold))
+                    | (is_move & (np.abs(move) >= threshold))
+                    | (is_cross & crossed)
+                ) & active
+                rearm = (
+                    (is_above & (price < threshold * (1 - self.price_band)))
+                    | (is_below & (price > threshold * (1 + self.price_band)))
+                    | (is_move & (np.abs(move) < threshold * self.rearm_ratio))
+                ) & active & ~armed
+                cooling = now - block.fired_at[:n] < self.cooldown
+
+            fired = holds & armed & ~cooling
+            self.suppressed += int(np.count_nonzero(holds)) - int(np.count_nonzero(fired))
+            # Crossing the average is already an edge, so those rules never disarm
+            armed[fired & ~is_cross] = False
+            armed[rearm] = True
+            block.fired_at[:n][fired] = now
+            changed = np.flatnonzero(fired | rearm)
+            if len(changed):
+                self._changed.update(block.rule_id[changed].tolist())
+
+            rows = np.flatnonzero(fired)
+            if not len(rows):
+                return []
+
+            values = np.where(kind[rows] == _KIND_CODES[MOVE], move[rows],
+                              np.where(kind[rows] == _KIND_CODES[CROSS_MA], averages[window[rows]], price))
+            return [RuleHit(self._rules[int(rule_id)], float(value), price)
+                    for rule_id, value in zip(block.rule_id[rows], values)]
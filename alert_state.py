@@ -0,0 +1,98 @@
+"""Edge-triggered alert state for Sajib Market Trading Monitor Bot
+
+Alerts used to be level-triggered: while the S&P 500 stayed down 2.3%,
+every poll re-sent "📉 S&P 500: -2.30%" to every subscriber. Each alert
+(a rule on a symbol) now carries a small state machine:
+
+* armed: the next time its value crosses the threshold it fires, once,
+  and becomes disarmed;
+* disarmed: nothing is sent while the condition holds. The alert re-arms
+  only after the value drops back under ``threshold * rearm_ratio``, so
+  a move hovering around its threshold doesn't flap;
+* cooldown: an alert that re-arms still stays quiet until ``cooldown``
+  seconds have passed since it last fired.
+
+Only alerts that fired recently have an entry; an armed alert whose
+cooldown is over is the default and is dropped. State therefore grows
+with market events, not with symbols x rules, and ``drain_changes()``
+hands the changed entries to the preference store so they survive
+restarts.
+"""
+
+import threading
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+DEFAULT_COOLDOWN_SECONDS = 3600.0
+DEFAULT_REARM_RATIO = 0.75
+
+# (armed, fired_at); None in a change set means "back to the default, forget it"
+StateEntry = Tuple[bool, float]
+
+
+class AlertState:
+    """Fire/re-arm/cooldown bookkeeping keyed by alert (e.g. ``"^GSPC|day|2"``)"""
+
+    def __init__(self, cooldown: float = DEFAULT_COOLDOWN_SECONDS, rearm_ratio: float = DEFAULT_REARM_RATIO):
+        if not 0 <= rearm_ratio <= 1:
+            raise ValueError("rearm_ratio must be between 0 and 1")
+        self.cooldown = cooldown
+        self.rearm_ratio = rearm_ratio
+
+        self._entries: Dict[Hashable, StateEntry] = {}
+        self._changed: Dict[Hashable, Optional[StateEntry]] = {}
+        self._lock = threading.Lock()
+        self.fired = 0
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, key: Hashable, value: Optional[float], threshold: float, now: float) -> bool:
+        """Record one observation of ``abs(value)`` against ``threshold``; True means send the alert"""
+        if value is None:
+            return False
+        magnitude = abs(value)
+        with self._lock:
+            armed, fired_at = self._entries.get(key, (True, None))
+            cooling = fired_at is not None and now - fired_at < self.cooldown
+
+            if not armed:
+                if magnitude < threshold * self.rearm_ratio:
+                    self._set(key, (True, fired_at) if cooling else None)
+                elif magnitude >= threshold:
+                    self.suppressed += 1
+                return False
+
+            if magnitude < threshold:
+                if fired_at is not None and not cooling:
+                    self._set(key, None)
+                return False
+            if cooling:
+                self.suppressed += 1
+                return False
+            self._set(key, (False, now))
+            self.fired += 1
+            return True
+
+    def _set(self, key: Hashable, entry: Optional[StateEntry]):
+        if entry is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = entry
+        self._changed[key] = entry
+
+    def load(self, entries: Iterable[Tuple[Hashable, bool, float]]):
+        """Restore persisted (key, armed, fired_at) entries"""
+        with self._lock:
+            for key, armed, fired_at in entries:
+                self._entries[key] = (bool(armed), fired_at)
+
+    def drain_changes(self) -> Dict[Hashable, Optional[StateEntry]]:
+        """Entries changed since the last call; None values were reset to the default"""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+        return changed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "fired": self.fired, "suppressed": self.suppressed}
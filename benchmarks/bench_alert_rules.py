@@ -0,0 +1,94 @@
+"""Benchmark: 1M alert rules across 500 symbols, checked per tick
+
+Loads --rules random rules (above/below/move/ma) spread over --symbols
+symbols into an AlertRuleEngine, then times quote updates: one symbol's
+update (a single vectorized pass over its rules) and a full sweep where
+every symbol ticks once. Prices hover around 100 and price/move
+thresholds are set away from it, so most of those rules stay quiet.
+"loop" checks the same rules of one symbol with a plain Python loop, as
+a per-rule implementation would.
+
+Usage: python benchmarks/bench_alert_rules.py [--rules 1000000] [--symbols 500] [--sweeps 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_rules import ABOVE, BELOW, CROSS_MA, DAY, MOVE, AlertRule, AlertRuleEngine
+
+WINDOWS = (5, 15, 60)
+
+
+def make_rules(count, symbols, rng):
+    for rule_id in range(count):
+        kind = rng.choice((ABOVE, BELOW, MOVE, CROSS_MA))
+        if kind == MOVE:
+            yield AlertRule(rule_id, str(rule_id), f"S{rule_id % symbols}", kind, rng.uniform(1, 5),
+                            rng.choice((DAY,) + WINDOWS))
+        elif kind == CROSS_MA:
+            yield AlertRule(rule_id, str(rule_id), f"S{rule_id % symbols}", kind, 0.0, rng.choice(WINDOWS))
+        elif kind == ABOVE:
+            yield AlertRule(rule_id, str(rule_id), f"S{rule_id % symbols}", kind, rng.uniform(101, 150))
+        else:
+            yield AlertRule(rule_id, str(rule_id), f"S{rule_id % symbols}", kind, rng.uniform(50, 99))
+
+
+def loop_check(rules, price, day_change, returns):
+    hits = 0
+    for rule in rules:
+        if rule.kind == ABOVE:
+            hits += price >= rule.threshold
+        elif rule.kind == BELOW:
+            hits += price <= rule.threshold
+        elif rule.kind == MOVE:
+            move = day_change if rule.window == DAY else returns[rule.window]
+            hits += abs(move) >= rule.threshold
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--sweeps", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(2)
+    rules = list(make_rules(args.rules, args.symbols, rng))
+    engine = AlertRuleEngine(WINDOWS)
+    started = time.perf_counter()
+    engine.load(rules)
+    load = time.perf_counter() - started
+
+    def quote(s):
+        return (f"S{s}", rng.gauss(100, 0.5), rng.gauss(0, 0.5),
+                {m: rng.gauss(0, 0.5) for m in WINDOWS}, {m: rng.gauss(100, 0.5) for m in WINDOWS})
+
+    updates = [[quote(s) for s in range(args.symbols)] for _ in range(args.sweeps)]
+    hits = 0
+    started = time.perf_counter()
+    for sweep in updates:
+        for symbol, price, day_change, returns, averages in sweep:
+            hits += len(engine.evaluate(symbol, price, day_change, returns, averages))
+    sweep_time = (time.perf_counter() - started) / args.sweeps
+
+    symbol_rules = [r for r in rules if r.symbol == "S0"]
+    _, price, day_change, returns, _ = updates[0][0]
+    started = time.perf_counter()
+    loop_check(symbol_rules, price, day_change, returns)
+    loop = time.perf_counter() - started
+
+    per_symbol = args.rules // args.symbols
+    print(f"{args.rules:,} rules over {args.symbols} symbols ({per_symbol:,} per symbol), loaded in {load:.2f}s")
+    print(f"vectorized: {sweep_time / args.symbols * 1e6:,.1f}us per symbol tick, "
+          f"{sweep_time * 1e3:,.1f}ms per sweep of all symbols, {hits / args.sweeps:,.0f} hits per sweep")
+    print(f"loop:       {loop * 1e6:,.1f}us per symbol tick (same rules, plain Python)")
+
+
+if __name__ == "__main__":
+    main()
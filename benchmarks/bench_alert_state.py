@@ -0,0 +1,60 @@
+"""Benchmark: alerts sent per trading day, level-triggered vs edge-triggered
+
+Simulates --days sessions of one-minute ticks for --symbols symbols (a
+random walk from the open) and counts how many day-move alerts a
+subscriber would receive when every poll re-sends an alert that is still
+over the threshold ("level", the old behaviour) versus with AlertState's
+edge triggering, hysteresis and cooldown ("edge"). Polls happen every
+--poll minutes, like ALERT_INTERVAL_MINUTES.
+
+Usage: python benchmarks/bench_alert_state.py [--symbols 50] [--days 20] [--poll 30]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_state import AlertState
+from config import ALERT_COOLDOWN_MINUTES, ALERT_REARM_RATIO, ALERT_THRESHOLD_PERCENT
+
+SESSION_MINUTES = 390
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--poll", type=int, default=30, help="minutes between alert polls")
+    parser.add_argument("--volatility", type=float, default=0.12, help="percent stdev per minute")
+    args = parser.parse_args()
+
+    rng = random.Random(4)
+    state = AlertState(ALERT_COOLDOWN_MINUTES * 60, ALERT_REARM_RATIO)
+    level = edge = updates = 0
+    elapsed = 0.0
+    for day in range(args.days):
+        changes = [0.0] * args.symbols
+        for minute in range(SESSION_MINUTES):
+            now = day * 86400 + minute * 60
+            for s in range(args.symbols):
+                changes[s] += rng.gauss(0, args.volatility)
+                if minute % args.poll == 0:
+                    level += abs(changes[s]) > ALERT_THRESHOLD_PERCENT
+                started = time.perf_counter()
+                edge += state.update(f"S{s}", changes[s], ALERT_THRESHOLD_PERCENT, now)
+                elapsed += time.perf_counter() - started
+                updates += 1
+
+    print(f"{args.symbols} symbols x {args.days} days, threshold {ALERT_THRESHOLD_PERCENT}%, "
+          f"cooldown {ALERT_COOLDOWN_MINUTES}m, re-arm at {ALERT_REARM_RATIO:.0%}")
+    print(f"level (every {args.poll}m poll): {level / args.days:8.1f} alerts/day")
+    print(f"edge (every 1m tick):    {edge / args.days:8.1f} alerts/day, {len(state)} state entries kept, "
+          f"{elapsed / updates * 1e6:.2f}us per update")
+
+
+if __name__ == "__main__":
+    main()
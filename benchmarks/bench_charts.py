@@ -0,0 +1,76 @@
+"""Benchmark: cost of a /chart request, rendered vs served from the caches
+
+For a year of minute bars in a HistoryStore, times each step of a chart
+request: reading the range and computing its content address, a PNG
+cache hit (read from disk), and a fresh render in a --workers process
+pool (skipped when matplotlib isn't installed). A file_id hit costs only
+the address, since the photo is sent by reference.
+
+Usage: python benchmarks/bench_charts.py [--requests 200] [--workers 2]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_renderer import MATPLOTLIB_AVAILABLE, RANGES, ChartCache, chart_key, downsample, render_chart
+from history_store import Bars, HistoryStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench-charts-")
+    try:
+        history = HistoryStore(os.path.join(root, "history"))
+        ts = np.arange(252 * 390, dtype=np.int64) * 60 + 1_700_000_000
+        close = 5000 + np.cumsum(np.random.default_rng(3).normal(0, 1, len(ts)))
+        history.append("^GSPC", Bars(ts, close, close, close, close, np.ones(len(ts))))
+        cache = ChartCache(os.path.join(root, "charts"))
+
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            last = history.latest("^GSPC")[0]
+            bars = history.range("^GSPC", last - RANGES["1y"].seconds)
+            key = chart_key("^GSPC", "1y", bars.ts[-1])
+        lookup = (time.perf_counter() - started) / args.requests
+        print(f"range read + address ({bars.size:,} bars): {lookup * 1e6:8.1f}us  (file_id hit)")
+
+        sampled_ts, sampled_close = downsample(bars.ts, bars.close)
+        cache.put(key, b"\x89PNG" + bytes(40_000))
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            cache.get(key)
+        hit = (time.perf_counter() - started) / args.requests
+        print(f"PNG cache hit (40 KB):            {(lookup + hit) * 1e6:8.1f}us")
+
+        if not MATPLOTLIB_AVAILABLE:
+            print("render: skipped, matplotlib is not installed")
+            return
+        with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pool.submit(render_chart, "warm-up", sampled_ts, sampled_close).result()
+            started = time.perf_counter()
+            futures = [pool.submit(render_chart, "S&P 500", sampled_ts, sampled_close)
+                       for _ in range(args.requests // 10 or 1)]
+            sizes = [len(f.result()) for f in futures]
+            render = (time.perf_counter() - started) / len(futures)
+        print(f"render ({len(sampled_ts)} points, {args.workers} workers): {render * 1e3:8.1f}ms per chart, "
+              f"{sum(sizes) // len(sizes) // 1024} KB PNG")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
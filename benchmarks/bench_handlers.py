@@ -0,0 +1,94 @@
+"""Load test: handler latency with blocking vs executor-offloaded I/O
+
+Fires a stream of fake /stocks and /status updates at the bot's handlers.
+Quote fetches are replaced by a stub that blocks for a fixed time, like a
+slow yfinance call. "before" runs the blocking call directly on the event
+loop (what the old synchronous handlers did); "after" uses the bot's
+executor through run_blocking.
+
+Usage: python benchmarks/bench_handlers.py [--updates 200] [--interval 0.005] [--fetch-latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_monitor_bot import MarketMonitorBot
+
+
+class FakeMessage:
+    async def reply_text(self, text, **kwargs):
+        return None
+
+
+def fake_update(chat_id):
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_message=FakeMessage()
+    )
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(bot, updates, interval, offload):
+    latencies = {"stocks": [], "status": []}
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+
+    if not offload:
+        async def inline(func, *args):
+            return func(*args)
+        bot.run_blocking = inline
+
+    async def one(i):
+        command = "stocks" if i % 4 == 0 else "status"
+        handler = bot.stocks_command if command == "stocks" else bot.status_command
+        # Latency is measured from when the update arrives, so time spent
+        # queued behind another handler's blocking call is included
+        arrival = t0 + i * interval
+        await asyncio.sleep(max(0.0, arrival - loop.time()))
+        await handler(fake_update(i), None)
+        latencies[command].append(loop.time() - arrival)
+
+    await asyncio.gather(*(one(i) for i in range(updates)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between update arrivals")
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="seconds per blocking quote fetch")
+    args = parser.parse_args()
+
+    def slow_fetch(symbols, cached_only=False):
+        time.sleep(args.fetch_latency)
+        return {}
+
+    print(f"{args.updates} updates, one every {args.interval * 1000:.0f} ms (1 in 4 is /stocks), "
+          f"fetch latency {args.fetch_latency * 1000:.0f} ms")
+    print(f"{'mode':>8} {'command':>8} {'p50':>10} {'p99':>10}")
+    for mode, offload in (("before", False), ("after", True)):
+        bot = MarketMonitorBot()
+        with patch.object(bot, "get_stock_data", side_effect=slow_fetch):
+            latencies = asyncio.run(run_load(bot, args.updates, args.interval, offload))
+        for command, values in latencies.items():
+            p50 = statistics.median(values) * 1000
+            p99 = percentile(values, 99) * 1000
+            print(f"{mode:>8} {command:>8} {p50:>8.1f}ms {p99:>8.1f}ms")
+        bot.executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
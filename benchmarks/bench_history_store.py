@@ -0,0 +1,91 @@
+"""Benchmark: appending and range-scanning 10 years of minute bars
+
+Writes --years of 390-bar trading sessions for one symbol into a
+HistoryStore, one append per session (as the close-of-session job does),
+then times range queries of a day, a month and a year at random offsets:
+"view" is the memory-mapped slice alone, "scan" also reads every close in
+it (mean). Finally a backfill of --late random bars is appended out of
+order and compacted into a fresh generation.
+
+Usage: python benchmarks/bench_history_store.py [--years 10] [--queries 2000] [--late 1000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import Bars, HistoryStore
+
+SESSION_BARS = 390
+SESSIONS_PER_YEAR = 252
+DAY = 86400
+
+
+def session(day, rng_state):
+    ts = day * DAY + 13 * 3600 + np.arange(SESSION_BARS, dtype=np.int64) * 60
+    close = 100 + np.cumsum(rng_state.normal(0, 0.05, SESSION_BARS))
+    return Bars(ts, close, close + 0.1, close - 0.1, close, rng_state.uniform(1, 1000, SESSION_BARS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--late", type=int, default=1000, help="out-of-order bars to backfill before compacting")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench-history-")
+    try:
+        store = HistoryStore(root)
+        rng_state = np.random.default_rng(1)
+        days = [d for d in range(args.years * 365) if d % 7 < 5][:args.years * SESSIONS_PER_YEAR]
+        sessions = [session(day, rng_state) for day in days]
+
+        started = time.perf_counter()
+        for bars in sessions:
+            store.append("^GSPC", bars)
+        append = time.perf_counter() - started
+        total = len(sessions) * SESSION_BARS
+        print(f"{total:,} bars ({args.years} years), {len(sessions):,} session appends in {append:.2f}s "
+              f"({total / append / 1e6:.1f}M bars/s), {total * 48 / 1e6:.0f} MB on disk")
+
+        rng = random.Random(2)
+        store = HistoryStore(root)  # cold open, as after a restart
+        first, last = days[0] * DAY, (days[-1] + 1) * DAY
+        print(f"{'range':>7} {'bars':>8} {'view':>10} {'scan':>10}")
+        for label, span in (("day", DAY), ("month", 30 * DAY), ("year", 365 * DAY)):
+            starts = [rng.uniform(first, last - span) for _ in range(args.queries)]
+            started = time.perf_counter()
+            sizes = [store.range("^GSPC", s, s + span).size for s in starts]
+            view = (time.perf_counter() - started) / args.queries
+            started = time.perf_counter()
+            for s in starts:
+                bars = store.range("^GSPC", s, s + span)
+                if bars.size:
+                    bars.close.mean()
+            scan = (time.perf_counter() - started) / args.queries
+            print(f"{label:>7} {sum(sizes) // len(sizes):>8,} {view * 1e6:>8.1f}us {scan * 1e6:>8.1f}us")
+
+        late_rows = [(rng.uniform(first, last) // 60 * 60, 1.0, 1.0, 1.0, 1.0, 1.0) for _ in range(args.late)]
+        store.append("^GSPC", Bars.from_rows(late_rows))
+        started = time.perf_counter()
+        store.range("^GSPC", first, first + 30 * DAY)
+        merged = time.perf_counter() - started
+        started = time.perf_counter()
+        store.compact()
+        compact = time.perf_counter() - started
+        print(f"month query with {args.late} pending bars: {merged * 1e3:.2f}ms; compaction: {compact:.2f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
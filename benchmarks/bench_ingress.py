@@ -0,0 +1,213 @@
+"""Load generator: sustained updates/second through long polling and the webhook
+
+Builds a python-telegram-bot Application against a local stub of the Bot
+API and feeds it --updates synthetic "/ping" messages spread over
+--chats chats. The handler holds each update for --work-ms, standing in
+for a reply round-trip.
+
+  polling  the stub serves the updates from getUpdates (100 per call) to
+           the Application's own updater
+  webhook  the updates are POSTed (as raw HTTP/1.1) over --connections
+           keep-alive connections to a WebhookServer with --workers workers; 429s
+           are retried after a short pause, the way Telegram re-delivers
+
+Prints the sustained rate (first update sent to last handled) per mode.
+
+Usage: python benchmarks/bench_ingress.py [--mode both] [--updates 5000] [--work-ms 5]
+                                          [--workers 32] [--connections 40] [--queue-size 1000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook_server import SECRET_HEADER, WebhookServer
+
+TOKEN = "123456:BENCH"
+SECRET = "bench-secret"
+
+
+def synthetic_updates(count: int, chats: int) -> list:
+    return [{
+        "update_id": i + 1,
+        "message": {
+            "message_id": i + 1,
+            "date": 1_700_000_000,
+            "chat": {"id": 1000 + i % chats, "type": "private"},
+            "from": {"id": 1000 + i % chats, "is_bot": False, "first_name": "Load"},
+            "text": "/ping",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}]
+        }
+    } for i in range(count)]
+
+
+class StubBotAPI:
+    """Answers getMe and getUpdates (from a fixed list of updates); every other method just succeeds"""
+
+    def __init__(self, updates: list):
+        self.updates = updates
+        self.port = None
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+
+    def _result(self, method: str, params: dict):
+        if method == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "getUpdates":
+            offset = int(params.get("offset", 0) or 0)
+            limit = int(params.get("limit", 100) or 100)
+            start = max(0, offset - 1)
+            return self.updates[start:start + limit]
+        return True
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                method = request_line.split()[1].decode().rsplit("/", 1)[-1]
+                params = {k: json.loads(v[0]) if v[0][:1] in "0123456789[{\"" else v[0]
+                          for k, v in parse_qs(body.decode()).items()}
+                result = self._result(method, params)
+                if method == "getUpdates" and not result:
+                    await asyncio.sleep(0.05)  # an idle long poll
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def build_application(stub: StubBotAPI, concurrency: int, work: float, done: asyncio.Event, total: int):
+    handled = [0]
+
+    async def ping(update, context):
+        if work:
+            await asyncio.sleep(work)
+        handled[0] += 1
+        if handled[0] == total:
+            done.set()
+
+    application = (Application.builder().token(TOKEN).base_url(f"http://127.0.0.1:{stub.port}/bot")
+                   .concurrent_updates(concurrency).build())
+    application.add_handler(CommandHandler("ping", ping))
+    await application.initialize()
+    return application
+
+
+async def run_polling(updates: list, args) -> float:
+    stub = StubBotAPI(updates)
+    await stub.start()
+    done = asyncio.Event()
+    application = await build_application(stub, args.workers, args.work_ms / 1000, done, len(updates))
+    await application.start()
+    started = time.perf_counter()
+    await application.updater.start_polling(poll_interval=0.0, timeout=1)
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    await stub.stop()
+    return elapsed
+
+
+async def run_webhook(updates: list, args) -> tuple:
+    stub = StubBotAPI([])
+    await stub.start()
+    done = asyncio.Event()
+    application = await build_application(stub, args.workers, args.work_ms / 1000, done, len(updates))
+
+    async def handle(data):
+        await application.process_update(Update.de_json(data, application.bot))
+
+    server = WebhookServer(handle, SECRET, host="127.0.0.1", port=0, workers=args.workers,
+                           queue_size=args.queue_size)
+    await server.start()
+    pending: asyncio.Queue = asyncio.Queue()
+    for update in updates:
+        body = json.dumps(update).encode()
+        pending.put_nowait(b"POST /telegram HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                           + f"{SECRET_HEADER}: {SECRET}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    retries = [0]
+
+    async def connection():
+        # Raw keep-alive requests: an HTTP client library in this process would cost more than the server
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        while True:
+            try:
+                request = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            while True:
+                writer.write(request)
+                status = int((await reader.readline()).split()[1])
+                while (await reader.readline()) != b"\r\n":
+                    pass
+                if status != 429:
+                    break
+                retries[0] += 1
+                await asyncio.sleep(0.01)
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(args.connections)))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await server.stop()
+    await application.shutdown()
+    await stub.stop()
+    return elapsed, retries[0], server.stats()["max_depth"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("polling", "webhook", "both"), default="both")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--work-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--connections", type=int, default=40)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    updates = synthetic_updates(args.updates, args.chats)
+    print(f"{args.updates:,} updates, {args.work_ms:g}ms handler, {args.workers} concurrent handlers")
+    if args.mode in ("polling", "both"):
+        elapsed = asyncio.run(run_polling(updates, args))
+        print(f"polling: {args.updates / elapsed:10,.0f} updates/s")
+    if args.mode in ("webhook", "both"):
+        elapsed, retries, max_depth = asyncio.run(run_webhook(updates, args))
+        print(f"webhook: {args.updates / elapsed:10,.0f} updates/s  "
+              f"({args.connections} connections, queue peak {max_depth}, {retries} pushed back)")
+
+
+if __name__ == "__main__":
+    main()
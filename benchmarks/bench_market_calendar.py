@@ -0,0 +1,69 @@
+"""Microbenchmark: per-call string-compare market status vs MarketCalendar
+
+"legacy" reproduces the old get_market_status hot path: pytz.timezone()
+on every call, format now as "HH:MM" and compare strings. "calendar"
+answers the same question by binary search over precompiled sessions.
+
+Usage: python benchmarks/bench_market_calendar.py [--users 100000]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_calendar import MarketCalendar
+from market_monitor_bot import MARKETS
+
+
+def legacy_is_open(market_info):
+    market_tz = pytz.timezone(market_info['tz'])
+    now = datetime.datetime.now(market_tz)
+    current_time = now.strftime("%H:%M")
+    if now.weekday() >= 5:
+        return False
+    if "break_start" in market_info and market_info['break_start'] <= current_time <= market_info['break_end']:
+        return False
+    return market_info['open'] <= current_time <= market_info['close']
+
+
+def per_call(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    calendar = MarketCalendar(MARKETS)
+    name, info = next(iter(MARKETS.items()))
+    calendar.is_open(name)  # compile
+
+    print(f"{'operation':>24} {'per call':>12}")
+    print(f"{'legacy is-open':>24} {per_call(lambda: legacy_is_open(info), args.calls) * 1e6:>10.2f}us")
+    print(f"{'calendar.is_open':>24} {per_call(lambda: calendar.is_open(name), args.calls) * 1e6:>10.2f}us")
+    print(f"{'calendar.next_open':>24} {per_call(lambda: calendar.next_open(name), args.calls) * 1e6:>10.2f}us")
+    print(f"{'calendar.status':>24} {per_call(lambda: calendar.status(name), args.calls) * 1e6:>10.2f}us")
+
+    # The alert scheduler's question: which markets are open, for every user
+    started = time.perf_counter()
+    now = time.time()
+    open_markets = {market: calendar.is_open(market, now) for market in MARKETS}
+    for _ in range(args.users):
+        [market for market in MARKETS if open_markets[market]]
+    elapsed = time.perf_counter() - started
+    print(f"all markets x {args.users:,} users: {elapsed * 1000:.1f}ms ({elapsed / args.users * 1e6:.2f}us per user)")
+
+
+if __name__ == "__main__":
+    main()
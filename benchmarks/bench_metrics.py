@@ -0,0 +1,75 @@
+"""Benchmark: per-call cost of handler and upstream instrumentation
+
+Times an async no-op handler called bare, through a disabled registry
+(METRICS_ENABLED = False) and through an enabled one, plus a
+``registry.time`` block around a no-op upstream call and a full
+Prometheus render of a registry the size of the bot's.
+
+Usage: python benchmarks/bench_metrics.py [--calls 200000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsRegistry
+
+
+async def handler(update, context):
+    return None
+
+
+def per_call(func, calls: int) -> float:
+    async def loop():
+        started = time.perf_counter()
+        for _ in range(calls):
+            await func(None, None)
+        return (time.perf_counter() - started) / calls
+    return asyncio.run(loop())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    bare = per_call(handler, args.calls)
+    print(f"bare handler:          {bare * 1e9:8.0f}ns")
+    for enabled in (False, True):
+        registry = MetricsRegistry(enabled=enabled)
+        wrapped = registry.timed(handler, registry.histogram("bot_handler_seconds", handler="status"),
+                                 registry.counter("bot_handler_errors_total", handler="status"))
+        cost = per_call(wrapped, args.calls) - bare
+        print(f"handler, metrics {'on ' if enabled else 'off'}:  {cost * 1e9:+8.0f}ns per call")
+
+    for enabled in (False, True):
+        registry = MetricsRegistry(enabled=enabled)
+        histogram = registry.histogram("bot_upstream_seconds", upstream="yfinance", call="quotes")
+        started = time.perf_counter()
+        for _ in range(args.calls):
+            with registry.time(histogram):
+                pass
+        cost = (time.perf_counter() - started) / args.calls
+        print(f"upstream timer {'on ' if enabled else 'off'}:    {cost * 1e9:8.0f}ns per call")
+
+    registry = MetricsRegistry()
+    for name in ("start", "help", "status", "news", "stocks", "chart", "watch", "unwatch", "watchlist",
+                 "settings", "settimezone", "alert", "alerts", "delalert", "botstats", "button", "location"):
+        registry.histogram("bot_handler_seconds", handler=name).observe(0.01)
+        registry.counter("bot_handler_errors_total", handler=name)
+    for upstream, call in (("yfinance", "quotes"), ("yfinance", "bars"), ("newsapi", "everything"),
+                           ("telegram", "sendMessage")):
+        registry.histogram("bot_upstream_seconds", upstream=upstream, call=call).observe(0.2)
+    renders = 1000
+    started = time.perf_counter()
+    for _ in range(renders):
+        text = registry.render()
+    print(f"render /metrics ({len(text.splitlines())} lines): {(time.perf_counter() - started) / renders * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark: NewsAPI requests and articles downloaded per 1k /news calls
+
+Simulates /news traffic from users whose keyword lists are drawn from a
+handful of interests, written with different order and capitalization.
+Each interest publishes a new article every few minutes. "legacy" spends
+one NewsAPI request (10 articles) per call, as get_market_news used to.
+"full refresh" is the bucketed cache re-downloading the top 10 on every
+refresh, and "watermark" asks only for articles newer than the bucket's
+newest publishedAt. Both run over a simulated hour with the background
+refresher running each minute.
+
+Usage: python benchmarks/bench_news_cache.py [--calls 1000] [--ttl 600]
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_cache import NewsCache
+
+INTERESTS = [
+    ["stock market", "trading", "finance", "economy"],
+    ["crypto", "bitcoin"],
+    ["forex", "usd", "myr"],
+    ["dhaka stock exchange", "bangladesh economy"],
+    ["oil", "commodities"],
+]
+
+
+def user_keywords(rng):
+    keywords = list(rng.choice(INTERESTS))
+    rng.shuffle(keywords)
+    return [k.title() if rng.random() < 0.3 else k for k in keywords]
+
+
+class Upstream:
+    """Stub NewsAPI: each bucket gets a new article every ``interval`` seconds"""
+
+    def __init__(self, clock, interval=300):
+        self.clock = clock
+        self.interval = interval
+        self.articles = 0
+
+    def fetch(self, key, since):
+        start = datetime(2026, 10, 19, tzinfo=timezone.utc).timestamp()
+        newest = int(self.clock() // self.interval)
+        results = []
+        for n in range(newest, max(newest - 10, -1), -1):
+            published_at = datetime.fromtimestamp(start + n * self.interval, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            if since and published_at < since:  # NewsAPI's "from" is inclusive
+                break
+            results.append({"url": f"https://news/{'-'.join(key)}/{n}", "title": str(n), "published_at": published_at})
+        self.articles += len(results)
+        return results
+
+
+def simulate(args, incremental):
+    rng = random.Random(1)
+    now = [0.0]
+    upstream = Upstream(lambda: now[0])
+    fetcher = upstream.fetch if incremental else (lambda key, since: upstream.fetch(key, None))
+    cache = NewsCache(fetcher, ttl=args.ttl, clock=lambda: now[0])
+
+    next_refresh = 60.0
+    for i in range(args.calls):
+        now[0] = args.duration * i / args.calls
+        while now[0] >= next_refresh:
+            cache.refresh_stale()
+            next_refresh += 60.0
+        cache.get(user_keywords(rng))
+
+    stats = cache.stats()
+    return stats["upstream_requests"] * 1000 / args.calls, upstream.articles * 1000 / args.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--ttl", type=float, default=600)
+    parser.add_argument("--duration", type=float, default=3600, help="simulated seconds the calls are spread over")
+    args = parser.parse_args()
+
+    print(f"{args.calls} /news calls over {args.duration / 60:.0f} simulated minutes, TTL {args.ttl:.0f}s")
+    print(f"{'mode':>14} {'requests/1k':>12} {'articles/1k':>12}")
+    print(f"{'legacy':>14} {1000:>12.0f} {10000:>12.0f}")
+    for label, incremental in (("full refresh", False), ("watermark", True)):
+        requests, articles = simulate(args, incremental)
+        print(f"{label:>14} {requests:>12.0f} {articles:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
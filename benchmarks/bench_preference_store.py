@@ -0,0 +1,84 @@
+"""Benchmark: SQLite preference store with 1M users
+
+Seeds a fresh database, then reports:
+  * startup: time to open the store and answer the first lookup
+  * cold lookup: first read of a user (goes to SQLite)
+  * warm lookup: repeat read (served from the in-memory layer)
+  * market_subscribers: the alert job's indexed subscriber query
+
+Usage: python benchmarks/bench_preference_store.py [--users 1000000] [--lookups 20000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_monitor_bot import MARKETS, UserPreferences
+from preference_store import SQLitePreferenceStore
+
+MARKET_NAMES = list(MARKETS.keys())
+
+
+def seed(path, users):
+    store = SQLitePreferenceStore(path, UserPreferences, batch_size=50_000, cache_size=0)
+    rng = random.Random(42)
+    started = time.perf_counter()
+    for i in range(users):
+        store.save(UserPreferences(
+            chat_id=str(i),
+            notifications_enabled=rng.random() < 0.8,
+            preferred_markets=rng.sample(MARKET_NAMES, rng.randint(1, len(MARKET_NAMES)))
+        ))
+    store.close()
+    return time.perf_counter() - started
+
+
+def time_lookups(store, chat_ids):
+    samples = []
+    for chat_id in chat_ids:
+        started = time.perf_counter()
+        store.get(chat_id)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def describe(samples):
+    ordered = sorted(samples)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    return f"p50 {statistics.median(samples) * 1e6:8.1f}us  p99 {p99 * 1e6:8.1f}us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "preferences.db")
+        print(f"seeding {args.users:,} users: {seed(path, args.users):.1f}s")
+
+        started = time.perf_counter()
+        store = SQLitePreferenceStore(path, UserPreferences)
+        store.get("0")
+        print(f"startup (open + first lookup): {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        chat_ids = [str(random.randrange(args.users)) for _ in range(args.lookups)]
+        print(f"cold lookup: {describe(time_lookups(store, chat_ids))}")
+        print(f"warm lookup: {describe(time_lookups(store, chat_ids))}")
+
+        started = time.perf_counter()
+        subscribers = store.market_subscribers()
+        total = sum(len(v) for v in subscribers.values())
+        print(f"market_subscribers: {total:,} subscriptions in {time.perf_counter() - started:.2f}s")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
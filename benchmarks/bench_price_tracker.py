@@ -0,0 +1,82 @@
+"""Benchmark: price tracker cost per tick vs recomputing windows from scratch
+
+Feeds random-walk ticks for --symbols symbols into a PriceTracker with the
+default 5/15/60-minute windows and alert rules, at several tick spacings.
+Denser ticks mean more ticks per window; "incremental" should stay flat
+while "recompute" (rescanning each window's ticks on every tick, as a
+naive implementation would) grows with the window population.
+
+Usage: python benchmarks/bench_price_tracker.py [--symbols 500] [--ticks 200]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MOVE_ALERT_RULES
+from price_tracker import MoveRule, PriceTracker
+
+WINDOWS = (5, 15, 60)
+
+
+def recompute(history, ts, price, volume):
+    """Naive per-tick signals: rescan every window's ticks"""
+    history.append((ts, price, volume))
+    while history[0][0] < ts - WINDOWS[-1] * 60:
+        history.popleft()
+    for minutes in WINDOWS:
+        inside = [t for t in history if t[0] >= ts - minutes * 60]
+        prices = [p for _, p, _ in inside]
+        total = sum(v for _, _, v in inside)
+        vwap = sum(p * v for _, p, v in inside) / total
+        mean = sum(prices) / len(prices)
+        std = math.sqrt(sum((p - mean) ** 2 for p in prices) / len(prices))
+        _ = (price / prices[0] - 1, price / vwap - 1, (price - mean) / std if std else None)
+
+
+def make_ticks(symbols, ticks, spacing, seed=5):
+    rng = random.Random(seed)
+    prices = [100.0] * symbols
+    stream = []
+    for n in range(ticks):
+        for s in range(symbols):
+            prices[s] *= 1 + rng.gauss(0, 0.001)
+            stream.append((f"S{s}", n * spacing, prices[s], rng.uniform(1, 100)))
+    return stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=200, help="ticks per symbol")
+    args = parser.parse_args()
+
+    print(f"{args.symbols} symbols x {args.ticks} ticks, windows {WINDOWS} minutes")
+    print(f"{'tick spacing':>12} {'ticks/60m':>10} {'incremental':>14} {'recompute':>14}")
+    for spacing in (60.0, 15.0, 5.0):
+        stream = make_ticks(args.symbols, args.ticks, spacing)
+
+        tracker = PriceTracker(WINDOWS, rules=[MoveRule(*rule) for rule in MOVE_ALERT_RULES])
+        started = time.perf_counter()
+        for symbol, ts, price, volume in stream:
+            tracker.update(symbol, price, ts, volume)
+        incremental = (time.perf_counter() - started) / len(stream)
+
+        histories = {}
+        started = time.perf_counter()
+        for symbol, ts, price, volume in stream:
+            recompute(histories.setdefault(symbol, deque()), ts, price, volume)
+        naive = (time.perf_counter() - started) / len(stream)
+
+        per_window = min(args.ticks, int(3600 / spacing))
+        print(f"{spacing:>11.0f}s {per_window:>10} {incremental * 1e6:>12.2f}us {naive * 1e6:>12.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark: per-symbol quote loop vs batched QuoteEngine
+
+Runs against a local stub provider that sleeps for a fixed latency per
+upstream round-trip, so the numbers reflect request count rather than
+network noise.
+
+Usage: python benchmarks/bench_quote_engine.py [--latency 0.005]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_engine import Quote, QuoteEngine, QuoteProvider
+
+SIZES = [5, 50, 500]
+
+
+class StubProvider(QuoteProvider):
+    """Simulated upstream with a fixed cost per HTTP round-trip"""
+    name = "stub"
+
+    def __init__(self, latency: float, supports_batch: bool):
+        self.latency = latency
+        self.supports_batch = supports_batch
+
+    def fetch_batch(self, symbols):
+        time.sleep(self.latency)
+        return {s: Quote(s, s, price=101.0, open=100.0) for s in symbols}
+
+    def fetch_one(self, symbol):
+        time.sleep(self.latency)
+        return Quote(symbol, symbol, price=101.0, open=100.0)
+
+
+def legacy_loop(provider, symbols):
+    """The old get_stock_data: ticker.info + ticker.history per symbol"""
+    data = {}
+    for symbol in symbols:
+        time.sleep(provider.latency)  # ticker.info
+        data[symbol] = provider.fetch_one(symbol)  # ticker.history
+    return data
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds per upstream round-trip")
+    args = parser.parse_args()
+
+    batching = StubProvider(args.latency, supports_batch=True)
+    pooled = StubProvider(args.latency, supports_batch=False)
+
+    print(f"Upstream latency: {args.latency * 1000:.1f} ms per request")
+    print(f"{'symbols':>8} {'legacy loop':>14} {'batched':>14} {'thread pool':>14}")
+    for size in SIZES:
+        symbols = [f"SYM{i}" for i in range(size)]
+        legacy = timed(legacy_loop, pooled, symbols)
+        batched = timed(QuoteEngine(batching).fetch, symbols)
+        fallback = timed(QuoteEngine(pooled).fetch, symbols)
+        print(f"{size:>8} {legacy * 1000:>12.1f}ms {batched * 1000:>12.1f}ms {fallback * 1000:>12.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark: /stocks latency while the quote upstream is hanging or throttled
+
+Replays --requests /stocks lookups (3 indices each) against a stub
+upstream. For the first half it answers in --latency; for the second
+half it hangs for --hang seconds and then fails, the way Yahoo behaves
+when it throttles us. Quotes expire after --ttl, so lookups keep going
+upstream.
+
+"before" is the old setup: one provider, no timeout, and a cache that
+waits for every expired quote. "after" is the current one: a timeout,
+a circuit breaker, a backup provider and stale-while-revalidate. For
+each the script prints latency percentiles and how many lookups came
+back with a price.
+
+Usage: python benchmarks/bench_quote_failover.py [--requests 200] [--hang 0.5] [--ttl 0.05]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_cache import QuoteCache
+from quote_engine import Quote, QuoteEngine, QuoteProvider
+
+SYMBOLS = ["^GSPC", "^DJI", "^IXIC"]
+
+
+class FlakyProvider(QuoteProvider):
+    """Stub upstream that starts hanging and failing once ``down`` is set"""
+    supports_batch = True
+
+    def __init__(self, name: str, latency: float, hang: float):
+        self.name = name
+        self.latency = latency
+        self.hang = hang
+        self.down = False
+        self.calls = 0
+
+    def fetch_batch(self, symbols):
+        self.calls += 1
+        if self.down:
+            time.sleep(self.hang)
+            raise ConnectionError("429 Too Many Requests")
+        time.sleep(self.latency)
+        return {s: Quote(s, s, price=101.0, open=100.0, timestamp=time.time()) for s in symbols}
+
+    def fetch_one(self, symbol):
+        return self.fetch_batch([symbol])[symbol]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def replay(cache: QuoteCache, primary: FlakyProvider, requests: int, allow_stale: bool):
+    latencies, answered = [], 0
+    for i in range(requests):
+        primary.down = i >= requests // 2
+        started = time.perf_counter()
+        quotes = cache.get_many(SYMBOLS, allow_stale=allow_stale)
+        latencies.append(time.perf_counter() - started)
+        answered += all(quote.available for quote in quotes.values())
+        time.sleep(0.01)
+    return latencies, answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="healthy upstream round-trip, seconds")
+    parser.add_argument("--hang", type=float, default=0.5, help="how long a throttled call hangs, seconds")
+    parser.add_argument("--ttl", type=float, default=0.05, help="quote lifetime, seconds")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)  # the outage is the point; don't print every failed call
+
+    ttl = lambda symbol: args.ttl
+
+    before_upstream = FlakyProvider("yfinance", args.latency, args.hang)
+    before = QuoteCache(QuoteEngine(before_upstream).fetch, ttl_for=ttl)
+
+    after_upstream = FlakyProvider("yfinance", args.latency, args.hang)
+    backup = FlakyProvider("backup", args.latency * 3, args.hang)  # slower, but up
+    engine = QuoteEngine([after_upstream, backup], timeout=args.latency * 5)
+    after = QuoteCache(engine.fetch, ttl_for=ttl, max_stale=3600)
+
+    print(f"{args.requests} lookups, upstream {args.latency * 1000:.0f}ms when healthy, "
+          f"hangs {args.hang * 1000:.0f}ms then fails for the second half")
+    print(f"{'':>7} {'p50':>9} {'p99':>9} {'max':>9} {'priced':>8} {'primary calls':>14}")
+    for label, cache, upstream, allow_stale in (("before", before, before_upstream, False),
+                                                ("after", after, after_upstream, True)):
+        latencies, answered = replay(cache, upstream, args.requests, allow_stale)
+        print(f"{label:>7} {percentile(latencies, 0.5) * 1000:>7.1f}ms {percentile(latencies, 0.99) * 1000:>7.1f}ms "
+              f"{max(latencies) * 1000:>7.1f}ms {answered / args.requests:>7.0%} {upstream.calls:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark: rate limiter cost and memory with millions of chats
+
+Sends --requests requests from --chats distinct chats through a
+RateLimiter, on a simulated clock that advances --spacing seconds per
+request, and reports the time per ``allow()`` call and the memory the
+limiter holds at the end (measured with tracemalloc). With a busy
+minute's worth of chats the key count stops at --max-keys; with chats
+spread over time idle ones expire and memory stays small.
+
+Usage: python benchmarks/bench_rate_limiter.py [--requests 2000000] [--chats 1000000] [--max-keys 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import RateLimiter
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(requests: int, chats: int, spacing: float, max_keys: int):
+    clock = SimClock()
+    tracemalloc.start()
+    limiter = RateLimiter(30, burst=10, max_keys=max_keys, clock=clock)
+    started = time.perf_counter()
+    for i in range(requests):
+        clock.now += spacing
+        limiter.allow(i * 7919 % chats)
+    elapsed = time.perf_counter() - started
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / requests, len(limiter), held, limiter.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2_000_000)
+    parser.add_argument("--chats", type=int, default=1_000_000)
+    parser.add_argument("--max-keys", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{args.requests:,} requests from {args.chats:,} chats, 30/min per chat, max {args.max_keys:,} keys")
+    print(f"{'arrival':>22} {'per call':>10} {'keys':>9} {'memory':>9} {'limited':>9}")
+    for label, rate in (("10,000 requests/s", 10_000), ("500 requests/s", 500)):
+        per_call, keys, held, stats = run(args.requests, args.chats, 1.0 / rate, args.max_keys)
+        print(f"{label:>22} {per_call * 1e6:>8.2f}us {keys:>9,} {held / 1e6:>7.1f}MB {stats['limited']:>9,}")
+
+
+if __name__ == "__main__":
+    main()
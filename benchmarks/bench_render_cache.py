@@ -0,0 +1,107 @@
+"""Benchmark: /status, /stocks and /news replies rendered per second
+
+"legacy" rebuilds every reply with the += concatenation the handlers
+used to have. "join" is the bot's current render_* methods called on
+every request, and "cached" goes through the RenderCache with the same
+keys the handlers use, so each (timezone, minute), quote version or news
+bucket version is rendered once. Requests come from users spread over
+--timezones distinct timezones, all within one minute.
+
+Usage: python benchmarks/bench_render_cache.py [--requests 20000] [--timezones 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from functools import partial
+from unittest.mock import patch
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_monitor_bot import MARKETS, MarketMonitorBot
+
+STOCK_DATA = {
+    symbol: {"symbol": symbol, "name": symbol, "price": "101.00", "change": "+1.00", "change_percent": "+1.00%"}
+    for market_info in MARKETS.values() for symbol in market_info.get("indices", [])
+}
+ARTICLES = [
+    {"title": f"Headline {i}", "description": "Markets moved on the news.", "url": f"https://news/{i}",
+     "source": "Wire", "published_at": "2026-10-19T10:00:00Z"}
+    for i in range(5)
+]
+
+
+def legacy_status(bot, user_tz):
+    message = "🔔 *Market Status Update*\n\n"
+    for market_name, market_info in MARKETS.items():
+        status = bot.get_market_status(market_name, market_info, user_tz)
+        message += f"*{status['name']}*\n"
+        message += f"Local Time: {status['display_time']}\n"
+        message += f"Status: {status['status']}\n\n"
+    return message
+
+
+def legacy_stocks(stock_data):
+    message = "📈 *Stock Indices*\n\n"
+    for symbol, data in stock_data.items():
+        emoji = "📈" if data['change_percent'].startswith('+') else "📉" if data['change_percent'].startswith('-') else "➡️"
+        message += f"{emoji} *{data['name']} ({symbol})*\n"
+        message += f"Price: {data['price']}\n"
+        message += f"Change: {data['change']} ({data['change_percent']})\n\n"
+    return message
+
+
+def legacy_news(articles):
+    message = "📰 *Latest Market News*\n\n"
+    for i, article in enumerate(articles, 1):
+        message += f"*{i}. {article['title']}*\n"
+        message += f"{article['description']}\n"
+        message += f"📰 {article['source']}\n"
+        message += f"[Read more]({article['url']})\n\n"
+    return message
+
+
+def reply(bot, mode, command, user_tz):
+    if mode == "legacy":
+        if command == "status":
+            return legacy_status(bot, user_tz)
+        return legacy_stocks(STOCK_DATA) if command == "stocks" else legacy_news(ARTICLES)
+
+    ts = bot.calendar.clock()
+    if command == "status":
+        key, render = ("status", user_tz, bot.calendar.version(ts)), partial(bot.render_status, user_tz, ts)
+    elif command == "stocks":
+        key, render = ("stocks", bot.quote_cache.version), partial(bot.render_stocks, STOCK_DATA)
+    else:
+        key, render = ("news", ("finance",), 1), partial(bot.render_news, ARTICLES)
+    return render() if mode == "join" else bot.render_cache.get_or_render(key, render)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--timezones", type=int, default=20)
+    args = parser.parse_args()
+
+    with patch("market_monitor_bot.Application"):
+        bot = MarketMonitorBot()
+    frozen = time.time()
+    bot.calendar.clock = lambda: frozen
+    timezones = pytz.common_timezones[::len(pytz.common_timezones) // args.timezones][:args.timezones]
+
+    print(f"{args.requests} requests per command, {len(timezones)} timezones")
+    print(f"{'command':>8} {'mode':>8} {'replies/s':>12}")
+    for command in ("status", "stocks", "news"):
+        for mode in ("legacy", "join", "cached"):
+            started = time.perf_counter()
+            for i in range(args.requests):
+                reply(bot, mode, command, timezones[i % len(timezones)])
+            elapsed = time.perf_counter() - started
+            print(f"{command:>8} {mode:>8} {args.requests / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark: update throughput with 1, 2, 4 and 8 worker processes
+
+Starts a Supervisor whose workers stand in for the bot's handlers: each
+update burns --cpu-ms of pure-Python CPU (rendering, parsing, alert
+bookkeeping, all under the GIL) and then waits --io-ms (a reply
+round-trip). --updates updates over --chats chats are routed by chat id,
+and the rate is measured from the first update routed to the last one
+acknowledged. Worker start-up is not counted.
+
+CPU-bound work only scales up to the number of cores, so the script
+prints how many it can use. It also times reads of the shared quote
+snapshot that the workers serve /stocks from.
+
+Usage: python benchmarks/bench_sharding.py [--workers 1,2,4,8] [--updates 2000] [--cpu-ms 2] [--io-ms 0]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_engine import Quote
+from quote_snapshot import QuoteSnapshot
+from supervisor import Supervisor
+
+
+def burn(seconds: float):
+    deadline = time.process_time() + seconds  # CPU time, so sharing a core doesn't shorten it
+    total = 0
+    while time.process_time() < deadline:
+        total += sum(i * i for i in range(200))
+    return total
+
+
+def handler_worker(index, inbound, snapshot_name, acks, cpu: float, io: float):
+    acks.put(("ready", index))
+    while True:
+        update = inbound.get()
+        if update is None:
+            break
+        burn(cpu)
+        if io:
+            time.sleep(io)
+        acks.put(("done", index))
+
+
+def run(workers: int, updates: list, cpu: float, io: float) -> float:
+    acks = multiprocessing.get_context("spawn").Queue()
+    supervisor = Supervisor(handler_worker, workers, args=(acks, cpu, io), queue_size=len(updates))
+    supervisor.start()
+    for _ in range(workers):
+        acks.get()
+    started = time.perf_counter()
+    for update in updates:
+        supervisor.route(update)
+    for _ in updates:
+        acks.get()
+    elapsed = time.perf_counter() - started
+    supervisor.stop()
+    return elapsed
+
+
+def bench_snapshot(symbols: int = 200, reads: int = 10_000):
+    snapshot = QuoteSnapshot.create()
+    reader = QuoteSnapshot.attach(snapshot.name)
+    expires = time.time() + 3600
+    snapshot.publish({f"S{i}": (expires, Quote(f"S{i}", f"Symbol {i}", price=100.0 + i, open=100.0, volume=1e6))
+                      for i in range(symbols)})
+    started = time.perf_counter()
+    for _ in range(reads):
+        reader.quotes(["S1", "S2", "S3"])
+    cached = (time.perf_counter() - started) / reads
+    started = time.perf_counter()
+    for _ in range(reads // 10):
+        snapshot.publish({})  # force a decode on every read
+        reader.quotes(["S1"])
+    fresh = (time.perf_counter() - started) / (reads // 10)
+    reader.close()
+    snapshot.close()
+    print(f"snapshot of {symbols} quotes: {cached * 1e6:.1f}us per read, "
+          f"{fresh * 1e6:.1f}us for the first read after a publish")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--cpu-ms", type=float, default=2.0)
+    parser.add_argument("--io-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    updates = [{"update_id": i, "message": {"chat": {"id": 1000 + i % args.chats}}} for i in range(args.updates)]
+    print(f"{args.updates:,} updates, {args.cpu_ms:g}ms CPU + {args.io_ms:g}ms I/O each, {cores} usable cores")
+    baseline = None
+    for workers in [int(n) for n in args.workers.split(",")]:
+        rate = args.updates / run(workers, updates, args.cpu_ms / 1000, args.io_ms / 1000)
+        baseline = baseline or rate
+        print(f"{workers} workers: {rate:10,.0f} updates/s  ({rate / baseline:.2f}x)")
+    bench_snapshot()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark: cold `import market_monitor_bot` time, from `python -X importtime`
+
+Runs the import --runs times in fresh interpreters, reports the median
+total and the slowest direct imports of the best run, and exits with
+status 1 if the median is over --budget-ms or if one of the lazily
+loaded integrations (yfinance, pandas, newsapi, geopy, timezonefinder,
+tzlocal) was imported at startup, so it can gate CI. Run it once first
+(or `python -m compileall .`) so bytecode compilation isn't measured.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--budget-ms 1000] [--top 10]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED = ("yfinance", "pandas", "newsapi", "geopy", "timezonefinder", "tzlocal")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def profile() -> list:
+    """One cold import: [(cumulative_us, depth, module)] in completion order"""
+    env = dict(os.environ, PREFERENCES_DB_PATH=":memory:")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import market_monitor_bot"],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            rows.append((int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [profile() for _ in range(args.runs)]
+    totals = [next(us for us, _, name in rows if name == "market_monitor_bot") / 1000 for rows in runs]
+    median = statistics.median(totals)
+    print(f"import market_monitor_bot: median {median:.0f}ms, best {min(totals):.0f}ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f}ms)")
+
+    best = runs[totals.index(min(totals))]
+    direct = sorted(((us, name) for us, depth, name in best if depth == 1), reverse=True)
+    for us, name in direct[:args.top]:
+        print(f"  {us / 1000:7.1f}ms  {name}")
+
+    imported = sorted({name.split(".")[0] for _, _, name in best} & set(DEFERRED))
+    failed = False
+    if imported:
+        print(f"FAIL: imported at startup: {', '.join(imported)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: startup is over budget by {median - args.budget_ms:.0f}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark: location -> timezone lookups, per-request finder vs shared locator
+
+"legacy" builds a new TimezoneFinder() for every location message, as
+detect_timezone_from_location used to. It is slow, so only a sample is
+timed. "cold" is the shared TimezoneLocator on its first pass over 10k
+random coordinates, and "warm" is a second pass where every grid cell
+is already memoized.
+
+Usage: python benchmarks/bench_timezone_lookup.py [--lookups 10000] [--legacy-sample 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timezonefinder import TimezoneFinder
+
+from market_monitor_bot import TimezoneLocator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--legacy-sample", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    coords = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(args.lookups)]
+
+    started = time.perf_counter()
+    for lat, lng in coords[:args.legacy_sample]:
+        TimezoneFinder().timezone_at(lat=lat, lng=lng)
+    legacy = (time.perf_counter() - started) / args.legacy_sample
+
+    locator = TimezoneLocator()
+    started = time.perf_counter()
+    locator.warm_up()
+    warm_up = time.perf_counter() - started
+
+    passes = []
+    for _ in range(2):
+        started = time.perf_counter()
+        for lat, lng in coords:
+            locator.timezone_at(lat, lng)
+        passes.append((time.perf_counter() - started) / len(coords))
+
+    print(f"{'mode':>26} {'per lookup':>12}")
+    print(f"{'legacy (new finder each)':>26} {legacy * 1e3:>10.2f}ms")
+    print(f"{'shared finder warm-up':>26} {warm_up * 1e3:>10.2f}ms (once)")
+    print(f"{'cold memo':>26} {passes[0] * 1e6:>10.2f}us")
+    print(f"{'warm memo':>26} {passes[1] * 1e6:>10.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark: resident memory of UserPreferences, old dataclass vs slotted layout
+
+Each measurement runs in a fresh subprocess, builds N preference objects
+the way the bot does (chat_id only, defaults for everything else) and
+reports how much the process's resident set grew.
+
+Usage: python benchmarks/bench_user_preferences_memory.py [--sizes 100000 1000000]
+"""
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAYOUTS = ("dataclass", "slotted")
+
+
+def resident_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def build(layout: str, size: int) -> int:
+    from market_monitor_bot import MARKETS, UserPreferences
+
+    @dataclass
+    class LegacyUserPreferences:
+        chat_id: str
+        timezone: Optional[str] = None
+        notifications_enabled: bool = True
+        preferred_markets: List[str] = None
+        news_keywords: List[str] = None
+
+        def __post_init__(self):
+            if self.preferred_markets is None:
+                self.preferred_markets = list(MARKETS.keys())
+            if self.news_keywords is None:
+                self.news_keywords = ["stock market", "trading", "finance", "economy"]
+
+    cls = LegacyUserPreferences if layout == "dataclass" else UserPreferences
+    chat_ids = [str(100_000_000 + i) for i in range(size)]
+    gc.collect()
+    before = resident_bytes()
+    prefs = {chat_id: cls(chat_id=chat_id) for chat_id in chat_ids}
+    gc.collect()
+    grown = resident_bytes() - before
+    assert len(prefs) == size
+    return grown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(build(args.child[0], int(args.child[1])))
+        return
+
+    print(f"{'users':>10} {'layout':>10} {'RSS growth':>12} {'per user':>10}")
+    for size in args.sizes:
+        for layout in LAYOUTS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", layout, str(size)],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            grown = int(output)
+            print(f"{size:>10,} {layout:>10} {grown / 2 ** 20:>10.1f}MB {grown / size:>9.0f}B")
+
+
+if __name__ == "__main__":
+    main()
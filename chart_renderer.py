@@ -0,0 +1,197 @@
+"""Price charts for Sajib Market Trading Monitor Bot
+
+``/chart <symbol> <range>`` sends a PNG of the symbol's closes. Drawing a
+chart with matplotlib takes a few hundred milliseconds of CPU, so:
+
+* rendering runs in a process pool (``render_chart`` is a plain
+  top-level function taking arrays, so it pickles cheaply), never on the
+  event loop or the handler threads;
+* rendered PNGs go to a content-addressed cache on disk. The address is a
+  hash of (symbol, range, last bar timestamp), so a chart stays valid
+  until a new bar arrives and there is nothing to invalidate;
+* once Telegram has the photo, the ``file_id`` it hands back is kept next
+  to the PNG and sent instead of the bytes, so a repeat request costs
+  neither rendering nor uploading.
+
+matplotlib is optional and only imported inside the worker processes.
+"""
+
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MATPLOTLIB_AVAILABLE = importlib.util.find_spec("matplotlib") is not None
+
+# Bump when the look of the charts changes, so cached PNGs aren't reused
+RENDER_VERSION = 1
+DEFAULT_MAX_POINTS = 800
+DEFAULT_MAX_FILES = 2000
+DAY = 86400
+
+
+class ChartRange(NamedTuple):
+    seconds: int
+    period: str    # upstream look-back when there's no local history
+    interval: str  # upstream bar size for that look-back
+
+
+RANGES: Dict[str, ChartRange] = {
+    "1d": ChartRange(DAY, "1d", "5m"),
+    "5d": ChartRange(5 * DAY, "5d", "30m"),
+    "1mo": ChartRange(30 * DAY, "1mo", "1h"),
+    "3mo": ChartRange(91 * DAY, "3mo", "1d"),
+    "6mo": ChartRange(182 * DAY, "6mo", "1d"),
+    "1y": ChartRange(365 * DAY, "1y", "1d"),
+    "5y": ChartRange(5 * 365 * DAY, "5y", "1wk"),
+}
+DEFAULT_RANGE = "1d"
+
+
+def chart_key(symbol: str, range_name: str, last_ts: int) -> str:
+    """Content address of a chart: everything the picture depends on"""
+    raw = f"{RENDER_VERSION}|{symbol}|{range_name}|{int(last_ts)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def downsample(ts: np.ndarray, close: np.ndarray, max_points: int = DEFAULT_MAX_POINTS):
+    """At most ``max_points`` evenly strided points, always keeping the last one"""
+    if len(ts) <= max_points:
+        return np.asarray(ts), np.asarray(close)
+    index = np.linspace(0, len(ts) - 1, max_points).round().astype(np.int64)
+    return ts[index], close[index]
+
+
+def render_chart(title: str, ts: np.ndarray, close: np.ndarray) -> bytes:
+    """Draw a close-price line chart and return it as PNG bytes (runs in a worker process)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.dates as mdates
+    from matplotlib.figure import Figure
+
+    change = (close[-1] - close[0]) / close[0] * 100 if close[0] else 0.0
+    color = "#2e7d32" if change >= 0 else "#c62828"
+    dates = ts.astype("datetime64[s]")
+
+    figure = Figure(figsize=(8, 4), dpi=100)
+    axes = figure.add_subplot()
+    axes.plot(dates, close, color=color, linewidth=1.4)
+    axes.fill_between(dates, close, close.min(), color=color, alpha=0.08)
+    axes.set_title(f"{title}  {close[-1]:,.2f}  ({change:+.2f}%)", loc="left", fontsize=11)
+    axes.grid(alpha=0.3)
+    axes.margins(x=0)
+    axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(axes.xaxis.get_major_locator()))
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+class ChartCache:
+    """Rendered PNGs by content address on disk, plus the Telegram file_id of each once uploaded"""
+
+    def __init__(self, directory: str, max_files: int = DEFAULT_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, None]" = OrderedDict()  # keys, least recently used first
+        self._file_ids: Dict[str, str] = {}
+        self._loaded = False
+
+        self.hits = 0
+        self.file_id_hits = 0
+        self.misses = 0
+
+    def _load(self):
+        """Index what's on disk the first time the cache is used"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.directory):
+            return
+        names = sorted(os.listdir(self.directory),
+                       key=lambda name: os.path.getmtime(os.path.join(self.directory, name)))
+        for name in names:
+            key, ext = os.path.splitext(name)
+            if ext == ".png":
+                self._index[key] = None
+            elif ext == ".id":
+                with open(os.path.join(self.directory, name)) as f:
+                    self._file_ids[key] = f.read().strip()
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, key + ext)
+
+    def file_id(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._load()
+            file_id = self._file_ids.get(key)
+            if file_id is not None:
+                self.file_id_hits += 1
+                if key in self._index:
+                    self._index.move_to_end(key)
+            return file_id
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            self._load()
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        try:
+            with open(self._path(key, ".png"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._index.pop(key, None)
+            return None
+
+    def put(self, key: str, png: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(key, f".{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, self._path(key, ".png"))
+        with self._lock:
+            self._load()
+            self._index[key] = None
+            self._index.move_to_end(key)
+            while len(self._index) > self.max_files:
+                old, _ = self._index.popitem(last=False)
+                self._file_ids.pop(old, None)
+                for ext in (".png", ".id"):
+                    try:
+                        os.remove(self._path(old, ext))
+                    except FileNotFoundError:
+                        pass
+
+    def remember_file_id(self, key: str, file_id: str):
+        with self._lock:
+            self._file_ids[key] = file_id
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(key, ".id"), "w") as f:
+                f.write(file_id)
+        except OSError as e:
+            logger.warning(f"Could not persist chart file_id: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._index),
+                "file_ids": len(self._file_ids),
+                "hits": self.hits,
+                "file_id_hits": self.file_id_hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,81 @@
+"""Circuit breaker for upstream calls in Sajib Market Trading Monitor Bot
+
+When Yahoo is throttling us, every call waits for the full timeout and
+then fails, and each retry only adds to the throttling. A breaker counts
+consecutive failures per upstream. After ``failure_threshold`` of them
+it opens, and calls are refused at once (so the next provider, or the
+stale cached quote, answers instead). After ``reset_timeout`` seconds a
+single trial call is let through (half-open). If it succeeds the breaker
+closes again; if it fails the breaker stays open for another
+``reset_timeout``.
+"""
+
+import threading
+import time
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT_SECONDS = 60
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open breaker for one upstream"""
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; in half-open state only one trial call at a time"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self.clock() - self._opened_at >= self.reset_timeout and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.trips += 1
+                self._state = OPEN
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {"state": state, "failures": self._failures, "trips": self.trips, "rejected": self.rejected}
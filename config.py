@@ -11,10 +11,88 @@ NEWS_API_KEY = "YOUR_NEWS_API_KEY"
 # --- ALERT SETTINGS ---
 ALERT_THRESHOLD_PERCENT = 2.0  # Send alerts for movements > 2%
 ALERT_INTERVAL_MINUTES = 30    # Check for alerts every 30 minutes
+MAX_ALERT_RULES_PER_USER = 25  # Personal /alert rules per chat
+MAX_WATCHLIST_SIZE = 20        # Tickers per /watch list
+ALERT_COOLDOWN_MINUTES = 60    # An alert that fired stays quiet at least this long
+ALERT_REARM_RATIO = 0.75       # A move alert re-arms once the move falls back under 75% of its threshold
+ALERT_PRICE_BAND_PERCENT = 0.5 # A price-level alert re-arms once the price is 0.5% back past the level
 
 # --- RATE LIMITING ---
-MAX_REQUESTS_PER_MINUTE = 30   # Respect API rate limits
+MAX_REQUESTS_PER_MINUTE = 30   # Commands and button presses per chat; past it, replies come from cache only
+RATE_LIMIT_BURST = 10          # Requests a chat can make back to back before the per-minute rate applies
+UPSTREAM_REQUESTS_PER_MINUTE = 120  # Quote/chart fetches triggered by users, across all chats
+RATE_LIMIT_MAX_CHATS = 100_000 # Most chats tracked at once (a chat is forgotten once its bucket refills)
 REQUEST_TIMEOUT_SECONDS = 10   # Timeout for API requests
+HANDLER_EXECUTOR_WORKERS = 16  # Threads for blocking calls (yfinance, NewsAPI) made by handlers
+
+# --- QUOTE CACHE ---
+QUOTE_CACHE_SIZE = 1024          # Max symbols kept in the shared quote cache
+QUOTE_TTL_OPEN_SECONDS = 60      # Quote freshness while the symbol's market is open
+QUOTE_TTL_CLOSED_SECONDS = 900   # Quote freshness while the market is closed
+QUOTE_STALE_SECONDS = 1800       # /stocks answers with an expired quote (marked with its age) for this long while it refreshes
+
+# --- QUOTE PROVIDERS ---
+CIRCUIT_FAILURE_THRESHOLD = 3    # Consecutive failures before a quote provider is skipped
+CIRCUIT_RESET_SECONDS = 60       # How long a failing provider is skipped before it is tried again
+DSE_PROVIDER_ENABLED = True      # Quote the Dhaka index from the DSE website (DSE has no quote API)
+DSE_QUOTE_URL = "https://www.dsebd.org/index.php"
+
+# --- PRICE TRACKER ---
+PRICE_TICK_SECONDS = 60                # Quote poll interval feeding the tracker while a market is open
+PRICE_WINDOWS_MINUTES = (5, 15, 60)    # Rolling windows for returns, VWAP deltas and z-scores
+PRICE_TRACKER_CAPACITY = 1024          # Ticks kept per symbol (ring buffer)
+MOVE_ALERT_RULES = [                   # (metric, threshold, window minutes); metric: return, vwap_delta, zscore
+    ("return", 1.0, 5),
+    ("return", 1.5, 15),
+    ("zscore", 3.0, 60),
+]
+
+# --- PRICE HISTORY ---
+HISTORY_ENABLED = True           # Record intraday bars after each market close
+HISTORY_DIR = "data/history"     # Per-symbol columnar OHLCV files
+HISTORY_BAR_INTERVAL = "1m"      # Bar size to record
+HISTORY_FETCH_PERIOD = "5d"      # Look-back per fetch; catches up on sessions missed while the bot was down
+
+# --- CHARTS ---
+CHART_WORKERS = 2                   # Processes rendering /chart images
+CHART_CACHE_DIR = "data/charts"     # Rendered PNGs, content-addressed by (symbol, range, last bar)
+CHART_CACHE_MAX_FILES = 2000        # PNGs kept on disk
+CHART_MAX_POINTS = 800              # Points plotted per chart
+
+# --- RENDER CACHE ---
+RENDER_CACHE_SIZE = 4096  # Rendered /status, /stocks and /news replies kept for reuse
+
+# --- TELEGRAM DELIVERY ---
+TELEGRAM_GLOBAL_RATE = 30          # Messages/second across all chats (Bot API limit)
+TELEGRAM_PER_CHAT_INTERVAL = 1.0   # Seconds between messages to the same chat
+TELEGRAM_MAX_CONCURRENCY = 16      # Parallel sendMessage requests / pooled connections
+
+# --- METRICS ---
+METRICS_ENABLED = True    # Time handlers and upstream calls; when off, instrumentation is a no-op
+METRICS_HOST = "0.0.0.0"  # Interface for the Prometheus endpoint
+METRICS_PORT = None       # Serve Prometheus text on http://host:port/metrics (e.g. 9108); None to disable
+ADMIN_CHAT_IDS = []       # Chats allowed to use /botstats (or set ADMIN_CHAT_IDS="123,456" in the environment)
+
+# --- UPDATE INGRESS ---
+WEBHOOK_URL = None             # Public HTTPS URL Telegram posts updates to (e.g. https://bot.example.com/telegram); None = long polling
+WEBHOOK_LISTEN = "0.0.0.0"     # Interface the webhook server binds to
+WEBHOOK_PORT = 8000            # Port the webhook server binds to (PORT in the environment wins, for PaaS hosts)
+WEBHOOK_PATH = "/telegram"     # Request path Telegram posts to
+WEBHOOK_SECRET_TOKEN = None    # Checked on every request; None derives one from the bot token, the same on every replica
+WEBHOOK_WORKERS = 32           # Updates handled concurrently
+WEBHOOK_QUEUE_SIZE = 1000      # Updates waiting for a worker; beyond this Telegram is told to retry later
+WEBHOOK_MAX_CONNECTIONS = 40   # Parallel connections Telegram may open to us
+WEBHOOK_DRAIN_SECONDS = 10     # On shutdown, time allowed to finish queued updates
+
+# --- WORKER PROCESSES ---
+WORKER_PROCESSES = 1             # >1 runs a supervisor that spreads chats over this many processes (needs the sqlite backend)
+WORKER_QUEUE_SIZE = 1000         # Updates waiting per worker process
+LEADER_LOCK_PATH = "data/leader.lock"  # The worker holding this lock polls quotes and sends alerts
+LEADER_RETRY_SECONDS = 5         # How often the other workers try to take over the lock
+QUOTE_SNAPSHOT_BYTES = 1 << 20   # Shared memory for the leader's quotes (~150 bytes per symbol)
+
+# --- STARTUP ---
+PRELOAD_INTEGRATIONS = True  # Import yfinance/newsapi/geopy in the background once the bot is up, not at startup
 
 # --- LOGGING ---
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
@@ -37,6 +115,22 @@ DEFAULT_NOTIFICATIONS_ENABLED = True
 DEFAULT_TIMEZONE = None  # Auto-detect
 DEFAULT_NEWS_KEYWORDS = ["stock market", "trading", "finance", "economy"]
 
+# --- NEWS CACHE ---
+NEWS_TTL_SECONDS = 600      # Refresh each keyword bucket from NewsAPI every 10 minutes
+NEWS_MAX_ARTICLES = 500     # Articles kept in memory, de-duplicated by URL
+NEWS_MAX_BUCKETS = 256      # Distinct keyword sets tracked at once
+NEWS_PUSH_LIMIT = 3         # Max new headlines pushed to a news-alert subscriber per refresh
+NEWS_PAGE_SIZE = 100        # Articles per NewsAPI request (its maximum); must cover a bucket's 20 newest
+
+# --- LOCATION LOOKUP ---
+LOCATION_GRID_DEGREES = 0.01   # Locations within ~1 km share a cached timezone lookup
+LOCATION_CACHE_SIZE = 10000    # Grid cells kept in the timezone lookup memo
+TIMEZONE_WARMUP = True         # Load timezone polygons at startup instead of on first location
+
+# --- PREFERENCE STORAGE ---
+PREFERENCES_BACKEND = "sqlite"               # "sqlite" (persistent) or "memory"
+PREFERENCES_DB_PATH = "data/preferences.db"  # SQLite file, kept across restarts
+
 # --- DEVELOPMENT SETTINGS ---
 DEBUG_MODE = False  # Enable for detailed logging
 TEST_MODE = False   # Enable for testing without real API calls
@@ -0,0 +1,320 @@
+"""Local OHLCV history for Sajib Market Trading Monitor Bot
+
+Every quote used to come from a live ``history(period="1d")`` call and
+nothing was kept. The store here appends bars to per-symbol columnar
+files, one flat binary file per column (``ts`` as int64 epoch seconds,
+``open``/``high``/``low``/``close``/``volume`` as float64):
+
+    <root>/<symbol>/CURRENT         generation number, e.g. "3"
+    <root>/<symbol>/3/main.ts       bars in timestamp order
+    <root>/<symbol>/3/main.close    ...
+    <root>/<symbol>/3/pending.ts    late or corrected bars, not yet merged
+
+Reads are ``np.memmap`` views, so a range query is two binary searches
+on the ``ts`` column and no copying. Bars newer than the last stored bar
+are appended to ``main``; anything older (a backfill, a corrected bar)
+goes to ``pending`` and is merged in by ``compact()``, which rewrites the
+symbol into a new generation, sorted and de-duplicated (the latest write
+of a timestamp wins), and then switches ``CURRENT`` atomically. Until then
+range queries merge ``pending`` in on the fly.
+
+One process writes; any number of readers can share the files. A store
+opened with ``follow=True`` expects another process to be appending and
+compacting (the alert leader, when the bot runs as several workers). It
+re-reads ``CURRENT`` and the column sizes before every read or append,
+never truncates a file it didn't write, and if a generation disappears
+under it during a compaction it moves on to the new one.
+"""
+
+import logging
+import math
+import os
+import shutil
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+DTYPES = {name: np.dtype(np.int64) if name == "ts" else np.dtype(np.float64) for name in COLUMNS}
+MAIN = "main"
+PENDING = "pending"
+
+
+class Bars(NamedTuple):
+    """Column arrays for a run of bars; views into the mapped files when read from the store"""
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.ts)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[float, float, float, float, float, float]]) -> "Bars":
+        """Build from (ts, open, high, low, close, volume) tuples"""
+        rows = list(rows)
+        return cls(*(np.fromiter((row[i] for row in rows), DTYPES[name], len(rows))
+                     for i, name in enumerate(COLUMNS)))
+
+    @classmethod
+    def empty(cls) -> "Bars":
+        return cls(*(np.empty(0, DTYPES[name]) for name in COLUMNS))
+
+    def take(self, index) -> "Bars":
+        return Bars(*(column[index] for column in self))
+
+
+def _rows(path: str) -> int:
+    try:
+        return os.stat(path).st_size // 8
+    except FileNotFoundError:
+        return 0
+
+
+class _Segment:
+    """One set of column files (main or pending) in a symbol's generation directory"""
+
+    def __init__(self, directory: str, prefix: str):
+        self.directory = directory
+        self.prefix = prefix
+        self.paths = {name: os.path.join(directory, f"{prefix}.{name}") for name in COLUMNS}
+        # Only rows present in every column count; a longer column is a torn or in-progress append
+        self.rows = min(_rows(path) for path in self.paths.values())
+        self._mapped: Optional[Bars] = None
+        self._repaired = False
+
+    def refresh(self):
+        """Pick up rows another process appended since we last looked"""
+        rows = min(_rows(path) for path in self.paths.values())
+        if rows != self.rows:
+            self.rows = rows
+            self._mapped = None
+
+    def _repair(self):
+        # A crash mid-append can leave some columns one batch longer; drop the torn tail before writing
+        for path in self.paths.values():
+            if _rows(path) > self.rows:
+                logger.warning(f"Truncating torn tail of {self.prefix} in {self.directory} to {self.rows} rows")
+                os.truncate(path, self.rows * 8)
+        self._repaired = True
+
+    def append(self, bars: Bars):
+        if not self._repaired:
+            self._repair()
+        for name, column in zip(COLUMNS, bars):
+            with open(self.paths[name], "ab") as f:
+                f.write(np.ascontiguousarray(column, DTYPES[name]).tobytes())
+        self.rows += bars.size
+        self._mapped = None
+
+    def map(self) -> Bars:
+        """Read-only memmaps of every column (cached until the next append)"""
+        if self._mapped is None:
+            if not self.rows:
+                self._mapped = Bars.empty()
+            else:
+                # Plain ndarray views of the maps: slicing a memmap subclass costs several times more
+                self._mapped = Bars(*(np.asarray(np.memmap(self.paths[name], DTYPES[name], "r", shape=(self.rows,)))
+                                      for name in COLUMNS))
+        return self._mapped
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return int(self.map().ts[-1]) if self.rows else None
+
+
+class _Series:
+    """The current generation of one symbol"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.generation = _current_generation(directory)
+        path = self.path(self.generation)
+        os.makedirs(path, exist_ok=True)
+        self.main = _Segment(path, MAIN)
+        self.pending = _Segment(path, PENDING)
+
+    def path(self, generation: int) -> str:
+        return os.path.join(self.directory, str(generation))
+
+
+def _current_generation(directory: str) -> int:
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return 0
+
+
+class HistoryStore:
+    """Append-only per-symbol OHLCV columns with memory-mapped range reads"""
+
+    def __init__(self, root: str, follow: bool = False):
+        self.root = root
+        self.follow = follow
+        self._series: Dict[str, _Series] = {}
+        self._lock = threading.Lock()
+        self.compactions = 0
+
+    def _directory(self, symbol: str) -> str:
+        return os.path.join(self.root, quote(symbol, safe=""))
+
+    def _get(self, symbol: str, create: bool = False) -> Optional[_Series]:
+        series = self._series.get(symbol)
+        if series is not None and self.follow:
+            if _current_generation(series.directory) != series.generation:
+                series = None  # compacted by the writer; open the new generation
+            else:
+                series.main.refresh()
+                series.pending.refresh()
+        if series is None:
+            directory = self._directory(symbol)
+            if not create and not os.path.isdir(directory):
+                return None
+            series = self._series[symbol] = _Series(directory)
+        return series
+
+    def _map(self, symbol: str) -> Optional[Tuple[Bars, Optional[Bars]]]:
+        """Maps of a symbol's main and pending segments (pending only if it has rows)"""
+        for _ in range(2):
+            series = self._get(symbol)
+            if series is None:
+                return None
+            try:
+                return series.main.map(), (series.pending.map() if series.pending.rows else None)
+            except FileNotFoundError:
+                # The writer compacted and removed this generation after we read CURRENT; look again
+                del self._series[symbol]
+        return None
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(name) for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def append(self, symbol: str, bars: Bars) -> int:
+        """Store bars (any order); returns how many went straight into the sorted main segment"""
+        if not bars.size:
+            return 0
+        order = np.argsort(bars.ts, kind="stable")
+        bars = bars.take(order)
+        with self._lock:
+            series = self._get(symbol, create=True)
+            last = series.main.last_ts
+            split = 0 if last is None else int(np.searchsorted(bars.ts, last, side="right"))
+            newer = bars.take(slice(split, None))
+            if split:
+                series.pending.append(bars.take(slice(0, split)))
+            if newer.size:
+                # Duplicates within the batch keep the last copy
+                keep = np.append(newer.ts[1:] != newer.ts[:-1], True)
+                series.main.append(newer if keep.all() else newer.take(keep))
+            return newer.size
+
+    def range(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> Bars:
+        """Bars with ``start <= ts < end``; zero-copy unless there are unmerged pending bars"""
+        with self._lock:
+            mapped = self._map(symbol)
+        if mapped is None:
+            return Bars.empty()
+        main, pending = mapped
+
+        # Bounds must be int64 too, or searchsorted converts the whole column to float first
+        lo = 0 if start is None else int(np.searchsorted(main.ts, np.int64(math.ceil(start)), side="left"))
+        hi = main.size if end is None else int(np.searchsorted(main.ts, np.int64(math.ceil(end)), side="left"))
+        bars = main.take(slice(lo, hi))
+        if pending is None:
+            return bars
+
+        mask = np.ones(pending.size, np.bool_)
+        if start is not None:
+            mask &= pending.ts >= start
+        if end is not None:
+            mask &= pending.ts < end
+        if not mask.any():
+            return bars
+        return _merge(bars, pending.take(mask))
+
+    def latest(self, symbol: str) -> Optional[Tuple[int, float]]:
+        """(ts, close) of the newest bar"""
+        with self._lock:
+            mapped = self._map(symbol)
+        if mapped is None or not mapped[0].size:
+            return None
+        main = mapped[0]
+        return int(main.ts[-1]), float(main.close[-1])
+
+    def close_at(self, symbol: str, ts: float) -> Optional[float]:
+        """Close of the last bar at or before ``ts``"""
+        bars = self.range(symbol, end=ts + 1)
+        return float(bars.close[-1]) if bars.size else None
+
+    def change_percent(self, symbol: str, seconds: float) -> Optional[float]:
+        """Percent change of the newest close against the close ``seconds`` earlier (e.g. 7 days)"""
+        latest = self.latest(symbol)
+        if latest is None:
+            return None
+        base = self.close_at(symbol, latest[0] - seconds)
+        if not base:
+            return None
+        return (latest[1] - base) / base * 100
+
+    def compact(self, symbols: Optional[Iterable[str]] = None) -> int:
+        """Merge pending bars into a fresh sorted generation; returns how many symbols were rewritten"""
+        compacted = 0
+        for symbol in list(symbols) if symbols is not None else self.symbols():
+            with self._lock:
+                series = self._get(symbol)
+                if series is None or not series.pending.rows:
+                    continue
+                merged = _merge(series.main.map(), series.pending.map())
+                old = series.path(series.generation)
+                generation = series.generation + 1
+                path = series.path(generation)
+                shutil.rmtree(path, ignore_errors=True)  # leftovers of an interrupted compaction
+                os.makedirs(path)
+                _Segment(path, MAIN).append(merged)
+                for name in COLUMNS:
+                    with open(os.path.join(path, f"{MAIN}.{name}"), "rb+") as f:
+                        os.fsync(f.fileno())
+
+                current = os.path.join(series.directory, "CURRENT")
+                with open(current + ".tmp", "w") as f:
+                    f.write(str(generation))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(current + ".tmp", current)
+                # Open maps of the old files stay valid after the unlink
+                shutil.rmtree(old, ignore_errors=True)
+                self._series[symbol] = _Series(series.directory)
+                self.compactions += 1
+                compacted += 1
+        return compacted
+
+    def stats(self) -> dict:
+        with self._lock:
+            series = list(self._series.values())
+        return {
+            "symbols": len(self.symbols()),
+            "open_symbols": len(series),
+            "rows": sum(s.main.rows for s in series),
+            "pending_rows": sum(s.pending.rows for s in series),
+            "compactions": self.compactions
+        }
+
+
+def _merge(main: Bars, pending: Bars) -> Bars:
+    """Sorted union of two bar runs; for equal timestamps the pending (later) bar wins"""
+    combined = Bars(*(np.concatenate([a, b]) for a, b in zip(main, pending)))
+    combined = combined.take(np.argsort(combined.ts, kind="stable"))
+    keep = np.append(combined.ts[1:] != combined.ts[:-1], True)
+    return combined.take(keep)
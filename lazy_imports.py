@@ -0,0 +1,110 @@
+"""Lazy optional dependencies for Sajib Market Trading Monitor Bot
+
+yfinance (and the pandas it drags in), newsapi, geopy, timezonefinder
+and tzlocal are each used by one feature, yet importing them all at
+startup took longer than everything else the bot loads put together.
+``lazy_import`` hands out a stand-in for the module instead: its
+``available`` flag only asks the import system whether the package is
+installed (without importing it), and the real import happens on the
+first attribute access, from whichever thread gets there first.
+
+Attribute writes go through to the real module as well, so tests can
+keep patching e.g. ``market_monitor_bot.yf.download`` and every module
+holding a stand-in for the same package sees the patch. ``preload``
+imports them ahead of time, off the startup path.
+"""
+
+import importlib
+import importlib.util
+import logging
+import threading
+from types import ModuleType
+from typing import Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, "LazyModule"] = {}
+_registry_lock = threading.Lock()
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+    __slots__ = ("_name", "_available", "_module", "_lock")
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_available", None)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def available(self) -> bool:
+        """Whether the package is installed; doesn't import it"""
+        if self._available is None:
+            # find_spec of "a.b" imports "a", so probe the top-level package only
+            top_level = self._name.partition(".")[0]
+            try:
+                found = importlib.util.find_spec(top_level) is not None
+            except (ImportError, ValueError):
+                found = False
+            object.__setattr__(self, "_available", found)
+        return self._available
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> ModuleType:
+        """Import the module now (raises ImportError if it can't be)"""
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    object.__setattr__(self, "_module", module)
+                    logger.debug(f"Loaded optional dependency {self._name}")
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "available" if self.available else "missing"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """The shared stand-in for ``name``; one per module name across the process"""
+    with _registry_lock:
+        module = _registry.get(name)
+        if module is None:
+            module = _registry[name] = LazyModule(name)
+        return module
+
+
+def loaded_modules() -> Dict[str, bool]:
+    """Which optional dependencies have been imported so far"""
+    with _registry_lock:
+        return {name: module.loaded for name, module in _registry.items()}
+
+
+def preload(modules: Iterable[LazyModule]):
+    """Import installed optional dependencies now, e.g. from a background thread after startup"""
+    for module in modules:
+        if not module.available or module.loaded:
+            continue
+        try:
+            module.load()
+        except Exception as e:
+            logger.warning(f"Could not preload {module.name}: {e}")
@@ -0,0 +1,63 @@
+"""Leader election for Sajib Market Trading Monitor Bot worker processes
+
+When the bot runs as several worker processes, exactly one of them may
+poll quotes, evaluate alerts and send the market bells. Otherwise every
+subscriber would get each alert once per worker.
+
+Each worker tries to take an exclusive SQLite transaction on a small
+lock file. SQLite's file locking works the same way on every platform we
+deploy to, and the lock belongs to the open connection, so the OS
+releases it the moment the leader process exits or crashes. Followers
+keep retrying, and one of them takes over within a retry interval.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Non-blocking, process-wide exclusive lock held for as long as the process wants it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if nobody else holds it; never waits"""
+        with self._lock:
+            if self._conn is not None:
+                return True
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=0, isolation_level=None, check_same_thread=False)
+            try:
+                # Rollback-journal mode: an exclusive transaction locks out every other connection
+                conn.execute("PRAGMA journal_mode=DELETE")
+                conn.execute("BEGIN EXCLUSIVE")
+            except sqlite3.OperationalError:
+                conn.close()
+                return False
+            self._conn = conn
+            logger.info(f"Process {os.getpid()} holds the leader lock {self.path}")
+            return True
+
+    def release(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.rollback()
+            finally:
+                self._conn.close()
+                self._conn = None
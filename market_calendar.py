@@ -0,0 +1,201 @@
+"""Precompiled trading-session calendar for Sajib Market Trading Monitor Bot
+
+Each entry in MARKETS is compiled once into a sorted list of UTC session
+boundaries ``[open, close, open, close, ...]`` covering a rolling window
+of days. Weekends, holidays, early closes and lunch breaks are resolved at
+compile time, and DST is handled by localizing every session in the
+market's own timezone. Queries are then just a binary search:
+
+* the market is open when ``bisect_right(bounds, t)`` is odd
+* the next open/close is the next boundary of the right parity
+
+Optional per-market keys understood in MARKETS:
+``weekend`` (weekday numbers, default Saturday/Sunday), ``holidays``
+(ISO dates) and ``early_close`` (ISO date -> "HH:MM").
+"""
+
+import datetime
+import threading
+import time
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional
+
+import pytz
+
+DEFAULT_WINDOW_DAYS = 35
+DEFAULT_WEEKEND = (5, 6)  # Saturday, Sunday
+
+# Day kinds
+TRADING = 0
+WEEKEND = 1
+HOLIDAY = 2
+
+
+class _Day(NamedTuple):
+    kind: int
+    close: str
+    break_start: Optional[float]
+    break_end: Optional[float]
+
+
+class _CompiledMarket(NamedTuple):
+    tz: datetime.tzinfo
+    bounds: List[float]
+    day_starts: List[float]
+    days: List[_Day]
+
+
+class MarketStatus(NamedTuple):
+    """Point-in-time status of one market"""
+    is_open: bool
+    status: str
+    local_time: str
+    local_dt: datetime.datetime
+
+
+class MarketCalendar:
+    """Answers "is open / next open / next close" for every market by binary search"""
+
+    def __init__(self, markets: Dict[str, dict], window_days: int = DEFAULT_WINDOW_DAYS,
+                 clock=time.time):
+        self.markets = dict(markets)
+        self.window_days = window_days
+        self.clock = clock
+
+        self._tz_cache: Dict[str, datetime.tzinfo] = {}
+        self._compiled: Dict[str, _CompiledMarket] = {}
+        self._window = (0.0, 0.0)
+        self._lock = threading.Lock()
+        # Session boundaries fall on whole minutes, so status only changes once a minute
+        self._status_cache: Dict[str, tuple] = {}
+
+    def timezone(self, name: str) -> datetime.tzinfo:
+        """Cached pytz timezone lookup"""
+        tz = self._tz_cache.get(name)
+        if tz is None:
+            tz = self._tz_cache[name] = pytz.timezone(name)
+        return tz
+
+    def add_market(self, market_name: str, market_info: dict):
+        with self._lock:
+            self.markets[market_name] = market_info
+            self._window = (0.0, 0.0)
+            self._status_cache.pop(market_name, None)
+
+    def _compiled_for(self, market_name: str, ts: float) -> _CompiledMarket:
+        start, end = self._window
+        # Keep at least a week of look-ahead so next_open over long weekends/holidays resolves
+        if not (start <= ts and ts + 7 * 86400 <= end) or market_name not in self._compiled:
+            self._rebuild(ts)
+        return self._compiled[market_name]
+
+    def _rebuild(self, ts: float):
+        with self._lock:
+            first = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).date() - datetime.timedelta(days=2)
+            dates = [first + datetime.timedelta(days=i) for i in range(self.window_days + 2)]
+            compiled = {name: self._compile(info, dates) for name, info in self.markets.items()}
+            self._compiled = compiled
+            self._window = (
+                datetime.datetime.combine(dates[0], datetime.time(), tzinfo=datetime.timezone.utc).timestamp()
+                + 86400,
+                datetime.datetime.combine(dates[-1], datetime.time(), tzinfo=datetime.timezone.utc).timestamp()
+            )
+
+    def _compile(self, info: dict, dates: List[datetime.date]) -> _CompiledMarket:
+        tz = self.timezone(info['tz'])
+        weekend = set(info.get('weekend', DEFAULT_WEEKEND))
+        holidays = set(info.get('holidays', ()))
+        early_close = info.get('early_close', {})
+
+        def at(day: datetime.date, hhmm: str) -> float:
+            hours, minutes = map(int, hhmm.split(":"))
+            return tz.localize(datetime.datetime.combine(day, datetime.time(hours, minutes))).timestamp()
+
+        bounds, day_starts, days = [], [], []
+        for day in dates:
+            iso = day.isoformat()
+            day_starts.append(at(day, "00:00"))
+            close = early_close.get(iso, info['close'])
+
+            if day.weekday() in weekend:
+                days.append(_Day(WEEKEND, close, None, None))
+                continue
+            if iso in holidays:
+                days.append(_Day(HOLIDAY, close, None, None))
+                continue
+
+            open_ts, close_ts = at(day, info['open']), at(day, close)
+            break_start = break_end = None
+            if "break_start" in info:
+                break_start, break_end = at(day, info['break_start']), at(day, info['break_end'])
+
+            if break_start is not None and break_start < close_ts:
+                bounds.extend([open_ts, break_start])
+                if break_end < close_ts:
+                    bounds.extend([break_end, close_ts])
+            else:
+                bounds.extend([open_ts, close_ts])
+            days.append(_Day(TRADING, close, break_start, break_end))
+
+        return _CompiledMarket(tz, bounds, day_starts, days)
+
+    def is_open(self, market_name: str, ts: Optional[float] = None) -> bool:
+        ts = self.clock() if ts is None else ts
+        return bisect_right(self._compiled_for(market_name, ts).bounds, ts) % 2 == 1
+
+    def next_open(self, market_name: str, ts: Optional[float] = None) -> Optional[float]:
+        """UTC timestamp of the next session open after ts"""
+        ts = self.clock() if ts is None else ts
+        bounds = self._compiled_for(market_name, ts).bounds
+        i = bisect_right(bounds, ts)
+        i += i % 2  # skip the close of a session that is in progress
+        return bounds[i] if i < len(bounds) else None
+
+    def next_close(self, market_name: str, ts: Optional[float] = None) -> Optional[float]:
+        """UTC timestamp of the next session close (or lunch break) after ts"""
+        ts = self.clock() if ts is None else ts
+        bounds = self._compiled_for(market_name, ts).bounds
+        i = bisect_right(bounds, ts)
+        i += 1 - i % 2
+        return bounds[i] if i < len(bounds) else None
+
+    def next_boundary(self, market_name: str, ts: Optional[float] = None) -> Optional[float]:
+        """UTC timestamp of the next open or close, whichever comes first"""
+        ts = self.clock() if ts is None else ts
+        bounds = self._compiled_for(market_name, ts).bounds
+        i = bisect_right(bounds, ts)
+        return bounds[i] if i < len(bounds) else None
+
+    def version(self, ts: Optional[float] = None) -> int:
+        """Snapshot version for anything derived from status(): it changes once a minute"""
+        ts = self.clock() if ts is None else ts
+        return int(ts // 60)
+
+    def status(self, market_name: str, ts: Optional[float] = None) -> MarketStatus:
+        """Open/closed state with the same labels /status has always shown"""
+        ts = self.clock() if ts is None else ts
+        minute = int(ts // 60)
+        cached = self._status_cache.get(market_name)
+        if cached is not None and cached[0] == minute:
+            return cached[1]
+
+        ts = minute * 60.0
+        compiled = self._compiled_for(market_name, ts)
+        is_open = bisect_right(compiled.bounds, ts) % 2 == 1
+        day = compiled.days[bisect_right(compiled.day_starts, ts) - 1]
+        local_dt = datetime.datetime.fromtimestamp(ts, compiled.tz)
+
+        if day.kind == WEEKEND:
+            status = "🔴 CLOSED (Weekend)"
+        elif day.kind == HOLIDAY:
+            status = "🔴 CLOSED (Holiday)"
+        elif is_open:
+            status = f"🟢 OPEN (Closes at {day.close})"
+        elif day.break_start is not None and day.break_start <= ts < day.break_end:
+            status = "🟡 LUNCH BREAK"
+        else:
+            status = "🔴 CLOSED"
+
+        market_status = MarketStatus(is_open, status, local_dt.strftime("%H:%M"), local_dt)
+        self._status_cache[market_name] = (minute, market_status)
+        return market_status
@@ -1,65 +1,109 @@
-import requests
+from __future__ import annotations
+
+import asyncio
+import contextvars
 import datetime
+import hashlib
 import pytz
 import time
-import json
 import logging
+import multiprocessing
 import os
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import re
+import signal
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial, wraps
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Try to import telegram, handle if not available
 try:
     from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-    from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters, CallbackContext
+    from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, ContextTypes, filters
     TELEGRAM_AVAILABLE = True
 except ImportError:
     TELEGRAM_AVAILABLE = False
     print("Warning: python-telegram-bot not available. Bot will run in test mode.")
 
-# Try to import yfinance
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
+from lazy_imports import lazy_import, preload
+
+# Optional integrations are imported on first use; the flags only check that they are installed
+yf = lazy_import("yfinance")
+YFINANCE_AVAILABLE = yf.available
+if not YFINANCE_AVAILABLE:
     print("Warning: yfinance not available. Stock data will be limited.")
 
-# Try to import newsapi
-try:
-    import newsapi
-    NEWSAPI_AVAILABLE = True
-except ImportError:
-    NEWSAPI_AVAILABLE = False
+newsapi = lazy_import("newsapi")
+NEWSAPI_AVAILABLE = newsapi.available
+if not NEWSAPI_AVAILABLE:
     print("Warning: newsapi not available. News features will be limited.")
 
-# Try to import geopy
-try:
-    from geopy.geocoders import Nominatim
-    GEOPY_AVAILABLE = True
-except ImportError:
-    GEOPY_AVAILABLE = False
+geocoders = lazy_import("geopy.geocoders")
+GEOPY_AVAILABLE = geocoders.available
+if not GEOPY_AVAILABLE:
     print("Warning: geopy not available. Location features will be limited.")
 
-# Try to import tzlocal
-try:
-    import tzlocal
-    TZLOCAL_AVAILABLE = True
-except ImportError:
-    TZLOCAL_AVAILABLE = False
+timezonefinder = lazy_import("timezonefinder")
+TIMEZONEFINDER_AVAILABLE = timezonefinder.available
+if not TIMEZONEFINDER_AVAILABLE:
+    print("Warning: timezonefinder not available. Location-based timezone detection will be disabled.")
+
+tzlocal = lazy_import("tzlocal")
+TZLOCAL_AVAILABLE = tzlocal.available
+if not TZLOCAL_AVAILABLE:
     print("Warning: tzlocal not available. Timezone detection will be limited.")
 
-import threading
-try:
-    import schedule
-    SCHEDULE_AVAILABLE = True
-except ImportError:
-    SCHEDULE_AVAILABLE = False
-    print("Warning: schedule not available. Automated tasks will be limited.")
+from config import (ADMIN_CHAT_IDS, ALERT_COOLDOWN_MINUTES, ALERT_INTERVAL_MINUTES, ALERT_PRICE_BAND_PERCENT,
+                    ALERT_REARM_RATIO, ALERT_THRESHOLD_PERCENT, CHART_CACHE_DIR, CHART_CACHE_MAX_FILES,
+                    CHART_MAX_POINTS, CHART_WORKERS, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS,
+                    DSE_PROVIDER_ENABLED, DSE_QUOTE_URL, HANDLER_EXECUTOR_WORKERS, HISTORY_BAR_INTERVAL, HISTORY_DIR,
+                    HISTORY_ENABLED, HISTORY_FETCH_PERIOD, LEADER_LOCK_PATH, LEADER_RETRY_SECONDS,
+                    LOCATION_CACHE_SIZE, LOCATION_GRID_DEGREES, MAX_ALERT_RULES_PER_USER, MAX_REQUESTS_PER_MINUTE,
+                    MAX_WATCHLIST_SIZE, METRICS_ENABLED, METRICS_HOST, METRICS_PORT, MOVE_ALERT_RULES,
+                    NEWS_MAX_ARTICLES, NEWS_MAX_BUCKETS, NEWS_PAGE_SIZE, NEWS_PUSH_LIMIT, NEWS_TTL_SECONDS,
+                    PREFERENCES_BACKEND, PREFERENCES_DB_PATH, PRELOAD_INTEGRATIONS, PRICE_TICK_SECONDS,
+                    PRICE_TRACKER_CAPACITY, PRICE_WINDOWS_MINUTES, QUOTE_CACHE_SIZE, QUOTE_SNAPSHOT_BYTES,
+                    QUOTE_STALE_SECONDS, QUOTE_TTL_CLOSED_SECONDS, QUOTE_TTL_OPEN_SECONDS, RATE_LIMIT_BURST,
+                    RATE_LIMIT_MAX_CHATS, RENDER_CACHE_SIZE, REQUEST_TIMEOUT_SECONDS, TELEGRAM_GLOBAL_RATE,
+                    TELEGRAM_MAX_CONCURRENCY, TELEGRAM_PER_CHAT_INTERVAL, TIMEZONE_WARMUP,
+                    UPSTREAM_REQUESTS_PER_MINUTE, WEBHOOK_DRAIN_SECONDS, WEBHOOK_LISTEN, WEBHOOK_MAX_CONNECTIONS,
+                    WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_QUEUE_SIZE, WEBHOOK_SECRET_TOKEN, WEBHOOK_URL,
+                    WEBHOOK_WORKERS, WORKER_PROCESSES, WORKER_QUEUE_SIZE)
+from alert_state import AlertState
+from alert_rules import CROSS_MA, DAY, MOVE, AlertRule, AlertRuleEngine, RuleHit, parse_rule_spec
+from chart_renderer import (DEFAULT_RANGE as DEFAULT_CHART_RANGE, MATPLOTLIB_AVAILABLE, RANGES as CHART_RANGES,
+                            ChartCache, chart_key, downsample, render_chart)
+from history_store import Bars, HistoryStore
+from leader_lock import LeaderLock
+from market_calendar import MarketCalendar
+from market_scheduler import BELL_BREAK, BELL_CLOSE, BELL_OPEN, MarketScheduler
+from metrics import COUNTER, GAUGE, MetricsRegistry, MetricsServer
+from news_cache import NewsCache, bucket_key
+from price_tracker import DAY_CHANGE, RETURN, VWAP_DELTA, MoveRule, PriceTracker, Trigger
+from preference_store import create_preference_store
+from quote_cache import QuoteCache
+from quote_engine import KNOWN_NAMES, DSEProvider, Quote, QuoteEngine, YFinanceProvider
+from quote_snapshot import QuoteSnapshot, SnapshotFull
+from rate_limiter import RateLimited, RateLimiter
+from render_cache import RenderCache
+from supervisor import Supervisor
+from symbol_registry import SymbolRegistry
+from telegram_delivery import HTTPX_AVAILABLE, TelegramSender
+from webhook_server import WebhookServer
 
 # --- CONFIGURATION ---
 TOKEN = os.environ.get('TELEGRAM_TOKEN', "8512725996:AAEPtUBWNGxkVk6rZLe2q8emZUsHsYYii-A")
 NEWS_API_KEY = os.environ.get('NEWS_API_KEY', "YOUR_NEWS_API_KEY")  # Get from https://newsapi.org/
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', WEBHOOK_URL)
+# Telegram echoes this header on every webhook call; deriving it from the token keeps replicas in agreement
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET_TOKEN', WEBHOOK_SECRET_TOKEN) or hashlib.sha256(
+    f"webhook:{TOKEN}".encode()).hexdigest()
+ADMIN_IDS = frozenset(
+    chat_id.strip() for chat_id in os.environ.get('ADMIN_CHAT_IDS', ",".join(map(str, ADMIN_CHAT_IDS))).split(",")
+    if chat_id.strip()
+)
 
 # MARKETS CONFIGURATION
 MARKETS = {
@@ -68,7 +112,14 @@ MARKETS = {
         "open": "09:30", 
         "close": "16:00",
         "indices": ["^GSPC", "^DJI", "^IXIC"],  # S&P 500, Dow Jones, NASDAQ
-        "currency": "USD"
+        "currency": "USD",
+        "holidays": [
+            "2026-01-01", "2026-01-19", "2026-02-16", "2026-04-03", "2026-05-25", "2026-06-19",
+            "2026-07-03", "2026-09-07", "2026-11-26", "2026-12-25",
+            "2027-01-01", "2027-01-18", "2027-02-15", "2027-03-26", "2027-05-31", "2027-06-18",
+            "2027-07-05", "2027-09-06", "2027-11-25", "2027-12-24"
+        ],
+        "early_close": {"2026-11-27": "13:00", "2026-12-24": "13:00", "2027-11-26": "13:00"}
     },
     "🇲🇾 Malaysia (Bursa)": {
         "tz": "Asia/Kuala_Lumpur", 
@@ -84,26 +135,173 @@ MARKETS = {
         "open": "10:00", 
         "close": "14:30",
         "indices": ["DSE"],
-        "currency": "BDT"
+        "currency": "BDT",
+        "weekend": [4, 5]  # Friday, Saturday
     }
 }
 
-# User preferences storage
-user_preferences = {}
+# Bit per market in MARKETS; a user's preferred markets are stored as a mask
+MARKET_BITS = {market_name: 1 << i for i, market_name in enumerate(MARKETS)}
+ALL_MARKETS_MASK = (1 << len(MARKETS)) - 1
+DEFAULT_NEWS_KEYWORDS = ("stock market", "trading", "finance", "economy")
+
+_market_names_by_mask: Dict[int, tuple] = {}
+_keyword_pool: Dict[tuple, tuple] = {DEFAULT_NEWS_KEYWORDS: DEFAULT_NEWS_KEYWORDS}
+
+def markets_to_mask(market_names) -> int:
+    """Pack market names into a bitmask; names not in MARKETS are dropped"""
+    mask = 0
+    for market_name in market_names:
+        mask |= MARKET_BITS.get(market_name, 0)
+    return mask
+
+def mask_to_markets(mask: int) -> tuple:
+    """Shared tuple of market names for a bitmask, in MARKETS order"""
+    names = _market_names_by_mask.get(mask)
+    if names is None:
+        names = tuple(name for name, bit in MARKET_BITS.items() if mask & bit)
+        _market_names_by_mask[mask] = names
+    return names
+
+def intern_keywords(keywords) -> tuple:
+    """Return the shared tuple for this keyword list, so equal lists are stored once"""
+    key = tuple(keywords)
+    return _keyword_pool.setdefault(key, key)
 
-@dataclass
 class UserPreferences:
-    chat_id: str
-    timezone: Optional[str] = None
-    notifications_enabled: bool = True
-    preferred_markets: List[str] = None
-    news_keywords: List[str] = None
+    """Per-chat settings, kept compact because there is one per subscriber"""
+    __slots__ = ("chat_id", "timezone", "notifications_enabled", "market_mask", "_news_keywords",
+                 "news_alerts", "news_cursor", "_watchlist")
+    
+    def __init__(self, chat_id: str, timezone: Optional[str] = None, notifications_enabled: bool = True,
+                 preferred_markets: List[str] = None, news_keywords: List[str] = None,
+                 news_alerts: bool = False, news_cursor: int = 0, watchlist: List[str] = None):
+        self.chat_id = chat_id
+        self.timezone = timezone
+        self.notifications_enabled = notifications_enabled
+        self.preferred_markets = preferred_markets
+        self.news_keywords = news_keywords
+        self.news_alerts = news_alerts
+        self.news_cursor = news_cursor  # publishedAt (epoch seconds) of the newest headline pushed
+        self.watchlist = watchlist
+        
+    @property
+    def preferred_markets(self) -> List[str]:
+        return list(mask_to_markets(self.market_mask))
+        
+    @preferred_markets.setter
+    def preferred_markets(self, market_names):
+        self.market_mask = ALL_MARKETS_MASK if market_names is None else markets_to_mask(market_names)
+        
+    @property
+    def news_keywords(self) -> List[str]:
+        return list(self._news_keywords)
+        
+    @news_keywords.setter
+    def news_keywords(self, keywords):
+        self._news_keywords = DEFAULT_NEWS_KEYWORDS if keywords is None else intern_keywords(keywords)
+        
+    @property
+    def watchlist(self) -> List[str]:
+        return list(self._watchlist)
+        
+    @watchlist.setter
+    def watchlist(self, symbols):
+        self._watchlist = tuple(sorted(set(sys.intern(s) for s in symbols))) if symbols else ()
+        
+    def __eq__(self, other):
+        if not isinstance(other, UserPreferences):
+            return NotImplemented
+        return (self.chat_id, self.timezone, self.notifications_enabled, self.market_mask, self._news_keywords,
+                self.news_alerts, self.news_cursor, self._watchlist) == \
+            (other.chat_id, other.timezone, other.notifications_enabled, other.market_mask, other._news_keywords,
+             other.news_alerts, other.news_cursor, other._watchlist)
+            
+    def __repr__(self):
+        return (f"UserPreferences(chat_id={self.chat_id!r}, timezone={self.timezone!r}, "
+                f"notifications_enabled={self.notifications_enabled!r}, "
+                f"preferred_markets={self.preferred_markets!r}, news_keywords={self.news_keywords!r}, "
+                f"news_alerts={self.news_alerts!r}, news_cursor={self.news_cursor!r}, "
+                f"watchlist={self.watchlist!r})")
+
+ALERT_SYMBOL_PATTERN = re.compile(r"^[\^A-Z0-9.=\-]{1,15}$")
+ALERT_USAGE = """*Usage:* /alert <symbol or market> <condition>
+
+/alert ^GSPC above 5200
+/alert ^KLSE below 1500
+/alert US move 1.5 15m
+/alert Bursa move 2
+/alert ^IXIC ma 60m
+
+Windows: 5m, 15m, 60m (moves without a window are measured since the open)"""
+
+# Personal rules' alert state is stored next to the shared alerts' state under this prefix
+RULE_STATE_PREFIX = "rule:"
+
+# Set while a handler serves a chat that is over its rate limit: answer from the caches, never upstream
+CACHED_ONLY = contextvars.ContextVar("cached_only", default=False)
+UPSTREAM_BUDGET = "upstream"
+
+
+def format_age(seconds: float) -> str:
+    """Compact age for stale quotes: 45s, 12m, 3h 5m"""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    return f"{minutes // 60}h {minutes % 60}m" if minutes % 60 else f"{minutes // 60}h"
+
+
+def rule_state_key(rule_id: int) -> str:
+    return f"{RULE_STATE_PREFIX}{rule_id}"
+
+# User preferences storage
+user_preferences = create_preference_store(
+    os.environ.get('PREFERENCES_BACKEND', PREFERENCES_BACKEND),
+    UserPreferences,
+    os.environ.get('PREFERENCES_DB_PATH', PREFERENCES_DB_PATH)
+)
+
+class TimezoneLocator:
+    """Shared TimezoneFinder plus an LRU memo of lookups on a lat/lng grid"""
     
-    def __post_init__(self):
-        if self.preferred_markets is None:
-            self.preferred_markets = list(MARKETS.keys())
-        if self.news_keywords is None:
-            self.news_keywords = ["stock market", "trading", "finance", "economy"]
+    def __init__(self, grid_degrees: float = LOCATION_GRID_DEGREES, cache_size: int = LOCATION_CACHE_SIZE):
+        self.grid_degrees = grid_degrees
+        self.cache_size = cache_size
+        self._finder = None
+        self._finder_lock = threading.Lock()
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        
+    def finder(self):
+        """Load the polygon dataset once, on first use"""
+        if self._finder is None:
+            with self._finder_lock:
+                if self._finder is None:
+                    self._finder = timezonefinder.TimezoneFinder()
+        return self._finder
+        
+    def warm_up(self):
+        """Load the dataset ahead of the first location message"""
+        self.finder().timezone_at(lat=0.0, lng=0.0)
+        
+    def timezone_at(self, latitude: float, longitude: float) -> Optional[str]:
+        key = (round(latitude / self.grid_degrees), round(longitude / self.grid_degrees))
+        with self._memo_lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+                
+        timezone = self.finder().timezone_at(lat=latitude, lng=longitude)
+        
+        with self._memo_lock:
+            self._memo[key] = timezone
+            if len(self._memo) > self.cache_size:
+                self._memo.popitem(last=False)
+        return timezone
+
+timezone_locator = TimezoneLocator()
 
 # Setup logging
 logging.basicConfig(
@@ -118,33 +316,159 @@ class MarketMonitorBot:
             print("Error: python-telegram-bot is required for this bot to work.")
             return
             
-        self.updater = Updater(TOKEN)
-        self.dispatcher = self.updater.dispatcher
+        # concurrent_updates lets a slow /stocks run alongside everyone else's /status
+        self.application = Application.builder().token(TOKEN).concurrent_updates(True).build()
+        self.metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+        self.metrics_server: Optional[MetricsServer] = None
+        self.executor = ThreadPoolExecutor(max_workers=HANDLER_EXECUTOR_WORKERS, thread_name_prefix="blocking")
         
         if NEWSAPI_AVAILABLE and NEWS_API_KEY != "YOUR_NEWS_API_KEY":
             self.news_client = newsapi.NewsApiClient(api_key=NEWS_API_KEY)
         else:
             self.news_client = None
             
-        if GEOPY_AVAILABLE:
-            self.geolocator = Nominatim(user_agent="market_monitor_bot")
-        else:
-            self.geolocator = None
+        self._geolocator = None
+            
+        self.calendar = MarketCalendar(MARKETS)
+        self._news_seconds = self.metrics.histogram("bot_upstream_seconds", upstream="newsapi", call="everything")
+        self._news_rate_limited = self.metrics.counter("bot_upstream_rate_limited_total", upstream="newsapi")
+        self.news_cache = NewsCache(
+            self.fetch_news_bucket,
+            ttl=NEWS_TTL_SECONDS,
+            max_articles=NEWS_MAX_ARTICLES,
+            max_buckets=NEWS_MAX_BUCKETS,
+            on_refresh=self.push_news
+        )
+        # Alerts fire once per event, then wait for the move to fade and a cooldown to pass
+        self.alert_state = AlertState(ALERT_COOLDOWN_MINUTES * 60, ALERT_REARM_RATIO)
+        self.price_tracker = PriceTracker(
+            PRICE_WINDOWS_MINUTES,
+            capacity=PRICE_TRACKER_CAPACITY,
+            rules=[MoveRule(*rule) for rule in MOVE_ALERT_RULES],
+            on_trigger=self.queue_move_alert,
+            alert_state=self.alert_state
+        )
+        self.day_rule = MoveRule(DAY_CHANGE, ALERT_THRESHOLD_PERCENT)
+        # Shared move alerts go to market subscribers, so only market indices can trigger them
+        self.market_symbols = frozenset(s for market in MARKETS.values() for s in market.get('indices', []))
+        self._move_alerts: Dict[tuple, Trigger] = {}
+        self._rule_hits: Dict[int, RuleHit] = {}
+        self._move_alerts_lock = threading.Lock()
+        self.alert_rules = AlertRuleEngine(
+            PRICE_WINDOWS_MINUTES,
+            cooldown=ALERT_COOLDOWN_MINUTES * 60,
+            rearm_ratio=ALERT_REARM_RATIO,
+            price_band=ALERT_PRICE_BAND_PERCENT / 100
+        )
+        self.alert_rules.load(AlertRule(*row) for row in user_preferences.alert_rules())
+        self.restore_alert_state()
+        # Symbols users track beyond MARKETS: one reference per watchlist entry and per /alert rule
+        self.tracked_symbols = SymbolRegistry()
+        self.tracked_symbols.load(user_preferences.watch_counts())
+        self.tracked_symbols.acquire(rule.symbol for rule in self.alert_rules.all_rules())
+        self._tracking_version: Optional[int] = None  # the store's version sync_tracking last loaded
+        # Providers in failover order; the DSE one only ever answers for the Dhaka index
+        providers = []
+        if DSE_PROVIDER_ENABLED and HTTPX_AVAILABLE:
+            providers.append(DSEProvider(DSE_QUOTE_URL, timeout=REQUEST_TIMEOUT_SECONDS))
+        if YFINANCE_AVAILABLE:
+            providers.append(YFinanceProvider(timeout=REQUEST_TIMEOUT_SECONDS))
+        self.quote_engine = QuoteEngine(
+            providers,
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=CIRCUIT_RESET_SECONDS,
+            metrics=self.metrics
+        )
+        self.quote_cache = QuoteCache(
+            self.quote_engine.fetch,
+            ttl_for=self.quote_ttl,
+            max_entries=QUOTE_CACHE_SIZE,
+            on_quote=self.on_quote,
+            max_stale=QUOTE_STALE_SECONDS
+        )
+        self.render_cache = RenderCache(RENDER_CACHE_SIZE)
+        # Chats over their rate, or requests past the shared upstream budget, are served from cache
+        self.chat_limiter = RateLimiter(MAX_REQUESTS_PER_MINUTE, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CHATS)
+        self.upstream_limiter = RateLimiter(UPSTREAM_REQUESTS_PER_MINUTE, RATE_LIMIT_BURST)
+        self.history = HistoryStore(os.environ.get('HISTORY_DIR', HISTORY_DIR)) if HISTORY_ENABLED else None
+        self.chart_cache = ChartCache(os.environ.get('CHART_CACHE_DIR', CHART_CACHE_DIR), CHART_CACHE_MAX_FILES)
+        self._chart_pool: Optional[ProcessPoolExecutor] = None
+        self._chart_flights: Dict[str, asyncio.Future] = {}
+        self._upstream_bars: Dict[tuple, tuple] = {}  # (symbol, range) -> (expires_at, bars)
+        self.webhook: Optional[WebhookServer] = None
+        # Set when running as one of several worker processes (see run_worker)
+        self.runs_alerts = True
+        self.quote_snapshot: Optional[QuoteSnapshot] = None
+        self.leader_lock: Optional[LeaderLock] = None
+        self.sender = TelegramSender(
+            TOKEN,
+            global_rate=TELEGRAM_GLOBAL_RATE,
+            per_chat_interval=TELEGRAM_PER_CHAT_INTERVAL,
+            max_concurrency=TELEGRAM_MAX_CONCURRENCY,
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            metrics=self.metrics
+        )
+        self.metrics.add_collector(self.collect_metrics)
             
         self.setup_handlers()
         
+    async def run_blocking(self, func: Callable, *args):
+        """Run a blocking call (yfinance, NewsAPI, timezonefinder) off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+        
+    def instrument(self, name: str, handler: Callable) -> Callable:
+        """Time a handler and count its exceptions under ``name`` (returns it untouched when metrics are off)"""
+        return self.metrics.timed(
+            handler,
+            self.metrics.histogram("bot_handler_seconds", handler=name),
+            self.metrics.counter("bot_handler_errors_total", handler=name)
+        )
+        
+    def limit(self, handler: Callable) -> Callable:
+        """Let chats over MAX_REQUESTS_PER_MINUTE through, but have the handler answer from cache only"""
+        @wraps(handler)
+        async def limited(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            chat = update.effective_chat
+            if chat is None or self.chat_limiter.allow(chat.id):
+                return await handler(update, context)
+            token = CACHED_ONLY.set(True)
+            try:
+                return await handler(update, context)
+            finally:
+                CACHED_ONLY.reset(token)
+        return limited
+        
+    def upstream_allowed(self, cached_only: bool) -> bool:
+        """Whether a user-triggered fetch may go upstream: the chat isn't throttled and the shared budget allows"""
+        return not cached_only and self.upstream_limiter.allow(UPSTREAM_BUDGET)
+        
     def setup_handlers(self):
-        self.dispatcher.add_handler(CommandHandler("start", self.start_command))
-        self.dispatcher.add_handler(CommandHandler("help", self.help_command))
-        self.dispatcher.add_handler(CommandHandler("status", self.status_command))
-        self.dispatcher.add_handler(CommandHandler("news", self.news_command))
-        self.dispatcher.add_handler(CommandHandler("stocks", self.stocks_command))
-        self.dispatcher.add_handler(CommandHandler("settings", self.settings_command))
-        self.dispatcher.add_handler(CommandHandler("settimezone", self.set_timezone_command))
-        self.dispatcher.add_handler(CallbackQueryHandler(self.button_callback))
-        self.dispatcher.add_handler(MessageHandler(Filters.location, self.handle_location))
-        
-    def start_command(self, update: Update, context: CallbackContext):
+        commands = {
+            "start": self.start_command,
+            "help": self.help_command,
+            "status": self.status_command,
+            "news": self.news_command,
+            "stocks": self.stocks_command,
+            "chart": self.chart_command,
+            "watch": self.watch_command,
+            "unwatch": self.unwatch_command,
+            "watchlist": self.watchlist_command,
+            "settings": self.settings_command,
+            "settimezone": self.set_timezone_command,
+            "alert": self.alert_command,
+            "alerts": self.alerts_command,
+            "delalert": self.delete_alert_command,
+            "botstats": self.botstats_command,
+        }
+        for command, handler in commands.items():
+            self.application.add_handler(CommandHandler(command, self.instrument(command, self.limit(handler))))
+        self.application.add_handler(CallbackQueryHandler(self.instrument("button", self.limit(self.button_callback))))
+        self.application.add_handler(MessageHandler(filters.LOCATION,
+                                                    self.instrument("location", self.limit(self.handle_location))))
+        
+    async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_id = update.effective_chat.id
         
         # Initialize user preferences
@@ -165,8 +489,11 @@ I'll help you stay updated with:
 /status - Check current market status
 /news - Get latest financial news
 /stocks - View stock indices
+/chart - Price chart of an index
+/watch - Add tickers to your watchlist
 /settings - Configure your preferences
 /settimezone - Set your timezone
+/alert - Set a personal price alert
 /help - Show this help message
 
 💡 *Tip:* Send your location for automatic timezone detection!
@@ -180,9 +507,9 @@ I'll help you stay updated with:
         ]
         
         reply_markup = InlineKeyboardMarkup(keyboard)
-        update.message.reply_text(welcome_message, parse_mode='Markdown', reply_markup=reply_markup)
+        await update.effective_message.reply_text(welcome_message, parse_mode='Markdown', reply_markup=reply_markup)
         
-    def help_command(self, update: Update, context: CallbackContext):
+    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         help_text = """
 📖 *Bot Commands Guide*
 
@@ -190,8 +517,15 @@ I'll help you stay updated with:
 /status - Check current market status for all configured markets
 /news - Get latest financial news and market updates
 /stocks - View current stock indices and prices
+/chart <symbol> [range] - Price chart (e.g., /chart ^GSPC 5d)
+/watch <symbol> ... - Add tickers to your watchlist (e.g., /watch AAPL MSFT)
+/unwatch <symbol> ... - Remove tickers from your watchlist
+/watchlist - Prices of the tickers you watch
 /settings - Configure your notification preferences
 /settimezone <timezone> - Set your timezone (e.g., /settimezone Asia/Dhaka)
+/alert <symbol|market> <condition> - Set a personal alert (e.g., /alert ^GSPC above 5200)
+/alerts - List your alerts
+/delalert <id> - Remove an alert
 /help - Show this help message
 
 *Advanced Features:*
@@ -209,7 +543,7 @@ I'll help you stay updated with:
 
 For more help, contact @Sajib
         """
-        update.message.reply_text(help_text, parse_mode='Markdown')
+        await update.effective_message.reply_text(help_text, parse_mode='Markdown')
         
     def get_user_timezone(self, chat_id: str) -> str:
         """Get user's timezone, with fallback to auto-detection"""
@@ -228,47 +562,51 @@ For more help, contact @Sajib
         
         return "UTC"  # Fallback
             
+    @property
+    def geolocator(self):
+        """Nominatim client, created (and geopy imported) on first use"""
+        if self._geolocator is None and GEOPY_AVAILABLE:
+            self._geolocator = geocoders.Nominatim(user_agent="market_monitor_bot")
+        return self._geolocator
+        
     def detect_timezone_from_location(self, latitude: float, longitude: float) -> Optional[str]:
         """Detect timezone from coordinates"""
-        if not GEOPY_AVAILABLE:
+        if not TIMEZONEFINDER_AVAILABLE:
+            logger.warning("timezonefinder not installed, cannot detect timezone from location")
             return None
             
         try:
-            from timezonefinder import TimezoneFinder
-            tf = TimezoneFinder()
-            timezone = tf.timezone_at(lat=latitude, lng=longitude)
-            return timezone
-        except ImportError:
-            logger.warning("timezonefinder not installed, cannot detect timezone from location")
-            return None
+            return timezone_locator.timezone_at(latitude, longitude)
         except Exception as e:
             logger.error(f"Error detecting timezone: {e}")
             return None
             
-    def handle_location(self, update: Update, context: CallbackContext):
+    async def handle_location(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle location messages for automatic timezone detection"""
         chat_id = update.effective_chat.id
-        location = update.message.location
+        location = update.effective_message.location
         
-        timezone = self.detect_timezone_from_location(location.latitude, location.longitude)
+        timezone = await self.run_blocking(self.detect_timezone_from_location, location.latitude, location.longitude)
         
         if timezone:
             if str(chat_id) not in user_preferences:
                 user_preferences[str(chat_id)] = UserPreferences(chat_id=str(chat_id))
             
-            user_preferences[str(chat_id)].timezone = timezone
+            user_pref = user_preferences[str(chat_id)]
+            user_pref.timezone = timezone
+            user_preferences[str(chat_id)] = user_pref
             
             message = f"📍 *Timezone Detected!*\n\nYour timezone has been automatically set to: `{timezone}`\n\nMarket status will now be shown in your local time."
-            update.message.reply_text(message, parse_mode='Markdown')
+            await update.effective_message.reply_text(message, parse_mode='Markdown')
         else:
-            update.message.reply_text("❌ Could not detect timezone from your location. Please use /settimezone command.")
+            await update.effective_message.reply_text("❌ Could not detect timezone from your location. Please use /settimezone command.")
             
-    def set_timezone_command(self, update: Update, context: CallbackContext):
+    async def set_timezone_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Set user timezone manually"""
         chat_id = update.effective_chat.id
         
         if not context.args:
-            update.message.reply_text("Please provide a timezone. Example: /settimezone Asia/Dhaka")
+            await update.effective_message.reply_text("Please provide a timezone. Example: /settimezone Asia/Dhaka")
             return
             
         timezone = context.args[0]
@@ -280,43 +618,103 @@ For more help, contact @Sajib
             if str(chat_id) not in user_preferences:
                 user_preferences[str(chat_id)] = UserPreferences(chat_id=str(chat_id))
             
-            user_preferences[str(chat_id)].timezone = timezone
+            user_pref = user_preferences[str(chat_id)]
+            user_pref.timezone = timezone
+            user_preferences[str(chat_id)] = user_pref
             
             message = f"✅ *Timezone Updated!*\n\nYour timezone is now set to: `{timezone}`\n\nMarket status will be shown in your local time."
-            update.message.reply_text(message, parse_mode='Markdown')
+            await update.effective_message.reply_text(message, parse_mode='Markdown')
             
         except pytz.exceptions.UnknownTimeZoneError:
-            update.message.reply_text("❌ Invalid timezone. Please use a valid timezone like: Asia/Dhaka, America/New_York, etc.")
+            await update.effective_message.reply_text("❌ Invalid timezone. Please use a valid timezone like: Asia/Dhaka, America/New_York, etc.")
             
-    def get_market_status(self, market_name: str, market_info: dict, user_tz: str = None) -> dict:
+    def resolve_alert_target(self, target: str) -> Tuple[List[str], Optional[str]]:
+        """Symbols an /alert target refers to: every index of a market (US, Bursa, ...) or one ticker"""
+        for market_name, market_info in MARKETS.items():
+            if target.lower() in re.findall(r"[a-z]+", market_name.lower()):
+                return list(market_info.get('indices', [])), market_name
+        return [target.upper()], None
+        
+    async def alert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Register a personal alert rule"""
+        chat_id = str(update.effective_chat.id)
+        
+        if not context.args or len(context.args) < 2:
+            await update.effective_message.reply_text(ALERT_USAGE, parse_mode='Markdown')
+            return
+            
+        try:
+            kind, threshold, window = parse_rule_spec(context.args[1:], PRICE_WINDOWS_MINUTES)
+        except ValueError as e:
+            await update.effective_message.reply_text(f"❌ {e}\n\n{ALERT_USAGE}", parse_mode='Markdown')
+            return
+            
+        symbols, market_name = self.resolve_alert_target(context.args[0])
+        symbols = [s for s in symbols if self.quote_engine.can_quote(s) and ALERT_SYMBOL_PATTERN.match(s)]
+        if not symbols:
+            await update.effective_message.reply_text(f"❌ No live quotes are available for {context.args[0]}.")
+            return
+            
+        if len(self.alert_rules.rules_for(chat_id)) + len(symbols) > MAX_ALERT_RULES_PER_USER:
+            await update.effective_message.reply_text(
+                f"❌ You can have at most {MAX_ALERT_RULES_PER_USER} alerts. Remove one with /delalert <id>."
+            )
+            return
+            
+        rows = [(chat_id, symbol, kind, threshold, window, market_name) for symbol in symbols]
+        rule_ids = await self.run_blocking(user_preferences.add_alert_rules, rows)
+        rules = [AlertRule(rule_id, *row) for rule_id, row in zip(rule_ids, rows)]
+        self.alert_rules.load(rules)
+        self.tracked_symbols.acquire(rule.symbol for rule in rules)
+        
+        message = "✅ *Alert set*\n\n" + "\n".join(f"#{rule.rule_id} {self.describe_rule(rule)}" for rule in rules)
+        await update.effective_message.reply_text(message, parse_mode='Markdown')
+        
+    async def alerts_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """List the user's alert rules"""
+        rules = self.alert_rules.rules_for(str(update.effective_chat.id))
+        if not rules:
+            await update.effective_message.reply_text(f"You have no alerts yet.\n\n{ALERT_USAGE}", parse_mode='Markdown')
+            return
+            
+        message = "🔔 *Your Alerts*\n\n" + "\n".join(f"#{rule.rule_id} {self.describe_rule(rule)}" for rule in rules)
+        message += "\n\nRemove one with /delalert <id>"
+        await update.effective_message.reply_text(message, parse_mode='Markdown')
+        
+    async def delete_alert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Remove one of the user's alert rules"""
+        chat_id = str(update.effective_chat.id)
+        try:
+            rule_id = int(context.args[0].lstrip("#"))
+        except (IndexError, TypeError, ValueError):
+            await update.effective_message.reply_text("Please give the alert number. Example: /delalert 3")
+            return
+            
+        removed = await self.run_blocking(user_preferences.remove_alert_rule, chat_id, rule_id)
+        if not removed:
+            await update.effective_message.reply_text(f"❌ You have no alert #{rule_id}.")
+            return
+        rule = self.alert_rules.remove(rule_id)
+        if rule is not None:
+            self.tracked_symbols.release([rule.symbol])
+        await self.run_blocking(user_preferences.save_alert_state, {rule_state_key(rule_id): None})
+        await update.effective_message.reply_text(f"✅ Alert #{rule_id} removed.")
+        
+    def get_market_status(self, market_name: str, market_info: dict, user_tz: str = None,
+                          now: Optional[datetime.datetime] = None) -> dict:
         """Get current market status"""
         try:
-            market_tz = pytz.timezone(market_info['tz'])
-            now = datetime.datetime.now(market_tz)
-            current_time = now.strftime("%H:%M")
-            
-            # Weekend check
-            if now.weekday() >= 5:  # Saturday=5, Sunday=6
-                status = "🔴 CLOSED (Weekend)"
-                is_open = False
-            # Lunch break check
-            elif "break_start" in market_info and market_info['break_start'] <= current_time <= market_info['break_end']:
-                status = "🟡 LUNCH BREAK"
-                is_open = False
-            # Standard open/close check
-            elif market_info['open'] <= current_time <= market_info['close']:
-                status = f"🟢 OPEN (Closes at {market_info['close']})"
-                is_open = True
-            else:
-                status = "🔴 CLOSED"
-                is_open = False
+            if market_name not in self.calendar.markets:
+                self.calendar.add_market(market_name, market_info)
+            ts = now.timestamp() if now is not None else None
+            market_status = self.calendar.status(market_name, ts)
+            current_time = market_status.local_time
                 
             # Convert to user timezone if provided
             display_time = current_time
             if user_tz and user_tz != market_info['tz']:
                 try:
-                    user_tz_obj = pytz.timezone(user_tz)
-                    user_time = now.astimezone(user_tz_obj)
+                    user_time = market_status.local_dt.astimezone(self.calendar.timezone(user_tz))
                     display_time = f"{current_time} ({user_time.strftime('%H:%M')} your time)"
                 except:
                     pass
@@ -325,8 +723,8 @@ For more help, contact @Sajib
                 "name": market_name,
                 "local_time": current_time,
                 "display_time": display_time,
-                "status": status,
-                "is_open": is_open,
+                "status": market_status.status,
+                "is_open": market_status.is_open,
                 "currency": market_info.get('currency', 'USD')
             }
             
@@ -341,153 +739,480 @@ For more help, contact @Sajib
                 "currency": "USD"
             }
             
-    def get_stock_data(self, symbols: List[str]) -> Dict[str, dict]:
-        """Get current stock data for given symbols"""
-        stock_data = {}
+    def quote_ttl(self, symbol: str) -> float:
+        """Cache lifetime for a symbol's quote, shorter while its market trades"""
+        for market_name, market_info in MARKETS.items():
+            if symbol in market_info.get('indices', []):
+                if self.calendar.is_open(market_name):
+                    return QUOTE_TTL_OPEN_SECONDS
+                return QUOTE_TTL_CLOSED_SECONDS
+        # Watched tickers aren't tied to a configured market; treat them as open while any market is
+        if any(self.calendar.is_open(market_name) for market_name in MARKETS):
+            return QUOTE_TTL_OPEN_SECONDS
+        return QUOTE_TTL_CLOSED_SECONDS
         
-        if not YFINANCE_AVAILABLE:
-            # Return mock data if yfinance is not available
-            for symbol in symbols:
-                stock_data[symbol] = {
-                    "symbol": symbol,
-                    "name": symbol,
-                    "price": "N/A",
-                    "change": "N/A",
-                    "change_percent": "N/A"
-                }
-            return stock_data
-        
-        for symbol in symbols:
-            try:
-                if symbol == "DSE":  # Special handling for DSE
-                    stock_data[symbol] = {
-                        "symbol": symbol,
-                        "name": "DSE Index",
-                        "price": "N/A",
-                        "change": "N/A",
-                        "change_percent": "N/A"
-                    }
-                    continue
-                    
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                history = ticker.history(period="1d")
-                
-                if not history.empty:
-                    current_price = history['Close'].iloc[-1]
-                    previous_close = history['Open'].iloc[0]
-                    change = current_price - previous_close
-                    change_percent = (change / previous_close) * 100
-                    
-                    stock_data[symbol] = {
-                        "symbol": symbol,
-                        "name": info.get('shortName', symbol),
-                        "price": f"{current_price:.2f}",
-                        "change": f"{change:+.2f}",
-                        "change_percent": f"{change_percent:+.2f}%"
-                    }
-                    
-            except Exception as e:
-                logger.error(f"Error fetching data for {symbol}: {e}")
-                stock_data[symbol] = {
-                    "symbol": symbol,
-                    "name": symbol,
-                    "price": "N/A",
-                    "change": "N/A",
-                    "change_percent": "N/A"
-                }
-                
+    def get_stock_data(self, symbols: List[str], cached_only: bool = False) -> Dict[str, dict]:
+        """Get current stock data for given symbols; expired quotes are served, with their age, while they refresh
+
+        With ``cached_only``, or when the upstream budget is spent, nothing new is fetched.
+        """
+        if self.quote_cache.missing(symbols) and not self.upstream_allowed(cached_only):
+            quotes = self.quote_cache.peek(symbols)
+        else:
+            quotes = self.quote_cache.get_many(symbols, allow_stale=True)
+        now = time.time()
+        stock_data = {}
+        for symbol, quote in quotes.items():
+            stock_data[symbol] = quote.to_dict()
+            if quote.available and quote.timestamp and now - quote.timestamp > self.quote_ttl(symbol):
+                stock_data[symbol]["age"] = format_age(now - quote.timestamp)
         return stock_data
         
-    def get_market_news(self, keywords: List[str] = None) -> List[dict]:
-        """Get latest market news"""
+    def fetch_news_bucket(self, keywords: tuple, since: Optional[str] = None) -> List[dict]:
+        """Fetch one keyword bucket from NewsAPI, only articles newer than ``since`` if given"""
+        query = " OR ".join(keywords)
+        try:
+            with self.metrics.time(self._news_seconds):
+                news = self.news_client.get_everything(
+                    q=query,
+                    language='en',
+                    sort_by='publishedAt',
+                    page_size=NEWS_PAGE_SIZE,  # a short page would leave a gap below the new watermark
+                    from_param=since
+                )
+        except Exception as e:
+            # NewsAPIException carries NewsAPI's error code; "rateLimited" is its 429
+            if getattr(e, 'get_code', lambda: None)() == 'rateLimited':
+                self._news_rate_limited.inc()
+            raise
+        
+        articles = []
+        for article in news.get('articles', []):
+            articles.append({
+                "title": article.get('title', ''),
+                "description": article.get('description', ''),
+                "url": article.get('url', ''),
+                "source": article.get('source', {}).get('name', ''),
+                "published_at": article.get('publishedAt', '')
+            })
+        return articles
+        
+    def get_market_news(self, keywords: List[str] = None, cached_only: bool = False) -> List[dict]:
+        """Get latest market news; a keyword list nobody asked for yet needs the upstream budget"""
         if not self.news_client:
             return []
-            
-        try:
-            if not keywords:
-                keywords = ["stock market", "trading", "finance", "economy"]
-                
-            query = " OR ".join(keywords)
-            news = self.news_client.get_everything(
-                q=query,
-                language='en',
-                sort_by='publishedAt',
-                page_size=10
-            )
-            
-            articles = []
-            for article in news.get('articles', [])[:5]:  # Limit to 5 articles
-                articles.append({
-                    "title": article.get('title', ''),
-                    "description": article.get('description', ''),
-                    "url": article.get('url', ''),
-                    "source": article.get('source', {}).get('name', ''),
-                    "published_at": article.get('publishedAt', '')
-                })
-                
+        articles = self.news_cache.peek(keywords, limit=5)
+        if articles is not None:
             return articles
+        if not self.upstream_allowed(cached_only):
+            raise RateLimited(f"no cached news for {bucket_key(keywords)}")
             
+        try:
+            return self.news_cache.get(keywords, limit=5)  # Limit to 5 articles
         except Exception as e:
             logger.error(f"Error fetching news: {e}")
             return []
             
-    def status_command(self, update: Update, context: CallbackContext):
+    def push_news(self):
+        """Send opted-in users the headlines published since their cursor (after each refresh pass)"""
+        subscribers = user_preferences.news_subscribers()
+        if not subscribers:
+            return
+            
+        messages = {}
+        outbox = []
+        cursors = {}
+        for chat_id_str, keywords, cursor in subscribers:
+            unseen = self.news_cache.since(keywords, cursor)
+            if not unseen:
+                continue
+            key = tuple(article['url'] for article in unseen[:NEWS_PUSH_LIMIT])
+            if key not in messages:
+                message = "🗞 *New Market Headlines*\n\n"
+                for article in unseen[:NEWS_PUSH_LIMIT]:
+                    message += f"*{article['title']}*\n"
+                    message += f"📰 {article['source']} · [Read more]({article['url']})\n\n"
+                messages[key] = message
+            outbox.append((chat_id_str, messages[key]))
+            cursors[chat_id_str] = unseen[0]['published_ts']
+            
+        if not outbox:
+            return
+        if not HTTPX_AVAILABLE:
+            logger.error("httpx not available, cannot deliver news alerts")
+            return
+        metrics = self.sender.deliver_sync(outbox)
+        user_preferences.advance_news_cursors(cursors)
+        logger.info(f"News alerts delivered: {metrics.as_dict()}")
+        
+    def render_status(self, user_tz: str, ts: float) -> str:
+        """Build the /status reply for one timezone at one moment"""
+        now = datetime.datetime.fromtimestamp(ts, pytz.utc)
+        parts = ["🔔 *Market Status Update*\n\n"]
+        for market_name, market_info in MARKETS.items():
+            status = self.get_market_status(market_name, market_info, user_tz, now=now)
+            parts.append(f"*{status['name']}*\nLocal Time: {status['display_time']}\nStatus: {status['status']}\n\n")
+        return "".join(parts)
+        
+    def render_news(self, articles: List[dict]) -> str:
+        """Build the /news reply for a list of articles"""
+        parts = ["📰 *Latest Market News*\n\n"]
+        for i, article in enumerate(articles, 1):
+            parts.append(f"*{i}. {article['title']}*\n{article['description']}\n"
+                         f"📰 {article['source']}\n[Read more]({article['url']})\n\n")
+        return "".join(parts)
+        
+    def render_stocks(self, stock_data: Dict[str, dict], title: str = "📈 *Stock Indices*") -> str:
+        """Build the /stocks (or /watchlist) reply for a quote snapshot"""
+        parts = [f"{title}\n\n"]
+        for symbol, data in stock_data.items():
+            emoji = "📈" if data['change_percent'].startswith('+') else "📉" if data['change_percent'].startswith('-') else "➡️"
+            age = f" _(as of {data['age']} ago)_" if 'age' in data else ""
+            parts.append(f"{emoji} *{data['name']} ({symbol})*\nPrice: {data['price']}{age}\n"
+                         f"Change: {data['change']} ({data['change_percent']})\n\n")
+        return "".join(parts)
+        
+    async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show current market status"""
         chat_id = update.effective_chat.id
         user_tz = self.get_user_timezone(chat_id)
         
-        message = "🔔 *Market Status Update*\n\n"
-        
-        for market_name, market_info in MARKETS.items():
-            status = self.get_market_status(market_name, market_info, user_tz)
-            message += f"*{status['name']}*\n"
-            message += f"Local Time: {status['display_time']}\n"
-            message += f"Status: {status['status']}\n\n"
-            
-        update.message.reply_text(message, parse_mode='Markdown')
+        # Status text only changes once a minute, so one render serves every user in this timezone
+        ts = self.calendar.clock()
+        message = self.render_cache.get_or_render(
+            ("status", user_tz, self.calendar.version(ts)),
+            partial(self.render_status, user_tz, ts)
+        )
+        await update.effective_message.reply_text(message, parse_mode='Markdown')
         
-    def news_command(self, update: Update, context: CallbackContext):
+    async def news_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show latest market news"""
         chat_id = update.effective_chat.id
         user_pref = user_preferences.get(str(chat_id))
         
         keywords = user_pref.news_keywords if user_pref else None
-        articles = self.get_market_news(keywords)
+        # Read the version before fetching, so a cached reply is never newer than its key
+        version = self.news_cache.version(keywords)
+        try:
+            articles = await self.run_blocking(self.get_market_news, keywords, CACHED_ONLY.get())
+        except RateLimited:
+            await update.effective_message.reply_text("⏳ Too many requests right now. Try /news again in a minute.")
+            return
         
         if not articles:
-            update.message.reply_text("❌ Could not fetch news. Please check your News API configuration.")
+            await update.effective_message.reply_text("❌ Could not fetch news. Please check your News API configuration.")
             return
             
-        message = "📰 *Latest Market News*\n\n"
-        
-        for i, article in enumerate(articles, 1):
-            message += f"*{i}. {article['title']}*\n"
-            message += f"{article['description']}\n"
-            message += f"📰 {article['source']}\n"
-            message += f"[Read more]({article['url']})\n\n"
-            
-        update.message.reply_text(message, parse_mode='Markdown', disable_web_page_preview=True)
+        if version:
+            message = self.render_cache.get_or_render(
+                ("news", bucket_key(keywords), version),
+                partial(self.render_news, articles)
+            )
+        else:
+            message = self.render_news(articles)  # the bucket was only just created; its version came after
+        await update.effective_message.reply_text(message, parse_mode='Markdown', disable_web_page_preview=True)
         
-    def stocks_command(self, update: Update, context: CallbackContext):
+    async def stocks_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show stock indices"""
-        message = "📈 *Stock Indices*\n\n"
-        
         all_symbols = []
         for market_info in MARKETS.values():
             all_symbols.extend(market_info.get('indices', []))
             
-        stock_data = self.get_stock_data(all_symbols)
+        version = self.quote_cache.version
+        stock_data = await self.run_blocking(self.get_stock_data, all_symbols, CACHED_ONLY.get())
         
-        for symbol, data in stock_data.items():
-            emoji = "📈" if data['change_percent'].startswith('+') else "📉" if data['change_percent'].startswith('-') else "➡️"
-            message += f"{emoji} *{data['name']} ({symbol})*\n"
-            message += f"Price: {data['price']}\n"
-            message += f"Change: {data['change']} ({data['change_percent']})\n\n"
+        ages = tuple(data.get('age') for data in stock_data.values())
+        message = self.render_cache.get_or_render(("stocks", version, ages), partial(self.render_stocks, stock_data))
+        await update.effective_message.reply_text(message, parse_mode='Markdown')
+        
+    def chart_bars(self, symbol: str, range_name: str, cached_only: bool = False) -> Optional[Bars]:
+        """Bars for a chart: local history if it covers the range, else a short-lived upstream copy"""
+        spec = CHART_RANGES[range_name]
+        if self.history is not None:
+            latest = self.history.latest(symbol)
+            if latest is not None:
+                bars = self.history.range(symbol, latest[0] - spec.seconds)
+                # Recorded history only reaches back to when recording started
+                if bars.size >= 2 and bars.ts[0] <= latest[0] - spec.seconds * 0.9:
+                    return bars
+                    
+        key = (symbol, range_name)
+        cached = self._upstream_bars.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        if not self.upstream_allowed(cached_only):
+            if cached is not None:
+                return cached[1]  # an expired copy beats none
+            raise RateLimited(f"no cached bars for {symbol} {range_name}")
+        bars = self.quote_engine.fetch_bars([symbol], spec.period, spec.interval).get(symbol)
+        if bars is not None:
+            if len(self._upstream_bars) >= QUOTE_CACHE_SIZE:
+                self._upstream_bars.clear()
+            self._upstream_bars[key] = (time.monotonic() + self.quote_ttl(symbol), bars)
+        return bars
+        
+    @property
+    def chart_pool(self) -> ProcessPoolExecutor:
+        # Started on first use; spawn, because forking a process full of threads isn't safe
+        if self._chart_pool is None:
+            self._chart_pool = ProcessPoolExecutor(max_workers=CHART_WORKERS,
+                                                   mp_context=multiprocessing.get_context("spawn"))
+        return self._chart_pool
+        
+    async def render_chart_png(self, key: str, title: str, bars: Bars) -> bytes:
+        """Render in the process pool; concurrent requests for the same chart share one render"""
+        flight = self._chart_flights.get(key)
+        if flight is None:
+            ts, close = downsample(bars.ts, bars.close, CHART_MAX_POINTS)
+            loop = asyncio.get_running_loop()
+            flight = loop.run_in_executor(self.chart_pool, render_chart, title, ts, close)
+            self._chart_flights[key] = flight
+            try:
+                png = await flight
+            finally:
+                self._chart_flights.pop(key, None)
+            await self.run_blocking(self.chart_cache.put, key, png)
+            return png
+        return await flight
+        
+    async def chart_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Send a price chart as a photo, reusing the uploaded file when nothing changed"""
+        args = context.args or []
+        ranges = ", ".join(CHART_RANGES)
+        if not args:
+            await update.effective_message.reply_text(
+                f"Please give a symbol. Example: /chart ^GSPC 5d\nRanges: {ranges}"
+            )
+            return
             
-        update.message.reply_text(message, parse_mode='Markdown')
+        symbol = args[0].upper()
+        range_name = args[1].lower() if len(args) > 1 else DEFAULT_CHART_RANGE
+        if range_name not in CHART_RANGES:
+            await update.effective_message.reply_text(f"❌ Unknown range {range_name}. Ranges: {ranges}")
+            return
+        if not self.quote_engine.can_quote(symbol) or not ALERT_SYMBOL_PATTERN.match(symbol):
+            await update.effective_message.reply_text(f"❌ No price history is available for {args[0]}.")
+            return
+        if not MATPLOTLIB_AVAILABLE:
+            await update.effective_message.reply_text("❌ Charts are not available on this server.")
+            return
+            
+        try:
+            bars = await self.run_blocking(self.chart_bars, symbol, range_name, CACHED_ONLY.get())
+        except RateLimited:
+            await update.effective_message.reply_text(
+                f"⏳ Too many requests right now. Try /chart {symbol} again in a minute."
+            )
+            return
+        if bars is None or bars.size < 2:
+            await update.effective_message.reply_text(f"❌ No price history for {symbol} yet.")
+            return
+            
+        key = chart_key(symbol, range_name, bars.ts[-1])
+        title = KNOWN_NAMES.get(symbol, symbol)
+        caption = f"📈 {title} · {range_name}"
         
-    def settings_command(self, update: Update, context: CallbackContext):
+        file_id = self.chart_cache.file_id(key)
+        if file_id is not None:
+            try:
+                await update.effective_message.reply_photo(photo=file_id, caption=caption)
+                return
+            except Exception as e:
+                logger.warning(f"Cached chart file_id failed, re-sending the image: {e}")
+                
+        png = await self.run_blocking(self.chart_cache.get, key)
+        if png is None:
+            png = await self.render_chart_png(key, title, bars)
+        message = await update.effective_message.reply_photo(photo=png, caption=caption)
+        if message is not None and getattr(message, "photo", None):
+            self.chart_cache.remember_file_id(key, message.photo[-1].file_id)
+            
+    async def watch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Add tickers to the user's watchlist"""
+        chat_id = str(update.effective_chat.id)
+        wanted = list(dict.fromkeys(arg.upper() for arg in context.args or []))
+        if not wanted:
+            await update.effective_message.reply_text("Please give one or more tickers. Example: /watch AAPL MSFT")
+            return
+            
+        if chat_id not in user_preferences:
+            user_preferences[chat_id] = UserPreferences(chat_id=chat_id)
+        user_pref = user_preferences[chat_id]
+        current = user_pref.watchlist
+        invalid = [s for s in wanted if not self.quote_engine.can_quote(s) or not ALERT_SYMBOL_PATTERN.match(s)]
+        new = [s for s in wanted if s not in current and s not in invalid]
+        if len(current) + len(new) > MAX_WATCHLIST_SIZE:
+            await update.effective_message.reply_text(
+                f"❌ Your watchlist can hold at most {MAX_WATCHLIST_SIZE} tickers. Remove some with /unwatch."
+            )
+            return
+            
+        # Goes through the shared quote cache, so checking a popular ticker is usually free
+        throttled = []
+        if new and self.quote_cache.missing(new) and not self.upstream_allowed(CACHED_ONLY.get()):
+            quotes = await self.run_blocking(self.quote_cache.peek, new)
+            throttled = [s for s in new if not quotes[s].available]
+        else:
+            quotes = await self.run_blocking(self.quote_cache.get_many, new) if new else {}
+        unknown = [s for s in new if not quotes[s].available and s not in throttled]
+        # Re-read: another /watch from this chat may have landed while we were fetching
+        current = user_pref.watchlist
+        added = [s for s in new if quotes[s].available and s not in current]
+        if added:
+            user_pref.watchlist = current + added
+            user_preferences[chat_id] = user_pref
+            self.tracked_symbols.acquire(added)
+            
+        lines = []
+        if added:
+            lines.append(f"✅ Watching {', '.join(added)}")
+        if invalid or unknown:
+            lines.append(f"❌ No quotes found for {', '.join(invalid + unknown)}")
+        if throttled:
+            lines.append(f"⏳ Too many requests right now. Try /watch {' '.join(throttled)} again in a minute.")
+        if not lines:
+            lines.append("You are already watching those tickers.")
+        lines.append("See their prices with /watchlist")
+        await update.effective_message.reply_text("\n".join(lines))
+        
+    async def unwatch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Remove tickers from the user's watchlist"""
+        chat_id = str(update.effective_chat.id)
+        user_pref = user_preferences.get(chat_id)
+        unwanted = {arg.upper() for arg in context.args or []}
+        if not unwanted:
+            await update.effective_message.reply_text("Please give the tickers to remove. Example: /unwatch AAPL")
+            return
+            
+        current = user_pref.watchlist if user_pref is not None else []
+        removed = [s for s in current if s in unwanted]
+        if not removed:
+            await update.effective_message.reply_text("❌ None of those are on your watchlist.")
+            return
+            
+        user_pref.watchlist = [s for s in current if s not in unwanted]
+        user_preferences[chat_id] = user_pref
+        self.tracked_symbols.release(removed)
+        await update.effective_message.reply_text(f"✅ Stopped watching {', '.join(removed)}")
+        
+    async def watchlist_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show prices for the user's watchlist"""
+        user_pref = user_preferences.get(str(update.effective_chat.id))
+        symbols = user_pref.watchlist if user_pref is not None else []
+        if not symbols:
+            await update.effective_message.reply_text("Your watchlist is empty. Add tickers with /watch AAPL MSFT")
+            return
+            
+        version = self.quote_cache.version
+        stock_data = await self.run_blocking(self.get_stock_data, symbols, CACHED_ONLY.get())
+        ages = tuple(data.get('age') for data in stock_data.values())
+        message = self.render_cache.get_or_render(
+            ("watchlist", tuple(symbols), version, ages),
+            partial(self.render_stocks, stock_data, "👀 *Your Watchlist*")
+        )
+        await update.effective_message.reply_text(message, parse_mode='Markdown')
+        
+    def collect_metrics(self):
+        """Scrape-time samples read from the caches' own counters, so hits cost nothing extra"""
+        caches = {
+            "quote": self.quote_cache.stats(),
+            "render": self.render_cache.stats(),
+            "chart": self.chart_cache.stats(),
+        }
+        for cache, stats in caches.items():
+            yield "bot_cache_hits_total", COUNTER, {"cache": cache}, stats["hits"]
+            yield "bot_cache_misses_total", COUNTER, {"cache": cache}, stats["misses"]
+        yield "bot_cache_hits_total", COUNTER, {"cache": "chart_file_id"}, caches["chart"]["file_id_hits"]
+        yield "bot_cache_stale_hits_total", COUNTER, {"cache": "quote"}, caches["quote"]["stale_hits"]
+        yield "bot_cache_entries", GAUGE, {"cache": "quote"}, caches["quote"]["size"]
+        yield "bot_cache_entries", GAUGE, {"cache": "render"}, caches["render"]["size"]
+        yield "bot_cache_entries", GAUGE, {"cache": "chart"}, caches["chart"]["files"]
+        
+        news = self.news_cache.stats()
+        yield "bot_cache_requests_total", COUNTER, {"cache": "news"}, news["requests"]
+        yield "bot_cache_upstream_fetches_total", COUNTER, {"cache": "news"}, news["upstream_requests"]
+        yield "bot_cache_upstream_fetches_total", COUNTER, {"cache": "quote"}, caches["quote"]["upstream_fetches"]
+        
+        for name, limiter in (("chat", self.chat_limiter), ("upstream", self.upstream_limiter)):
+            limits = limiter.stats()
+            yield "bot_rate_limited_total", COUNTER, {"limit": name}, limits["limited"]
+            yield "bot_rate_limiter_keys", GAUGE, {"limit": name}, limits["keys"]
+        
+        alerts = self.alert_state.stats()
+        yield "bot_alerts_fired_total", COUNTER, {}, alerts["fired"]
+        yield "bot_alerts_suppressed_total", COUNTER, {}, alerts["suppressed"]
+        yield "bot_tracked_symbols", GAUGE, {}, len(self.tracked_symbols)
+        if self.webhook is not None:
+            webhook = self.webhook.stats()
+            yield "bot_webhook_queue_depth", GAUGE, {}, webhook["depth"]
+            yield "bot_webhook_updates_total", COUNTER, {"result": "processed"}, webhook["processed"]
+            yield "bot_webhook_updates_total", COUNTER, {"result": "failed"}, webhook["failed"]
+        
+    def render_botstats(self) -> str:
+        """Build the /botstats reply from the current metrics"""
+        samples = self.metrics.samples()
+        
+        def series(name):
+            return samples.get(name, (None, {}))[1]
+            
+        def value(name, **labels):
+            metric = series(name).get(tuple(sorted(labels.items())), 0)
+            return metric if isinstance(metric, (int, float)) else metric.value
+            
+        def timing(histogram):
+            return (f"{histogram.count:,} · avg {histogram.sum / histogram.count * 1000:,.1f} ms · "
+                    f"p95 ≤{histogram.quantile(0.95) * 1000:,.0f} ms")
+            
+        parts = ["📊 *Bot Stats*\n\n*Commands* (calls · avg · p95)\n"]
+        for labels, histogram in sorted(series("bot_handler_seconds").items()):
+            if histogram.count:
+                handler = dict(labels)["handler"]
+                errors = value("bot_handler_errors_total", handler=handler)
+                parts.append(f"{handler}: {timing(histogram)}" + (f" · {errors:,.0f} errors" if errors else "") + "\n")
+                
+        parts.append("\n*Upstream*\n")
+        for labels, histogram in sorted(series("bot_upstream_seconds").items()):
+            if histogram.count:
+                label = dict(labels)
+                parts.append(f"{label['upstream']} {label['call']}: {timing(histogram)}\n")
+        for upstream in sorted({dict(labels)["upstream"] for name in ("bot_upstream_errors_total",
+                                "bot_upstream_retries_total", "bot_upstream_rate_limited_total")
+                                for labels in series(name)}):
+            counts = (value("bot_upstream_errors_total", upstream=upstream),
+                      value("bot_upstream_retries_total", upstream=upstream),
+                      value("bot_upstream_rate_limited_total", upstream=upstream))
+            if any(counts):
+                parts.append(f"{upstream}: {counts[0]:,.0f} errors · {counts[1]:,.0f} retries · "
+                             f"{counts[2]:,.0f} × 429\n")
+                
+        parts.append("\n*Caches* (hit rate)\n")
+        for cache in ("quote", "render", "chart"):
+            hits, misses = value("bot_cache_hits_total", cache=cache), value("bot_cache_misses_total", cache=cache)
+            if hits + misses:
+                parts.append(f"{cache}: {hits / (hits + misses):.0%} of {hits + misses:,.0f}\n")
+                
+        throttled = {limit: value("bot_rate_limited_total", limit=limit) for limit in ("chat", "upstream")}
+        if any(throttled.values()):
+            parts.append(f"\n*Rate limits*\nserved from cache: {throttled['chat']:,.0f} chat · "
+                         f"{throttled['upstream']:,.0f} upstream budget\n")
+        
+        cycles = [(dict(labels)["job"], gauge.value)
+                  for labels, gauge in sorted(series("bot_alert_cycle_seconds").items())]
+        if cycles:
+            parts.append("\n*Last cycle*\n" + " · ".join(f"{job} {seconds:.2f} s" for job, seconds in cycles) + "\n")
+        return "".join(parts)
+        
+    async def botstats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show handler, upstream and cache metrics (admins only)"""
+        if str(update.effective_chat.id) not in ADMIN_IDS:
+            await update.effective_message.reply_text("⛔ /botstats is only available to bot admins.")
+            return
+        if not self.metrics.enabled:
+            await update.effective_message.reply_text("📊 Metrics are turned off (METRICS_ENABLED in config.py).")
+            return
+        await update.effective_message.reply_text(self.render_botstats(), parse_mode='Markdown')
+        
+    async def settings_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show settings menu"""
         chat_id = update.effective_chat.id
         user_pref = user_preferences.get(str(chat_id))
@@ -500,35 +1225,37 @@ For more help, contact @Sajib
         message += f"🕐 Timezone: `{user_pref.timezone or 'Auto-detect'}`\n"
         message += f"🔔 Notifications: {'✅ Enabled' if user_pref.notifications_enabled else '❌ Disabled'}\n"
         message += f"📊 Tracked Markets: {len(user_pref.preferred_markets)}\n"
-        message += f"📰 News Keywords: {', '.join(user_pref.news_keywords[:3])}...\n\n"
+        message += f"📰 News Keywords: {', '.join(user_pref.news_keywords[:3])}...\n"
+        message += f"🗞 News Alerts: {'✅ Enabled' if user_pref.news_alerts else '❌ Disabled'}\n\n"
         
         keyboard = [
             [InlineKeyboardButton("🕐 Set Timezone", callback_data="set_timezone")],
             [InlineKeyboardButton("🔔 Toggle Notifications", callback_data="toggle_notifications")],
+            [InlineKeyboardButton("🗞 Toggle News Alerts", callback_data="toggle_news_alerts")],
             [InlineKeyboardButton("📊 Select Markets", callback_data="select_markets")],
             [InlineKeyboardButton("📰 Edit Keywords", callback_data="edit_keywords")]
         ]
         
         reply_markup = InlineKeyboardMarkup(keyboard)
-        update.message.reply_text(message, parse_mode='Markdown', reply_markup=reply_markup)
+        await update.effective_message.reply_text(message, parse_mode='Markdown', reply_markup=reply_markup)
         
-    def button_callback(self, update: Update, context: CallbackContext):
+    async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks"""
         query = update.callback_query
-        query.answer()
+        await query.answer()
         
         data = query.data
         
         if data == "status":
-            self.status_command(update, context)
+            await self.status_command(update, context)
         elif data == "news":
-            self.news_command(update, context)
+            await self.news_command(update, context)
         elif data == "stocks":
-            self.stocks_command(update, context)
+            await self.stocks_command(update, context)
         elif data == "settings":
-            self.settings_command(update, context)
+            await self.settings_command(update, context)
         elif data == "set_timezone":
-            query.edit_message_text(
+            await query.edit_message_text(
                 "🕐 *Set Your Timezone*\n\n"
                 "Please send your location for automatic detection, "
                 "or use /settimezone <timezone> command.\n\n"
@@ -540,58 +1267,244 @@ For more help, contact @Sajib
             user_pref = user_preferences.get(str(chat_id))
             if user_pref:
                 user_pref.notifications_enabled = not user_pref.notifications_enabled
+                user_preferences[str(chat_id)] = user_pref
                 status = "enabled" if user_pref.notifications_enabled else "disabled"
-                query.edit_message_text(f"✅ Notifications {status}!")
+                await query.edit_message_text(f"✅ Notifications {status}!")
+        elif data == "toggle_news_alerts":
+            chat_id = update.effective_chat.id
+            user_pref = user_preferences.get(str(chat_id))
+            if user_pref:
+                user_pref.news_alerts = not user_pref.news_alerts
+                if user_pref.news_alerts:
+                    user_pref.news_cursor = int(time.time())  # Only headlines published from now on
+                user_preferences[str(chat_id)] = user_pref
+                status = "enabled" if user_pref.news_alerts else "disabled"
+                await query.edit_message_text(f"✅ News alerts {status}!")
         elif data == "select_markets":
             # Create market selection keyboard
             keyboard = []
             for market_name in MARKETS.keys():
                 keyboard.append([InlineKeyboardButton(market_name, callback_data=f"market_{market_name}")])
             reply_markup = InlineKeyboardMarkup(keyboard)
-            query.edit_message_text("📊 *Select Markets to Track*\n\nChoose which markets you want to monitor:", 
+            await query.edit_message_text("📊 *Select Markets to Track*\n\nChoose which markets you want to monitor:", 
                                   parse_mode='Markdown', reply_markup=reply_markup)
                                   
-    def send_market_alerts(self):
+    def build_market_subscribers(self) -> Dict[str, List[str]]:
+        """Inverted index from market name to chat ids that want its alerts"""
+        subscribers = user_preferences.market_subscribers()
+        return {market: chat_ids for market, chat_ids in subscribers.items() if market in MARKETS}
+        
+    def restore_alert_state(self):
+        """Load which alerts already fired, so a restart doesn't repeat them"""
+        shared, personal = [], []
+        for key, armed, fired_at in user_preferences.alert_state():
+            if key.startswith(RULE_STATE_PREFIX):
+                personal.append((int(key[len(RULE_STATE_PREFIX):]), armed, fired_at))
+            else:
+                shared.append((key, armed, fired_at))
+        self.alert_state.load(shared)
+        self.alert_rules.restore_state(personal)
+        
+    def persist_alert_state(self):
+        """Write alert state that changed since the last call"""
+        changes = self.alert_state.drain_changes()
+        changes.update((rule_state_key(rule_id), entry) for rule_id, entry in self.alert_rules.drain_state().items())
+        if changes:
+            user_preferences.save_alert_state(changes)
+            
+    def on_quote(self, quote: Quote):
+        """Every fresh upstream quote is a tick: feed the tracker, then check users' rules on it"""
+        if not self.runs_alerts:
+            return  # only the leader worker evaluates alerts
+        shared = quote.symbol in self.market_symbols  # watched and /alert symbols only feed personal rules
+        self.price_tracker.observe(quote, check_rules=shared)
+        now = quote.timestamp or time.time()
+        if shared and self.alert_state.update(self.day_rule.state_key(quote.symbol), quote.change_percent,
+                                              self.day_rule.threshold, now):
+            self.queue_move_alert(Trigger(quote.symbol, self.day_rule, quote.change_percent, quote.price, now))
+            
+        signals = self.price_tracker.signals(quote.symbol)
+        hits = self.alert_rules.evaluate(
+            quote.symbol,
+            quote.price,
+            quote.change_percent,
+            {minutes: signal.return_percent for minutes, signal in signals.items()},
+            {minutes: signal.average for minutes, signal in signals.items()},
+            now
+        )
+        if hits:
+            with self._move_alerts_lock:
+                for hit in hits:
+                    self._rule_hits[hit.rule.rule_id] = hit
+                    
+    def pop_rule_hits(self) -> Dict[str, List[RuleHit]]:
+        """Take every queued rule hit, grouped by chat"""
+        with self._move_alerts_lock:
+            hits, self._rule_hits = self._rule_hits, {}
+        by_chat = {}
+        for hit in hits.values():
+            by_chat.setdefault(hit.rule.chat_id, []).append(hit)
+        return by_chat
+        
+    def queue_move_alert(self, trigger: Trigger):
+        """Queue a day-move or rolling-window trigger until the next delivery"""
+        with self._move_alerts_lock:
+            self._move_alerts[(trigger.symbol, trigger.rule)] = trigger
+            
+    def pop_move_alerts(self, symbols: List[str]) -> Dict[str, List[Trigger]]:
+        """Take the latest queued trigger per rule for these symbols"""
+        wanted = set(symbols)
+        taken = {}
+        with self._move_alerts_lock:
+            for key in [k for k in self._move_alerts if k[0] in wanted]:
+                trigger = self._move_alerts.pop(key)
+                taken.setdefault(trigger.symbol, []).append(trigger)
+        return taken
+        
+    def evaluate_alerts(self, quotes: Dict[str, Quote]) -> Dict[str, List[Trigger]]:
+        """Numeric triggers per symbol: the day's move and rolling-window rules that newly fired"""
+        # Fetching the quotes ran every rule on these ticks; only edges were queued
+        triggers = self.pop_move_alerts(list(quotes))
+        for symbol_triggers in triggers.values():
+            symbol_triggers.sort(key=lambda t: t.rule.metric != DAY_CHANGE)
+        return triggers
+        
+    def render_alert(self, quote: Quote, trigger: Trigger) -> str:
+        """Format one trigger as an alert line"""
+        rule, value = trigger.rule, trigger.value
+        if rule.metric == DAY_CHANGE:
+            direction = "🚀" if value > 0 else "📉"
+            return f"{direction} {quote.name}: {value:+.2f}%"
+        if rule.metric == RETURN:
+            return f"⚡ {quote.name}: {value:+.2f}% in {rule.minutes}m"
+        if rule.metric == VWAP_DELTA:
+            return f"⚖️ {quote.name}: {value:+.2f}% vs {rule.minutes}m VWAP"
+        return f"📊 {quote.name}: {value:+.1f}σ over {rule.minutes}m"
+        
+    def describe_rule(self, rule: AlertRule) -> str:
+        if rule.kind == MOVE:
+            when = "today" if rule.window == DAY else f"in {rule.window}m"
+            return f"{rule.symbol} moves {rule.threshold:g}% {when}"
+        if rule.kind == CROSS_MA:
+            return f"{rule.symbol} crosses its {rule.window}m average"
+        return f"{rule.symbol} {rule.kind} {rule.threshold:,.2f}"
+        
+    def render_rule_hit(self, hit: RuleHit) -> str:
+        """Format one personal rule hit as an alert line"""
+        rule = hit.rule
+        if rule.kind == MOVE:
+            when = "today" if rule.window == DAY else f"in {rule.window}m"
+            line = f"⚡ {rule.symbol}: {hit.value:+.2f}% {when}"
+        elif rule.kind == CROSS_MA:
+            line = f"〰️ {rule.symbol} crossed its {rule.window}m average {hit.value:,.2f}"
+        else:
+            line = f"🎯 {rule.symbol} is {rule.kind} {rule.threshold:,.2f}"
+        return f"{line} (now {hit.price:,.2f}) · #{rule.rule_id}"
+        
+    def poll_prices(self, markets: List[str]):
+        """Tick poll: refresh quotes for open markets and alert at once if a window rule fired"""
+        symbols = [s for market_name in markets for s in MARKETS[market_name].get('indices', [])]
+        if self.quote_snapshot is not None:
+            self.sync_tracking()
+        # Watched and /alert symbols are polled, once each, whenever any market trades
+        self.quote_cache.get_many(symbols + self.tracked_symbols.symbols())
+        self.publish_quotes()
+        self.persist_alert_state()
+        with self._move_alerts_lock:
+            fired = {symbol for symbol, _ in self._move_alerts}
+            rule_hits = bool(self._rule_hits)
+        due = [m for m in markets if fired.intersection(MARKETS[m].get('indices', []))]
+        if due or rule_hits:
+            self.send_market_alerts(due)
+            
+
+    def send_market_alerts(self, markets: Optional[List[str]] = None):
         """Send periodic market alerts"""
-        for chat_id_str, user_pref in user_preferences.items():
-            if not user_pref.notifications_enabled:
+        # Stage 1: which markets have subscribers, and which symbols they need
+        subscribers = self.build_market_subscribers()
+        if markets is not None:
+            subscribers = {m: chat_ids for m, chat_ids in subscribers.items() if m in markets}
+        symbols = []
+        for market_name in subscribers:
+            symbols.extend(MARKETS[market_name].get('indices', []))
+        # Moves on markets nobody follows would otherwise wait in the queue and go out late
+        requested = MARKETS if markets is None else markets
+        self.pop_move_alerts([s for m in requested for s in MARKETS[m].get('indices', []) if s not in symbols])
+            
+        # Stage 2: fetch and evaluate every symbol exactly once
+        symbol_alerts = {}
+        if symbols:
+            quotes = self.quote_cache.get_many(symbols)
+            self.publish_quotes()
+            symbol_triggers = self.evaluate_alerts(quotes)
+            symbol_alerts = {
+                symbol: [self.render_alert(quotes[symbol], t) for t in triggers]
+                for symbol, triggers in symbol_triggers.items()
+            }
+            
+        # Stage 3: fan out per-market alert lines to their subscribers
+        user_alerts = {}
+        for market_name, chat_ids in subscribers.items():
+            lines = [line for s in MARKETS[market_name].get('indices', []) for line in symbol_alerts.get(s, ())]
+            if not lines:
                 continue
+            for chat_id_str in chat_ids:
+                user_alerts.setdefault(chat_id_str, []).extend(lines)
                 
-            try:
-                # Check for significant market movements
-                alerts = []
-                
-                for market_name in user_pref.preferred_markets:
-                    if market_name in MARKETS:
-                        market_info = MARKETS[market_name]
-                        symbols = market_info.get('indices', [])
-                        
-                        if symbols:
-                            stock_data = self.get_stock_data(symbols)
-                            
-                            for symbol, data in stock_data.items():
-                                try:
-                                    change_percent = float(data['change_percent'].replace('%', '').replace('+', ''))
-                                    if abs(change_percent) > 2.0:  # Alert on 2%+ movement
-                                        direction = "🚀" if change_percent > 0 else "📉"
-                                        alerts.append(f"{direction} {data['name']}: {data['change_percent']}")
-                                except:
-                                    continue
-                                    
-                if alerts:
-                    message = f"🚨 *Market Alert*\n\n" + "\n".join(alerts[:5])  # Limit to 5 alerts
-                    
-                    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-                    payload = {
-                        "chat_id": chat_id_str,
-                        "text": message,
-                        "parse_mode": "Markdown"
-                    }
-                    requests.post(url, json=payload)
-                    
-            except Exception as e:
-                logger.error(f"Error sending alerts to {chat_id_str}: {e}")
+        # Personal /alert rules that fired on ticks since the last delivery
+        for chat_id_str, hits in self.pop_rule_hits().items():
+            user_alerts.setdefault(chat_id_str, []).extend(self.render_rule_hit(hit) for hit in hits)
+        self.persist_alert_state()
+        if not user_alerts:
+            return
                 
+        messages = {}
+        outbox = []
+        for chat_id_str, alerts in user_alerts.items():
+            key = tuple(alerts[:5])  # Limit to 5 alerts
+            if key not in messages:
+                messages[key] = "🚨 *Market Alert*\n\n" + "\n".join(key)
+            outbox.append((chat_id_str, messages[key]))
+            
+        # Stage 4: rate-limited delivery over a pooled connection
+        if not HTTPX_AVAILABLE:
+            logger.error("httpx not available, cannot deliver market alerts")
+            return
+        metrics = self.sender.deliver_sync(outbox)
+        logger.info(f"Market alerts delivered: {metrics.as_dict()}")
+        
+    def record_history(self, market_name: str):
+        """Append the latest bars of a market's indices (and of symbols with /alert rules) to history"""
+        symbols = list(MARKETS[market_name].get('indices', [])) + self.tracked_symbols.symbols()
+        fetched = self.quote_engine.fetch_bars(symbols, HISTORY_FETCH_PERIOD, HISTORY_BAR_INTERVAL)
+        appended = 0
+        for symbol, bars in fetched.items():
+            latest = self.history.latest(symbol)
+            if latest is not None:
+                bars = bars.take(bars.ts > latest[0])  # the look-back overlaps what we already have
+            appended += self.history.append(symbol, bars)
+        compacted = self.history.compact(fetched)
+        logger.info(f"{market_name} history: {appended} bars for {len(fetched)} symbols, {compacted} compacted")
+        
+    def send_market_bell(self, market_name: str, event: str):
+        """Tell a market's subscribers that it just opened, closed or broke for lunch"""
+        if event == BELL_CLOSE and self.history is not None:
+            self.executor.submit(self.record_history, market_name)
+            
+        chat_ids = self.build_market_subscribers().get(market_name, [])
+        if not chat_ids or not HTTPX_AVAILABLE:
+            return
+            
+        if event == BELL_OPEN:
+            message = f"🔔 *{market_name}* is now OPEN"
+        elif event == BELL_BREAK:
+            message = f"🟡 *{market_name}* is on LUNCH BREAK"
+        else:
+            message = f"🔕 *{market_name}* is now CLOSED"
+            
+        metrics = self.sender.deliver_sync([(chat_id, message) for chat_id in chat_ids])
+        logger.info(f"{market_name} {event} bell delivered: {metrics.as_dict()}")
+        
     def run(self):
         """Start the bot"""
         if not TELEGRAM_AVAILABLE:
@@ -600,21 +1513,232 @@ For more help, contact @Sajib
             
         logger.info("Starting Market Monitor Bot...")
         
-        # Schedule periodic alerts
-        if SCHEDULE_AVAILABLE:
-            schedule.every(30).minutes.do(self.send_market_alerts)
+        port = os.environ.get('METRICS_PORT', METRICS_PORT)
+        if self.metrics.enabled and port:
+            self.metrics_server = MetricsServer(self.metrics, METRICS_HOST, int(port))
+            self.metrics_server.start()
             
-            def run_scheduler():
-                while True:
-                    schedule.run_pending()
-                    time.sleep(60)
+        if PRELOAD_INTEGRATIONS:
+            # Off the startup path, but ready before the first /stocks or /news
+            modules = [yf, newsapi, geocoders, tzlocal]
+            threading.Thread(target=preload, args=(modules,), name="import-warmup", daemon=True).start()
+            
+        if TIMEZONEFINDER_AVAILABLE and TIMEZONE_WARMUP:
+            threading.Thread(target=timezone_locator.warm_up, name="timezone-warmup", daemon=True).start()
+            
+        self.start_background_jobs()
+        if WEBHOOK_URL:
+            asyncio.run(self.run_webhook(WEBHOOK_URL))
+        else:
+            self.application.run_polling()
+            
+    def start_background_jobs(self):
+        """News refresh, market alerts/bells and price ticks: run by exactly one process"""
+        if self.news_client:
+            self.news_cache.start()
+            
+        # Poll each market only while it trades, waking exactly at session boundaries
+        self.scheduler = MarketScheduler(
+            self.calendar,
+            MARKETS,
+            on_poll=self.metrics.timed(self.send_market_alerts,
+                                       self.metrics.gauge("bot_alert_cycle_seconds", job="alerts")),
+            on_bell=self.send_market_bell,
+            poll_interval=ALERT_INTERVAL_MINUTES * 60
+        )
+        self.scheduler.start()
+        
+        # Feed the price tracker every PRICE_TICK_SECONDS while a market trades
+        self.tick_scheduler = MarketScheduler(
+            self.calendar,
+            MARKETS,
+            on_poll=self.metrics.timed(self.poll_prices, self.metrics.gauge("bot_alert_cycle_seconds", job="ticks")),
+            poll_interval=PRICE_TICK_SECONDS
+        )
+        self.tick_scheduler.start()
+        
+    async def process_webhook_update(self, data: dict):
+        """Decode one webhook update and run it through the handlers (called by the webhook workers)"""
+        await self.application.process_update(Update.de_json(data, self.application.bot))
+        
+    async def run_webhook(self, url: str):
+        """Serve updates pushed by Telegram until SIGINT/SIGTERM, then drain what is queued"""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows
+                pass
+                
+        self.webhook = WebhookServer(
+            self.process_webhook_update,
+            WEBHOOK_SECRET,
+            host=WEBHOOK_LISTEN,
+            port=int(os.environ.get('PORT', WEBHOOK_PORT)),
+            path=WEBHOOK_PATH,
+            workers=WEBHOOK_WORKERS,
+            queue_size=WEBHOOK_QUEUE_SIZE,
+            metrics=self.metrics
+        )
+        await self.application.initialize()
+        await self.application.start()
+        await self.webhook.start()
+        await self.application.bot.set_webhook(
+            url,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Update.ALL_TYPES
+        )
+        try:
+            await stop.wait()
+        finally:
+            # The webhook stays registered: other replicas (or our restart) keep receiving updates
+            await self.webhook.stop(WEBHOOK_DRAIN_SECONDS)
+            await self.application.stop()
+            await self.application.shutdown()
+            
+    def run_worker(self, index: int, inbound, snapshot_name: str, workers: int = 1):
+        """Serve one shard of chats for the supervisor until it sends None (see supervisor.py)"""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor decides when workers stop
+        logger.info(f"Worker {index} starting (pid {os.getpid()})")
+        self.runs_alerts = False
+        # Each worker limits its own shard, so together they stay within the one upstream budget
+        self.upstream_limiter = RateLimiter(UPSTREAM_REQUESTS_PER_MINUTE / workers,
+                                            max(1, RATE_LIMIT_BURST // workers))
+        if self.history is not None:
+            self.history.follow = True  # whichever worker leads writes the history; everyone reads it
+        self.quote_snapshot = QuoteSnapshot.attach(snapshot_name)
+        self.quote_cache.loader = self.load_shared_quotes
+        self.leader_lock = LeaderLock(os.environ.get('LEADER_LOCK_PATH', LEADER_LOCK_PATH))
+        threading.Thread(target=self.seek_leadership, name="leader-election", daemon=True).start()
+        if TIMEZONEFINDER_AVAILABLE and TIMEZONE_WARMUP:
+            threading.Thread(target=timezone_locator.warm_up, name="timezone-warmup", daemon=True).start()
+        try:
+            asyncio.run(self.serve_shard(inbound))
+        finally:
+            self.leader_lock.release()
+            self.quote_snapshot.close()
+            
+    async def serve_shard(self, inbound):
+        """Handle routed updates, up to WEBHOOK_WORKERS at a time, until the None sentinel"""
+        loop = asyncio.get_running_loop()
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shard-inbound")
+        slots = asyncio.Semaphore(WEBHOOK_WORKERS)
+        tasks = set()
+        
+        async def handle(data: dict):
+            try:
+                await self.process_webhook_update(data)
+            except Exception as e:
+                logger.error(f"Error handling update {data.get('update_id')}: {e}")
+            finally:
+                slots.release()
                 
-            scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-            scheduler_thread.start()
+        await self.application.initialize()
+        await self.application.start()
+        try:
+            while True:
+                data = await loop.run_in_executor(reader, inbound.get)
+                if data is None:
+                    break
+                await slots.acquire()
+                task = asyncio.create_task(handle(data))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            reader.shutdown(wait=False)
+            await self.application.stop()
+            await self.application.shutdown()
+            
+    def seek_leadership(self):
+        """Retry the leader lock until this worker gets it, then take over the background jobs"""
+        while not self.leader_lock.try_acquire():
+            time.sleep(LEADER_RETRY_SECONDS)
+        self.become_leader()
+        
+    def become_leader(self):
+        logger.info(f"Process {os.getpid()} is now the alert leader")
+        # A previous leader may have fired alerts and changed rules since this worker started
+        self.sync_tracking()
+        self.restore_alert_state()
+        self.quote_cache.loader = self.quote_engine.fetch
+        self.runs_alerts = True
+        self.start_background_jobs()
+        
+    def sync_tracking(self):
+        """Pick up /alert, /delalert and /watch changes that other worker processes made"""
+        # Read the version first: a change made while we reload is picked up on the next tick
+        version = user_preferences.tracking_version()
+        if version == self._tracking_version:
+            return
+        self._tracking_version = version
+        stored = {row[0]: AlertRule(*row) for row in user_preferences.alert_rules()}
+        known = {rule.rule_id for rule in self.alert_rules.all_rules()}
+        for rule_id in known - stored.keys():
+            self.alert_rules.remove(rule_id)
+        self.alert_rules.load(stored[rule_id] for rule_id in stored.keys() - known)
+        
+        tracked = SymbolRegistry()
+        tracked.load(user_preferences.watch_counts())
+        tracked.acquire(rule.symbol for rule in stored.values())
+        self.tracked_symbols = tracked
+        
+    def load_shared_quotes(self, symbols: List[str]) -> Dict[str, Quote]:
+        """Quote loader for followers: the leader's snapshot first, upstream only for what it lacks"""
+        quotes = self.quote_snapshot.quotes(symbols)
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing:
+            quotes.update(self.quote_engine.fetch(missing))
+        return quotes
         
-        self.updater.start_polling()
-        self.updater.idle()
+    def publish_quotes(self):
+        """Share the leader's fresh quotes with the other workers"""
+        if self.quote_snapshot is None:
+            return
+        now = time.time()
+        try:
+            self.quote_snapshot.publish({symbol: (now + seconds_left, quote)
+                                         for symbol, (seconds_left, quote) in self.quote_cache.fresh().items()})
+        except SnapshotFull as e:
+            logger.warning(f"Quotes not shared with the other workers: {e}")
+
+
+def run_worker_process(index: int, inbound, snapshot_name: str, workers: int = 1):
+    """Entry point of a worker process started by the supervisor"""
+    MarketMonitorBot().run_worker(index, inbound, snapshot_name, workers)
+    
+    
+def run_supervisor(workers: int):
+    """Spread chats over ``workers`` processes behind one Telegram connection"""
+    if not TELEGRAM_AVAILABLE:
+        print("Cannot start bot: python-telegram-bot is not available.")
+        return
+    if PREFERENCES_BACKEND != "sqlite":
+        raise ValueError("Worker processes share preferences through SQLite; set PREFERENCES_BACKEND = \"sqlite\"")
+        
+    supervisor = Supervisor(run_worker_process, workers, args=(workers,), queue_size=WORKER_QUEUE_SIZE,
+                            snapshot_bytes=QUOTE_SNAPSHOT_BYTES)
+    webhook = None
+    if WEBHOOK_URL:
+        webhook = WebhookServer(
+            supervisor.dispatch,
+            WEBHOOK_SECRET,
+            host=WEBHOOK_LISTEN,
+            port=int(os.environ.get('PORT', WEBHOOK_PORT)),
+            path=WEBHOOK_PATH,
+            workers=WEBHOOK_WORKERS,
+            queue_size=WEBHOOK_QUEUE_SIZE
+        )
+    asyncio.run(supervisor.serve(TOKEN, webhook, WEBHOOK_URL, max_connections=WEBHOOK_MAX_CONNECTIONS,
+                                 allowed_updates=Update.ALL_TYPES, drain_timeout=WEBHOOK_DRAIN_SECONDS))
+
 
 if __name__ == "__main__":
-    bot = MarketMonitorBot()
-    bot.run()
+    workers = int(os.environ.get('WORKER_PROCESSES', WORKER_PROCESSES))
+    if workers > 1:
+        run_supervisor(workers)
+    else:
+        bot = MarketMonitorBot()
+        bot.run()
@@ -0,0 +1,153 @@
+"""Market-session-aware alert scheduler for Sajib Market Trading Monitor Bot
+
+Replaces the fixed ``schedule.every(30).minutes`` loop. The scheduler
+asks the MarketCalendar for the next open/close/break boundary of every
+market and sleeps exactly until then (or until the next poll of a market
+that is open). Markets are only polled while they trade, an open/close
+bell event is raised on every transition, and a poll that is still
+running when the next one is due absorbs it instead of stacking up.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from market_calendar import MarketCalendar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL_SECONDS = 30 * 60
+MAX_SLEEP_SECONDS = 3600  # re-check at least hourly in case the wall clock jumps
+
+BELL_OPEN = "open"
+BELL_CLOSE = "close"
+BELL_BREAK = "break"
+
+
+def _start_thread(target: Callable):
+    threading.Thread(target=target, name="market-poll", daemon=True).start()
+
+
+class MarketScheduler:
+    """Drives polling and bell events from market session boundaries"""
+
+    def __init__(self, calendar: MarketCalendar, markets: Iterable[str],
+                 on_poll: Callable[[List[str]], None],
+                 on_bell: Optional[Callable[[str, str], None]] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+                 clock: Callable[[], float] = time.time,
+                 spawn: Callable[[Callable], None] = _start_thread):
+        self.calendar = calendar
+        self.markets = list(markets)
+        self.on_poll = on_poll
+        self.on_bell = on_bell
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.spawn = spawn
+
+        self._open: Dict[str, bool] = {}
+        self._next_poll: Dict[str, float] = {}
+        self._stop = threading.Event()
+
+        # Coalescing state: at most one poll runs; anything due meanwhile is merged
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending: Set[str] = set()
+        self.polls = 0
+        self.coalesced = 0
+
+    def tick(self, now: Optional[float] = None) -> List[str]:
+        """Handle every boundary and poll due at ``now``; returns the markets submitted"""
+        now = self.clock() if now is None else now
+        due = []
+        for market_name in self.markets:
+            is_open = self.calendar.is_open(market_name, now)
+            was_open = self._open.get(market_name)
+            self._open[market_name] = is_open
+
+            if was_open is not None and is_open != was_open:
+                self._ring(market_name, now, is_open)
+                if not is_open:
+                    due.append(market_name)  # last read at the close/break
+                    continue
+
+            if not is_open:
+                continue
+            if was_open is not True:
+                # Just opened: first poll one interval in (or now, on startup mid-session)
+                self._next_poll[market_name] = now + self.poll_interval
+                if was_open is None:
+                    due.append(market_name)
+            elif now >= self._next_poll[market_name]:
+                self._next_poll[market_name] = now + self.poll_interval
+                due.append(market_name)
+
+        if due:
+            self.submit(due)
+        return due
+
+    def _ring(self, market_name: str, now: float, is_open: bool):
+        if is_open:
+            event = BELL_OPEN
+        elif "LUNCH BREAK" in self.calendar.status(market_name, now).status:
+            event = BELL_BREAK
+        else:
+            event = BELL_CLOSE
+        logger.info(f"{market_name}: {event} bell")
+        if self.on_bell:
+            try:
+                self.on_bell(market_name, event)
+            except Exception as e:
+                logger.error(f"Error sending {event} bell for {market_name}: {e}")
+
+    def next_wakeup(self, now: Optional[float] = None) -> float:
+        """Earliest of every market's next boundary and every open market's next poll"""
+        now = self.clock() if now is None else now
+        candidates = [now + MAX_SLEEP_SECONDS]
+        for market_name in self.markets:
+            boundary = self.calendar.next_boundary(market_name, now)
+            if boundary is not None:
+                candidates.append(boundary)
+            if self._open.get(market_name):
+                candidates.append(self._next_poll[market_name])
+        return min(candidates)
+
+    def submit(self, markets: Iterable[str]):
+        """Start a poll, or fold the markets into the one already running"""
+        with self._lock:
+            self._pending.update(markets)
+            if self._running:
+                self.coalesced += 1
+                return
+            self._running = True
+        self.spawn(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                markets = [m for m in self.markets if m in self._pending]
+                self._pending.clear()
+                if not markets:
+                    self._running = False
+                    return
+            self.polls += 1
+            try:
+                self.on_poll(markets)
+            except Exception as e:
+                logger.error(f"Error polling {', '.join(markets)}: {e}")
+
+    def run_forever(self):
+        """Sleep from boundary to boundary until stop() is called"""
+        while not self._stop.is_set():
+            now = self.clock()
+            self.tick(now)
+            self._stop.wait(max(0.0, self.next_wakeup(now) - self.clock()))
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run_forever, name="market-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
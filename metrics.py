@@ -0,0 +1,329 @@
+"""In-process metrics for Sajib Market Trading Monitor Bot
+
+A small Prometheus-style registry: histograms time the command handlers
+and every upstream call (yfinance, NewsAPI, Telegram), counters track
+errors, retries and 429s, and gauges hold the duration of the last alert
+and tick cycles. Cache hit rates are not counted on the hot path at all;
+the caches already keep their own counters, and collectors read them
+when the metrics are scraped.
+
+The registry is exposed as Prometheus text on ``/metrics`` by
+``MetricsServer`` and summarised for admins by ``/botstats``. A disabled
+registry hands out shared no-op metrics and ``timed`` returns the
+wrapped function unchanged, so instrumentation costs next to nothing
+when it is turned off.
+"""
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# Seconds; spans a render-cache hit up to a slow yfinance batch
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, str, Dict[str, str], float]  # (name, kind, labels, value) from a collector
+
+
+class Counter:
+    """Monotonic count"""
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Last observed value"""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    observe = set
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observations"""
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (the largest bound for +Inf)"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class _NullMetric:
+    """Stands in for every metric of a disabled registry"""
+    __slots__ = ()
+    value = 0.0
+    count = 0
+    sum = 0.0
+
+    def inc(self, amount: float = 1.0):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def quantile(self, q: float) -> float:
+        return 0.0
+
+
+NULL_METRIC = _NullMetric()
+
+
+class _Timer:
+    """Context manager feeding the elapsed time into a histogram or gauge"""
+    __slots__ = ("metric", "clock", "started")
+
+    def __init__(self, metric, clock):
+        self.metric = metric
+        self.clock = clock
+
+    def __enter__(self):
+        self.started = self.clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric.observe(self.clock() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+def _label_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = []
+    for key, value in labels:
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Named, labelled metrics plus collectors read at scrape time"""
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.clock = clock
+        self._metrics: Dict[Tuple[str, Labels], object] = {}
+        self._kinds: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, name: str, labels: Dict[str, str], factory):
+        if not self.enabled:
+            return NULL_METRIC
+        key = (name, _label_key(labels))
+        with self._lock:
+            known = self._kinds.setdefault(name, kind)
+            if known != kind:
+                raise ValueError(f"{name} is already registered as a {known}")
+            return self._metrics.setdefault(key, factory())
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get(COUNTER, name, labels, Counter)
+
+    def gauge(self, name: str, **labels) -> Gauge:
+        return self._get(GAUGE, name, labels, Gauge)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        return self._get(HISTOGRAM, name, labels, lambda: Histogram(self.buckets))
+
+    def time(self, metric):
+        """``with registry.time(histogram_or_gauge):`` records the block's duration"""
+        if metric is NULL_METRIC:
+            return NULL_TIMER
+        return _Timer(metric, self.clock)
+
+    def timed(self, func: Callable, metric, errors=None) -> Callable:
+        """Wrap a (sync or async) function so each call's duration goes into ``metric``
+        and each exception it raises into the ``errors`` counter; disabled registries
+        return ``func`` itself"""
+        if not self.enabled:
+            return func
+        clock = self.clock
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    if errors is not None:
+                        errors.inc()
+                    raise
+                finally:
+                    metric.observe(clock() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc()
+                raise
+            finally:
+                metric.observe(clock() - started)
+        return wrapper
+
+    def add_collector(self, collect: Callable[[], Iterable[Sample]]):
+        """Register a callable read at scrape time, e.g. to export a cache's own hit counters"""
+        if self.enabled:
+            self._collectors.append(collect)
+
+    def samples(self) -> Dict[str, Tuple[str, Dict[Labels, object]]]:
+        """Every metric grouped by name: name -> (kind, {labels: metric or collected value})"""
+        grouped: Dict[str, Tuple[str, Dict[Labels, object]]] = {}
+        with self._lock:
+            metrics = list(self._metrics.items())
+            kinds = dict(self._kinds)
+        for (name, labels), metric in metrics:
+            grouped.setdefault(name, (kinds[name], {}))[1][labels] = metric
+        for collect in self._collectors:
+            try:
+                for name, kind, labels, value in collect():
+                    grouped.setdefault(name, (kind, {}))[1][_label_key(labels)] = value
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+        return grouped
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for name, (kind, series) in sorted(self.samples().items()):
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in sorted(series.items()):
+                if kind != HISTOGRAM:
+                    value = metric if isinstance(metric, (int, float)) else metric.value
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                with metric._lock:
+                    counts = list(metric.counts)
+                    total, count = metric.sum, metric.count
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves ``registry.render()`` on GET /metrics from a daemon thread"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "0.0.0.0", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self) -> threading.Thread:
+        # http.server pulls in the email package; only pay for it when the endpoint is on
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would drown the bot log
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        thread.start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return thread
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,261 @@
+"""Keyword-bucketed news cache for Sajib Market Trading Monitor Bot
+
+Every /news call used to spend a NewsAPI request. Here each user's
+keyword list is normalized into a canonical bucket key (lower-cased,
+de-duplicated, sorted), so users with the same interests share one
+bucket. Buckets are refreshed in the background once their TTL expires,
+and articles are de-duplicated by URL in one bounded store shared by all
+buckets. /news is then answered from memory.
+
+Refreshes are incremental: each bucket keeps a ``publishedAt`` watermark
+and only asks upstream for articles newer than it, merging them into the
+bucket's newest-first list. ``since()`` returns the articles published
+after a subscriber's cursor (epoch seconds), so the push job only needs
+to remember one integer per user. It never goes upstream: a keyword set
+seen for the first time is only registered, and the next background
+pass fetches it.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEYWORDS = ("stock market", "trading", "finance", "economy")
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_ARTICLES = 500
+DEFAULT_MAX_BUCKETS = 256
+DEFAULT_BUCKET_SIZE = 20
+
+BucketKey = Tuple[str, ...]
+
+# Bucket versions come from one process-wide counter, so a bucket that is dropped and built
+# again never reuses a version (and a reply rendered for the old articles)
+_versions = itertools.count(1)
+
+
+def bucket_key(keywords: Optional[Iterable[str]]) -> BucketKey:
+    """Canonical key for a keyword list; order, case and duplicates don't matter"""
+    normalized = {" ".join(k.lower().split()) for k in (keywords or ())}
+    normalized.discard("")
+    return tuple(sorted(normalized)) or tuple(sorted(DEFAULT_KEYWORDS))
+
+
+def published_ts(published_at: Optional[str]) -> int:
+    """Epoch seconds for a NewsAPI ``publishedAt`` value, 0 if missing or malformed"""
+    try:
+        parsed = datetime.strptime(published_at[:19], "%Y-%m-%dT%H:%M:%S")
+    except (TypeError, ValueError):
+        return 0
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+
+class _Bucket:
+    __slots__ = ("urls", "watermark", "fetched_at", "last_used", "version", "loading")
+
+    def __init__(self):
+        self.urls: List[str] = []
+        self.watermark: Optional[str] = None
+        self.fetched_at = 0.0
+        self.last_used = 0.0
+        self.version = next(_versions)
+        self.loading: Optional[threading.Event] = None
+
+
+class NewsCache:
+    """Shared, TTL-refreshed news buckets backed by a bounded article store"""
+
+    def __init__(self, fetcher: Callable[[BucketKey, Optional[str]], List[dict]],
+                 ttl: float = DEFAULT_TTL_SECONDS,
+                 max_articles: int = DEFAULT_MAX_ARTICLES,
+                 max_buckets: int = DEFAULT_MAX_BUCKETS,
+                 bucket_size: int = DEFAULT_BUCKET_SIZE,
+                 on_refresh: Optional[Callable[[], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.max_articles = max_articles
+        self.max_buckets = max_buckets
+        self.bucket_size = bucket_size
+        self.on_refresh = on_refresh
+        self.clock = clock
+
+        self._articles: "OrderedDict[str, dict]" = OrderedDict()
+        self._buckets: Dict[BucketKey, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.requests = 0
+        self.upstream_requests = 0
+
+    def get(self, keywords: Optional[Iterable[str]] = None, limit: int = 5) -> List[dict]:
+        """Newest articles for a keyword list, fetching upstream only for a brand-new bucket"""
+        with self._lock:
+            self.requests += 1
+        bucket = self._bucket(bucket_key(keywords))
+        with self._lock:
+            articles = [self._articles[url] for url in bucket.urls if url in self._articles]
+        return articles[:limit]
+
+    def peek(self, keywords: Optional[Iterable[str]] = None, limit: int = 5) -> Optional[List[dict]]:
+        """Newest articles if the bucket has been (or is being) fetched; None rather than fetching a new bucket"""
+        with self._lock:
+            bucket = self._buckets.get(bucket_key(keywords))
+            if bucket is None or not (bucket.fetched_at or bucket.loading):
+                return None
+            loading = bucket.loading
+        if loading is not None and not bucket.fetched_at:
+            loading.wait()
+        with self._lock:
+            self.requests += 1
+            bucket.last_used = self.clock()
+            articles = [self._articles[url] for url in bucket.urls if url in self._articles]
+        return articles[:limit]
+
+    def since(self, keywords: Optional[Iterable[str]], cursor: int) -> List[dict]:
+        """Articles published after ``cursor`` (epoch seconds), newest first, from the cache only
+
+        A bucket that doesn't exist yet is created empty for ``refresh_stale`` to fill.
+        """
+        key = bucket_key(keywords)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+                bucket.last_used = self.clock()
+                self._evict_buckets()
+            bucket.last_used = self.clock()
+            articles = (self._articles.get(url) for url in bucket.urls)
+            return [a for a in articles if a is not None and a["published_ts"] > cursor]
+
+    def _bucket(self, key: BucketKey) -> _Bucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+                bucket.last_used = self.clock()
+                self._evict_buckets()  # after stamping it, or the new bucket would be the one evicted
+            bucket.last_used = self.clock()
+
+        if not bucket.fetched_at:
+            self._refresh(key, bucket)
+        return bucket
+
+    def version(self, keywords: Optional[Iterable[str]] = None) -> int:
+        """Changes whenever the bucket's article list changes; 0 until the bucket has been fetched"""
+        bucket = self._buckets.get(bucket_key(keywords))
+        return bucket.version if bucket and bucket.fetched_at else 0
+
+    def _refresh(self, key: BucketKey, bucket: _Bucket) -> bool:
+        """Fetch what's new for one bucket; concurrent callers wait for the same request.
+
+        Returns True if the bucket's article list changed.
+        """
+        with self._lock:
+            loading = bucket.loading
+            if loading is None:
+                loading = bucket.loading = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            loading.wait()
+            return False
+
+        try:
+            with self._lock:
+                self.upstream_requests += 1
+            articles = self.fetcher(key, bucket.watermark)
+        except Exception as e:
+            logger.error(f"Error fetching news for {key}: {e}")
+            articles = None
+
+        changed = False
+        with self._lock:
+            now = self.clock()
+            if articles is not None:
+                changed = self._merge(bucket, articles)
+            # On failure keep serving what we had and try again after the TTL
+            bucket.fetched_at = now
+            bucket.loading = None
+        loading.set()
+        return changed
+
+    def _merge(self, bucket: _Bucket, articles: List[dict]) -> bool:
+        """Add newly fetched articles to a bucket, keeping it newest-first and bounded"""
+        known = set(bucket.urls)
+        fresh = []
+        for article in articles:
+            url = article.get("url")
+            if not url:
+                continue
+            if url not in self._articles:
+                article["published_ts"] = published_ts(article.get("published_at"))
+                self._articles[url] = article
+            self._articles.move_to_end(url)
+            if url not in known:
+                known.add(url)
+                fresh.append(url)
+        while len(self._articles) > self.max_articles:
+            self._articles.popitem(last=False)
+
+        urls = [url for url in fresh + bucket.urls if url in self._articles]
+        urls.sort(key=lambda url: self._articles[url]["published_ts"], reverse=True)
+        del urls[self.bucket_size:]
+        if urls and self._articles[urls[0]]["published_ts"]:
+            bucket.watermark = self._articles[urls[0]].get("published_at")
+        if urls == bucket.urls:
+            return False
+        bucket.urls = urls
+        bucket.version = next(_versions)
+        return True
+
+    def _evict_buckets(self):
+        while len(self._buckets) > self.max_buckets:
+            oldest = min(self._buckets, key=lambda k: self._buckets[k].last_used)
+            del self._buckets[oldest]
+
+    def refresh_stale(self) -> List[BucketKey]:
+        """Refresh every bucket whose TTL has expired and return the ones that changed.
+
+        Buckets registered by ``since`` get their first fetch here. Idle buckets are dropped.
+        """
+        now = self.clock()
+        with self._lock:
+            for key in [k for k, b in self._buckets.items() if now - b.last_used > 6 * self.ttl]:
+                del self._buckets[key]
+            stale = [(k, b) for k, b in self._buckets.items()
+                     if b.loading is None and (not b.fetched_at or now - b.fetched_at >= self.ttl)]
+        return [key for key, bucket in stale if self._refresh(key, bucket)]
+
+    def run_forever(self, interval: Optional[float] = None):
+        interval = interval or max(1.0, self.ttl / 10)
+        while not self._stop.wait(interval):
+            try:
+                self.refresh_stale()
+                if self.on_refresh:
+                    self.on_refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing news buckets: {e}")
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run_forever, name="news-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "buckets": len(self._buckets),
+                "articles": len(self._articles),
+                "requests": self.requests,
+                "upstream_requests": self.upstream_requests
+            }
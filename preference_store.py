@@ -0,0 +1,558 @@
+"""User preference storage for Sajib Market Trading Monitor Bot
+
+Preferences used to live in a plain module-level dict and were lost on
+every restart. The stores here keep the same dict-style interface
+(``in``, ``[]``, ``get``, ``items``) so handlers barely change, and add
+``market_subscribers()`` so the alert job can ask for subscribers
+directly instead of scanning every user. ``news_subscribers()`` and
+``advance_news_cursors()`` do the same for the news push job, which only
+needs each subscriber's keywords and last-seen cursor. Watchlists are
+stored per (chat, symbol) like market subscriptions, and
+``watch_counts()`` gives the bot its symbol reference counts. Users' /alert
+rules are stored alongside as plain rows; the bot loads them into its
+rule engine at startup. So is alert state (which alerts have fired and
+when), so a restart doesn't re-send every alert that is still in effect.
+
+SQLitePreferenceStore is the default backend: WAL mode, batched writes,
+indexes on ``notifications_enabled`` and market, and a bounded read-through
+cache in front of the database so hot handlers don't touch disk.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL_SECONDS = 5.0
+DEFAULT_CACHE_SIZE = 100_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    chat_id TEXT PRIMARY KEY,
+    timezone TEXT,
+    notifications_enabled INTEGER NOT NULL DEFAULT 1,
+    news_keywords TEXT,
+    news_alerts INTEGER NOT NULL DEFAULT 0,
+    news_cursor INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_users_notifications ON users (notifications_enabled);
+CREATE TABLE IF NOT EXISTS user_markets (
+    market TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    PRIMARY KEY (market, chat_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_markets_chat ON user_markets (chat_id);
+CREATE TABLE IF NOT EXISTS user_watchlist (
+    chat_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    PRIMARY KEY (chat_id, symbol)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alert_rules (
+    rule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    window_minutes INTEGER NOT NULL DEFAULT 0,
+    market TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alert_rules_chat ON alert_rules (chat_id);
+CREATE TABLE IF NOT EXISTS alert_state (
+    key TEXT PRIMARY KEY,
+    armed INTEGER NOT NULL,
+    fired_at REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tracking_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO tracking_version (id, version) VALUES (0, 0);
+"""
+
+# Columns added after the first release; older databases get them on open
+MIGRATIONS = [
+    ("news_alerts", "ALTER TABLE users ADD COLUMN news_alerts INTEGER NOT NULL DEFAULT 0"),
+    ("news_cursor", "ALTER TABLE users ADD COLUMN news_cursor INTEGER NOT NULL DEFAULT 0"),
+]
+POST_MIGRATION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_users_news_alerts ON users (news_alerts);
+"""
+
+USER_COLUMNS = "timezone, notifications_enabled, news_keywords, news_alerts, news_cursor"
+BUMP_TRACKING_VERSION = "UPDATE tracking_version SET version = version + 1"
+
+NewsSubscriber = Tuple[str, Optional[List[str]], int]
+# (chat_id, symbol, kind, threshold, window_minutes, market), plus a leading rule_id once stored
+AlertRuleRow = Tuple[str, str, str, float, int, Optional[str]]
+# key -> (armed, fired_at), or None to drop the key
+AlertStateChanges = Dict[str, Optional[Tuple[bool, float]]]
+
+
+class PreferenceStore:
+    """Dict-like interface shared by every preference backend"""
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+
+    def get(self, chat_id: str, default=None):
+        raise NotImplementedError
+
+    def save(self, pref):
+        raise NotImplementedError
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        raise NotImplementedError
+
+    def market_subscribers(self) -> Dict[str, List[str]]:
+        """Map market name to chat ids that have notifications enabled"""
+        raise NotImplementedError
+
+    def news_subscribers(self) -> List[NewsSubscriber]:
+        """(chat_id, news_keywords, news_cursor) for every chat with news alerts on"""
+        raise NotImplementedError
+
+    def watch_counts(self) -> Dict[str, int]:
+        """Number of watchlists each symbol is on"""
+        raise NotImplementedError
+
+    def advance_news_cursors(self, cursors: Dict[str, int]):
+        """Record the newest article each chat has now been sent"""
+        raise NotImplementedError
+
+    def add_alert_rules(self, rows: List[AlertRuleRow]) -> List[int]:
+        """Store alert rules and return their new rule ids"""
+        raise NotImplementedError
+
+    def remove_alert_rule(self, chat_id: str, rule_id: int) -> bool:
+        raise NotImplementedError
+
+    def alert_rules(self) -> List[tuple]:
+        """Every stored rule as (rule_id, chat_id, symbol, kind, threshold, window_minutes, market)"""
+        raise NotImplementedError
+
+    def tracking_version(self) -> int:
+        """Changes whenever alert rules or watchlists may have changed, in any process"""
+        raise NotImplementedError
+
+    def alert_state(self) -> List[tuple]:
+        """Every stored alert state as (key, armed, fired_at)"""
+        raise NotImplementedError
+
+    def save_alert_state(self, changes: AlertStateChanges):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, chat_id) -> bool:
+        return self.get(str(chat_id)) is not None
+
+    def __getitem__(self, chat_id):
+        pref = self.get(str(chat_id))
+        if pref is None:
+            raise KeyError(chat_id)
+        return pref
+
+    def __setitem__(self, chat_id, pref):
+        self.save(pref)
+
+
+class MemoryPreferenceStore(PreferenceStore):
+    """Non-persistent backend, equivalent to the old module-level dict"""
+
+    def __init__(self, factory: Callable):
+        super().__init__(factory)
+        self._prefs: Dict[str, object] = {}
+        self._rules: Dict[int, tuple] = {}
+        self._next_rule_id = 1
+        self._alert_state: Dict[str, tuple] = {}
+        self._tracking_version = 0
+
+    def get(self, chat_id: str, default=None):
+        return self._prefs.get(str(chat_id), default)
+
+    def save(self, pref):
+        self._prefs[str(pref.chat_id)] = pref
+        self._tracking_version += 1
+
+    def items(self):
+        return iter(list(self._prefs.items()))
+
+    def market_subscribers(self) -> Dict[str, List[str]]:
+        subscribers = {}
+        for chat_id, pref in self._prefs.items():
+            if pref.notifications_enabled:
+                for market_name in pref.preferred_markets:
+                    subscribers.setdefault(market_name, []).append(chat_id)
+        return subscribers
+
+    def news_subscribers(self) -> List[NewsSubscriber]:
+        return [(chat_id, pref.news_keywords, pref.news_cursor)
+                for chat_id, pref in self._prefs.items() if pref.news_alerts]
+
+    def watch_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for pref in self._prefs.values():
+            for symbol in pref.watchlist:
+                counts[symbol] = counts.get(symbol, 0) + 1
+        return counts
+
+    def advance_news_cursors(self, cursors: Dict[str, int]):
+        for chat_id, cursor in cursors.items():
+            pref = self._prefs.get(str(chat_id))
+            if pref is not None:
+                pref.news_cursor = cursor
+
+    def add_alert_rules(self, rows: List[AlertRuleRow]) -> List[int]:
+        rule_ids = []
+        for row in rows:
+            self._rules[self._next_rule_id] = (self._next_rule_id, *row)
+            rule_ids.append(self._next_rule_id)
+            self._next_rule_id += 1
+        self._tracking_version += 1
+        return rule_ids
+
+    def remove_alert_rule(self, chat_id: str, rule_id: int) -> bool:
+        row = self._rules.get(rule_id)
+        if row is None or row[1] != str(chat_id):
+            return False
+        del self._rules[rule_id]
+        self._tracking_version += 1
+        return True
+
+    def alert_rules(self) -> List[tuple]:
+        return list(self._rules.values())
+
+    def tracking_version(self) -> int:
+        return self._tracking_version
+
+    def alert_state(self) -> List[tuple]:
+        return [(key, armed, fired_at) for key, (armed, fired_at) in self._alert_state.items()]
+
+    def save_alert_state(self, changes: AlertStateChanges):
+        for key, entry in changes.items():
+            if entry is None:
+                self._alert_state.pop(key, None)
+            else:
+                self._alert_state[key] = entry
+
+    def clear(self):
+        self._prefs.clear()
+        self._rules.clear()
+        self._alert_state.clear()
+        self._tracking_version += 1
+
+    def __len__(self) -> int:
+        return len(self._prefs)
+
+
+class SQLitePreferenceStore(PreferenceStore):
+    """SQLite backend with batched writes and a read-through LRU cache"""
+
+    def __init__(self, path: str, factory: Callable,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        super().__init__(factory)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[str, object]" = OrderedDict()
+        self._dirty: Dict[str, object] = {}
+        self._last_flush = time.monotonic()
+        self._flush_timer: Optional[threading.Timer] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Open the database on first use, so importing the bot never touches disk"""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = self._connect()
+        return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory and self.path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        atexit.register(self.close)
+        logger.info(f"Preference store opened at {self.path}")
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+        with conn:
+            for column, ddl in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(ddl)
+        conn.executescript(POST_MIGRATION_SCHEMA)
+
+    def _row_to_pref(self, chat_id: str, timezone, notifications_enabled, news_keywords,
+                     news_alerts, news_cursor, markets, watchlist):
+        return self.factory(
+            chat_id=chat_id,
+            timezone=timezone,
+            notifications_enabled=bool(notifications_enabled),
+            preferred_markets=markets,
+            news_keywords=json.loads(news_keywords) if news_keywords else None,
+            news_alerts=bool(news_alerts),
+            news_cursor=news_cursor,
+            watchlist=watchlist
+        )
+
+    def _remember(self, chat_id: str, pref):
+        self._cache[chat_id] = pref
+        self._cache.move_to_end(chat_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, chat_id: str, default=None):
+        chat_id = str(chat_id)
+        with self._lock:
+            pref = self._dirty.get(chat_id)
+            if pref is None:
+                pref = self._cache.get(chat_id)
+                if pref is not None:
+                    self._cache.move_to_end(chat_id)
+            if pref is not None:
+                return pref
+
+            row = self.conn.execute(
+                f"SELECT {USER_COLUMNS} FROM users WHERE chat_id = ?",
+                (chat_id,)
+            ).fetchone()
+            if row is None:
+                return default
+            markets = [m for (m,) in self.conn.execute(
+                "SELECT market FROM user_markets WHERE chat_id = ?", (chat_id,)
+            )]
+            watchlist = [s for (s,) in self.conn.execute(
+                "SELECT symbol FROM user_watchlist WHERE chat_id = ?", (chat_id,)
+            )]
+            pref = self._row_to_pref(chat_id, *row, markets, watchlist)
+            self._remember(chat_id, pref)
+            return pref
+
+    def save(self, pref):
+        """Queue a write; it reaches disk with the next batch"""
+        chat_id = str(pref.chat_id)
+        with self._lock:
+            self._dirty[chat_id] = pref
+            self._remember(chat_id, pref)
+            if (len(self._dirty) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+            elif self._flush_timer is None:
+                # Make sure a lone write still reaches disk within flush_interval
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Write all queued preference changes in a single transaction"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            dirty = list(self._dirty.values())
+            chat_ids = [(str(p.chat_id),) for p in dirty]
+            with self.conn:
+                # news_cursor only moves forward: the news job (advance_news_cursors, possibly in
+                # another process) may have passed a queued change's cursor, which must not win,
+                # while opting in to news alerts moves it to "now", which must
+                self.conn.executemany(
+                    f"INSERT INTO users (chat_id, {USER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(chat_id) DO UPDATE SET timezone = excluded.timezone, "
+                    "notifications_enabled = excluded.notifications_enabled, "
+                    "news_keywords = excluded.news_keywords, news_alerts = excluded.news_alerts, "
+                    "news_cursor = MAX(news_cursor, excluded.news_cursor)",
+                    [(str(p.chat_id), p.timezone, int(p.notifications_enabled), json.dumps(list(p.news_keywords)),
+                      int(p.news_alerts), p.news_cursor)
+                     for p in dirty]
+                )
+                self.conn.executemany("DELETE FROM user_markets WHERE chat_id = ?", chat_ids)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO user_markets (market, chat_id) VALUES (?, ?)",
+                    [(market, str(p.chat_id)) for p in dirty for market in p.preferred_markets]
+                )
+                self.conn.executemany("DELETE FROM user_watchlist WHERE chat_id = ?", chat_ids)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO user_watchlist (chat_id, symbol) VALUES (?, ?)",
+                    [(str(p.chat_id), symbol) for p in dirty for symbol in p.watchlist]
+                )
+                self.conn.execute(BUMP_TRACKING_VERSION)
+            self._dirty.clear()
+
+    def items(self):
+        self.flush()
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT chat_id, {USER_COLUMNS} FROM users"
+            ).fetchall()
+            market_rows = self.conn.execute("SELECT market, chat_id FROM user_markets").fetchall()
+            watch_rows = self.conn.execute("SELECT chat_id, symbol FROM user_watchlist").fetchall()
+        markets: Dict[str, List[str]] = {}
+        for market, chat_id in market_rows:
+            markets.setdefault(chat_id, []).append(market)
+        watchlists: Dict[str, List[str]] = {}
+        for chat_id, symbol in watch_rows:
+            watchlists.setdefault(chat_id, []).append(symbol)
+        for chat_id, *row in rows:
+            yield chat_id, self._row_to_pref(chat_id, *row, markets.get(chat_id, []), watchlists.get(chat_id, []))
+
+    def market_subscribers(self) -> Dict[str, List[str]]:
+        self.flush()
+        subscribers: Dict[str, List[str]] = {}
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT m.market, m.chat_id FROM user_markets m "
+                "JOIN users u ON u.chat_id = m.chat_id "
+                "WHERE u.notifications_enabled = 1"
+            ).fetchall()
+        for market, chat_id in rows:
+            subscribers.setdefault(market, []).append(chat_id)
+        return subscribers
+
+    def watch_counts(self) -> Dict[str, int]:
+        self.flush()
+        with self._lock:
+            return dict(self.conn.execute("SELECT symbol, COUNT(*) FROM user_watchlist GROUP BY symbol"))
+
+    def news_subscribers(self) -> List[NewsSubscriber]:
+        self.flush()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT chat_id, news_keywords, news_cursor FROM users WHERE news_alerts = 1"
+            ).fetchall()
+        return [(chat_id, json.loads(keywords) if keywords else None, cursor)
+                for chat_id, keywords, cursor in rows]
+
+    def advance_news_cursors(self, cursors: Dict[str, int]):
+        """Update cached objects in place and write every cursor in one statement batch"""
+        with self._lock:
+            for chat_id, cursor in cursors.items():
+                for pref in (self._dirty.get(chat_id), self._cache.get(chat_id)):
+                    if pref is not None:
+                        pref.news_cursor = cursor
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE users SET news_cursor = ? WHERE chat_id = ?",
+                    [(cursor, str(chat_id)) for chat_id, cursor in cursors.items()]
+                )
+
+    def add_alert_rules(self, rows: List[AlertRuleRow]) -> List[int]:
+        rule_ids = []
+        with self._lock, self.conn:
+            for row in rows:
+                cursor = self.conn.execute(
+                    "INSERT INTO alert_rules (chat_id, symbol, kind, threshold, window_minutes, market) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", row
+                )
+                rule_ids.append(cursor.lastrowid)
+            if rule_ids:
+                self.conn.execute(BUMP_TRACKING_VERSION)
+        return rule_ids
+
+    def remove_alert_rule(self, chat_id: str, rule_id: int) -> bool:
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM alert_rules WHERE rule_id = ? AND chat_id = ?", (rule_id, str(chat_id))
+            )
+            removed = cursor.rowcount > 0
+            if removed:
+                self.conn.execute(BUMP_TRACKING_VERSION)
+        return removed
+
+    def alert_rules(self) -> List[tuple]:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT rule_id, chat_id, symbol, kind, threshold, window_minutes, market FROM alert_rules"
+            ).fetchall()
+
+    def tracking_version(self) -> int:
+        """One indexed row read, so the leader can check for changes on every tick"""
+        self.flush()
+        with self._lock:
+            return self.conn.execute("SELECT version FROM tracking_version WHERE id = 0").fetchone()[0]
+
+    def alert_state(self) -> List[tuple]:
+        with self._lock:
+            return [(key, bool(armed), fired_at) for key, armed, fired_at in
+                    self.conn.execute("SELECT key, armed, fired_at FROM alert_state")]
+
+    def save_alert_state(self, changes: AlertStateChanges):
+        """Write a batch of state changes in one transaction"""
+        if not changes:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO alert_state (key, armed, fired_at) VALUES (?, ?, ?)",
+                [(key, int(entry[0]), entry[1]) for key, entry in changes.items() if entry is not None]
+            )
+            self.conn.executemany(
+                "DELETE FROM alert_state WHERE key = ?",
+                [(key,) for key, entry in changes.items() if entry is None]
+            )
+
+    def clear(self):
+        with self._lock:
+            self._dirty.clear()
+            self._cache.clear()
+            with self.conn:
+                self.conn.execute("DELETE FROM alert_rules")
+                self.conn.execute("DELETE FROM alert_state")
+                self.conn.execute("DELETE FROM user_markets")
+                self.conn.execute("DELETE FROM user_watchlist")
+                self.conn.execute("DELETE FROM users")
+                self.conn.execute(BUMP_TRACKING_VERSION)
+
+    def close(self):
+        with self._lock:
+            if self._conn is None and not self._dirty:
+                return
+            try:
+                self.flush()
+            finally:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def create_preference_store(backend: str, factory: Callable, path: Optional[str] = None) -> PreferenceStore:
+    """Build the preference store named in config (``sqlite`` or ``memory``)"""
+    if backend == "memory":
+        return MemoryPreferenceStore(factory)
+    if backend == "sqlite":
+        return SQLitePreferenceStore(path, factory)
+    raise ValueError(f"Unknown preference store backend: {backend}")
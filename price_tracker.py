@@ -0,0 +1,302 @@
+"""Streaming intraday price tracker for Sajib Market Trading Monitor Bot
+
+Alert detection used to look at a single number per poll: the day's
+change from the first open. The tracker keeps a fixed-size ring buffer of
+recent ticks per symbol (``array('d')`` columns for time, price and
+volume) and maintains, for each rolling window (5/15/60 minutes by
+default), running sums of volume, price*volume, price and price^2. Each
+tick therefore costs O(1) amortized work per window, and gives:
+
+* the return since the oldest tick inside the window,
+* the distance of the last price from the window's VWAP,
+* the z-score of the last price against the window's prices,
+* the window's simple moving average.
+
+Alert rules are checked against those signals as soon as the tick lands.
+Given an ``AlertState``, a rule only triggers when it newly crosses its
+threshold (see alert_state); without one every tick over the threshold
+triggers. Everything stays numeric; formatting is left to whoever renders
+alerts.
+"""
+
+import logging
+import math
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from alert_state import AlertState
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOWS_MINUTES = (5, 15, 60)
+DEFAULT_CAPACITY = 1024
+
+# Rule metrics; DAY_CHANGE is the classic open-to-last move and is not windowed
+RETURN = "return"
+VWAP_DELTA = "vwap_delta"
+ZSCORE = "zscore"
+DAY_CHANGE = "day"
+
+MIN_ZSCORE_TICKS = 3
+
+
+class MoveRule(NamedTuple):
+    """Fire when ``abs(metric over the window) >= threshold``"""
+    metric: str
+    threshold: float
+    minutes: Optional[int] = None
+
+    def state_key(self, symbol: str) -> str:
+        """Stable id of this rule on ``symbol`` for alert state"""
+        return f"{symbol}|{self.metric}|{self.threshold:g}|{self.minutes or 0}"
+
+
+class Trigger(NamedTuple):
+    """A rule that fired on a tick, with the numeric value that made it fire"""
+    symbol: str
+    rule: MoveRule
+    value: float
+    price: float
+    ts: float
+
+
+class WindowSignal(NamedTuple):
+    minutes: int
+    ticks: int
+    return_percent: Optional[float]
+    vwap_delta_percent: Optional[float]
+    zscore: Optional[float]
+    average: Optional[float]
+
+
+class _Window:
+    """Running sums for the ticks with sequence numbers in [start, head)"""
+    __slots__ = ("minutes", "seconds", "start", "traded", "volume", "pv", "p", "pp")
+
+    def __init__(self, minutes: int):
+        self.minutes = minutes
+        self.seconds = minutes * 60.0
+        self.start = 0
+        self.reset()
+
+    def reset(self):
+        self.traded = 0  # ticks with volume; exact, unlike the volume sum once ticks leave
+        self.volume = 0.0
+        self.pv = 0.0
+        self.p = 0.0
+        self.pp = 0.0
+
+
+class SymbolSeries:
+    """Ring buffer of one symbol's ticks plus its rolling-window sums"""
+
+    def __init__(self, windows_minutes: Iterable[int], capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.ts = array("d", bytes(8 * capacity))
+        self.price = array("d", bytes(8 * capacity))
+        self.volume = array("d", bytes(8 * capacity))
+        self.head = 0  # sequence number of the next tick
+        self.windows = [_Window(m) for m in sorted(windows_minutes)]
+        self.reference: Optional[float] = None  # prices are summed relative to this, for precision
+
+    def __len__(self) -> int:
+        return min(self.head, self.capacity)
+
+    @property
+    def last_price(self) -> Optional[float]:
+        return self.price[(self.head - 1) % self.capacity] if self.head else None
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return self.ts[(self.head - 1) % self.capacity] if self.head else None
+
+    def _add(self, window: _Window, i: int):
+        p = self.price[i] - self.reference
+        v = self.volume[i]
+        window.traded += v > 0
+        window.volume += v
+        window.pv += p * v
+        window.p += p
+        window.pp += p * p
+
+    def _remove(self, window: _Window, i: int):
+        p = self.price[i] - self.reference
+        v = self.volume[i]
+        window.traded -= v > 0
+        window.volume -= v
+        window.pv -= p * v
+        window.p -= p
+        window.pp -= p * p
+
+    def append(self, ts: float, price: float, volume: float = 0.0):
+        if self.reference is None:
+            self.reference = price
+        capacity = self.capacity
+
+        # The slot we're about to overwrite may still be inside some windows
+        overwritten = self.head - capacity
+        if overwritten >= 0:
+            for window in self.windows:
+                if window.start <= overwritten:
+                    self._remove(window, overwritten % capacity)
+                    window.start = overwritten + 1
+
+        i = self.head % capacity
+        self.ts[i] = ts
+        self.price[i] = price
+        self.volume[i] = volume
+        self.head += 1
+
+        for window in self.windows:
+            self._add(window, i)
+            cutoff = ts - window.seconds
+            while window.start < self.head - 1 and self.ts[window.start % capacity] < cutoff:
+                self._remove(window, window.start % capacity)
+                window.start += 1
+
+        # Re-derive the sums once per buffer lap so add/remove rounding can't accumulate
+        if self.head % capacity == 0:
+            for window in self.windows:
+                window.reset()
+                for seq in range(window.start, self.head):
+                    self._add(window, seq % capacity)
+
+    def window(self, minutes: int) -> _Window:
+        for window in self.windows:
+            if window.minutes == minutes:
+                return window
+        raise KeyError(minutes)
+
+    def window_return(self, window: _Window) -> Optional[float]:
+        """Percent return from the oldest tick in the window to the last one"""
+        if self.head - window.start < 2:
+            return None
+        first = self.price[window.start % self.capacity]
+        return (self.last_price - first) / first * 100 if first else None
+
+    def vwap_delta(self, window: _Window) -> Optional[float]:
+        """Percent distance of the last price from the window's VWAP; None if nothing traded in it"""
+        if not window.traded or window.volume <= 0:
+            return None
+        vwap = window.pv / window.volume + self.reference
+        return (self.last_price - vwap) / vwap * 100 if vwap else None
+
+    def moving_average(self, window: _Window) -> Optional[float]:
+        n = self.head - window.start
+        return window.p / n + self.reference if n else None
+
+    def zscore(self, window: _Window) -> Optional[float]:
+        """Standard score of the last price among the window's prices"""
+        n = self.head - window.start
+        if n < MIN_ZSCORE_TICKS:
+            return None
+        mean = window.p / n
+        variance = window.pp / n - mean * mean
+        if variance <= 1e-12 * (mean * mean + 1.0):
+            return None
+        return (self.last_price - self.reference - mean) / math.sqrt(variance)
+
+    def metric(self, rule: MoveRule) -> Optional[float]:
+        window = self.window(rule.minutes)
+        if rule.metric == RETURN:
+            return self.window_return(window)
+        if rule.metric == VWAP_DELTA:
+            return self.vwap_delta(window)
+        if rule.metric == ZSCORE:
+            return self.zscore(window)
+        raise ValueError(f"Unknown rule metric: {rule.metric}")
+
+    def signals(self) -> Dict[int, WindowSignal]:
+        return {
+            window.minutes: WindowSignal(
+                window.minutes,
+                self.head - window.start,
+                self.window_return(window),
+                self.vwap_delta(window),
+                self.zscore(window),
+                self.moving_average(window)
+            )
+            for window in self.windows
+        }
+
+
+class PriceTracker:
+    """Per-symbol tick series with rolling signals and tick-time alert rules"""
+
+    def __init__(self, windows_minutes: Iterable[int] = DEFAULT_WINDOWS_MINUTES,
+                 capacity: int = DEFAULT_CAPACITY,
+                 rules: Iterable[MoveRule] = (),
+                 on_trigger: Optional[Callable[[Trigger], None]] = None,
+                 alert_state: Optional[AlertState] = None):
+        self.windows_minutes = tuple(sorted(windows_minutes))
+        self.capacity = capacity
+        self.rules = [r for r in rules if r.metric != DAY_CHANGE]
+        for rule in self.rules:
+            if rule.minutes not in self.windows_minutes:
+                raise ValueError(f"Rule {rule} needs a {rule.minutes}-minute window")
+        self.on_trigger = on_trigger
+        self.alert_state = alert_state
+
+        self._series: Dict[str, SymbolSeries] = {}
+        self._cumulative_volume: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.ticks = 0
+
+    def update(self, symbol: str, price: float, ts: float, volume: Optional[float] = None,
+               check_rules: bool = True) -> List[Trigger]:
+        """Record one tick and return the rules it fired; out-of-order ticks are ignored
+
+        With ``check_rules=False`` the tick only feeds the windows, for symbols
+        nobody would be alerted about.
+        """
+        with self._lock:
+            series = self._series.get(symbol)
+            if series is None:
+                series = self._series[symbol] = SymbolSeries(self.windows_minutes, self.capacity)
+            elif series.head and ts <= series.last_ts:
+                return []
+            # No volume weighs nothing: a dummy weight would skew the VWAP next to real volumes
+            series.append(ts, price, volume if volume and volume > 0 else 0.0)
+            self.ticks += 1
+
+            triggers = []
+            for rule in self.rules if check_rules else ():
+                value = series.metric(rule)
+                if self.alert_state is not None:
+                    fire = self.alert_state.update(rule.state_key(symbol), value, rule.threshold, ts)
+                else:
+                    fire = value is not None and abs(value) >= rule.threshold
+                if fire:
+                    triggers.append(Trigger(symbol, rule, value, price, ts))
+
+        if self.on_trigger:
+            for trigger in triggers:
+                try:
+                    self.on_trigger(trigger)
+                except Exception as e:
+                    logger.error(f"Error handling {trigger}: {e}")
+        return triggers
+
+    def observe(self, quote, check_rules: bool = True) -> List[Trigger]:
+        """Feed a Quote; its cumulative day volume is turned into a per-tick volume"""
+        if quote.price is None or quote.timestamp is None:
+            return []
+        volume = None
+        if quote.volume is not None:
+            with self._lock:
+                previous = self._cumulative_volume.get(quote.symbol)
+                self._cumulative_volume[quote.symbol] = quote.volume
+            # A drop in cumulative volume means a new session started
+            if previous is not None and quote.volume >= previous:
+                volume = quote.volume - previous
+        return self.update(quote.symbol, quote.price, quote.timestamp, volume, check_rules)
+
+    def signals(self, symbol: str) -> Dict[int, WindowSignal]:
+        with self._lock:
+            series = self._series.get(symbol)
+            return series.signals() if series else {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"symbols": len(self._series), "ticks": self.ticks}
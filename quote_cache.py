@@ -0,0 +1,250 @@
+"""Shared TTL quote cache for Sajib Market Trading Monitor Bot
+
+Sits in front of the QuoteEngine so /stocks, the inline buttons and the
+alert job all share one copy of each quote. Entries expire after a
+per-symbol TTL, the least recently used entries are evicted once the
+cache is full, and concurrent misses for the same symbol are collapsed
+into a single upstream fetch (single-flight).
+
+``version`` goes up whenever what a stored quote shows changes (not its
+fetch timestamp), so callers can cache anything derived from the quotes (like the rendered /stocks
+reply) and know when it is out of date. ``on_quote`` is called with
+every quote that comes back from upstream, which is how the price
+tracker receives its ticks.
+
+With ``max_stale``, callers that pass ``allow_stale=True`` get an
+expired quote straight away (for up to ``max_stale`` seconds past its
+expiry) while a background thread refreshes it. Then a slow or failing
+upstream never holds up a user's reply. A failed refresh never replaces
+the last good quote with "unavailable" either; the last good quote is
+kept until it is too old to serve.
+
+``peek`` never goes upstream: it returns whatever is cached, however old,
+and waits for a fetch that is already running rather than starting one.
+It answers users who are over their rate limit.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from quote_engine import Quote, unavailable_quote
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 1024
+REFRESH_WORKERS = 2
+
+
+def _shown(quote: Quote) -> tuple:
+    """The parts of a quote a reply displays"""
+    return quote.name, quote.price, quote.open, quote.volume
+
+
+class _Flight:
+    """An in-progress upstream fetch that other callers can wait on"""
+    __slots__ = ("done", "quotes")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.quotes: Dict[str, Quote] = {}
+
+
+class QuoteCache:
+    """Thread-safe LRU quote cache with per-symbol TTL and single-flight loads"""
+
+    def __init__(self, loader: Callable[[List[str]], Dict[str, Quote]],
+                 ttl_for: Optional[Callable[[str], float]] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 on_quote: Optional[Callable[[Quote], None]] = None,
+                 max_stale: float = 0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.loader = loader
+        self.ttl_for = ttl_for or (lambda symbol: DEFAULT_TTL_SECONDS)
+        self.max_entries = max_entries
+        self.on_quote = on_quote
+        self.max_stale = max_stale
+        self.clock = clock
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # symbol -> (expires_at, quote)
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._refresher: Optional[ThreadPoolExecutor] = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.upstream_fetches = 0
+        self.version = 0
+
+    def get_many(self, symbols: Iterable[str], allow_stale: bool = False) -> Dict[str, Quote]:
+        """Return quotes for all symbols, fetching only what is missing or stale
+
+        With ``allow_stale``, a recently expired quote is returned as is and
+        refreshed in the background instead of being waited for.
+        """
+        ordered = list(dict.fromkeys(symbols))
+        result: Dict[str, Quote] = {}
+        claimed: List[str] = []
+        waiting: Dict[str, _Flight] = {}
+        flight = None
+        revalidate: List[str] = []
+        refresh = None
+
+        with self._lock:
+            now = self.clock()
+            for symbol in ordered:
+                entry = self._entries.get(symbol)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(symbol)
+                    result[symbol] = entry[1]
+                    self.hits += 1
+                    continue
+                if allow_stale and self._servable(entry, now):
+                    self._entries.move_to_end(symbol)
+                    result[symbol] = entry[1]
+                    self.stale_hits += 1
+                    if symbol not in self._inflight:
+                        if refresh is None:
+                            refresh = _Flight()
+                        self._inflight[symbol] = refresh
+                        revalidate.append(symbol)
+                    continue
+
+                self.misses += 1
+                other = self._inflight.get(symbol)
+                if other is not None:
+                    waiting[symbol] = other
+                else:
+                    if flight is None:
+                        flight = _Flight()
+                    self._inflight[symbol] = flight
+                    claimed.append(symbol)
+
+        if revalidate:
+            if self._refresher is None:
+                with self._lock:
+                    if self._refresher is None:
+                        self._refresher = ThreadPoolExecutor(max_workers=REFRESH_WORKERS,
+                                                             thread_name_prefix="quote-refresh")
+            self._refresher.submit(self._load, revalidate, refresh)
+
+        if claimed:
+            self._load(claimed, flight)
+            result.update(flight.quotes)
+
+        for symbol, other in waiting.items():
+            other.done.wait()
+            result[symbol] = other.quotes.get(symbol) or unavailable_quote(symbol)
+
+        return {symbol: result[symbol] for symbol in ordered}
+
+    def get(self, symbol: str) -> Quote:
+        return self.get_many([symbol])[symbol]
+
+    def peek(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """Cached quotes of any age, joining fetches already in flight; never starts a fetch"""
+        ordered = list(dict.fromkeys(symbols))
+        result: Dict[str, Quote] = {}
+        waiting: Dict[str, _Flight] = {}
+        with self._lock:
+            now = self.clock()
+            for symbol in ordered:
+                entry = self._entries.get(symbol)
+                if entry is not None:
+                    result[symbol] = entry[1]
+                    if entry[0] > now:
+                        self.hits += 1
+                    else:
+                        self.stale_hits += 1
+                elif symbol in self._inflight:
+                    waiting[symbol] = self._inflight[symbol]
+                else:
+                    result[symbol] = unavailable_quote(symbol)
+
+        for symbol, flight in waiting.items():
+            flight.done.wait()
+            result[symbol] = flight.quotes.get(symbol) or unavailable_quote(symbol)
+        return {symbol: result[symbol] for symbol in ordered}
+
+    def missing(self, symbols: Iterable[str]) -> List[str]:
+        """Symbols ``get_many`` would have to fetch: not fresh and not already being fetched"""
+        with self._lock:
+            now = self.clock()
+            return [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._inflight
+                    and (symbol not in self._entries or self._entries[symbol][0] <= now)]
+
+    def _load(self, symbols: List[str], flight: _Flight):
+        with self._lock:
+            self.upstream_fetches += 1
+        try:
+            quotes = self.loader(symbols)
+        except Exception as e:
+            logger.error(f"Error loading quotes for {', '.join(symbols)}: {e}")
+            quotes = {}
+
+        loaded = {s: quotes.get(s) or unavailable_quote(s) for s in symbols}
+        with self._lock:
+            now = self.clock()
+            for symbol, quote in loaded.items():
+                flight.quotes[symbol] = self._store(symbol, quote, now)
+                self._inflight.pop(symbol, None)
+        flight.done.set()
+
+        if self.on_quote:
+            for quote in loaded.values():
+                if not quote.available:
+                    continue
+                try:
+                    self.on_quote(quote)
+                except Exception as e:
+                    logger.error(f"Error handling quote for {quote.symbol}: {e}")
+
+    def _servable(self, entry: Optional[tuple], now: float) -> bool:
+        """An expired entry that may still be served while it is refreshed"""
+        return entry is not None and entry[1].available and entry[0] + self.max_stale > now
+
+    def _store(self, symbol: str, quote: Quote, now: float) -> Quote:
+        """Store a loaded quote; returns the quote callers should see for the symbol"""
+        previous = self._entries.get(symbol)
+        if not quote.available and self._servable(previous, now):
+            return previous[1]  # the refresh failed: keep the last good quote until it is too old to serve
+        if previous is None or _shown(previous[1]) != _shown(quote):
+            self.version += 1
+        self._entries[symbol] = (now + self.ttl_for(symbol), quote)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return quote
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop one symbol, or everything when no symbol is given"""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+    def fresh(self) -> Dict[str, tuple]:
+        """{symbol: (seconds_left, quote)} for every unexpired, available quote (for sharing it elsewhere)"""
+        with self._lock:
+            now = self.clock()
+            return {symbol: (expires_at - now, quote) for symbol, (expires_at, quote) in self._entries.items()
+                    if expires_at > now and quote.available}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "upstream_fetches": self.upstream_fetches
+            }
@@ -0,0 +1,399 @@
+"""Batched quote engine for Sajib Market Trading Monitor Bot
+
+Fetches quotes for many symbols at once instead of one ``yf.Ticker`` per
+symbol. Providers that can batch are asked for every symbol in a single
+request; anything they can't answer falls back to a bounded thread pool.
+``fetch_bars`` does the same for intraday OHLCV bars, which the history
+store records at each market close. With a MetricsRegistry, every
+provider call is timed and failed calls are counted, labelled with the
+provider's name.
+
+The engine takes a list of providers and fails over between them. A
+provider with a ``symbols`` set (like ``DSEProvider``) is the only one
+asked for those symbols. General providers (``symbols = None``) are
+asked, in order, for everything else, and each one only for what the
+previous ones couldn't answer. Every provider has its own circuit
+breaker. With a ``timeout``, no call keeps the caller waiting longer
+than that, whether or not the provider's own client honours it. A batch
+call that fails or times out sends its symbols straight to the next
+provider rather than one by one to the same one, and batch calls run on
+their own pool, so calls left hanging can't hold up the per-symbol
+fallback.
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from circuit_breaker import (CLOSED, DEFAULT_FAILURE_THRESHOLD, DEFAULT_RESET_TIMEOUT_SECONDS, HALF_OPEN,
+                             CircuitBreaker)
+from history_store import Bars
+from lazy_imports import lazy_import
+from metrics import COUNTER, GAUGE, MetricsRegistry
+
+# yfinance (and pandas behind it) is only imported on the first fetch
+yf = lazy_import("yfinance")
+YFINANCE_AVAILABLE = yf.available
+
+logger = logging.getLogger(__name__)
+
+# Display names for the indices in MARKETS, so we don't need a
+# ``ticker.info`` round-trip per symbol just to get ``shortName``.
+KNOWN_NAMES = {
+    "^GSPC": "S&P 500",
+    "^DJI": "Dow Jones Industrial Average",
+    "^IXIC": "NASDAQ Composite",
+    "^KLSE": "FTSE Bursa Malaysia KLCI",
+    "DSE": "DSE Index",
+}
+
+# Symbols that only a local-exchange provider can quote; general providers are never asked for them
+LOCAL_SYMBOLS = {"DSE"}
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT_SECONDS = 10
+DSE_HOME_URL = "https://www.dsebd.org/index.php"
+DSE_INDICES = {"DSE": "DSEX"}
+CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1}  # anything else is open: 2
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Typed quote record for a single symbol"""
+    symbol: str
+    name: str
+    price: Optional[float] = None
+    open: Optional[float] = None
+    timestamp: Optional[float] = None
+    volume: Optional[float] = None  # cumulative session volume, when the upstream reports it
+
+    @property
+    def available(self) -> bool:
+        return self.price is not None and self.open is not None
+
+    @property
+    def change(self) -> Optional[float]:
+        if not self.available:
+            return None
+        return self.price - self.open
+
+    @property
+    def change_percent(self) -> Optional[float]:
+        if not self.available or not self.open:
+            return None
+        return (self.price - self.open) / self.open * 100
+
+    def to_dict(self) -> dict:
+        """Render the quote in the dict shape used by stocks_command"""
+        if not self.available:
+            return {
+                "symbol": self.symbol,
+                "name": self.name,
+                "price": "N/A",
+                "change": "N/A",
+                "change_percent": "N/A"
+            }
+        change_percent = self.change_percent
+        return {
+            "symbol": self.symbol,
+            "name": self.name,
+            "price": f"{self.price:.2f}",
+            "change": f"{self.change:+.2f}",
+            "change_percent": f"{change_percent:+.2f}%" if change_percent is not None else "N/A"
+        }
+
+
+def unavailable_quote(symbol: str) -> Quote:
+    """Quote placeholder for symbols we could not fetch"""
+    return Quote(symbol=symbol, name=KNOWN_NAMES.get(symbol, symbol))
+
+
+class UpstreamEmpty(Exception):
+    """A provider answered, but with nothing for any of the symbols (how Yahoo signals throttling)"""
+
+
+class QuoteProvider:
+    """Base class for upstream quote sources"""
+    name = "base"
+    supports_batch = False
+    supports_bars = False
+    symbols: Optional[frozenset] = None  # the only symbols it quotes; None means general purpose
+
+    def fetch_one(self, symbol: str) -> Quote:
+        raise NotImplementedError
+
+    def fetch_batch(self, symbols: List[str]) -> Dict[str, Quote]:
+        raise NotImplementedError
+
+    def fetch_bars(self, symbols: List[str], period: str, interval: str) -> Dict[str, Bars]:
+        raise NotImplementedError
+
+
+class YFinanceProvider(QuoteProvider):
+    """Yahoo Finance provider using one ``yf.download`` for all symbols"""
+    name = "yfinance"
+    supports_batch = True
+    supports_bars = True
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    def fetch_batch(self, symbols: List[str]) -> Dict[str, Quote]:
+        frame = yf.download(
+            tickers=symbols,
+            period="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            threads=False,
+            progress=False,
+            timeout=self.timeout
+        )
+        quotes = {}
+        if frame is None or frame.empty:
+            return quotes
+
+        multi = getattr(frame.columns, "nlevels", 1) > 1
+        for symbol in symbols:
+            try:
+                history = frame[symbol] if multi else frame
+                quote = self._quote_from_history(symbol, history)
+            except KeyError:
+                continue
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def fetch_bars(self, symbols: List[str], period: str = "1d", interval: str = "1m") -> Dict[str, Bars]:
+        frame = yf.download(
+            tickers=symbols,
+            period=period,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=False,
+            threads=False,
+            progress=False,
+            timeout=self.timeout
+        )
+        bars = {}
+        if frame is None or frame.empty:
+            return bars
+
+        multi = getattr(frame.columns, "nlevels", 1) > 1
+        for symbol in symbols:
+            try:
+                history = (frame[symbol] if multi else frame).dropna(subset=["Close"])
+            except KeyError:
+                continue
+            if history.empty:
+                continue
+            volume = history["Volume"].fillna(0) if "Volume" in history else np.zeros(len(history))
+            bars[symbol] = Bars(
+                history.index.asi8 // 1_000_000_000,  # UTC nanoseconds -> epoch seconds
+                history["Open"].to_numpy(np.float64),
+                history["High"].to_numpy(np.float64),
+                history["Low"].to_numpy(np.float64),
+                history["Close"].to_numpy(np.float64),
+                np.asarray(volume, np.float64)
+            )
+        return bars
+
+    def fetch_one(self, symbol: str) -> Quote:
+        history = yf.Ticker(symbol).history(period="1d", timeout=self.timeout)
+        return self._quote_from_history(symbol, history) or unavailable_quote(symbol)
+
+    @staticmethod
+    def _quote_from_history(symbol: str, history) -> Optional[Quote]:
+        history = history.dropna(subset=["Close"])
+        if history.empty:
+            return None
+        volume = float(history["Volume"].sum()) if "Volume" in history else None
+        return Quote(
+            symbol=symbol,
+            name=KNOWN_NAMES.get(symbol, symbol),
+            price=float(history["Close"].iloc[-1]),
+            open=float(history["Open"].iloc[0]),
+            timestamp=time.time(),
+            volume=volume
+        )
+
+
+def parse_dse_index(symbol: str, html: str) -> Optional[Quote]:
+    """Read an index's value and change from the DSE home page ("DSEX 5,123.45 -12.34 -0.24%")"""
+    text = " ".join(re.sub(r"<[^>]+>", " ", html).split())
+    match = re.search(rf"\b{DSE_INDICES[symbol]}\b\D*?([\d,]+\.\d+)\s+([+-]?[\d,]+\.\d+)\s+[+-]?[\d.]+\s*%", text)
+    if match is None:
+        return None
+    price, change = (float(group.replace(",", "")) for group in match.groups())
+    return Quote(
+        symbol=symbol,
+        name=KNOWN_NAMES.get(symbol, symbol),
+        price=price,
+        open=price - change,  # DSE reports the change since the previous close
+        timestamp=time.time()
+    )
+
+
+class DSEProvider(QuoteProvider):
+    """Dhaka Stock Exchange indices, read from the DSE home page (DSE has no public quote API)"""
+    name = "dse"
+    supports_batch = True
+    symbols = frozenset(DSE_INDICES)
+
+    def __init__(self, url: str = DSE_HOME_URL, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch_batch(self, symbols: List[str]) -> Dict[str, Quote]:
+        import httpx
+
+        response = httpx.get(self.url, timeout=self.timeout, follow_redirects=True)
+        response.raise_for_status()
+        quotes = {symbol: parse_dse_index(symbol, response.text) for symbol in symbols if symbol in self.symbols}
+        return {symbol: quote for symbol, quote in quotes.items() if quote is not None}
+
+    def fetch_one(self, symbol: str) -> Quote:
+        return self.fetch_batch([symbol]).get(symbol) or unavailable_quote(symbol)
+
+
+class _Upstream:
+    """A provider with its breaker and metrics"""
+
+    def __init__(self, provider: QuoteProvider, breaker: CircuitBreaker, metrics: MetricsRegistry):
+        self.provider = provider
+        self.breaker = breaker
+        self.seconds = {call: metrics.histogram("bot_upstream_seconds", upstream=provider.name, call=call)
+                        for call in ("quotes", "quote", "bars")}
+        self.errors = metrics.counter("bot_upstream_errors_total", upstream=provider.name)
+
+
+class QuoteEngine:
+    """Fetch quotes for many symbols with as few round-trips as possible"""
+
+    def __init__(self, providers: Union[QuoteProvider, Sequence[QuoteProvider], None],
+                 max_workers: int = DEFAULT_MAX_WORKERS, timeout: Optional[float] = None,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT_SECONDS,
+                 metrics: Optional[MetricsRegistry] = None):
+        if providers is None:
+            providers = []
+        elif isinstance(providers, QuoteProvider):
+            providers = [providers]
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        self.metrics = metrics or MetricsRegistry(enabled=False)
+        self.upstreams = [_Upstream(provider, CircuitBreaker(failure_threshold, reset_timeout), self.metrics)
+                          for provider in providers]
+        # Symbols a specialised provider owns are never sent to the general ones
+        self._claimed = set(LOCAL_SYMBOLS).union(*(p.symbols for p in providers if p.symbols is not None))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quote-upstream")
+        self._batch_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quote-batch")
+        self.metrics.add_collector(self.collect_metrics)
+
+    @property
+    def provider(self) -> Optional[QuoteProvider]:
+        """The first general-purpose provider (what charts and history use)"""
+        return next((u.provider for u in self.upstreams if u.provider.symbols is None), None)
+
+    def _handles(self, upstream: _Upstream, symbol: str) -> bool:
+        symbols = upstream.provider.symbols
+        return symbol not in self._claimed if symbols is None else symbol in symbols
+
+    def can_quote(self, symbol: str) -> bool:
+        """Whether any configured provider would be asked for ``symbol``"""
+        return any(self._handles(upstream, symbol) for upstream in self.upstreams)
+
+    def fetch(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """Return one Quote per requested symbol, in request order"""
+        ordered = list(dict.fromkeys(symbols))
+        quotes: Dict[str, Quote] = {}
+
+        for upstream in self.upstreams:
+            wanted = [s for s in ordered if s not in quotes and self._handles(upstream, s)]
+            if not wanted or not upstream.breaker.allow():
+                continue
+            provider = upstream.provider
+            if provider.supports_batch:
+                try:
+                    quotes.update(self._call(upstream, "quotes", provider.fetch_batch, wanted,
+                                             require_result=len(wanted) > 1))
+                except Exception as e:
+                    # Retrying symbol by symbol would cost another timeout before the next provider
+                    logger.error(f"Batch fetch from {provider.name} failed: {e}")
+                    continue
+            missing = [s for s in wanted if s not in quotes]
+            if missing and (not provider.supports_batch or upstream.breaker.allow()):
+                quotes.update(self._fetch_pooled(upstream, missing))
+
+        return {s: quotes.get(s) or unavailable_quote(s) for s in ordered}
+
+    def fetch_bars(self, symbols: Iterable[str], period: str = "1d", interval: str = "1m") -> Dict[str, Bars]:
+        """Intraday bars per symbol; symbols no provider can answer are left out"""
+        ordered = list(dict.fromkeys(symbols))
+        bars: Dict[str, Bars] = {}
+        for upstream in self.upstreams:
+            wanted = [s for s in ordered if s not in bars and self._handles(upstream, s)]
+            # A provider without bars must not spend (or close) its breaker's half-open trial
+            if not wanted or not upstream.provider.supports_bars or not upstream.breaker.allow():
+                continue
+            try:
+                bars.update(self._call(upstream, "bars", upstream.provider.fetch_bars, wanted, period, interval))
+            except Exception as e:
+                logger.error(f"Bar fetch from {upstream.provider.name} failed: {e}")
+        return bars
+
+    def _call(self, upstream: _Upstream, call: str, func, *args, require_result: bool = False):
+        """One timed upstream call, cut off after ``timeout``, with the outcome reported to the breaker"""
+        try:
+            with self.metrics.time(upstream.seconds[call]):
+                if self.timeout is None:
+                    result = func(*args)
+                else:
+                    try:
+                        result = self._batch_executor.submit(func, *args).result(timeout=self.timeout)
+                    except FutureTimeout:
+                        raise TimeoutError(f"no answer within {self.timeout:g}s") from None
+            if require_result and not result:
+                raise UpstreamEmpty(f"{upstream.provider.name} returned nothing for {len(args[0])} symbols")
+        except Exception:
+            upstream.errors.inc()
+            upstream.breaker.record_failure()
+            raise
+        upstream.breaker.record_success()
+        return result
+
+    def _fetch_pooled(self, upstream: _Upstream, symbols: List[str]) -> Dict[str, Quote]:
+        """Fallback for providers (or symbols) that can't be batched"""
+        futures = {self._executor.submit(self._fetch_one_safe, upstream, symbol): symbol for symbol in symbols}
+        done, late = wait(futures, timeout=self.timeout)
+        if late:
+            upstream.errors.inc()
+            upstream.breaker.record_failure()
+            logger.error(f"{upstream.provider.name} timed out on {', '.join(futures[f] for f in late)}")
+        quotes = (future.result() for future in done)
+        return {quote.symbol: quote for quote in quotes if quote.available}
+
+    def _fetch_one_safe(self, upstream: _Upstream, symbol: str) -> Quote:
+        try:
+            with self.metrics.time(upstream.seconds["quote"]):
+                quote = upstream.provider.fetch_one(symbol)
+        except Exception as e:
+            upstream.errors.inc()
+            upstream.breaker.record_failure()
+            logger.error(f"Error fetching data for {symbol} from {upstream.provider.name}: {e}")
+            return unavailable_quote(symbol)
+        upstream.breaker.record_success()
+        return quote
+
+    def collect_metrics(self):
+        for upstream in self.upstreams:
+            stats = upstream.breaker.stats()
+            labels = {"upstream": upstream.provider.name}
+            yield "bot_upstream_circuit_state", GAUGE, labels, CIRCUIT_STATES.get(stats["state"], 2)
+            yield "bot_upstream_circuit_trips_total", COUNTER, labels, stats["trips"]
+            yield "bot_upstream_rejected_total", COUNTER, labels, stats["rejected"]
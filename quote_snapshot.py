@@ -0,0 +1,134 @@
+"""Shared-memory quote snapshot for Sajib Market Trading Monitor Bot
+
+With several worker processes only the alert leader polls upstream. After
+each poll it publishes its fresh quotes here, and every worker serves
+/stocks, /status and the inline buttons from the snapshot, going
+upstream only for symbols that are missing or expired.
+
+The segment is a small header followed by a JSON payload:
+
+    sequence  u64  odd while a publish is in progress
+    length    u32  payload bytes
+
+There is a single writer (whoever holds the leader lock), so a seqlock is
+enough. Readers copy the payload and retry if the sequence was odd or
+changed underneath them. Each reader decodes a given sequence once and
+keeps the result until the next publish.
+
+Every quote carries a wall-clock expiry, so a worker never picks up a
+quote that the leader already considers stale.
+"""
+
+import json
+import logging
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from quote_engine import Quote
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<QI")  # sequence, payload length
+DEFAULT_SIZE = 1 << 20
+READ_ATTEMPTS = 100
+
+
+class SnapshotFull(ValueError):
+    """The quotes don't fit in the shared segment"""
+
+
+class QuoteSnapshot:
+    """One writer, many readers: the leader's latest quotes in shared memory"""
+
+    def __init__(self, segment: shared_memory.SharedMemory, owner: bool = False,
+                 clock: Callable[[], float] = time.time):
+        self.segment = segment
+        self.owner = owner
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sequence = -1
+        self._quotes: Dict[str, Tuple[float, Quote]] = {}
+
+        self.publishes = 0
+        self.decodes = 0
+
+    @classmethod
+    def create(cls, size: int = DEFAULT_SIZE, **kwargs) -> "QuoteSnapshot":
+        """Allocate a new zeroed segment (the supervisor does this once, before starting workers)"""
+        segment = shared_memory.SharedMemory(create=True, size=HEADER.size + size)
+        HEADER.pack_into(segment.buf, 0, 0, 0)
+        return cls(segment, owner=True, **kwargs)
+
+    @classmethod
+    def attach(cls, name: str, **kwargs) -> "QuoteSnapshot":
+        return cls(shared_memory.SharedMemory(name=name), **kwargs)
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    @property
+    def capacity(self) -> int:
+        return self.segment.size - HEADER.size
+
+    def publish(self, quotes: Dict[str, Tuple[float, Quote]]):
+        """Replace the snapshot with {symbol: (expires_at, quote)}, expires_at in wall-clock seconds"""
+        payload = json.dumps([
+            [q.symbol, q.name, q.price, q.open, q.timestamp, q.volume, expires_at]
+            for expires_at, q in quotes.values()
+        ], separators=(",", ":")).encode()
+        if len(payload) > self.capacity:
+            raise SnapshotFull(f"{len(payload)} bytes of quotes, snapshot holds {self.capacity}")
+
+        buf = self.segment.buf
+        sequence, _ = HEADER.unpack_from(buf, 0)
+        sequence += sequence & 1  # a previous leader may have died mid-publish
+        HEADER.pack_into(buf, 0, sequence + 1, 0)
+        buf[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(buf, 0, sequence + 2, len(payload))
+        self.publishes += 1
+
+    def _read(self) -> Optional[Tuple[int, bytes]]:
+        buf = self.segment.buf
+        for _ in range(READ_ATTEMPTS):
+            sequence, length = HEADER.unpack_from(buf, 0)
+            if sequence & 1:
+                time.sleep(0)
+                continue
+            if sequence == self._sequence:
+                return sequence, b""
+            payload = bytes(buf[HEADER.size:HEADER.size + length])
+            if HEADER.unpack_from(buf, 0)[0] == sequence:
+                return sequence, payload
+        return None
+
+    def quotes(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, Quote]:
+        """Unexpired quotes from the latest snapshot, optionally only for ``symbols``"""
+        with self._lock:
+            read = self._read()
+            if read is None:
+                logger.warning("Quote snapshot kept changing while being read; skipping it this time")
+            elif read[0] != self._sequence:
+                sequence, payload = read
+                rows = json.loads(payload) if payload else []
+                self._quotes = {row[0]: (row[6], Quote(*row[:6])) for row in rows}
+                self._sequence = sequence
+                self.decodes += 1
+            entries = self._quotes
+
+        now = self.clock()
+        wanted = entries.keys() if symbols is None else symbols
+        return {symbol: entries[symbol][1] for symbol in wanted
+                if symbol in entries and entries[symbol][0] > now}
+
+    def close(self):
+        """Detach; the creating side also removes the segment"""
+        self.segment.close()
+        if self.owner:
+            try:
+                self.segment.unlink()
+            except FileNotFoundError:
+                pass
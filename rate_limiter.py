@@ -0,0 +1,91 @@
+"""Request rate limiter for Sajib Market Trading Monitor Bot
+
+Every command and button press can end in an upstream fetch, so one chat
+hammering the "📈 Stock Indices" button could spend the whole Yahoo
+budget. The bot keeps one limiter per chat (``MAX_REQUESTS_PER_MINUTE``)
+and one shared limiter for user-triggered upstream fetches. A request
+over either limit isn't refused: it is answered from the caches only.
+
+Each limiter is a token bucket per key, stored as a single float: the
+time the key's bucket will be full again (GCRA, the "theoretical arrival
+time"). A request is allowed while that time is less than
+``burst`` intervals ahead of now, and each allowed request pushes it one
+interval further. Once the time has passed, the bucket is full and the
+key is indistinguishable from one never seen, so it is dropped. A chat
+takes up memory only while its bucket refills (one interval after a
+single request, ``burst`` intervals at most), and never more than
+``max_keys`` chats are kept.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+DEFAULT_BURST = 10
+DEFAULT_MAX_KEYS = 100_000
+
+
+class RateLimited(Exception):
+    """The answer needs an upstream fetch and the caller is over its limit"""
+
+
+class RateLimiter:
+    """Thread-safe per-key token buckets that forget idle keys"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None,
+                 max_keys: int = DEFAULT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.interval = 60.0 / rate_per_minute
+        self.burst = max(1, burst if burst is not None else DEFAULT_BURST)
+        self.max_keys = max_keys
+        self.clock = clock
+
+        self._full_at: "OrderedDict[Hashable, float]" = OrderedDict()  # key -> when its bucket is full again
+        self._lock = threading.Lock()
+
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def allow(self, key: Hashable = None) -> bool:
+        """Take a token for ``key``; False if its bucket is empty"""
+        with self._lock:
+            now = self.clock()
+            full_at = max(self._full_at.get(key, now), now)
+            if full_at - now > self.interval * (self.burst - 1):
+                self.limited += 1
+                return False
+            self._full_at[key] = full_at + self.interval
+            self._full_at.move_to_end(key)
+            self.allowed += 1
+            self._expire(now)
+            return True
+
+    def retry_after(self, key: Hashable = None) -> float:
+        """Seconds until ``key`` may make another request"""
+        with self._lock:
+            full_at = self._full_at.get(key)
+            if full_at is None:
+                return 0.0
+            return max(0.0, full_at - self.interval * (self.burst - 1) - self.clock())
+
+    def _expire(self, now: float):
+        # Keys are ordered by last use, so the refilled ones collect at the front
+        while self._full_at:
+            key, full_at = next(iter(self._full_at.items()))
+            if full_at > now:
+                break
+            del self._full_at[key]
+        while len(self._full_at) > self.max_keys:
+            self._full_at.popitem(last=False)  # forgetting a key only refills its bucket early
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._full_at), "allowed": self.allowed, "limited": self.limited,
+                    "evictions": self.evictions}
@@ -0,0 +1,55 @@
+"""Rendered-reply cache for Sajib Market Trading Monitor Bot
+
+/status, /stocks and /news used to rebuild their Markdown on every call,
+although the text only depends on a few inputs: the market snapshot
+(calendar minute or quote version), the user's timezone, or the news
+bucket and its version. Handlers build a key from exactly those inputs
+and ask the cache for the reply. The snapshot version is part of the
+key, so a changed snapshot simply misses and old versions age out of
+the LRU; nothing has to be invalidated by hand.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered messages keyed by their inputs"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> str:
+        """Return the cached text for ``key``, calling ``render`` only on a miss"""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+            self.misses += 1
+
+        # Rendering is cheap and pure, so a rare duplicate render beats holding the lock
+        text = render()
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
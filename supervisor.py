@@ -0,0 +1,244 @@
+"""Multi-process supervisor for Sajib Market Trading Monitor Bot
+
+One bot process handles every update on one core. With
+``WORKER_PROCESSES`` > 1 the bot starts as a ``Supervisor`` instead: it
+owns the single connection to Telegram (long polling, or the webhook
+server), and it routes each update to one of N worker processes by
+hashing the update's chat id. A chat always lands on the same worker, so
+its updates are still handled in order and its cached preferences stay
+in one process.
+
+The workers decide among themselves which of them is the alert leader
+(see ``leader_lock.py``). The supervisor only creates the shared quote
+snapshot the leader publishes to (see ``quote_snapshot.py``), restarts
+workers that die, and on shutdown tells every worker to finish its
+queue and exit.
+
+Each worker is ``target(index, inbound_queue, snapshot_name, *args)``
+and runs in a spawned process. It should return once it reads ``None``
+from its queue.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+import zlib
+from typing import Callable, Iterable, List, Optional
+
+from quote_snapshot import DEFAULT_SIZE as DEFAULT_SNAPSHOT_BYTES, QuoteSnapshot
+from webhook_server import WebhookServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_STOP_TIMEOUT_SECONDS = 10
+FULL_QUEUE_PAUSE_SECONDS = 0.01
+WATCH_INTERVAL_SECONDS = 1.0
+POLL_TIMEOUT_SECONDS = 30
+POLL_RETRY_SECONDS = 5
+BOT_API_URL = "https://api.telegram.org/bot{token}/{method}"
+
+
+def shard_for(key, workers: int) -> int:
+    """Stable worker index for a chat id (the same in every process and across restarts)"""
+    return zlib.crc32(str(key).encode()) % workers
+
+
+def update_chat_id(update: dict) -> Optional[int]:
+    """The chat an update belongs to, or the sender for updates without a chat (like inline queries)"""
+    for key, payload in update.items():
+        if key == "update_id" or not isinstance(payload, dict):
+            continue
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat.get("id")
+        sender = payload.get("from") or payload.get("user")
+        if sender:
+            return sender.get("id")
+    return None
+
+
+class Supervisor:
+    """Runs N worker processes and routes every update to the one that owns its chat"""
+
+    def __init__(self, target: Callable, workers: int, args: tuple = (),
+                 queue_size: int = DEFAULT_QUEUE_SIZE, snapshot_bytes: int = DEFAULT_SNAPSHOT_BYTES):
+        if workers < 1:
+            raise ValueError("A supervisor needs at least one worker")
+        self.target = target
+        self.workers = workers
+        self.args = args
+        self.queue_size = queue_size
+        self.snapshot_bytes = snapshot_bytes
+
+        self._context = multiprocessing.get_context("spawn")
+        self.snapshot: Optional[QuoteSnapshot] = None
+        self.queues: List = []
+        self.processes: List = []
+
+        self.routed = [0] * workers
+        self.restarts = 0
+
+    def start(self):
+        self.snapshot = QuoteSnapshot.create(self.snapshot_bytes)
+        self.queues = [self._context.Queue(self.queue_size) for _ in range(self.workers)]
+        self.processes = [self._spawn(index) for index in range(self.workers)]
+        logger.info(f"Started {self.workers} worker processes")
+
+    def _spawn(self, index: int):
+        process = self._context.Process(
+            target=self.target,
+            args=(index, self.queues[index], self.snapshot.name) + tuple(self.args),
+            name=f"bot-worker-{index}"
+        )
+        process.start()
+        return process
+
+    def shard(self, update: dict) -> int:
+        chat_id = update_chat_id(update)
+        return shard_for(update.get("update_id", 0) if chat_id is None else chat_id, self.workers)
+
+    def route(self, update: dict) -> bool:
+        """Queue an update for its worker; False if that worker's queue is full"""
+        index = self.shard(update)
+        try:
+            self.queues[index].put_nowait(update)
+        except queue.Full:
+            return False
+        self.routed[index] += 1
+        return True
+
+    async def dispatch(self, update: dict):
+        """Route an update, waiting (without blocking the event loop) while its worker is backed up"""
+        while not self.route(update):
+            await asyncio.sleep(FULL_QUEUE_PAUSE_SECONDS)
+
+    def check_workers(self) -> int:
+        """Restart worker processes that exited; returns how many were restarted"""
+        restarted = 0
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            logger.warning(f"Worker {index} exited with code {process.exitcode}; restarting it")
+            process.close()
+            # A process killed inside get() never releases the queue's read lock, so start on a fresh one
+            stale, self.queues[index] = self.queues[index], self._context.Queue(self.queue_size)
+            stale.cancel_join_thread()
+            stale.close()
+            self.processes[index] = self._spawn(index)
+            restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    def stop(self, timeout: float = DEFAULT_STOP_TIMEOUT_SECONDS):
+        """Ask every worker to finish its queue and exit; terminate the ones that don't in time"""
+        if not self.processes:
+            return
+        deadline = time.monotonic() + timeout
+        for inbound in self.queues:
+            try:
+                inbound.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                pass
+        for index, process in enumerate(self.processes):
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {index} did not stop in time; terminating it")
+                process.terminate()
+                process.join()
+        for inbound in self.queues:
+            inbound.cancel_join_thread()
+            inbound.close()
+        self.snapshot.close()
+        self.processes = []
+        self.queues = []
+        logger.info(f"Workers stopped after routing {sum(self.routed)} updates")
+
+    def depths(self) -> List[int]:
+        try:
+            return [inbound.qsize() for inbound in self.queues]
+        except NotImplementedError:  # macOS
+            return []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "alive": sum(process.is_alive() for process in self.processes),
+            "routed": list(self.routed),
+            "depths": self.depths(),
+            "restarts": self.restarts
+        }
+
+    async def long_poll(self, client, token: str, allowed_updates: Optional[Iterable[str]] = None):
+        """getUpdates in a loop, routing each update; the one Telegram connection for all workers"""
+        import httpx
+        url = BOT_API_URL.format(token=token, method="getUpdates")
+        params = {"timeout": POLL_TIMEOUT_SECONDS}
+        if allowed_updates is not None:
+            params["allowed_updates"] = list(allowed_updates)
+        while True:
+            try:
+                response = await client.post(url, json=params, timeout=POLL_TIMEOUT_SECONDS + 10)
+                body = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                logger.error(f"getUpdates failed: {e}")
+                await asyncio.sleep(POLL_RETRY_SECONDS)
+                continue
+            if not body.get("ok"):
+                # A bad token (401) or another poller or webhook (409) won't clear up by asking again at once
+                logger.error(f"getUpdates refused ({response.status_code}): {body.get('description')}")
+                await asyncio.sleep(POLL_RETRY_SECONDS)
+                continue
+            for update in body.get("result") or []:
+                await self.dispatch(update)
+                params["offset"] = update["update_id"] + 1
+
+    async def serve(self, token: str, webhook: Optional[WebhookServer] = None, webhook_url: Optional[str] = None,
+                    max_connections: int = 40, allowed_updates: Optional[Iterable[str]] = None,
+                    drain_timeout: float = DEFAULT_STOP_TIMEOUT_SECONDS):
+        """Start the workers and feed them updates until SIGINT/SIGTERM
+
+        With ``webhook`` (built with ``handle_update=self.dispatch``) Telegram
+        is pointed at ``webhook_url``; otherwise the supervisor long-polls.
+        """
+        import httpx
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows
+                pass
+
+        self.start()
+        ingress = None
+        async with httpx.AsyncClient() as client:
+            try:
+                if webhook is not None:
+                    await webhook.start()
+                    params = {"url": webhook_url, "max_connections": max_connections}
+                    if webhook.secret_token:
+                        params["secret_token"] = webhook.secret_token.decode()
+                    if allowed_updates is not None:
+                        params["allowed_updates"] = list(allowed_updates)
+                    await client.post(BOT_API_URL.format(token=token, method="setWebhook"), json=params)
+                else:
+                    await client.post(BOT_API_URL.format(token=token, method="deleteWebhook"))
+                    ingress = asyncio.create_task(self.long_poll(client, token, allowed_updates))
+
+                while not stop.is_set():
+                    try:
+                        await asyncio.wait_for(stop.wait(), WATCH_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        self.check_workers()
+            finally:
+                if ingress is not None:
+                    ingress.cancel()
+                    await asyncio.gather(ingress, return_exceptions=True)
+                if webhook is not None:
+                    await webhook.stop(drain_timeout)
+                await loop.run_in_executor(None, self.stop, drain_timeout)
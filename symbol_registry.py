@@ -0,0 +1,68 @@
+"""Reference-counted symbol registry for Sajib Market Trading Monitor Bot
+
+Besides the fixed indices in MARKETS, users track symbols of their own:
+through /watch and through /alert rules. The registry counts, for every
+such symbol, how many watchlist entries and rules refer to it. The tick
+poll asks it for the distinct symbols, so each one is fetched once per
+tick however many users track it, and a symbol drops out of polling as
+soon as its last reference is released.
+"""
+
+import threading
+from typing import Dict, Iterable, List
+
+
+class SymbolRegistry:
+    """Thread-safe reference counts of user-tracked symbols"""
+
+    def __init__(self):
+        self._refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self._refs
+
+    def acquire(self, symbols: Iterable[str]) -> List[str]:
+        """Add one reference per item (repeats count); returns symbols that are newly tracked"""
+        added = []
+        with self._lock:
+            for symbol in symbols:
+                count = self._refs.get(symbol, 0)
+                if not count:
+                    added.append(symbol)
+                self._refs[symbol] = count + 1
+        return added
+
+    def release(self, symbols: Iterable[str]) -> List[str]:
+        """Drop one reference per item; returns symbols nobody tracks any more"""
+        dropped = []
+        with self._lock:
+            for symbol in symbols:
+                count = self._refs.get(symbol, 0) - 1
+                if count > 0:
+                    self._refs[symbol] = count
+                elif symbol in self._refs:
+                    del self._refs[symbol]
+                    dropped.append(symbol)
+        return dropped
+
+    def load(self, counts: Dict[str, int]):
+        """Add stored reference counts, e.g. watchlist entries per symbol at startup"""
+        with self._lock:
+            for symbol, count in counts.items():
+                if count > 0:
+                    self._refs[symbol] = self._refs.get(symbol, 0) + count
+
+    def refcount(self, symbol: str) -> int:
+        return self._refs.get(symbol, 0)
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return list(self._refs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"symbols": len(self._refs), "references": sum(self._refs.values())}
@@ -0,0 +1,226 @@
+"""Outbound Telegram delivery for Sajib Market Trading Monitor Bot
+
+Sends bulk messages (market alerts, news pushes) over one pooled
+``httpx.AsyncClient`` with bounded concurrency. A global token bucket
+keeps us under Telegram's per-bot limit, a per-chat schedule keeps us
+under the per-chat limit, and 429 responses pause all sending for the
+``retry_after`` period the API asks for. The limits belong to the sender,
+not to one ``deliver`` call, so alert, tick, news and bell jobs sending
+at the same time from their own threads share one budget. Given a
+MetricsRegistry, each sendMessage round-trip is timed and retries, 429s
+and failed requests are counted.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from metrics import MetricsRegistry
+
+# Try to import httpx (installed with python-telegram-bot)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+# Telegram allows roughly 30 messages/second per bot and 1 message/second per chat
+DEFAULT_GLOBAL_RATE = 30.0
+DEFAULT_PER_CHAT_INTERVAL = 1.0
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_TIMEOUT_SECONDS = 10
+
+ChatId = Union[int, str]
+
+
+class TokenBucket:
+    """Thread-safe reservation-based token bucket; callers sleep for the returned delay"""
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long to wait before using it"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+@dataclass
+class DeliveryMetrics:
+    """Counters for one delivery run"""
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    elapsed: float = 0.0
+    errors: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["rate"] = round(self.rate, 2)
+        return data
+
+
+class TelegramSender:
+    """Rate-limited, connection-pooled sender for the Bot API sendMessage call"""
+
+    def __init__(self, token: str, base_url: str = TELEGRAM_API_URL,
+                 global_rate: float = DEFAULT_GLOBAL_RATE,
+                 global_burst: Optional[float] = None,
+                 per_chat_interval: float = DEFAULT_PER_CHAT_INTERVAL,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.url = f"{base_url}/bot{token}/sendMessage"
+        self.global_rate = global_rate
+        self.global_burst = global_burst if global_burst is not None else global_rate
+        self.per_chat_interval = per_chat_interval
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        # Shared by every deliver() call, whichever thread and event loop it runs on
+        self._bucket = TokenBucket(self.global_rate, self.global_burst, clock=time.monotonic)
+        self._chat_next: Dict[str, float] = {}  # chat_id -> monotonic time of its next free slot
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        registry = metrics or MetricsRegistry(enabled=False)
+        self._post_seconds = registry.histogram("bot_upstream_seconds", upstream="telegram", call="sendMessage")
+        self._post_errors = registry.counter("bot_upstream_errors_total", upstream="telegram")
+        self._post_retries = registry.counter("bot_upstream_retries_total", upstream="telegram")
+        self._rate_limited = registry.counter("bot_upstream_rate_limited_total", upstream="telegram")
+
+    async def _acquire(self, chat_id: str):
+        """Wait for a free slot under both the global and per-chat limits"""
+        with self._lock:
+            now = time.monotonic()
+            chat_at = max(now, self._chat_next.get(chat_id, now))
+            self._chat_next[chat_id] = chat_at + self.per_chat_interval
+        if chat_at > now:
+            await asyncio.sleep(chat_at - now)
+
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            await asyncio.sleep(pause)
+
+        delay = self._bucket.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send_one(self, client, chat_id: str, text: str, parse_mode: Optional[str],
+                        metrics: DeliveryMetrics) -> bool:
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                metrics.retries += 1
+                self._post_retries.inc()
+            await self._acquire(chat_id)
+            started = time.perf_counter()
+            try:
+                response = await client.post(self.url, json=payload)
+            except httpx.HTTPError as e:
+                self._post_errors.inc()
+                logger.warning(f"Network error sending to {chat_id}: {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            self._post_seconds.observe(time.perf_counter() - started)
+            if response.status_code == 200:
+                metrics.sent += 1
+                return True
+
+            metrics.errors[response.status_code] = metrics.errors.get(response.status_code, 0) + 1
+            if response.status_code == 429:
+                metrics.rate_limited += 1
+                self._rate_limited.inc()
+                retry_after = self._retry_after(response)
+                with self._lock:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                logger.warning(f"Telegram asked us to back off for {retry_after}s")
+                continue
+            self._post_errors.inc()
+            if response.status_code >= 500:
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            # 400/403 (bad request, bot blocked by user) will not succeed on retry
+            logger.error(f"Error sending alerts to {chat_id}: HTTP {response.status_code}")
+            break
+
+        metrics.failed += 1
+        return False
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        try:
+            return float(response.json().get("parameters", {}).get("retry_after", 1))
+        except ValueError:
+            return 1.0
+
+    async def deliver(self, messages: Iterable[Tuple[ChatId, str]],
+                      parse_mode: Optional[str] = "Markdown") -> DeliveryMetrics:
+        """Send every (chat_id, text) pair and return delivery metrics"""
+        metrics = DeliveryMetrics()
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat_id, text in messages:
+            queue.put_nowait((str(chat_id), text))
+        if queue.empty():
+            return metrics
+
+        limits = httpx.Limits(max_connections=self.max_concurrency,
+                              max_keepalive_connections=self.max_concurrency)
+
+        async def worker():
+            while True:
+                try:
+                    chat_id, text = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._send_one(client, chat_id, text, parse_mode, metrics)
+
+        started = time.perf_counter()
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            workers = min(self.max_concurrency, queue.qsize())
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        metrics.elapsed = time.perf_counter() - started
+
+        with self._lock:
+            # Chats whose next slot has passed are free again; forget them so the schedule stays small
+            now = time.monotonic()
+            self._chat_next = {chat_id: at for chat_id, at in self._chat_next.items() if at > now}
+        return metrics
+
+    def deliver_sync(self, messages: Iterable[Tuple[ChatId, str]],
+                     parse_mode: Optional[str] = "Markdown") -> DeliveryMetrics:
+        """Blocking wrapper for callers outside the event loop (scheduler thread)"""
+        return asyncio.run(self.deliver(messages, parse_mode))
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Keep test runs from creating data/preferences.db in the working tree
+os.environ.setdefault('PREFERENCES_DB_PATH', ':memory:')
+os.environ.setdefault('HISTORY_DIR', tempfile.mkdtemp(prefix='history-'))
+os.environ.setdefault('CHART_CACHE_DIR', tempfile.mkdtemp(prefix='charts-'))
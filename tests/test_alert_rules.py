@@ -0,0 +1,159 @@
+import pytest
+import os
+import random
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_rules import ABOVE, BELOW, CROSS_MA, DAY, MOVE, AlertRule, AlertRuleEngine, parse_rule_spec
+
+WINDOWS = (5, 15, 60)
+
+
+def reference(rule, price, day_change, returns, averages, previous):
+    """Plain-Python version of one rule's condition"""
+    if rule.kind == ABOVE:
+        return price >= rule.threshold
+    if rule.kind == BELOW:
+        return price <= rule.threshold
+    if rule.kind == MOVE:
+        move = day_change if rule.window == DAY else returns.get(rule.window)
+        return move is not None and abs(move) >= rule.threshold
+    if previous is None or averages.get(rule.window) is None or previous[1].get(rule.window) is None:
+        return False
+    return (price - averages[rule.window]) * (previous[0] - previous[1][rule.window]) < 0
+
+
+def reference_rearm(rule, price, day_change, returns, band=0.005, ratio=0.75):
+    """Plain-Python version of one rule's hysteresis band"""
+    if rule.kind == ABOVE:
+        return price < rule.threshold * (1 - band)
+    if rule.kind == BELOW:
+        return price > rule.threshold * (1 + band)
+    if rule.kind == MOVE:
+        move = day_change if rule.window == DAY else returns.get(rule.window)
+        return move is not None and abs(move) < rule.threshold * ratio
+    return False
+
+
+class TestParseRuleSpec:
+
+    def test_valid_specs(self):
+        assert parse_rule_spec(["above", "5200"], WINDOWS) == (ABOVE, 5200.0, DAY)
+        assert parse_rule_spec(["MOVE", "1.5%", "15m"], WINDOWS) == (MOVE, 1.5, 15)
+        assert parse_rule_spec(["move", "2"], WINDOWS) == (MOVE, 2.0, DAY)
+        assert parse_rule_spec(["ma", "60m"], WINDOWS) == (CROSS_MA, 0.0, 60)
+
+    @pytest.mark.parametrize("tokens", [
+        [], ["sideways", "1"], ["above"], ["above", "abc"], ["below", "-3"],
+        ["move", "1", "7m"], ["above", "10", "5m"], ["ma"], ["ma", "10", "5m"]
+    ])
+    def test_invalid_specs(self, tokens):
+        with pytest.raises(ValueError):
+            parse_rule_spec(tokens, WINDOWS)
+
+
+class TestAlertRuleEngine:
+
+    def test_conditions(self):
+        """Test each rule kind on a sequence of quote updates"""
+        engine = AlertRuleEngine(WINDOWS)
+        engine.load([
+            AlertRule(1, "a", "^GSPC", ABOVE, 5200.0),
+            AlertRule(2, "b", "^GSPC", BELOW, 5000.0),
+            AlertRule(3, "c", "^GSPC", MOVE, 1.0, 15),
+            AlertRule(4, "d", "^GSPC", CROSS_MA, 0.0, 60),
+            AlertRule(5, "e", "^DJI", ABOVE, 1.0),
+        ])
+
+        hits = engine.evaluate("^GSPC", 5100.0, 0.5, {15: 0.2}, {60: 5150.0}, now=0)
+        assert hits == []
+
+        hits = engine.evaluate("^GSPC", 5210.0, 1.0, {15: 1.2}, {60: 5160.0}, now=60)
+        assert {hit.rule.rule_id: hit.value for hit in hits} == {1: 5210.0, 3: 1.2, 4: 5160.0}
+        assert all(hit.price == 5210.0 for hit in hits)
+
+    def test_edge_triggered_with_hysteresis_and_cooldown(self):
+        """Test that a price rule fires once per crossing, re-arming only past its band and cooldown"""
+        engine = AlertRuleEngine(WINDOWS, cooldown=600, price_band=0.01)
+        engine.add(AlertRule(1, "a", "X", ABOVE, 100.0))
+
+        def fired(price, now):
+            return [hit.rule.rule_id for hit in engine.evaluate("X", price, None, {}, {}, now=now)]
+
+        assert fired(101.0, 0) == [1]
+        assert fired(102.0, 60) == []      # still above: no repeat
+        assert fired(99.5, 120) == []      # back under, but inside the 1% band
+        assert fired(100.5, 180) == []     # so this isn't a new crossing
+        assert fired(98.0, 240) == []      # re-armed...
+        assert fired(101.0, 300) == []     # ...but still cooling down
+        assert fired(101.0, 600) == [1]    # cooldown over and the condition still holds
+        assert engine.suppressed == 3
+
+    def test_state_round_trip(self):
+        """Test that drained state restores into a fresh engine"""
+        engine = AlertRuleEngine(WINDOWS)
+        rules = [AlertRule(1, "a", "X", ABOVE, 100.0), AlertRule(2, "a", "X", BELOW, 50.0)]
+        engine.load(rules)
+        engine.evaluate("X", 101.0, None, {}, {}, now=1000.0)
+        state = engine.drain_state()
+        assert state == {1: (False, 1000.0)}
+        assert engine.drain_state() == {}
+
+        restored = AlertRuleEngine(WINDOWS)
+        restored.load(rules)
+        restored.restore_state((rule_id, *entry) for rule_id, entry in state.items())
+        assert restored.evaluate("X", 101.0, None, {}, {}, now=2000.0) == []
+
+    def test_remove_and_compact(self):
+        """Test that removed rules stop firing and the block shrinks"""
+        engine = AlertRuleEngine(WINDOWS)
+        engine.load(AlertRule(i, str(i), "X", ABOVE, float(i)) for i in range(1, 101))
+        for rule_id in range(1, 81):
+            assert engine.remove(rule_id).rule_id == rule_id
+        assert engine.remove(1) is None
+
+        hits = engine.evaluate("X", 1000.0, None, {}, {})
+        assert sorted(hit.rule.rule_id for hit in hits) == list(range(81, 101))
+        assert engine._blocks["X"].size < 100
+        assert [r.rule_id for r in engine.rules_for("90")] == [90]
+
+    def test_vectorized_pass_matches_reference(self):
+        """Test the NumPy evaluation, edge state included, against a per-rule Python loop"""
+        rng = random.Random(11)
+        rules = []
+        for rule_id in range(2000):
+            kind = rng.choice([ABOVE, BELOW, MOVE, CROSS_MA])
+            window = rng.choice(WINDOWS) if kind == CROSS_MA else rng.choice((DAY,) + WINDOWS) if kind == MOVE else DAY
+            threshold = 0.0 if kind == CROSS_MA else rng.uniform(0.1, 3) if kind == MOVE else rng.uniform(90, 110)
+            rules.append(AlertRule(rule_id, str(rule_id % 50), "X", kind, threshold, window))
+        engine = AlertRuleEngine(WINDOWS, cooldown=300)
+        engine.load(rules)
+
+        state = {r.rule_id: (True, None) for r in rules}  # rule_id -> (armed, fired_at)
+        previous = None
+        for tick in range(40):
+            now = tick * 60.0
+            price = rng.uniform(90, 110)
+            day_change = rng.uniform(-3, 3)
+            returns = {m: rng.choice([None, rng.uniform(-3, 3)]) for m in WINDOWS}
+            averages = {m: rng.choice([None, rng.uniform(95, 105)]) for m in WINDOWS}
+
+            expected = set()
+            for r in rules:
+                armed, fired_at = state[r.rule_id]
+                cooling = fired_at is not None and now - fired_at < 300
+                if armed and not cooling and reference(r, price, day_change, returns, averages, previous):
+                    expected.add(r.rule_id)
+                    state[r.rule_id] = (r.kind == CROSS_MA, now)
+                elif not armed and reference_rearm(r, price, day_change, returns):
+                    state[r.rule_id] = (True, fired_at)
+
+            hits = {hit.rule.rule_id for hit in engine.evaluate("X", price, day_change, returns, averages, now)}
+            assert hits == expected
+            previous = (price, averages)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
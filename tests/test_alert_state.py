@@ -0,0 +1,58 @@
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_state import AlertState
+
+
+class TestAlertState:
+
+    def test_fires_once_per_event(self):
+        """Test that a move that stays over its threshold fires only on the way in"""
+        state = AlertState(cooldown=0, rearm_ratio=0.75)
+        fired = [state.update("^GSPC|day", value, 2.0, now) for now, value in
+                 enumerate([1.0, -2.3, -2.5, -2.1, -1.8, -2.2, -1.2, -2.4])]
+        # -1.8 is still inside the band (>= 1.5), so -2.2 is not a new event; -1.2 re-arms
+        assert fired == [False, True, False, False, False, False, False, True]
+        assert state.stats()["suppressed"] == 3
+
+    def test_cooldown(self):
+        """Test that a re-armed alert waits out its cooldown, then fires if the move persists"""
+        state = AlertState(cooldown=600, rearm_ratio=0.75)
+        assert state.update("k", 2.5, 2.0, 0)
+        assert not state.update("k", 0.5, 2.0, 60)
+        assert not state.update("k", 2.5, 2.0, 120)
+        assert state.update("k", 2.5, 2.0, 600)
+
+    def test_entries_are_dropped_once_back_to_default(self):
+        """Test that only recent events take space, and the change set says what to delete"""
+        state = AlertState(cooldown=100, rearm_ratio=0.5)
+        state.update("k", 3.0, 2.0, 0)
+        assert state.drain_changes() == {"k": (False, 0)}
+        state.update("k", 0.1, 2.0, 50)
+        assert state.drain_changes() == {"k": (True, 0)}
+        state.update("k", 0.1, 2.0, 200)
+        assert len(state) == 0
+        assert state.drain_changes() == {"k": None}
+
+    def test_load_restores_disarmed_alerts(self):
+        state = AlertState(cooldown=0)
+        state.load([("k", False, 0.0)])
+        assert not state.update("k", 3.0, 2.0, 10)
+        assert state.drain_changes() == {}
+
+    def test_unknown_values_are_ignored(self):
+        state = AlertState()
+        assert not state.update("k", None, 2.0, 0)
+        assert len(state) == 0
+
+    def test_rearm_ratio_is_checked(self):
+        with pytest.raises(ValueError):
+            AlertState(rearm_ratio=1.5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,19 +1,19 @@
 import pytest
 import os
 import sys
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 
 # Add the parent directory to the path to import the bot
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from market_monitor_bot import MarketMonitorBot, UserPreferences, MARKETS
+from market_monitor_bot import MarketMonitorBot, UserPreferences, MARKETS, user_preferences
 
 class TestMarketMonitorBot:
     
     @pytest.fixture
     def bot(self):
         """Create a bot instance for testing"""
-        with patch('market_monitor_bot.Updater'):
+        with patch('market_monitor_bot.Application'):
             bot = MarketMonitorBot()
             return bot
     
@@ -36,6 +36,19 @@ class TestMarketMonitorBot:
         assert len(user_preferences.preferred_markets) == 2
         assert "stock market" in user_preferences.news_keywords
     
+    def test_user_preferences_compact_layout(self):
+        """Test that preferences are slotted and share market/keyword storage"""
+        first = UserPreferences(chat_id="1")
+        second = UserPreferences(chat_id="2", news_keywords=["stock market", "trading", "finance", "economy"])
+        
+        assert not hasattr(first, "__dict__")
+        assert first.preferred_markets == list(MARKETS.keys())
+        assert first._news_keywords is second._news_keywords
+        
+        first.preferred_markets = ["🇧🇩 Dhaka (DSE)", "Unknown market"]
+        assert first.preferred_markets == ["🇧🇩 Dhaka (DSE)"]
+        assert first == UserPreferences(chat_id="1", preferred_markets=["🇧🇩 Dhaka (DSE)"])
+    
     def test_get_market_status_open(self):
         """Test market status when market is open"""
         from datetime import datetime
@@ -44,23 +57,14 @@ class TestMarketMonitorBot:
         market_info = MARKETS["🇺🇸 US (NYSE)"]
         bot = MarketMonitorBot()
         
-        # Mock current time to be during market hours
-        with patch('market_monitor_bot.datetime') as mock_datetime:
-            mock_now = Mock()
-            mock_now.weekday.return_value = 1  # Tuesday
-            mock_now.strftime.return_value = "10:30"
-            mock_datetime.datetime.now.return_value = mock_now
-            
-            with patch('pytz.timezone') as mock_tz:
-                mock_tz_obj = Mock()
-                mock_tz.return_value = mock_tz_obj
-                mock_tz_obj.localize.return_value = mock_now
-                
-                status = bot.get_market_status("🇺🇸 US (NYSE)", market_info)
-                
-                assert status["name"] == "🇺🇸 US (NYSE)"
-                assert "OPEN" in status["status"]
-                assert status["is_open"] is True
+        # Tuesday during market hours
+        now = pytz.timezone("America/New_York").localize(datetime(2026, 10, 13, 10, 30))
+        status = bot.get_market_status("🇺🇸 US (NYSE)", market_info, now=now)
+        
+        assert status["name"] == "🇺🇸 US (NYSE)"
+        assert "OPEN" in status["status"]
+        assert status["is_open"] is True
+        assert status["local_time"] == "10:30"
     
     def test_get_market_status_closed_weekend(self):
         """Test market status on weekend"""
@@ -70,22 +74,14 @@ class TestMarketMonitorBot:
         market_info = MARKETS["🇺🇸 US (NYSE)"]
         bot = MarketMonitorBot()
         
-        # Mock current time to be weekend
-        with patch('market_monitor_bot.datetime') as mock_datetime:
-            mock_now = Mock()
-            mock_now.weekday.return_value = 6  # Sunday
-            mock_datetime.datetime.now.return_value = mock_now
-            
-            with patch('pytz.timezone') as mock_tz:
-                mock_tz_obj = Mock()
-                mock_tz.return_value = mock_tz_obj
-                mock_tz_obj.localize.return_value = mock_now
-                
-                status = bot.get_market_status("🇺🇸 US (NYSE)", market_info)
-                
-                assert status["name"] == "🇺🇸 US (NYSE)"
-                assert "WEEKEND" in status["status"]
-                assert status["is_open"] is False
+        # Sunday
+        now = pytz.timezone("America/New_York").localize(datetime(2026, 10, 18, 11, 0))
+        status = bot.get_market_status("🇺🇸 US (NYSE)", market_info, user_tz="Asia/Dhaka", now=now)
+        
+        assert status["name"] == "🇺🇸 US (NYSE)"
+        assert "Weekend" in status["status"]
+        assert status["is_open"] is False
+        assert status["display_time"] == "11:00 (21:00 your time)"
     
     def test_get_user_timezone_with_preference(self):
         """Test getting user timezone when preference is set"""
@@ -115,35 +111,344 @@ class TestMarketMonitorBot:
             timezone = bot.get_user_timezone(chat_id)
             assert timezone == "Asia/Kuala_Lumpur"
     
-    @patch('market_monitor_bot.yf.Ticker')
-    def test_get_stock_data(self, mock_ticker):
+    @patch('market_monitor_bot.yf.download')
+    def test_get_stock_data(self, mock_download):
         """Test stock data fetching"""
+        import pandas as pd
+        
         bot = MarketMonitorBot()
         symbols = ["^GSPC"]
         
-        # Mock yfinance response
-        mock_ticker_instance = Mock()
-        mock_ticker.return_value = mock_ticker_instance
-        mock_ticker_instance.info = {"shortName": "S&P 500"}
-        
-        mock_history = Mock()
-        mock_history.__getitem__ = lambda self, key: [100, 102] if key == 'Close' else [100, 100]
-        mock_history.__len__ = lambda self: 2
-        mock_history.iloc = Mock()
-        mock_history.iloc.__getitem__ = lambda self, key: 102 if key == -1 else 100
-        mock_ticker_instance.history.return_value = mock_history
+        # Mock a batched yfinance response
+        mock_download.return_value = pd.DataFrame({"Open": [100.0, 101.0], "Close": [101.0, 102.0]})
         
         stock_data = bot.get_stock_data(symbols)
         
         assert "^GSPC" in stock_data
         assert stock_data["^GSPC"]["name"] == "S&P 500"
         assert "102.00" in stock_data["^GSPC"]["price"]
+        assert stock_data["^GSPC"]["change_percent"] == "+2.00%"
+        mock_download.assert_called_once()
+    
+    def test_stale_quotes_are_served_with_their_age(self):
+        """Test that /stocks shows the last good quote, marked with its age, while upstream is down"""
+        import time
+        from quote_cache import QuoteCache
+        from quote_engine import Quote
+        
+        bot = MarketMonitorBot()
+        answers = [{"^GSPC": Quote("^GSPC", "S&P 500", price=101.0, open=100.0, timestamp=time.time() - 7500)}]
+        bot.quote_cache = QuoteCache(lambda symbols: answers.pop(0) if answers else {},
+                                     ttl_for=lambda s: -1, max_stale=3600)
+        
+        bot.get_stock_data(["^GSPC"])
+        stock_data = bot.get_stock_data(["^GSPC"])  # expired: served stale while the refresh fails
+        
+        assert stock_data["^GSPC"]["price"] == "101.00"
+        assert stock_data["^GSPC"]["age"] == "2h 5m"
+        assert "Price: 101.00 _(as of 2h 5m ago)_" in bot.render_stocks(stock_data)
+    
+    def test_send_market_alerts_fetches_each_symbol_once(self):
+        """Test that alert cost grows with symbols, not subscribers"""
+        from quote_cache import QuoteCache
+        from quote_engine import Quote
+        
+        bot = MarketMonitorBot()
+        calls = []
+        
+        def loader(symbols):
+            calls.append(list(symbols))
+            return {s: Quote(s, s, price=97.0, open=100.0) for s in symbols}
+        
+        bot.quote_cache = QuoteCache(loader, on_quote=bot.on_quote)
+        
+        user_preferences.clear()
+        for i in range(500):
+            user_preferences[str(i)] = UserPreferences(
+                chat_id=str(i),
+                preferred_markets=["🇺🇸 US (NYSE)"],
+                notifications_enabled=(i % 5 != 0)
+            )
+        
+        with patch.object(bot.sender, 'deliver_sync') as mock_deliver:
+            bot.send_market_alerts()
+            
+            assert calls == [["^GSPC", "^DJI", "^IXIC"]]
+            outbox = mock_deliver.call_args.args[0]
+            assert len(outbox) == 400
+            assert "📉 ^GSPC: -3.00%" in outbox[0][1]
+            
+            # The move is still on at the next poll, but it has already been announced
+            mock_deliver.reset_mock()
+            bot.quote_cache.invalidate()
+            bot.send_market_alerts()
+            assert len(calls) == 2
+            mock_deliver.assert_not_called()
+        user_preferences.clear()
+    
+    def test_window_move_alerts_on_tick_poll(self):
+        """Test that a rolling-window rule firing on a tick poll sends an alert right away"""
+        from quote_engine import Quote
+        
+        bot = MarketMonitorBot()
+        prices = iter([100.0, 101.5])
+        clock = iter([1000.0, 1060.0])
+        bot.quote_cache.loader = lambda symbols: {
+            s: Quote(s, s, price=next(prices), open=100.0, timestamp=next(clock)) for s in symbols
+        }
+        user_preferences.clear()
+        user_preferences["1"] = UserPreferences(chat_id="1", preferred_markets=["🇲🇾 Malaysia (Bursa)"])
+        
+        with patch.object(bot.sender, 'deliver_sync') as mock_deliver:
+            bot.poll_prices(["🇲🇾 Malaysia (Bursa)"])
+            assert not mock_deliver.called
+            bot.quote_cache.invalidate()  # next tick
+            bot.poll_prices(["🇲🇾 Malaysia (Bursa)"])
+        user_preferences.clear()
+        
+        outbox = mock_deliver.call_args.args[0]
+        assert outbox[0][0] == "1"
+        assert "⚡ ^KLSE: +1.50% in 5m" in outbox[0][1]
+    
+    def test_shared_move_alerts_only_for_deliverable_indices(self):
+        """Test that a watched ticker's big move isn't queued or marked fired, and unfollowed markets are dropped"""
+        from quote_engine import Quote
+        
+        bot = MarketMonitorBot()
+        user_preferences.clear()
+        user_preferences["1"] = UserPreferences(chat_id="1", preferred_markets=["🇲🇾 Malaysia (Bursa)"])
+        
+        bot.on_quote(Quote("TSLA", "Tesla", price=90.0, open=100.0, timestamp=1000.0))
+        assert not bot.pop_move_alerts(["TSLA"])
+        assert not bot.alert_state.drain_changes()
+        
+        bot.on_quote(Quote("^GSPC", "S&P 500", price=95.0, open=100.0, timestamp=1000.0))
+        with patch.object(bot.sender, 'deliver_sync') as mock_deliver:
+            bot.send_market_alerts(["🇺🇸 US (NYSE)"])  # nobody follows the US market
+        user_preferences.clear()
+        
+        mock_deliver.assert_not_called()
+        assert not bot.pop_move_alerts(["^GSPC"])
+        
+    def test_alert_commands_register_and_fire_personal_rules(self):
+        """Test /alert, /alerts and /delalert, and that a fired rule reaches only its owner"""
+        import asyncio
+        from types import SimpleNamespace
+        from quote_engine import Quote
+        
+        bot = MarketMonitorBot()
+        user_preferences.clear()
+        
+        def command(chat_id, *args):
+            update = SimpleNamespace(
+                effective_chat=SimpleNamespace(id=chat_id),
+                effective_message=SimpleNamespace(reply_text=AsyncMock())
+            )
+            return update, SimpleNamespace(args=list(args))
+        
+        update, context = command(1, "US", "move", "1.5", "15m")
+        asyncio.run(bot.alert_command(update, context))
+        assert "^GSPC moves 1.5% in 15m" in update.effective_message.reply_text.call_args.args[0]
+        
+        update, context = command(2, "^gspc", "above", "5200")
+        asyncio.run(bot.alert_command(update, context))
+        update, context = command(2, "^GSPC", "sideways", "1")
+        asyncio.run(bot.alert_command(update, context))
+        assert "Condition must be one of" in update.effective_message.reply_text.call_args.args[0]
+        
+        update, context = command(1)
+        asyncio.run(bot.alerts_command(update, context))
+        listing = update.effective_message.reply_text.call_args.args[0]
+        assert "^DJI" in listing and "5,200" not in listing
+        
+        other_rule = bot.alert_rules.rules_for("2")[0].rule_id
+        update, context = command(1, str(other_rule))
+        asyncio.run(bot.delete_alert_command(update, context))  # someone else's rule
+        assert f"no alert #{other_rule}" in update.effective_message.reply_text.call_args.args[0]
+        assert len(bot.alert_rules) == 4
+        
+        bot.on_quote(Quote("^GSPC", "S&P 500", price=5210.0, open=5150.0, timestamp=1000.0))
+        with patch.object(bot.sender, 'deliver_sync') as mock_deliver:
+            bot.send_market_alerts([])
+        user_preferences.clear()
+        
+        outbox = mock_deliver.call_args.args[0]
+        assert [chat_id for chat_id, _ in outbox] == ["2"]
+        assert f"🎯 ^GSPC is above 5,200.00 (now 5,210.00) · #{other_rule}" in outbox[0][1]
+    
+    def test_push_news_sends_only_unseen_headlines(self):
+        """Test that news alerts go to opted-in users once, then advance their cursor"""
+        from news_cache import NewsCache
+        
+        bot = MarketMonitorBot()
+        bot.news_cache = NewsCache(lambda key, since: [
+            {"title": "Old", "url": "https://news/old", "source": "Test", "published_at": "2026-10-18T08:00:00Z"},
+            {"title": "New", "url": "https://news/new", "source": "Test", "published_at": "2026-10-18T10:00:00Z"},
+        ])
+        user_preferences.clear()
+        cursor = 1792314000  # 2026-10-18T09:00:00Z
+        user_preferences["1"] = UserPreferences(chat_id="1", news_alerts=True, news_cursor=cursor)
+        user_preferences["2"] = UserPreferences(chat_id="2")
+        
+        with patch.object(bot.sender, 'deliver_sync') as mock_deliver:
+            bot.push_news()  # registers the subscriber's bucket without fetching it
+            assert bot.news_cache.stats()["upstream_requests"] == 0
+            bot.news_cache.refresh_stale()
+            bot.push_news()
+            bot.push_news()
+        advanced = user_preferences["1"].news_cursor
+        user_preferences.clear()
+        
+        assert mock_deliver.call_count == 1
+        outbox = mock_deliver.call_args.args[0]
+        assert [chat_id for chat_id, _ in outbox] == ["1"]
+        assert "New" in outbox[0][1] and "Old" not in outbox[0][1]
+        assert advanced == cursor + 3600
+    
+    def test_status_reply_rendered_once_per_timezone_and_minute(self):
+        """Test that /status reuses the rendered reply until the minute changes"""
+        import asyncio
+        from types import SimpleNamespace
+        
+        bot = MarketMonitorBot()
+        clock = [1792314000.0]
+        bot.calendar.clock = lambda: clock[0]
+        
+        def status_update(chat_id):
+            return SimpleNamespace(
+                effective_chat=SimpleNamespace(id=chat_id),
+                effective_message=SimpleNamespace(reply_text=AsyncMock())
+            )
+        
+        user_preferences.clear()
+        for chat_id, tz in (("1", "Asia/Dhaka"), ("2", "Asia/Dhaka"), ("3", "Europe/London")):
+            user_preferences[chat_id] = UserPreferences(chat_id=chat_id, timezone=tz)
+            
+        with patch.object(bot, 'render_status', wraps=bot.render_status) as render:
+            updates = [status_update(chat_id) for chat_id in ("1", "2", "3")]
+            for update in updates:
+                asyncio.run(bot.status_command(update, None))
+            assert render.call_count == 2
+            
+            clock[0] += 60
+            asyncio.run(bot.status_command(status_update("1"), None))
+            assert render.call_count == 3
+        user_preferences.clear()
+        
+        replies = [u.effective_message.reply_text.call_args.args[0] for u in updates]
+        assert replies[0] is replies[1]
+        assert "your time" in replies[2]
+    
+    def test_stocks_command_fetches_off_event_loop(self):
+        """Test that blocking quote fetches run in the executor, not the event loop"""
+        import asyncio
+        import threading
+        from types import SimpleNamespace
+        
+        bot = MarketMonitorBot()
+        fetch_threads = []
+        
+        def fake_get_stock_data(symbols, cached_only=False):
+            fetch_threads.append(threading.current_thread().name)
+            return {"^GSPC": {"symbol": "^GSPC", "name": "S&P 500", "price": "101.00",
+                              "change": "+1.00", "change_percent": "+1.00%"}}
+        
+        update = SimpleNamespace(
+            effective_chat=SimpleNamespace(id=123456),
+            effective_message=SimpleNamespace(reply_text=AsyncMock())
+        )
+        
+        with patch.object(bot, 'get_stock_data', side_effect=fake_get_stock_data):
+            asyncio.run(bot.stocks_command(update, None))
+        
+        assert fetch_threads[0].startswith("blocking")
+        text = update.effective_message.reply_text.call_args.args[0]
+        assert "S&P 500 (^GSPC)" in text
+    
+    def test_throttled_chats_are_answered_from_cache(self):
+        """Test that spamming the stocks button can't spend more than the chat's and the bot's budgets"""
+        import asyncio
+        from types import SimpleNamespace
+        from quote_cache import QuoteCache
+        from quote_engine import Quote
+        from rate_limiter import RateLimiter
+        
+        bot = MarketMonitorBot()
+        calls = []
+        
+        def loader(symbols):
+            calls.append(list(symbols))
+            return {s: Quote(s, s, price=101.0, open=100.0) for s in symbols}
+        
+        bot.quote_cache = QuoteCache(loader, ttl_for=lambda s: 0)  # every request would go upstream
+        bot.chat_limiter = RateLimiter(30, burst=3)
+        bot.upstream_limiter = RateLimiter(60, burst=4)
+        press = bot.limit(bot.button_callback)
+        
+        def button(chat_id):
+            return SimpleNamespace(
+                effective_chat=SimpleNamespace(id=chat_id),
+                effective_message=SimpleNamespace(reply_text=AsyncMock()),
+                callback_query=SimpleNamespace(data="stocks", answer=AsyncMock())
+            )
+        
+        async def spam():
+            updates = [button(1) for _ in range(10)] + [button(2) for _ in range(2)]
+            for update in updates:
+                await press(update, None)
+            return updates
+        
+        updates = asyncio.run(spam())
+        
+        assert len(calls) == 4  # chat 1 is held to its burst of 3; chat 2 gets what's left of the budget
+        for update in updates:
+            assert "Price: 101.00" in update.effective_message.reply_text.call_args.args[0]
+        assert bot.chat_limiter.stats()["limited"] == 7
+        assert bot.upstream_limiter.stats()["limited"] == 1
+    
+    def test_throttled_chat_causes_no_upstream_calls(self):
+        """Test that /watch with new tickers and /news with new keywords stay off upstream once throttled"""
+        import asyncio
+        from types import SimpleNamespace
+        from quote_engine import Quote
+        from rate_limiter import RateLimiter
+        
+        bot = MarketMonitorBot()
+        user_preferences.clear()
+        fetched, searched = [], []
+        bot.quote_cache.loader = lambda symbols: fetched.append(list(symbols)) or {
+            s: Quote(s, s, price=10.0, open=9.0) for s in symbols}
+        bot.news_client = Mock(get_everything=lambda **kwargs: searched.append(kwargs) or {"articles": []})
+        bot.chat_limiter = RateLimiter(30, burst=1)
+        bot.chat_limiter.allow(1)  # the chat has spent its burst
+        
+        async def spam():
+            replies = []
+            for i in range(10):
+                for handler, args in ((bot.watch_command, [f"T{i}A", f"T{i}B"]), (bot.unwatch_command, [f"T{i}A"]),
+                                      (bot.news_command, [])):
+                    user_preferences["1"] = UserPreferences(chat_id="1", news_keywords=[f"topic {i}"])
+                    update = SimpleNamespace(
+                        effective_chat=SimpleNamespace(id=1),
+                        effective_message=SimpleNamespace(reply_text=AsyncMock())
+                    )
+                    await bot.limit(handler)(update, SimpleNamespace(args=args))
+                    replies.append(update.effective_message.reply_text.call_args.args[0])
+            return replies
+        
+        replies = asyncio.run(spam())
+        
+        assert fetched == [] and searched == []
+        assert "⏳ Too many requests right now. Try /watch T0A T0B again in a minute." in replies[0]
+        assert replies[2] == "⏳ Too many requests right now. Try /news again in a minute."
+        assert bot.chat_limiter.stats()["limited"] == 30
+        user_preferences.clear()
     
     def test_detect_timezone_from_location(self):
         """Test timezone detection from coordinates"""
         bot = MarketMonitorBot()
         
-        with patch('market_monitor_bot.TimezoneFinder') as mock_tf_class:
+        with patch('market_monitor_bot.timezonefinder.TimezoneFinder') as mock_tf_class:
             mock_tf = Mock()
             mock_tf_class.return_value = mock_tf
             mock_tf.timezone_at.return_value = "Asia/Dhaka"
@@ -153,6 +458,218 @@ class TestMarketMonitorBot:
             assert timezone == "Asia/Dhaka"
             mock_tf.timezone_at.assert_called_once_with(lat=23.8103, lng=90.4125)
     
+    def test_timezone_locator_shares_finder_and_memoizes(self):
+        """Test one finder for all threads and memo hits for nearby coordinates"""
+        import threading
+        from market_monitor_bot import TimezoneLocator
+        
+        with patch('market_monitor_bot.timezonefinder.TimezoneFinder') as mock_tf_class:
+            mock_tf_class.return_value.timezone_at.return_value = "Asia/Dhaka"
+            locator = TimezoneLocator(grid_degrees=0.01, cache_size=2)
+            
+            threads = [threading.Thread(target=locator.timezone_at, args=(23.8103, 90.4125)) for _ in range(10)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            
+            assert mock_tf_class.call_count == 1
+            calls = mock_tf_class.return_value.timezone_at.call_count
+            assert locator.timezone_at(23.8104, 90.4126) == "Asia/Dhaka"  # same ~1km cell
+            assert mock_tf_class.return_value.timezone_at.call_count == calls
+            
+            locator.timezone_at(3.139, 101.6869)
+            locator.timezone_at(40.7128, -74.006)  # evicts the Dhaka cell
+            locator.timezone_at(23.8103, 90.4125)
+            assert mock_tf_class.return_value.timezone_at.call_count == calls + 3
+    
+    def test_record_history_appends_only_new_bars(self, bot, tmp_path):
+        """Test that the close-of-session job stores overlapping look-backs without duplicates"""
+        from history_store import Bars, HistoryStore
+
+        bot.history = HistoryStore(str(tmp_path))
+
+        def bars(start, count):
+            return Bars.from_rows((start + 60 * i, 1.0, 1.0, 1.0, 1.0 + i, 5.0) for i in range(count))
+
+        with patch.object(bot.quote_engine, 'fetch_bars', return_value={"^KLSE": bars(0, 10)}) as mock_fetch:
+            bot.record_history("🇲🇾 Malaysia (Bursa)")
+            assert mock_fetch.call_args.args[0] == ["^KLSE"]
+
+            mock_fetch.return_value = {"^KLSE": bars(300, 10)}  # overlaps the first five minutes
+            bot.record_history("🇲🇾 Malaysia (Bursa)")
+
+        stored = bot.history.range("^KLSE")
+        assert stored.ts.tolist() == [60 * i for i in range(15)]
+        assert bot.history.stats()["pending_rows"] == 0
+
+    def test_chart_command_reuses_cached_image_and_file_id(self, bot, tmp_path):
+        """Test that a cached chart is uploaded once and then re-sent by file_id"""
+        import asyncio
+        from types import SimpleNamespace
+        from chart_renderer import ChartCache, chart_key
+        from history_store import Bars, HistoryStore
+
+        bot.history = HistoryStore(str(tmp_path / "history"))
+        bot.history.append("^GSPC", Bars.from_rows((60 * i, 1.0, 1.0, 1.0, 100.0 + i, 1.0) for i in range(1441)))
+        bot.chart_cache = ChartCache(str(tmp_path / "charts"))
+        bot.chart_cache.put(chart_key("^GSPC", "1d", 60 * 1440), b"\x89PNG cached")
+
+        def command(*args):
+            uploaded = SimpleNamespace(photo=[SimpleNamespace(file_id="small"), SimpleNamespace(file_id="F1")])
+            update = SimpleNamespace(
+                effective_chat=SimpleNamespace(id=1),
+                effective_message=SimpleNamespace(reply_text=AsyncMock(), reply_photo=AsyncMock(return_value=uploaded))
+            )
+            return update, SimpleNamespace(args=list(args))
+
+        with patch('market_monitor_bot.MATPLOTLIB_AVAILABLE', True), \
+                patch.object(bot, 'render_chart_png', new=AsyncMock()) as mock_render, \
+                patch.object(bot.quote_engine, 'fetch_bars') as mock_fetch:
+            update, context = command("^gspc")
+            asyncio.run(bot.chart_command(update, context))
+            assert update.effective_message.reply_photo.call_args.kwargs["photo"] == b"\x89PNG cached"
+
+            update, context = command("^GSPC", "1d")
+            asyncio.run(bot.chart_command(update, context))
+            assert update.effective_message.reply_photo.call_args.kwargs["photo"] == "F1"
+
+            update, context = command("^GSPC", "10y")
+            asyncio.run(bot.chart_command(update, context))
+            assert "Unknown range" in update.effective_message.reply_text.call_args.args[0]
+
+        mock_render.assert_not_called()
+        mock_fetch.assert_not_called()
+
+    def test_watchlists_share_one_poll_per_symbol(self):
+        """Test /watch, /unwatch and /watchlist, and that a ticker is polled once however many watch it"""
+        import asyncio
+        from types import SimpleNamespace
+        from quote_engine import Quote
+
+        bot = MarketMonitorBot()
+        user_preferences.clear()
+        fetched = []
+
+        def loader(symbols):
+            fetched.append(sorted(symbols))
+            return {s: Quote(s, s, price=10.0, open=9.0) if s != "NOPE" else Quote(s, s) for s in symbols}
+
+        bot.quote_cache.loader = loader
+
+        def command(handler, chat_id, *args):
+            update = SimpleNamespace(
+                effective_chat=SimpleNamespace(id=chat_id),
+                effective_message=SimpleNamespace(reply_text=AsyncMock())
+            )
+            asyncio.run(handler(update, SimpleNamespace(args=list(args))))
+            return update.effective_message.reply_text.call_args.args[0]
+
+        assert "Watching AAPL, MSFT" in command(bot.watch_command, 1, "aapl", "MSFT")
+        reply = command(bot.watch_command, 2, "AAPL", "NOPE", "bad ticker!")
+        assert "Watching AAPL" in reply and "BAD TICKER!, NOPE" in reply
+        assert bot.tracked_symbols.refcount("AAPL") == 2
+        assert "AAPL" in command(bot.watchlist_command, 2)
+
+        fetched.clear()
+        bot.quote_cache.invalidate()
+        bot.poll_prices([])
+        assert fetched == [["AAPL", "MSFT"]]
+
+        command(bot.unwatch_command, 1, "AAPL", "MSFT")
+        assert bot.tracked_symbols.symbols() == ["AAPL"]
+        command(bot.unwatch_command, 2, "AAPL")
+        assert bot.tracked_symbols.symbols() == []
+        assert "empty" in command(bot.watchlist_command, 2)
+        user_preferences.clear()
+
+    def test_botstats_is_admin_only_and_reports_handlers(self):
+        """Test that instrumented handlers show up in /botstats and on /metrics, for admins only"""
+        import asyncio
+        from types import SimpleNamespace
+
+        bot = MarketMonitorBot()
+
+        def update(chat_id):
+            return SimpleNamespace(
+                effective_chat=SimpleNamespace(id=chat_id),
+                effective_message=SimpleNamespace(reply_text=AsyncMock())
+            )
+
+        status = bot.instrument("status", bot.status_command)
+        asyncio.run(status(update(1), None))
+        failing = bot.instrument("news", AsyncMock(side_effect=RuntimeError("boom")))
+        with pytest.raises(RuntimeError):
+            asyncio.run(failing(update(1), None))
+
+        stranger, admin = update(2), update(42)
+        with patch('market_monitor_bot.ADMIN_IDS', frozenset({"42"})):
+            asyncio.run(bot.botstats_command(stranger, None))
+            asyncio.run(bot.botstats_command(admin, None))
+        assert "only available to bot admins" in stranger.effective_message.reply_text.call_args.args[0]
+        stats = admin.effective_message.reply_text.call_args.args[0]
+        assert "status: 1 ·" in stats
+        assert "news: 1 ·" in stats and "1 errors" in stats
+
+        text = bot.metrics.render()
+        assert 'bot_handler_seconds_count{handler="status"} 1' in text
+        assert 'bot_handler_errors_total{handler="news"} 1' in text
+        assert 'bot_cache_misses_total{cache="render"}' in text
+
+    def test_webhook_updates_are_decoded_and_dispatched(self):
+        """Test that a webhook payload reaches the application as a telegram Update"""
+        import asyncio
+        from telegram import Update
+
+        bot = MarketMonitorBot()
+        payload = {
+            "update_id": 7,
+            "message": {"message_id": 1, "date": 1700000000, "text": "/status",
+                        "chat": {"id": 42, "type": "private"}}
+        }
+        with patch.object(bot.application, 'process_update', new=AsyncMock()) as mock_process:
+            asyncio.run(bot.process_webhook_update(payload))
+
+        update = mock_process.call_args.args[0]
+        assert isinstance(update, Update)
+        assert update.update_id == 7
+        assert update.effective_chat.id == 42
+        assert update.effective_message.text == "/status"
+
+    def test_workers_share_the_leaders_quotes_and_rules(self):
+        """Test that followers read the leader's quote snapshot and that the leader picks up their /alert rules"""
+        from quote_engine import Quote
+        from quote_snapshot import QuoteSnapshot
+        
+        user_preferences.clear()
+        snapshot = QuoteSnapshot.create(4096)
+        leader, follower = MarketMonitorBot(), MarketMonitorBot()
+        leader.quote_snapshot = snapshot
+        leader.quote_cache.loader = lambda symbols: {s: Quote(s, s, price=101.0, open=100.0) for s in symbols}
+        follower.runs_alerts = False
+        follower.quote_snapshot = QuoteSnapshot.attach(snapshot.name)
+        follower.quote_cache.loader = follower.load_shared_quotes
+        
+        leader.poll_prices(["🇲🇾 Malaysia (Bursa)"])
+        with patch.object(follower.quote_engine, 'fetch', return_value={}) as mock_fetch:
+            quotes = follower.quote_cache.get_many(["^KLSE", "AAPL"])
+        assert quotes["^KLSE"].price == 101.0
+        mock_fetch.assert_called_once_with(["AAPL"])
+        assert follower.price_tracker.stats()["ticks"] == 0  # followers never evaluate alerts
+        
+        # A rule added by another worker is evaluated by the leader from its next tick
+        user_preferences.add_alert_rules([("7", "TSLA", "above", 250.0, 0, None)])
+        leader.poll_prices([])
+        assert [rule.symbol for rule in leader.alert_rules.rules_for("7")] == ["TSLA"]
+        assert "TSLA" in leader.tracked_symbols
+        with patch.object(user_preferences, 'alert_rules', wraps=user_preferences.alert_rules) as reload:
+            leader.poll_prices([])
+        reload.assert_not_called()  # nothing changed since the last tick
+        
+        follower.quote_snapshot.close()
+        snapshot.close()
+        user_preferences.clear()
+        
     def test_market_configuration(self):
         """Test that market configuration is properly set up"""
         assert "🇺🇸 US (NYSE)" in MARKETS
@@ -0,0 +1,64 @@
+import pytest
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_renderer import ChartCache, chart_key, downsample, render_chart
+
+
+class TestChartCache:
+
+    def test_key_changes_with_the_last_bar(self):
+        assert chart_key("^GSPC", "1d", 100) == chart_key("^GSPC", "1d", 100.0)
+        assert chart_key("^GSPC", "1d", 100) != chart_key("^GSPC", "1d", 160)
+        assert chart_key("^GSPC", "1d", 100) != chart_key("^GSPC", "5d", 100)
+
+    def test_png_and_file_id_survive_a_restart(self, tmp_path):
+        cache = ChartCache(str(tmp_path))
+        assert cache.get("k") is None
+        cache.put("k", b"png")
+        cache.remember_file_id("k", "AgAD")
+
+        reopened = ChartCache(str(tmp_path))
+        assert reopened.get("k") == b"png"
+        assert reopened.file_id("k") == "AgAD"
+        assert reopened.stats()["hits"] == 1
+
+    def test_least_recently_used_files_are_evicted(self, tmp_path):
+        cache = ChartCache(str(tmp_path), max_files=2)
+        cache.put("a", b"1")
+        cache.remember_file_id("a", "A")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1" and cache.get("c") == b"3"
+        assert sorted(os.listdir(tmp_path)) == ["a.id", "a.png", "c.png"]
+
+
+class TestRendering:
+
+    def test_downsample_keeps_the_ends(self):
+        ts = np.arange(10_000)
+        sampled_ts, sampled_close = downsample(ts, ts * 2.0, max_points=100)
+        assert len(sampled_ts) == 100
+        assert sampled_ts[0] == 0 and sampled_ts[-1] == 9_999
+        assert sampled_close[-1] == 19_998.0
+
+        short = np.arange(5)
+        assert downsample(short, short, max_points=100)[0].tolist() == [0, 1, 2, 3, 4]
+
+    def test_render_chart_returns_png(self):
+        pytest.importorskip("matplotlib")
+        ts = np.arange(0, 3600 * 6, 300, dtype=np.int64) + 1_700_000_000
+        png = render_chart("S&P 500", ts, 5000 + np.sin(np.arange(len(ts))) * 10)
+        assert png.startswith(b"\x89PNG")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,62 @@
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker trips at the threshold and then refuses calls"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, clock=FakeClock())
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()  # resets the count
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED and breaker.allow()
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.stats() == {"state": OPEN, "failures": 3, "trips": 1, "rejected": 1}
+
+    def test_half_open_lets_one_trial_through(self):
+        """Test the single trial call after the reset timeout, and what its outcome does"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 60
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()  # the trial is still running
+
+        breaker.record_failure()  # trial failed: open for another reset_timeout
+        assert breaker.state == OPEN
+        clock.now = 119
+        assert not breaker.allow()
+
+        clock.now = 120
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow() and breaker.allow()
+        assert breaker.trips == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+import pytest
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import Bars, HistoryStore
+
+
+def minute_bars(start, count, price=100.0):
+    return Bars.from_rows((start + i * 60, price + i, price + i + 1, price + i - 1, price + i + 0.5, 10.0)
+                          for i in range(count))
+
+
+def is_mapped(array):
+    """True if the array is a view into a memory-mapped file"""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "history")
+
+
+class TestHistoryStore:
+
+    def test_range_is_a_memory_mapped_view(self, root):
+        """Test timestamp range queries against appended bars, without copying"""
+        store = HistoryStore(root)
+        assert store.append("^GSPC", minute_bars(0, 100)) == 100
+        assert store.append("^GSPC", minute_bars(6000, 50)) == 50
+
+        bars = store.range("^GSPC", 60 * 10, 60 * 20)
+        assert bars.ts.tolist() == [60 * i for i in range(10, 20)]
+        assert bars.close[0] == 110.5
+        assert is_mapped(bars.close)
+
+        assert store.range("^GSPC").size == 150
+        assert store.range("^GSPC", start=10**9).size == 0
+        assert store.range("^NOPE").size == 0
+        assert store.latest("^GSPC") == (6000 + 49 * 60, 100 + 49 + 0.5)
+
+    def test_reopen(self, root):
+        """Test that bars survive a restart and odd symbols get safe directory names"""
+        HistoryStore(root).append("^GSPC", minute_bars(0, 10))
+        store = HistoryStore(root)
+        assert store.symbols() == ["^GSPC"]
+        assert store.range("^GSPC").close.tolist() == [100.5 + i for i in range(10)]
+
+    def test_late_bars_are_merged_then_compacted(self, root):
+        """Test that backfilled and corrected bars show up at once and compaction folds them in"""
+        store = HistoryStore(root)
+        store.append("X", minute_bars(600, 10))
+        late = Bars.from_rows([(0, 1, 1, 1, 1, 1), (600, 2, 2, 2, 2, 2)])  # one backfill, one correction
+        assert store.append("X", late) == 0
+        assert store.stats()["pending_rows"] == 2
+
+        bars = store.range("X", 0, 660)
+        assert bars.ts.tolist() == [0, 600]
+        assert bars.close.tolist() == [1.0, 2.0]
+
+        assert store.compact() == 1
+        assert store.compact() == 0
+        assert store.stats()["pending_rows"] == 0
+        bars = HistoryStore(root).range("X")
+        assert bars.ts.tolist() == [0] + [600 + 60 * i for i in range(10)]
+        assert bars.close[1] == 2.0
+        assert is_mapped(bars.close)
+
+    def test_torn_append_is_truncated(self, root):
+        """Test that columns left uneven by a crash are ignored by reads and cut back before the next append"""
+        HistoryStore(root).append("X", minute_bars(0, 5))
+        generation = os.path.join(root, "X", "0")
+        with open(os.path.join(generation, "main.ts"), "ab") as f:
+            f.write(np.arange(3, dtype=np.int64).tobytes())
+
+        store = HistoryStore(root)
+        assert store.range("X").size == 5
+        assert os.path.getsize(os.path.join(generation, "main.ts")) == 8 * 8  # reading never truncates
+        store.append("X", minute_bars(300, 1))
+        assert store.range("X").ts.tolist() == [0, 60, 120, 180, 240, 300]
+        assert os.path.getsize(os.path.join(generation, "main.ts")) == 6 * 8
+
+    def test_follower_sees_appends_and_compactions(self, root):
+        """Test that a reader in another process keeps up with the writer's appends and new generations"""
+        writer, reader = HistoryStore(root), HistoryStore(root, follow=True)
+        writer.append("X", minute_bars(600, 5))
+        assert reader.range("X").size == 5
+        assert reader.latest("X")[0] == 840
+
+        writer.append("X", minute_bars(900, 2))
+        assert reader.latest("X")[0] == 960
+        writer.append("X", minute_bars(0, 2))  # late bars, pending until compacted
+        assert reader.range("X").size == 9
+
+        old = reader.range("X", end=700)
+        writer.compact()
+        assert not os.path.exists(os.path.join(root, "X", "0"))
+        assert old.ts.tolist() == [0, 60, 600, 660]  # what was already read stays readable
+        assert reader.range("X").ts.tolist() == [0, 60, 600, 660, 720, 780, 840, 900, 960]
+        assert reader.stats()["pending_rows"] == 0
+
+    def test_removed_generation_is_reopened(self, root):
+        """Test that a generation deleted before it was mapped sends the reader to the new one"""
+        writer, reader = HistoryStore(root), HistoryStore(root)
+        writer.append("X", minute_bars(600, 3))
+        writer.append("X", minute_bars(0, 1))
+        reader._get("X")  # opened (CURRENT read) but not mapped yet
+        writer.compact()
+
+        assert reader.range("X").ts.tolist() == [0, 600, 660, 720]
+
+    def test_change_percent(self, root):
+        store = HistoryStore(root)
+        store.append("X", Bars.from_rows([(0, 0, 0, 0, 100.0, 0), (86400, 0, 0, 0, 103.0, 0),
+                                           (7 * 86400, 0, 0, 0, 110.0, 0)]))
+        assert store.change_percent("X", 7 * 86400) == pytest.approx(10.0)
+        assert store.change_percent("X", 6 * 86400) == pytest.approx((110 - 103) / 103 * 100)
+        assert store.change_percent("X", 30 * 86400) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lazy_imports import LazyModule, lazy_import, preload
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative `import market_monitor_bot` time, python-telegram-bot and numpy included
+STARTUP_IMPORT_BUDGET_MS = 1500
+
+
+@pytest.fixture
+def fake_package(tmp_path, monkeypatch):
+    """An importable module that counts how often it is imported"""
+    (tmp_path / "lazy_fixture_pkg.py").write_text("IMPORTS = 1\ndef answer():\n    return 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "lazy_fixture_pkg"
+    sys.modules.pop("lazy_fixture_pkg", None)
+
+
+class TestLazyModule:
+
+    def test_imports_on_first_attribute_access(self, fake_package):
+        module = LazyModule(fake_package)
+        assert module.available
+        assert fake_package not in sys.modules
+
+        assert module.answer() == 42
+        assert module.loaded and fake_package in sys.modules
+
+    def test_missing_package_is_unavailable(self):
+        module = LazyModule("no_such_package_for_the_bot.sub")
+        assert not module.available
+        with pytest.raises(ImportError):
+            module.anything
+
+    def test_patches_reach_the_real_module(self, fake_package):
+        """Test that patching through one stand-in is seen by every holder of the module"""
+        from unittest.mock import patch
+
+        with patch.object(LazyModule(fake_package), "answer", return_value=7):
+            assert sys.modules[fake_package].answer() == 7
+        assert sys.modules[fake_package].answer() == 42
+
+    def test_registry_and_preload(self, fake_package):
+        module = lazy_import(fake_package)
+        assert lazy_import(fake_package) is module
+        preload([module, LazyModule("no_such_package_for_the_bot")])
+        assert module.loaded
+
+
+class TestStartupBudget:
+
+    def test_bot_import_defers_integrations_and_stays_in_budget(self):
+        """Test that importing the bot loads none of the optional integrations, within the time budget"""
+        probe = (
+            "import json, sys, time\n"
+            "started = time.perf_counter()\n"
+            "import market_monitor_bot, lazy_imports\n"
+            "elapsed = time.perf_counter() - started\n"
+            "names = list(lazy_imports.loaded_modules()) + ['pandas']\n"
+            "print(json.dumps({'ms': elapsed * 1000, 'imported': [n for n in names if n in sys.modules]}))\n"
+        )
+        best = None
+        for _ in range(3):
+            result = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, capture_output=True,
+                                    text=True, timeout=120, check=True)
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            assert report["imported"] == []
+            best = report["ms"] if best is None else min(best, report["ms"])
+        assert best < STARTUP_IMPORT_BUDGET_MS
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,50 @@
+import pytest
+import os
+import subprocess
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leader_lock import LeaderLock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLeaderLock:
+
+    def test_only_one_holder_until_released(self, tmp_path):
+        path = str(tmp_path / "locks" / "leader.lock")
+        first, second = LeaderLock(path), LeaderLock(path)
+        assert first.try_acquire()
+        assert first.try_acquire()  # re-entrant for the holder
+        assert not second.try_acquire()
+
+        first.release()
+        assert not first.held
+        assert second.try_acquire()
+        second.release()
+
+    def test_lock_is_freed_when_the_leader_process_dies(self, tmp_path):
+        """Test that a follower can take over as soon as the leader process is gone"""
+        path = str(tmp_path / "leader.lock")
+        holder = subprocess.Popen(
+            [sys.executable, "-c", "import sys, time\n"
+                                   "from leader_lock import LeaderLock\n"
+                                   f"print(LeaderLock({path!r}).try_acquire(), flush=True)\n"
+                                   "time.sleep(60)\n"],
+            cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True
+        )
+        try:
+            assert holder.stdout.readline().strip() == "True"
+            follower = LeaderLock(path)
+            assert not follower.try_acquire()
+        finally:
+            holder.kill()
+            holder.wait()
+        assert follower.try_acquire()
+        follower.release()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
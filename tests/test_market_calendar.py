@@ -0,0 +1,77 @@
+import pytest
+import os
+import sys
+from datetime import datetime, timezone
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_calendar import MarketCalendar
+from market_monitor_bot import MARKETS
+
+US = "🇺🇸 US (NYSE)"
+MY = "🇲🇾 Malaysia (Bursa)"
+DSE = "🇧🇩 Dhaka (DSE)"
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def calendar():
+    return MarketCalendar(MARKETS)
+
+
+class TestMarketCalendar:
+
+    def test_us_open_moves_with_spring_dst(self, calendar):
+        """Test that NYSE opens at 14:30 UTC before and 13:30 UTC after DST starts"""
+        # DST starts Sunday 2026-03-08
+        assert calendar.next_open(US, utc(2026, 3, 6, 12, 0)) == utc(2026, 3, 6, 14, 30)
+        assert calendar.next_open(US, utc(2026, 3, 9, 12, 0)) == utc(2026, 3, 9, 13, 30)
+        assert not calendar.is_open(US, utc(2026, 3, 9, 13, 29))
+        assert calendar.is_open(US, utc(2026, 3, 9, 13, 30))
+
+    def test_us_next_open_across_autumn_dst_weekend(self, calendar):
+        """Test next open from Friday's close over the weekend DST ends"""
+        # DST ends Sunday 2026-11-01; Friday close is 20:00 UTC, Monday open 14:30 UTC
+        friday_close = utc(2026, 10, 30, 20, 0)
+        assert calendar.next_close(US, utc(2026, 10, 30, 15, 0)) == friday_close
+        assert calendar.next_open(US, friday_close) == utc(2026, 11, 2, 14, 30)
+        assert calendar.next_close(US, utc(2026, 11, 2, 15, 0)) == utc(2026, 11, 2, 21, 0)
+
+    def test_holiday_and_early_close(self, calendar):
+        """Test Thanksgiving closure and the following half-day"""
+        status = calendar.status(US, utc(2026, 11, 26, 16, 0))
+        assert not status.is_open
+        assert "Holiday" in status.status
+
+        assert calendar.next_close(US, utc(2026, 11, 27, 15, 0)) == utc(2026, 11, 27, 18, 0)
+        assert calendar.status(US, utc(2026, 11, 27, 15, 0)).status == "🟢 OPEN (Closes at 13:00)"
+        assert not calendar.is_open(US, utc(2026, 11, 27, 18, 30))
+
+    def test_lunch_break(self, calendar):
+        """Test Bursa's lunch break splits the session"""
+        # 12:45 Kuala Lumpur (UTC+8) on a Tuesday
+        status = calendar.status(MY, utc(2026, 10, 13, 4, 45))
+        assert status.status == "🟡 LUNCH BREAK"
+        assert status.local_time == "12:45"
+        assert calendar.next_open(MY, utc(2026, 10, 13, 4, 45)) == utc(2026, 10, 13, 6, 30)
+        assert calendar.next_boundary(MY, utc(2026, 10, 13, 2, 0)) == utc(2026, 10, 13, 4, 30)
+
+    def test_dse_trades_sunday_not_friday(self, calendar):
+        """Test the per-market weekend setting"""
+        # 11:00 Dhaka (UTC+6)
+        assert calendar.is_open(DSE, utc(2026, 10, 18, 5, 0))  # Sunday
+        assert "Weekend" in calendar.status(DSE, utc(2026, 10, 16, 5, 0)).status  # Friday
+
+    def test_window_rolls_forward(self, calendar):
+        """Test queries far apart in time recompile the window"""
+        assert calendar.is_open(US, utc(2026, 10, 13, 15, 0))
+        assert calendar.is_open(US, utc(2027, 6, 15, 15, 0))
+        assert not calendar.is_open(US, utc(2027, 6, 18, 15, 0))  # Juneteenth observed
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
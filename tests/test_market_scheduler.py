@@ -0,0 +1,108 @@
+import pytest
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_calendar import MarketCalendar
+from market_monitor_bot import MARKETS
+from market_scheduler import BELL_BREAK, BELL_CLOSE, BELL_OPEN, MarketScheduler
+
+US = "🇺🇸 US (NYSE)"
+MY = "🇲🇾 Malaysia (Bursa)"
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def recorder():
+    events = {"polls": [], "bells": []}
+    return events
+
+
+def make_scheduler(recorder, markets, **kwargs):
+    return MarketScheduler(
+        MarketCalendar(MARKETS),
+        markets,
+        on_poll=lambda m: recorder["polls"].append(list(m)),
+        on_bell=lambda m, e: recorder["bells"].append((m, e)),
+        poll_interval=30 * 60,
+        spawn=lambda fn: fn(),
+        **kwargs
+    )
+
+
+class TestMarketScheduler:
+
+    def test_sleeps_until_next_boundary_when_closed(self, recorder):
+        """Test that nothing is polled on a weekend and the wakeup is Monday's open"""
+        scheduler = make_scheduler(recorder, [US])
+        saturday = utc(2026, 10, 17, 15, 0)
+
+        assert scheduler.tick(saturday) == []
+        assert scheduler.next_wakeup(saturday) == saturday + 3600  # capped at an hour
+        assert recorder["polls"] == []
+
+        sunday_night = utc(2026, 10, 19, 13, 0)
+        assert scheduler.next_wakeup(sunday_night) == utc(2026, 10, 19, 13, 30)
+
+    def test_polls_only_while_open_and_rings_bells(self, recorder):
+        """Test open bell, interval polls and the final poll at the close"""
+        scheduler = make_scheduler(recorder, [US])
+        scheduler.tick(utc(2026, 10, 19, 13, 0))  # before the open
+
+        opened = utc(2026, 10, 19, 13, 30)
+        scheduler.tick(opened)
+        assert recorder["bells"] == [(US, BELL_OPEN)]
+        assert recorder["polls"] == []
+        assert scheduler.next_wakeup(opened) == opened + 1800
+
+        scheduler.tick(opened + 1800)
+        assert recorder["polls"] == [[US]]
+
+        scheduler.tick(utc(2026, 10, 19, 20, 0))  # close
+        assert recorder["bells"][-1] == (US, BELL_CLOSE)
+        assert recorder["polls"][-1] == [US]
+
+    def test_lunch_break_bell(self, recorder):
+        """Test that Bursa's lunch break is reported as a break, not a close"""
+        scheduler = make_scheduler(recorder, [MY])
+        scheduler.tick(utc(2026, 10, 13, 4, 0))
+        scheduler.tick(utc(2026, 10, 13, 4, 30))
+        assert recorder["bells"] == [(MY, BELL_BREAK)]
+
+    def test_overlapping_polls_are_coalesced(self):
+        """Test that polls due while one is running are merged into one follow-up"""
+        started = threading.Event()
+        release = threading.Event()
+        polls = []
+
+        def slow_poll(markets):
+            polls.append(list(markets))
+            started.set()
+            release.wait()
+
+        scheduler = MarketScheduler(MarketCalendar(MARKETS), [US, MY], on_poll=slow_poll)
+        scheduler.submit([US])
+        started.wait()
+        scheduler.submit([MY])
+        scheduler.submit([US])
+        scheduler.submit([MY])
+        release.set()
+
+        for _ in range(100):
+            if not scheduler._running:
+                break
+            threading.Event().wait(0.01)
+
+        assert polls == [[US], [US, MY]]
+        assert scheduler.coalesced == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
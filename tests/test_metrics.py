@@ -0,0 +1,122 @@
+import pytest
+import asyncio
+import os
+import sys
+import urllib.error
+import urllib.request
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import COUNTER, GAUGE, NULL_METRIC, NULL_TIMER, MetricsRegistry, MetricsServer
+
+
+class TestMetricsRegistry:
+
+    def test_prometheus_exposition(self):
+        """Test counters, gauges, cumulative histogram buckets and collected samples in the text format"""
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        histogram = registry.histogram("bot_handler_seconds", handler="stocks")
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+        registry.counter("bot_upstream_retries_total", upstream="telegram").inc(2)
+        registry.gauge("bot_alert_cycle_seconds", job="alerts").set(1.5)
+        registry.add_collector(lambda: [("bot_cache_hits_total", COUNTER, {"cache": "quote"}, 7)])
+
+        text = registry.render()
+
+        assert "# TYPE bot_handler_seconds histogram" in text
+        assert 'bot_handler_seconds_bucket{handler="stocks",le="0.1"} 1' in text
+        assert 'bot_handler_seconds_bucket{handler="stocks",le="1.0"} 2' in text
+        assert 'bot_handler_seconds_bucket{handler="stocks",le="+Inf"} 3' in text
+        assert 'bot_handler_seconds_count{handler="stocks"} 3' in text
+        assert 'bot_handler_seconds_sum{handler="stocks"} 5.55' in text
+        assert 'bot_upstream_retries_total{upstream="telegram"} 2' in text
+        assert 'bot_alert_cycle_seconds{job="alerts"} 1.5' in text
+        assert "# TYPE bot_cache_hits_total counter" in text
+        assert 'bot_cache_hits_total{cache="quote"} 7' in text
+
+    def test_same_labels_share_a_metric(self):
+        registry = MetricsRegistry()
+        assert registry.counter("c", a="1", b="2") is registry.counter("c", b="2", a="1")
+        assert registry.counter("c", a="1") is not registry.counter("c", a="2")
+        with pytest.raises(ValueError):
+            registry.gauge("c", a="1")
+
+    def test_quantile_is_a_bucket_bound(self):
+        registry = MetricsRegistry(buckets=(0.01, 0.1, 1.0))
+        histogram = registry.histogram("h")
+        assert histogram.quantile(0.95) == 0.0
+        for _ in range(95):
+            histogram.observe(0.005)
+        for _ in range(5):
+            histogram.observe(0.5)
+        assert histogram.quantile(0.5) == 0.01
+        assert histogram.quantile(0.99) == 1.0
+
+    def test_timed_records_duration_and_errors(self):
+        """Test that sync and async wrappers observe every call and count exceptions"""
+        now = [0.0]
+        registry = MetricsRegistry(clock=lambda: now[0])
+        histogram, errors = registry.histogram("h"), registry.counter("errors")
+
+        def slow(fail=False):
+            now[0] += 0.25
+            if fail:
+                raise RuntimeError("boom")
+            return "ok"
+
+        async def slow_async():
+            now[0] += 0.5
+            return "ok"
+
+        assert registry.timed(slow, histogram, errors)() == "ok"
+        with pytest.raises(RuntimeError):
+            registry.timed(slow, histogram, errors)(fail=True)
+        assert asyncio.run(registry.timed(slow_async, histogram, errors)()) == "ok"
+
+        assert histogram.count == 3
+        assert histogram.sum == pytest.approx(1.0)
+        assert errors.value == 1
+
+        gauge = registry.gauge("g")
+        with registry.time(gauge):
+            now[0] += 2.0
+        assert gauge.value == 2.0
+
+    def test_disabled_registry_is_a_no_op(self):
+        """Test that nothing is wrapped or recorded when metrics are off"""
+        registry = MetricsRegistry(enabled=False)
+
+        def handler():
+            return 1
+
+        assert registry.timed(handler, registry.histogram("h")) is handler
+        assert registry.histogram("h") is NULL_METRIC
+        assert registry.counter("c", a="1") is NULL_METRIC
+        assert registry.time(registry.gauge("g", job="x")) is NULL_TIMER
+        registry.counter("c").inc()
+        registry.add_collector(lambda: [("x", GAUGE, {}, 1)])
+        assert registry.render() == "\n"
+
+
+class TestMetricsServer:
+
+    def test_serves_metrics_endpoint(self):
+        registry = MetricsRegistry()
+        registry.counter("bot_handler_errors_total", handler="news").inc()
+        server = MetricsServer(registry, host="127.0.0.1", port=0)
+        server.start()
+        try:
+            url = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                assert 'bot_handler_errors_total{handler="news"} 1' in response.read().decode()
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other", timeout=5)
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,173 @@
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_cache import NewsCache, bucket_key, published_ts
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def article(url, title=None, published_at=""):
+    return {"title": title or url, "description": "", "url": url, "source": "Test", "published_at": published_at}
+
+
+class TestNewsCache:
+
+    def test_bucket_key_is_canonical(self):
+        """Test that order, case, spacing and duplicates don't change the bucket"""
+        assert bucket_key(["Trading", "stock  market"]) == bucket_key(["stock market", "trading", "TRADING"])
+        assert bucket_key(None) == bucket_key([]) == bucket_key(["economy", "finance", "stock market", "trading"])
+
+    def test_identical_keyword_sets_share_one_request(self):
+        """Test that equivalent keyword lists are served from one upstream fetch"""
+        calls = []
+
+        def fetcher(key, since):
+            calls.append(key)
+            return [article(f"https://news/{i}") for i in range(10)]
+
+        cache = NewsCache(fetcher)
+        for keywords in (["finance", "trading"], ["Trading", "Finance"], ["trading", "finance", "finance"]):
+            assert len(cache.get(keywords)) == 5
+
+        assert calls == [("finance", "trading")]
+        assert cache.stats()["requests"] == 3
+
+    def test_articles_are_deduplicated_across_buckets(self):
+        """Test that one URL is stored once even if several buckets return it"""
+        cache = NewsCache(lambda key, since: [article("https://news/shared"), article(f"https://news/{key[0]}")])
+        cache.get(["forex"])
+        cache.get(["crypto"])
+        assert cache.stats()["articles"] == 3
+
+    def test_article_store_is_bounded(self):
+        """Test LRU eviction of the shared article store"""
+        cache = NewsCache(lambda key, since: [article(f"https://news/{key[0]}/{i}") for i in range(4)], max_articles=6)
+        cache.get(["a"])
+        cache.get(["b"])
+        assert cache.stats()["articles"] == 6
+        assert len(cache.get(["a"])) == 2  # two of bucket "a" were evicted
+
+    def test_rebuilt_bucket_never_reuses_a_version(self):
+        """Test that a bucket evicted and fetched again can't match replies rendered for its old articles"""
+        clock = FakeClock()
+        batches = [[article("https://news/old")], [article("https://news/crypto")], [article("https://news/new")]]
+        cache = NewsCache(lambda key, since: batches.pop(0), ttl=60, max_buckets=1, clock=clock)
+
+        cache.get(["forex"])
+        old_version = cache.version(["forex"])
+        clock.now += 1
+        cache.get(["crypto"])  # evicts "forex"
+        assert cache.version(["forex"]) == 0
+
+        clock.now += 1
+        assert [a["url"] for a in cache.get(["forex"])] == ["https://news/new"]
+        assert cache.version(["forex"]) not in (0, old_version)
+
+        clock.now += 7 * 60
+        cache.refresh_stale()  # idle buckets are dropped too
+        assert cache.version(["forex"]) == 0
+
+    def test_stale_buckets_refresh_in_background_pass(self):
+        """Test TTL refresh, version bump and that /news never waits on it"""
+        clock = FakeClock()
+        batches = [[article("https://news/1")], [article("https://news/2"), article("https://news/1")]]
+        cache = NewsCache(lambda key, since: batches.pop(0), ttl=60, clock=clock)
+
+        assert [a["url"] for a in cache.get()] == ["https://news/1"]
+        version = cache.version()
+
+        clock.now += 61
+        assert [a["url"] for a in cache.get()] == ["https://news/1"]  # stale but served
+        cache.refresh_stale()
+        assert [a["url"] for a in cache.get()] == ["https://news/2", "https://news/1"]
+        assert cache.version() == version + 1
+        assert cache.stats()["upstream_requests"] == 2
+
+    def test_refresh_asks_only_for_articles_after_watermark(self):
+        """Test that refreshes pass the newest publishedAt and merge what's new"""
+        clock = FakeClock()
+        calls = []
+        responses = [
+            [article("https://news/1", published_at="2026-10-18T09:00:00Z"),
+             article("https://news/2", published_at="2026-10-18T10:00:00Z")],
+            [article("https://news/2", published_at="2026-10-18T10:00:00Z"),
+             article("https://news/3", published_at="2026-10-18T11:30:00Z")],
+            [],
+        ]
+
+        def fetcher(key, since):
+            calls.append(since)
+            return responses.pop(0)
+
+        cache = NewsCache(fetcher, ttl=60, clock=clock)
+        cache.get()
+        for _ in range(2):
+            clock.now += 61
+            cache.refresh_stale()
+
+        assert calls == [None, "2026-10-18T10:00:00Z", "2026-10-18T11:30:00Z"]
+        assert [a["url"] for a in cache.get()] == ["https://news/3", "https://news/2", "https://news/1"]
+
+    def test_since_returns_only_unseen_articles(self):
+        """Test that a subscriber cursor selects headlines published after it, once the refresh pass fetched them"""
+        cache = NewsCache(lambda key, since: [
+            article("https://news/1", published_at="2026-10-18T09:00:00Z"),
+            article("https://news/2", published_at="2026-10-18T10:00:00Z"),
+        ])
+        cursor = published_ts("2026-10-18T09:00:00Z")
+        assert cache.since(["forex"], cursor) == []  # registered, not fetched
+        assert cache.stats()["upstream_requests"] == 0
+        cache.refresh_stale()
+        assert [a["url"] for a in cache.since(["forex"], cursor)] == ["https://news/2"]
+        assert cache.since(["forex"], published_ts("2026-10-18T10:00:00Z")) == []
+        assert published_ts("") == published_ts(None) == 0
+
+    def test_failed_refresh_keeps_old_articles(self):
+        """Test that an upstream error doesn't empty the bucket"""
+        clock = FakeClock()
+        responses = [[article("https://news/1")], RuntimeError("quota exceeded")]
+
+        def fetcher(key, since):
+            result = responses.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        cache = NewsCache(fetcher, ttl=60, clock=clock)
+        cache.get()
+        clock.now += 61
+        cache.refresh_stale()
+        assert [a["url"] for a in cache.get()] == ["https://news/1"]
+
+    def test_concurrent_first_requests_single_flight(self):
+        """Test that a new bucket is fetched once even under concurrency"""
+        calls = []
+
+        def fetcher(key, since):
+            calls.append(key)
+            time.sleep(0.05)
+            return [article("https://news/1")]
+
+        cache = NewsCache(fetcher)
+        threads = [threading.Thread(target=cache.get, args=(["forex"],)) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,228 @@
+import pytest
+import os
+import sqlite3
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_monitor_bot import UserPreferences
+from preference_store import MemoryPreferenceStore, SQLitePreferenceStore, create_preference_store
+
+US = "🇺🇸 US (NYSE)"
+DSE = "🇧🇩 Dhaka (DSE)"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "data" / "preferences.db")
+
+
+class TestSQLitePreferenceStore:
+
+    def test_preferences_survive_restart(self, db_path):
+        """Test that saved preferences are loaded by a new store instance"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        store["1"] = UserPreferences(chat_id="1", timezone="Asia/Dhaka", preferred_markets=[DSE],
+                                     news_keywords=["dse", "bdt"])
+        store.close()
+
+        reopened = SQLitePreferenceStore(db_path, UserPreferences)
+        pref = reopened["1"]
+        assert pref.timezone == "Asia/Dhaka"
+        assert pref.preferred_markets == [DSE]
+        assert pref.news_keywords == ["dse", "bdt"]
+        assert "2" not in reopened
+        reopened.close()
+
+    def test_uses_wal_and_indexes(self, db_path):
+        """Test WAL mode and the subscriber indexes"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[1] for row in store.conn.execute("SELECT * FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_users_notifications" in indexes
+        store.close()
+
+    def test_writes_are_batched(self, db_path):
+        """Test that writes are queued until the batch fills up"""
+        store = SQLitePreferenceStore(db_path, UserPreferences, batch_size=3, flush_interval=3600)
+        store.conn  # create the database file
+        store["1"] = UserPreferences(chat_id="1")
+        store["2"] = UserPreferences(chat_id="2")
+
+        on_disk = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        assert on_disk == 0
+        assert store["2"].chat_id == "2"  # served from the write queue
+
+        store["3"] = UserPreferences(chat_id="3")
+        on_disk = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        assert on_disk == 3
+        store.close()
+
+    def test_market_subscribers_query(self, db_path):
+        """Test the inverted market -> subscribers query"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        store["1"] = UserPreferences(chat_id="1", preferred_markets=[US, DSE])
+        store["2"] = UserPreferences(chat_id="2", preferred_markets=[US])
+        store["3"] = UserPreferences(chat_id="3", preferred_markets=[US], notifications_enabled=False)
+
+        subscribers = store.market_subscribers()
+
+        assert sorted(subscribers[US]) == ["1", "2"]
+        assert subscribers[DSE] == ["1"]
+        store.close()
+
+    def test_updates_replace_market_rows(self, db_path):
+        """Test that re-saving a user replaces their market subscriptions"""
+        store = SQLitePreferenceStore(db_path, UserPreferences, cache_size=1)
+        pref = UserPreferences(chat_id="1", preferred_markets=[US, DSE])
+        store["1"] = pref
+        pref.preferred_markets = [DSE]
+        store["1"] = pref
+        store.flush()
+        store["2"] = UserPreferences(chat_id="2")  # pushes "1" out of the read cache
+
+        assert store["1"].preferred_markets == [DSE]
+        assert "1" not in store.market_subscribers().get(US, [])
+        store.close()
+
+    def test_watchlists_persist(self, db_path):
+        """Test that watchlists survive a restart and are counted per symbol"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        store["1"] = UserPreferences(chat_id="1", watchlist=["MSFT", "AAPL"])
+        store["2"] = UserPreferences(chat_id="2", watchlist=["AAPL"])
+        pref = store["2"]
+        pref.watchlist = ["TSLA"]
+        store["2"] = pref
+        store.close()
+
+        reopened = SQLitePreferenceStore(db_path, UserPreferences)
+        assert reopened["1"].watchlist == ["AAPL", "MSFT"]
+        assert reopened.watch_counts() == {"AAPL": 1, "MSFT": 1, "TSLA": 1}
+        assert dict(reopened.items())["2"].watchlist == ["TSLA"]
+        reopened.close()
+
+    def test_news_cursors(self, db_path):
+        """Test the news subscriber query and that advanced cursors persist"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        store["1"] = UserPreferences(chat_id="1", news_alerts=True, news_cursor=100, news_keywords=["forex"])
+        store["2"] = UserPreferences(chat_id="2")
+
+        assert store.news_subscribers() == [("1", ["forex"], 100)]
+        store.advance_news_cursors({"1": 250})
+        assert store["1"].news_cursor == 250
+        store.close()
+
+        reopened = SQLitePreferenceStore(db_path, UserPreferences)
+        assert reopened["1"].news_cursor == 250
+        assert reopened["1"].news_alerts is True
+        reopened.close()
+
+    def test_flush_keeps_cursor_advanced_elsewhere(self, db_path):
+        """Test that a queued preference change doesn't write back a stale news cursor"""
+        worker = SQLitePreferenceStore(db_path, UserPreferences, batch_size=100, flush_interval=60)
+        leader = SQLitePreferenceStore(db_path, UserPreferences)
+        leader["1"] = UserPreferences(chat_id="1", news_alerts=True, news_cursor=100)
+        leader.flush()
+
+        pref = worker["1"]
+        pref.timezone = "Asia/Dhaka"
+        worker.save(pref)  # queued with news_cursor=100
+        leader.advance_news_cursors({"1": 250})
+        worker.flush()
+
+        assert leader.news_subscribers()[0][2] == 250
+        reopened = SQLitePreferenceStore(db_path, UserPreferences)
+        assert (reopened["1"].timezone, reopened["1"].news_cursor) == ("Asia/Dhaka", 250)
+        for store in (worker, leader, reopened):
+            store.close()
+
+    def test_opting_in_moves_the_cursor(self, db_path):
+        """Test that an existing user turning news alerts on gets a cursor of now, not the old one"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        store["1"] = UserPreferences(chat_id="1")
+        store.flush()
+
+        pref = store["1"]
+        pref.news_alerts = True
+        pref.news_cursor = 1_800_000_000
+        store["1"] = pref
+        store.flush()
+
+        assert store.news_subscribers()[0][2] == 1_800_000_000
+        store.close()
+
+    def test_alert_rules_persist(self, db_path):
+        """Test that alert rules survive a restart and can only be removed by their owner"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        rule_ids = store.add_alert_rules([
+            ("1", "^GSPC", "above", 5200.0, 0, None),
+            ("1", "^KLSE", "move", 1.5, 15, "🇲🇾 Malaysia (Bursa)"),
+        ])
+        assert not store.remove_alert_rule("2", rule_ids[0])
+        assert store.remove_alert_rule("1", rule_ids[0])
+        store.close()
+
+        reopened = SQLitePreferenceStore(db_path, UserPreferences)
+        assert reopened.alert_rules() == [(rule_ids[1], "1", "^KLSE", "move", 1.5, 15, "🇲🇾 Malaysia (Bursa)")]
+        reopened.close()
+
+    def test_tracking_version_follows_rules_and_watchlists(self, db_path):
+        """Test that another process's /alert, /delalert and /watch changes bump the shared version"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        other = SQLitePreferenceStore(db_path, UserPreferences)
+        version = store.tracking_version()
+        assert store.tracking_version() == version
+
+        rule_id, = other.add_alert_rules([("1", "TSLA", "above", 250.0, 0, None)])
+        assert store.tracking_version() == version + 1
+        assert not other.remove_alert_rule("2", rule_id)  # not the owner: nothing changed
+        assert store.tracking_version() == version + 1
+        other.remove_alert_rule("1", rule_id)
+        other["1"] = UserPreferences(chat_id="1", watchlist=["AAPL"])
+        other.flush()
+        assert store.tracking_version() == version + 3
+        store.close()
+        other.close()
+
+    def test_alert_state_persists(self, db_path):
+        """Test that fired alerts are remembered across a restart and reset entries are deleted"""
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        store.save_alert_state({"^GSPC|day|2|0": (False, 1000.0), "rule:7": (True, 900.0)})
+        store.save_alert_state({"rule:7": None})
+        store.close()
+
+        reopened = SQLitePreferenceStore(db_path, UserPreferences)
+        assert reopened.alert_state() == [("^GSPC|day|2|0", False, 1000.0)]
+        reopened.close()
+
+    def test_old_database_is_migrated(self, db_path):
+        """Test that a database from before news alerts gains the new columns"""
+        os.makedirs(os.path.dirname(db_path))
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE users (chat_id TEXT PRIMARY KEY, timezone TEXT, "
+                     "notifications_enabled INTEGER NOT NULL DEFAULT 1, news_keywords TEXT)")
+        conn.execute("INSERT INTO users VALUES ('1', 'Asia/Dhaka', 1, NULL)")
+        conn.commit()
+        conn.close()
+
+        store = SQLitePreferenceStore(db_path, UserPreferences)
+        pref = store["1"]
+        assert pref.timezone == "Asia/Dhaka"
+        assert (pref.news_alerts, pref.news_cursor) == (False, 0)
+        assert store.news_subscribers() == []
+        store.close()
+
+
+class TestCreatePreferenceStore:
+
+    def test_backends(self, db_path):
+        """Test backend selection from config"""
+        assert isinstance(create_preference_store("memory", UserPreferences), MemoryPreferenceStore)
+        assert isinstance(create_preference_store("sqlite", UserPreferences, db_path), SQLitePreferenceStore)
+        with pytest.raises(ValueError):
+            create_preference_store("redis", UserPreferences)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
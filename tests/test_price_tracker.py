@@ -0,0 +1,110 @@
+import pytest
+import math
+import os
+import random
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_tracker import RETURN, VWAP_DELTA, ZSCORE, MoveRule, PriceTracker
+from quote_engine import Quote
+
+
+def brute_force(ticks, minutes, capacity):
+    """Recompute a window's signals from scratch over the retained ticks"""
+    kept = ticks[-capacity:]
+    now = kept[-1][0]
+    inside = [t for t in kept if t[0] >= now - minutes * 60]
+    prices = [p for _, p, _ in inside]
+    volume = sum(v for _, _, v in inside)
+    last = prices[-1]
+    ret = (last - prices[0]) / prices[0] * 100 if len(prices) > 1 else None
+    vwap = sum(p * v for _, p, v in inside) / volume
+    mean = sum(prices) / len(prices)
+    std = math.sqrt(sum((p - mean) ** 2 for p in prices) / len(prices))
+    z = (last - mean) / std if len(prices) >= 3 and std > 1e-9 else None
+    return len(inside), ret, (last - vwap) / vwap * 100, z
+
+
+class TestPriceTracker:
+
+    def test_signals_match_brute_force_across_buffer_wrap(self):
+        """Test incremental window sums against a full recomputation, past the ring capacity"""
+        rng = random.Random(3)
+        tracker = PriceTracker((5, 15, 60), capacity=50)
+        ticks = []
+        ts, price = 1_000_000.0, 5000.0
+        for _ in range(400):
+            ts += rng.uniform(5, 90)
+            price *= 1 + rng.gauss(0, 0.002)
+            volume = rng.uniform(1, 1000)
+            ticks.append((ts, price, volume))
+            tracker.update("^GSPC", price, ts, volume)
+
+            for minutes, signal in tracker.signals("^GSPC").items():
+                n, ret, vwap_delta, z = brute_force(ticks, minutes, 50)
+                assert signal.ticks == n
+                if ret is None:
+                    assert signal.return_percent is None
+                else:
+                    assert signal.return_percent == pytest.approx(ret, abs=1e-9)
+                assert signal.vwap_delta_percent == pytest.approx(vwap_delta, abs=1e-7)
+                if z is None:
+                    assert signal.zscore is None
+                else:
+                    assert signal.zscore == pytest.approx(z, rel=1e-5, abs=1e-6)
+
+    def test_rules_fire_on_the_tick(self):
+        """Test that a rule fires on the tick that crosses its threshold"""
+        fired = []
+        tracker = PriceTracker(rules=[MoveRule(RETURN, 1.0, 5)], on_trigger=fired.append)
+
+        assert tracker.update("^GSPC", 100.0, 0.0) == []
+        assert tracker.update("^GSPC", 100.5, 60.0) == []
+        triggers = tracker.update("^GSPC", 101.2, 120.0)
+
+        assert len(triggers) == 1
+        assert triggers[0].value == pytest.approx(1.2)
+        assert fired == triggers
+
+        # Ten minutes later the first ticks have left the 5-minute window
+        assert tracker.update("^GSPC", 101.3, 720.0) == []
+
+    def test_zscore_and_vwap_rules(self):
+        """Test z-score and VWAP-delta rules on a sudden jump"""
+        tracker = PriceTracker(rules=[MoveRule(ZSCORE, 2.0, 15), MoveRule(VWAP_DELTA, 0.5, 15)])
+        for i in range(10):
+            tracker.update("X", 100.0 + (i % 2) * 0.1, i * 60.0, volume=10)
+        triggers = tracker.update("X", 101.0, 600.0, volume=10)
+        assert {t.rule.metric for t in triggers} == {ZSCORE, VWAP_DELTA}
+
+    def test_rule_needs_a_tracked_window(self):
+        with pytest.raises(ValueError):
+            PriceTracker((5, 15), rules=[MoveRule(RETURN, 1.0, 60)])
+
+    def test_observe_uses_volume_deltas_and_ignores_stale_ticks(self):
+        """Test that cumulative quote volume becomes per-tick volume"""
+        tracker = PriceTracker((5,))
+        tracker.observe(Quote("X", "X", price=100.0, open=100.0, timestamp=0.0, volume=1000.0))
+        tracker.observe(Quote("X", "X", price=102.0, open=100.0, timestamp=60.0, volume=1100.0))
+        tracker.observe(Quote("X", "X", price=50.0, open=100.0, timestamp=30.0, volume=1200.0))  # out of order
+
+        signal = tracker.signals("X")[5]
+        assert signal.ticks == 2
+        assert signal.vwap_delta_percent == pytest.approx(0.0)  # the first tick has no volume, so no weight
+
+    def test_vwap_needs_volume(self):
+        """Test that ticks without volume give no VWAP instead of an unweighted mean"""
+        tracker = PriceTracker((5,), rules=[MoveRule(VWAP_DELTA, 0.5, 5)])
+        for i, price in enumerate((100.0, 101.0, 105.0)):
+            assert not tracker.update("X", price, i * 60.0)
+        assert tracker.signals("X")[5].vwap_delta_percent is None
+
+        tracker.update("Y", 100.0, 0.0, volume=1e-3)
+        tracker.update("Y", 100.0, 400.0)  # the traded tick has left the window
+        assert tracker.signals("Y")[5].vwap_delta_percent is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
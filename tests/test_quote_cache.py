@@ -0,0 +1,187 @@
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_cache import QuoteCache
+from quote_engine import Quote
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_loader(calls, delay=0.0):
+    def loader(symbols):
+        calls.append(list(symbols))
+        if delay:
+            time.sleep(delay)
+        return {s: Quote(s, s, price=101.0, open=100.0) for s in symbols}
+    return loader
+
+
+class TestQuoteCache:
+
+    def test_hit_after_first_fetch(self):
+        """Test that a second request is served from cache"""
+        calls = []
+        cache = QuoteCache(make_loader(calls))
+
+        cache.get_many(["^GSPC", "^DJI"])
+        quotes = cache.get_many(["^GSPC", "^DJI"])
+
+        assert calls == [["^GSPC", "^DJI"]]
+        assert quotes["^DJI"].price == 101.0
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 2
+
+    def test_entries_expire_after_ttl(self):
+        """Test per-symbol TTL"""
+        calls = []
+        clock = FakeClock()
+        ttls = {"OPEN": 60, "CLOSED": 900}
+        cache = QuoteCache(make_loader(calls), ttl_for=ttls.get, clock=clock)
+
+        cache.get_many(["OPEN", "CLOSED"])
+        clock.now = 61
+        cache.get_many(["OPEN", "CLOSED"])
+
+        assert calls == [["OPEN", "CLOSED"], ["OPEN"]]
+
+    def test_lru_eviction(self):
+        """Test that the least recently used symbol is evicted"""
+        calls = []
+        cache = QuoteCache(make_loader(calls), max_entries=2)
+
+        cache.get("A")
+        cache.get("B")
+        cache.get("A")
+        cache.get("C")  # evicts B
+        cache.get("A")
+
+        assert cache.stats()["evictions"] == 1
+        cache.get("B")
+        assert calls[-1] == ["B"]
+
+    def test_single_flight(self):
+        """Test that concurrent misses trigger a single upstream fetch"""
+        calls = []
+        cache = QuoteCache(make_loader(calls, delay=0.1))
+        results = []
+
+        def worker():
+            results.append(cache.get_many(["^GSPC", "^DJI", "^IXIC"]))
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert len(results) == 20
+        assert all(r["^IXIC"].price == 101.0 for r in results)
+
+    def test_version_changes_only_when_quotes_change(self):
+        """Test the snapshot version used to invalidate rendered replies"""
+        prices = [101.0, 101.0, 99.0]
+        clock = FakeClock()
+        cache = QuoteCache(lambda symbols: {s: Quote(s, s, price=prices.pop(0), open=100.0, timestamp=clock.now)
+                                            for s in symbols},
+                           ttl_for=lambda s: 60, clock=clock)
+
+        cache.get("^GSPC")
+        first = cache.version
+        clock.now = 61
+        cache.get("^GSPC")  # reloaded, same quote with a new timestamp
+        assert cache.version == first
+        clock.now = 122
+        cache.get("^GSPC")
+        assert cache.version == first + 1
+
+    def test_loader_error_returns_placeholders(self):
+        """Test that a failing upstream does not raise to the caller"""
+        def loader(symbols):
+            raise RuntimeError("upstream down")
+
+        quotes = QuoteCache(loader).get_many(["^GSPC"])
+        assert not quotes["^GSPC"].available
+
+    def test_stale_quote_served_while_revalidating(self):
+        """Test that an expired quote is returned at once and refreshed in the background"""
+        clock = FakeClock()
+        release = threading.Event()
+        prices = [101.0, 105.0]
+
+        def loader(symbols):
+            price = prices.pop(0)
+            if not prices:
+                release.wait(5)
+            return {s: Quote(s, s, price=price, open=100.0) for s in symbols}
+
+        cache = QuoteCache(loader, ttl_for=lambda s: 60, max_stale=600, clock=clock)
+        cache.get("^GSPC")
+        clock.now = 61
+
+        started = time.monotonic()
+        stale = cache.get_many(["^GSPC"], allow_stale=True)["^GSPC"]
+        assert time.monotonic() - started < 1
+        assert stale.price == 101.0
+        assert cache.get_many(["^GSPC"], allow_stale=True)["^GSPC"].price == 101.0  # one refresh in flight
+
+        release.set()
+        for _ in range(100):
+            if cache.fresh():
+                break
+            time.sleep(0.01)
+        assert cache.get("^GSPC").price == 105.0
+        assert cache.stats()["stale_hits"] == 2
+        assert cache.stats()["upstream_fetches"] == 2
+
+    def test_failed_refresh_keeps_last_good_quote(self):
+        """Test that an upstream outage doesn't replace a servable quote with N/A"""
+        clock = FakeClock()
+        answers = [{"^GSPC": Quote("^GSPC", "^GSPC", price=101.0, open=100.0)}, {}]
+        cache = QuoteCache(lambda symbols: answers.pop(0), ttl_for=lambda s: 60, max_stale=600, clock=clock)
+        cache.get("^GSPC")
+
+        clock.now = 61
+        assert cache.get("^GSPC").price == 101.0  # refresh came back empty
+        clock.now = 61 + 600
+        assert not cache.get_many(["^GSPC"], allow_stale=True)["^GSPC"].available
+
+    def test_peek_never_starts_a_fetch(self):
+        """Test that peek serves any cached quote and joins a fetch already running"""
+        calls = []
+        clock = FakeClock()
+        cache = QuoteCache(make_loader(calls, delay=0.1), ttl_for=lambda s: 60, clock=clock)
+        cache.get("^GSPC")
+        clock.now = 3600
+
+        quotes = cache.peek(["^GSPC", "^DJI"])
+        assert quotes["^GSPC"].price == 101.0  # expired, but cached
+        assert not quotes["^DJI"].available
+        assert calls == [["^GSPC"]]
+        assert cache.missing(["^GSPC", "^DJI"]) == ["^GSPC", "^DJI"]
+
+        loading = threading.Thread(target=cache.get, args=("^DJI",))
+        loading.start()
+        while not cache._inflight:
+            time.sleep(0.001)
+        assert cache.missing(["^DJI"]) == []
+        assert cache.peek(["^DJI"])["^DJI"].price == 101.0
+        loading.join()
+        assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
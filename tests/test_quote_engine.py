@@ -0,0 +1,207 @@
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import HALF_OPEN, OPEN
+from quote_engine import DSEProvider, Quote, QuoteEngine, QuoteProvider, parse_dse_index
+
+DSE_HOME = """
+<div class="midrow"><a class="abhead">DSEX Index</a>
+<div class="m_col-2">5,123.45</div> <div class="m_col-2">-12.34</div> <div class="m_col-2">-0.24%</div></div>
+<div class="midrow"><a class="abhead">DSES Index</a><div>1,100.00</div> <div>1.00</div> <div>0.09%</div></div>
+"""
+
+
+class StubProvider(QuoteProvider):
+    """In-memory provider that records how it was called"""
+
+    def __init__(self, prices, supports_batch=True, fail_batch=False, delay=0.0, name="stub"):
+        self.prices = prices
+        self.name = name
+        self.delay = delay
+        self.supports_batch = supports_batch
+        self.fail_batch = fail_batch
+        self.batch_calls = []
+        self.single_calls = []
+        self.lock = threading.Lock()
+
+    def fetch_batch(self, symbols):
+        self.batch_calls.append(list(symbols))
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_batch:
+            raise RuntimeError("batch endpoint down")
+        return {s: Quote(s, s, *self.prices[s]) for s in symbols if s in self.prices}
+
+    def fetch_one(self, symbol):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.single_calls.append(symbol)
+        if symbol not in self.prices:
+            raise KeyError(symbol)
+        return Quote(symbol, symbol, *self.prices[symbol])
+
+
+class TestQuoteEngine:
+
+    def test_quote_to_dict_matches_legacy_shape(self):
+        """Test that Quote renders the dict shape stocks_command expects"""
+        quote = Quote("^GSPC", "S&P 500", price=102.0, open=100.0)
+        assert quote.to_dict() == {
+            "symbol": "^GSPC",
+            "name": "S&P 500",
+            "price": "102.00",
+            "change": "+2.00",
+            "change_percent": "+2.00%"
+        }
+        assert Quote("X", "X").to_dict()["price"] == "N/A"
+
+    def test_batch_fetch_uses_one_request(self):
+        """Test that all symbols are fetched in a single batch call"""
+        provider = StubProvider({"A": (10.0, 9.0), "B": (20.0, 21.0)})
+        engine = QuoteEngine(provider)
+
+        quotes = engine.fetch(["A", "B", "A"])
+
+        assert list(quotes) == ["A", "B"]
+        assert provider.batch_calls == [["A", "B"]]
+        assert provider.single_calls == []
+        assert quotes["B"].change == pytest.approx(-1.0)
+
+    def test_missing_symbols_fall_back_to_pool(self):
+        """Test that symbols missing from the batch are fetched one by one"""
+        provider = StubProvider({"A": (10.0, 9.0)})
+        engine = QuoteEngine(provider, max_workers=2)
+
+        quotes = engine.fetch(["A", "MISSING"])
+
+        assert quotes["A"].price == 10.0
+        assert not quotes["MISSING"].available
+        assert provider.single_calls == ["MISSING"]
+
+    def test_unquoted_symbols_never_hit_provider(self):
+        """Test that DSE is answered locally"""
+        provider = StubProvider({}, supports_batch=False)
+        engine = QuoteEngine(provider)
+
+        quotes = engine.fetch(["DSE"])
+
+        assert quotes["DSE"].name == "DSE Index"
+        assert quotes["DSE"].to_dict()["price"] == "N/A"
+        assert provider.single_calls == []
+
+    def test_no_provider_returns_placeholders(self):
+        """Test behaviour when yfinance is not installed"""
+        quotes = QuoteEngine(None).fetch(["^GSPC"])
+        assert quotes["^GSPC"].to_dict()["change_percent"] == "N/A"
+
+    def test_fails_over_to_the_next_provider(self):
+        """Test that the second provider is only asked for what the first couldn't answer"""
+        primary = StubProvider({"A": (10.0, 9.0)}, name="primary")
+        backup = StubProvider({"A": (11.0, 9.0), "B": (20.0, 21.0)}, name="backup")
+        engine = QuoteEngine([primary, backup])
+
+        quotes = engine.fetch(["A", "B"])
+
+        assert quotes["A"].price == 10.0 and quotes["B"].price == 20.0
+        assert backup.batch_calls == [["B"]]
+
+    def test_open_breaker_skips_the_provider(self):
+        """Test that a provider failing repeatedly stops being called"""
+        primary = StubProvider({}, fail_batch=True, name="primary")
+        backup = StubProvider({"A": (10.0, 9.0), "B": (20.0, 21.0)}, name="backup")
+        engine = QuoteEngine([primary, backup], failure_threshold=2)
+
+        for _ in range(3):
+            quotes = engine.fetch(["A", "B"])
+            assert quotes["A"].price == 10.0
+
+        # a failed batch goes straight to the backup; two of them trip the breaker
+        assert len(primary.batch_calls) == 2
+        assert primary.single_calls == []
+        assert engine.upstreams[0].breaker.state == OPEN
+
+    def test_empty_batch_counts_as_a_failure(self):
+        """Test that an empty answer for several symbols (throttling) trips the breaker"""
+        primary = StubProvider({}, name="primary")
+        engine = QuoteEngine(primary, failure_threshold=1)
+
+        engine.fetch(["A", "B"])
+
+        assert engine.upstreams[0].breaker.state == OPEN
+
+    def test_timeout_bounds_a_slow_provider(self):
+        """Test that a hung provider can't hold up the caller past the timeout"""
+        slow = StubProvider({"A": (10.0, 9.0)}, delay=1.0, name="slow")
+        backup = StubProvider({"A": (11.0, 9.0)}, name="backup")
+        engine = QuoteEngine([slow, backup], timeout=0.1)
+
+        started = time.monotonic()
+        quotes = engine.fetch(["A"])
+
+        assert time.monotonic() - started < 0.8
+        assert quotes["A"].price == 11.0
+        assert slow.single_calls == []  # one timeout per provider, not a second one per symbol
+
+    def test_dse_is_only_asked_of_the_dse_provider(self):
+        """Test that a specialised provider owns its symbols"""
+        dse = StubProvider({"DSE": (5123.45, 5135.79)}, name="dse")
+        dse.symbols = frozenset({"DSE"})
+        general = StubProvider({"^GSPC": (10.0, 9.0)}, name="general")
+        engine = QuoteEngine([dse, general])
+
+        quotes = engine.fetch(["DSE", "^GSPC"])
+
+        assert quotes["DSE"].price == 5123.45
+        assert dse.batch_calls == [["DSE"]]
+        assert general.batch_calls == [["^GSPC"]]
+        assert engine.can_quote("DSE") and not QuoteEngine(general).can_quote("DSE")
+
+    def test_bars_leave_an_open_breaker_alone(self):
+        """Test that asking for bars doesn't close the breaker of a provider that has none"""
+        dse = StubProvider({}, fail_batch=True, name="dse")
+        dse.symbols = frozenset({"DSE"})
+        engine = QuoteEngine(dse, failure_threshold=1, reset_timeout=60)
+        breaker = engine.upstreams[0].breaker
+        breaker.clock = lambda: now
+        now = 0.0
+        engine.fetch(["DSE"])
+        assert breaker.state == OPEN
+
+        now = 60.0
+        assert engine.fetch_bars(["DSE"]) == {}
+        assert breaker.state == HALF_OPEN
+
+        engine.fetch(["DSE"])  # the quote fetch still gets the trial, and fails it
+        assert len(dse.batch_calls) == 2
+        assert breaker.state == OPEN
+
+    def test_parse_dse_index(self):
+        """Test reading DSEX from the DSE home page markup"""
+        quote = parse_dse_index("DSE", DSE_HOME)
+
+        assert quote.price == 5123.45
+        assert quote.change == pytest.approx(-12.34)
+        assert parse_dse_index("DSE", "<html>maintenance</html>") is None
+
+    def test_dse_provider_fetches_the_home_page_once(self, monkeypatch):
+        """Test that DSEProvider answers only its own symbols from one page load"""
+        import httpx
+        requests = []
+        monkeypatch.setattr(httpx, "get", lambda url, **kwargs: requests.append(url) or
+                            httpx.Response(200, text=DSE_HOME, request=httpx.Request("GET", url)))
+
+        quotes = DSEProvider(url="https://dse.example/").fetch_batch(["DSE", "^GSPC"])
+
+        assert list(quotes) == ["DSE"]
+        assert requests == ["https://dse.example/"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
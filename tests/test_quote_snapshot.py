@@ -0,0 +1,82 @@
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quote_engine import Quote
+from quote_snapshot import QuoteSnapshot, SnapshotFull
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def snapshot():
+    snapshot = QuoteSnapshot.create(4096)
+    yield snapshot
+    snapshot.close()
+
+
+class TestQuoteSnapshot:
+
+    def test_readers_see_published_quotes_until_they_expire(self, snapshot):
+        clock = FakeClock()
+        reader = QuoteSnapshot.attach(snapshot.name, clock=clock)
+        assert reader.quotes() == {}
+
+        aapl = Quote("AAPL", "Apple", price=101.0, open=100.0, timestamp=999.0, volume=5e6)
+        msft = Quote("MSFT", "Microsoft", price=401.0, open=400.0)
+        snapshot.publish({"AAPL": (1060.0, aapl), "MSFT": (1010.0, msft)})
+        assert reader.quotes() == {"AAPL": aapl, "MSFT": msft}
+        assert reader.quotes(["AAPL", "TSLA"]) == {"AAPL": aapl}
+
+        clock.now = 1030.0
+        assert reader.quotes() == {"AAPL": aapl}
+        reader.close()
+
+    def test_each_publish_is_decoded_once_per_reader(self, snapshot):
+        reader = QuoteSnapshot.attach(snapshot.name, clock=lambda: 0.0)
+        quote = Quote("AAPL", "Apple", price=101.0, open=100.0)
+        snapshot.publish({"AAPL": (60.0, quote)})
+        for _ in range(5):
+            reader.quotes()
+        assert reader.decodes == 1
+
+        snapshot.publish({})
+        assert reader.quotes() == {}
+        assert reader.decodes == 2
+        reader.close()
+
+    def test_interrupted_publish_is_recovered(self, snapshot):
+        """Test that a leader dying mid-publish leaves readers on the old data and the next leader fixes it"""
+        reader = QuoteSnapshot.attach(snapshot.name, clock=lambda: 0.0)
+        quote = Quote("AAPL", "Apple", price=101.0, open=100.0)
+        snapshot.publish({"AAPL": (60.0, quote)})
+        assert reader.quotes() == {"AAPL": quote}
+
+        snapshot.segment.buf[0] += 1  # sequence left odd, as by a writer killed halfway
+        assert reader.quotes() == {"AAPL": quote}  # keeps what it decoded last
+
+        successor = QuoteSnapshot.attach(snapshot.name)
+        successor.publish({})
+        assert reader.quotes() == {}
+        successor.close()
+        reader.close()
+
+    def test_oversized_publish_is_rejected(self):
+        small = QuoteSnapshot.create(64)
+        quotes = {f"S{i}": (60.0, Quote(f"S{i}", f"Symbol {i}", price=1.0, open=1.0)) for i in range(10)}
+        with pytest.raises(SnapshotFull):
+            small.publish(quotes)
+        small.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,63 @@
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+
+    def test_burst_then_steady_rate(self):
+        """Test that a chat gets its burst at once and then one request per interval"""
+        clock = FakeClock()
+        limiter = RateLimiter(30, burst=3, clock=clock)  # one token every 2 seconds
+
+        assert [limiter.allow(1) for _ in range(4)] == [True, True, True, False]
+        assert limiter.allow(2)  # other chats have their own bucket
+        assert limiter.retry_after(1) == pytest.approx(2.0)
+
+        clock.now = 1.9
+        assert not limiter.allow(1)
+        clock.now = 2.0
+        assert limiter.allow(1)
+        assert not limiter.allow(1)
+        assert limiter.stats()["limited"] == 3
+
+    def test_idle_keys_are_forgotten(self):
+        """Test that a chat whose bucket has refilled takes no memory"""
+        clock = FakeClock()
+        limiter = RateLimiter(60, burst=5, clock=clock)
+        for chat_id in range(1000):
+            limiter.allow(chat_id)
+        assert len(limiter) == 1000
+
+        clock.now = 1.0
+        limiter.allow("active")
+        assert len(limiter) == 1
+        assert [limiter.allow(0) for _ in range(6)] == [True] * 5 + [False]
+
+    def test_key_count_is_bounded(self):
+        """Test that max_keys caps memory even when every chat is active"""
+        limiter = RateLimiter(1, burst=1, max_keys=100, clock=FakeClock())
+        for chat_id in range(1000):
+            assert limiter.allow(chat_id)
+
+        assert len(limiter) == 100
+        assert limiter.stats()["evictions"] == 900
+        assert not limiter.allow(999)
+        assert limiter.allow(0)  # evicted, so its bucket starts full again
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,41 @@
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_cache import RenderCache
+
+
+class TestRenderCache:
+
+    def test_renders_once_per_key(self):
+        """Test that a key is rendered on the first request only"""
+        renders = []
+        cache = RenderCache()
+
+        def render():
+            renders.append(1)
+            return "🔔 *Market Status Update*"
+
+        first = cache.get_or_render(("status", "Asia/Dhaka", 100), render)
+        second = cache.get_or_render(("status", "Asia/Dhaka", 100), render)
+        cache.get_or_render(("status", "Asia/Dhaka", 101), render)  # new snapshot version
+
+        assert first is second
+        assert len(renders) == 2
+        assert cache.stats() == {"size": 2, "hits": 1, "misses": 2}
+
+    def test_old_versions_are_evicted(self):
+        """Test LRU eviction keeps the cache bounded"""
+        cache = RenderCache(max_entries=2)
+        for version in range(3):
+            cache.get_or_render(("stocks", version), lambda: str(version))
+
+        assert cache.stats()["size"] == 2
+        assert cache.get_or_render(("stocks", 0), lambda: "re-rendered") == "re-rendered"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,108 @@
+import pytest
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import supervisor as supervisor_module
+from quote_engine import Quote
+from quote_snapshot import QuoteSnapshot
+from supervisor import Supervisor, shard_for, update_chat_id
+
+
+def echo_worker(index, inbound, snapshot_name, results):
+    """Worker process: report which worker saw which chat, and what the shared snapshot held"""
+    snapshot = QuoteSnapshot.attach(snapshot_name)
+    while True:
+        update = inbound.get()
+        if update is None:
+            break
+        if update.get("crash"):
+            sys.exit(3)
+        results.put((index, update_chat_id(update), sorted(snapshot.quotes())))
+    snapshot.close()
+
+
+def message(update_id, chat_id, **extra):
+    return dict({"update_id": update_id, "message": {"message_id": update_id, "chat": {"id": chat_id}}}, **extra)
+
+
+class TestSharding:
+
+    def test_chat_ids_from_every_update_shape(self):
+        assert update_chat_id(message(1, 42)) == 42
+        assert update_chat_id({"update_id": 2, "callback_query": {"id": "x", "from": {"id": 7},
+                                                                   "message": {"chat": {"id": -100}}}}) == -100
+        assert update_chat_id({"update_id": 3, "inline_query": {"id": "q", "from": {"id": 9}}}) == 9
+        assert update_chat_id({"update_id": 4}) is None
+
+    def test_shards_are_stable_and_balanced(self):
+        assert shard_for(123456789, 4) == shard_for("123456789", 4)
+        counts = Counter(shard_for(chat_id, 8) for chat_id in range(100_000, 110_000))
+        assert set(counts) == set(range(8))
+        assert max(counts.values()) < 1.1 * min(counts.values())
+
+
+class TestSupervisor:
+
+    def test_routes_chats_to_fixed_workers_and_restarts_crashed_ones(self):
+        """Test routing, the shared snapshot, restart of a dead worker and a clean stop"""
+        results = multiprocessing.get_context("spawn").Queue()
+        supervisor = Supervisor(echo_worker, 3, args=(results,), snapshot_bytes=4096)
+        supervisor.start()
+        try:
+            quote = Quote("AAPL", "Apple", price=101.0, open=100.0)
+            supervisor.snapshot.publish({"AAPL": (time.time() + 60, quote)})
+            chats = range(1, 11)
+            for update_id, chat_id in enumerate(list(chats) * 3):
+                assert supervisor.route(message(update_id, chat_id))
+            seen = [results.get(timeout=60) for _ in range(30)]
+            assert {(index, chat_id) for index, chat_id, _ in seen} == {(shard_for(c, 3), c) for c in chats}
+            assert all(quotes == ["AAPL"] for _, _, quotes in seen)
+
+            victim = shard_for(5, 3)
+            supervisor.route(message(100, 5, crash=True))
+            supervisor.processes[victim].join(60)
+            assert supervisor.check_workers() == 1
+            supervisor.route(message(101, 5))
+            assert results.get(timeout=60)[:2] == (victim, 5)
+            assert supervisor.stats()["restarts"] == 1
+        finally:
+            processes = list(supervisor.processes)
+            supervisor.stop(timeout=30)
+        assert not any(process.is_alive() for process in processes)
+
+    def test_long_poll_backs_off_when_telegram_refuses(self, monkeypatch):
+        """Test that a 409 from getUpdates waits POLL_RETRY_SECONDS instead of asking again at once"""
+        class RefusingClient:
+            def __init__(self):
+                self.calls = 0
+
+            async def post(self, url, json, timeout):
+                self.calls += 1
+                return httpx.Response(409, json={"ok": False, "description": "Conflict: terminated by other getUpdates"})
+
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                raise asyncio.CancelledError
+
+        monkeypatch.setattr(supervisor_module.asyncio, "sleep", fake_sleep)
+        client = RefusingClient()
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(Supervisor(echo_worker, 1).long_poll(client, "token"))
+        assert client.calls == 3
+        assert sleeps == [supervisor_module.POLL_RETRY_SECONDS] * 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
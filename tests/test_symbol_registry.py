@@ -0,0 +1,35 @@
+import pytest
+import os
+import sys
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from symbol_registry import SymbolRegistry
+
+
+class TestSymbolRegistry:
+
+    def test_reference_counting(self):
+        """Test that a symbol stays tracked until its last reference is released"""
+        registry = SymbolRegistry()
+        assert registry.acquire(["AAPL", "MSFT", "AAPL"]) == ["AAPL", "MSFT"]
+        assert registry.acquire(["AAPL"]) == []
+        assert registry.refcount("AAPL") == 3
+
+        assert registry.release(["AAPL", "AAPL"]) == []
+        assert registry.release(["AAPL", "MSFT"]) == ["AAPL", "MSFT"]
+        assert registry.symbols() == []
+        assert registry.release(["AAPL"]) == []  # releasing an untracked symbol is a no-op
+
+    def test_load_adds_to_existing_counts(self):
+        registry = SymbolRegistry()
+        registry.acquire(["AAPL"])
+        registry.load({"AAPL": 2, "TSLA": 1, "NONE": 0})
+        assert registry.refcount("AAPL") == 3
+        assert sorted(registry.symbols()) == ["AAPL", "TSLA"]
+        assert registry.stats() == {"symbols": 2, "references": 4}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,211 @@
+import pytest
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsRegistry
+from telegram_delivery import TelegramSender, TokenBucket
+
+
+class StubBotAPI:
+    """Minimal keep-alive HTTP server that enforces Telegram-style flood limits"""
+
+    def __init__(self, global_rate, global_burst, per_chat_interval=1.0, fail_first=0):
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.per_chat_interval = per_chat_interval
+        self.fail_first = fail_first
+        self.accepted = 0
+        self.rejected = 0
+        self.chat_last = {}
+        self.port = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._serve())
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        self._bucket = TokenBucket(self.global_rate, self.global_burst, clock=self._loop.time)
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        await self._stop.wait()
+        server.close()
+
+    def _check(self, chat_id):
+        now = self._loop.time()
+        if self.rejected < self.fail_first:
+            return 2
+        if now - self.chat_last.get(chat_id, -1e9) < self.per_chat_interval * 0.9:
+            return 1
+        bucket = self._bucket
+        bucket.reserve()
+        if bucket.tokens < 0:
+            bucket.tokens += 1  # request refused, give the token back
+            return 1
+        self.chat_last[chat_id] = now
+        return 0
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length))
+
+                retry_after = self._check(body["chat_id"])
+                if retry_after:
+                    self.rejected += 1
+                    status = "429 Too Many Requests"
+                    payload = {"ok": False, "error_code": 429, "parameters": {"retry_after": retry_after}}
+                else:
+                    self.accepted += 1
+                    status = "200 OK"
+                    payload = {"ok": True, "result": {"message_id": self.accepted}}
+
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+def stub_api():
+    servers = []
+
+    def factory(**kwargs):
+        server = StubBotAPI(**kwargs)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield factory
+    for server in servers:
+        server.stop()
+
+
+class TestTelegramDelivery:
+
+    def test_token_bucket_reserves_in_order(self):
+        """Test that reservations beyond the burst are spaced at 1/rate"""
+        now = [0.0]
+        bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+        delays = [bucket.reserve() for _ in range(4)]
+        assert delays == [0.0, 0.0, pytest.approx(0.1), pytest.approx(0.2)]
+
+    def test_10k_messages_drain_at_max_rate_without_429(self, stub_api):
+        """Test that 10k messages drain at the allowed rate with no 429s"""
+        rate, burst, concurrency = 400.0, 20.0, 16
+        # The stub allows for requests already in flight when the bucket refills
+        server = stub_api(global_rate=rate, global_burst=burst + concurrency)
+        sender = TelegramSender(
+            "TEST",
+            base_url=f"http://127.0.0.1:{server.port}",
+            global_rate=rate,
+            global_burst=burst,
+            max_concurrency=concurrency
+        )
+        messages = [(chat_id, "🚨 *Market Alert*") for chat_id in range(10_000)]
+
+        metrics = sender.deliver_sync(messages)
+
+        assert metrics.sent == 10_000
+        assert metrics.failed == 0
+        assert metrics.rate_limited == 0
+        assert server.rejected == 0
+        ideal = (10_000 - burst) / rate
+        assert ideal * 0.95 <= metrics.elapsed <= ideal * 1.5
+
+    def test_concurrent_deliveries_share_the_global_budget(self, stub_api):
+        """Test that outboxes sent from several threads, one after another, share one burst and rate"""
+        rate, burst, concurrency = 50.0, 20.0, 4
+        server = stub_api(global_rate=rate, global_burst=burst + 2 * concurrency)
+        sender = TelegramSender(
+            "TEST",
+            base_url=f"http://127.0.0.1:{server.port}",
+            global_rate=rate,
+            global_burst=burst,
+            max_concurrency=concurrency
+        )
+        results = []
+
+        def job(index):
+            time.sleep(index * 0.3)  # each job starts while the previous ones are still sending
+            results.append(sender.deliver_sync([(index * 40 + i, "🔔 Bell") for i in range(40)]))
+
+        threads = [threading.Thread(target=job, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(metrics.sent for metrics in results) == 160
+        assert sum(metrics.rate_limited for metrics in results) == 0
+        assert server.rejected == 0
+
+    def test_per_chat_limit_is_respected(self, stub_api):
+        """Test that repeated messages to one chat are spaced out"""
+        server = stub_api(global_rate=1000.0, global_burst=1000.0, per_chat_interval=0.2)
+        sender = TelegramSender(
+            "TEST",
+            base_url=f"http://127.0.0.1:{server.port}",
+            global_rate=1000.0,
+            per_chat_interval=0.2
+        )
+
+        metrics = sender.deliver_sync([("42", f"msg {i}") for i in range(5)])
+
+        assert metrics.sent == 5
+        assert server.rejected == 0
+        assert metrics.elapsed >= 0.8 * 0.95
+
+    def test_retry_after_is_honoured(self, stub_api):
+        """Test that a 429 pauses sending and the message is retried"""
+        server = stub_api(global_rate=1000.0, global_burst=1000.0, fail_first=1)
+        registry = MetricsRegistry()
+        sender = TelegramSender("TEST", base_url=f"http://127.0.0.1:{server.port}", global_rate=1000.0,
+                                metrics=registry)
+
+        metrics = sender.deliver_sync([("1", "hello")])
+
+        assert metrics.sent == 1
+        assert metrics.rate_limited == 1
+        assert metrics.retries == 1
+        assert metrics.elapsed >= 2.0
+        assert registry.counter("bot_upstream_rate_limited_total", upstream="telegram").value == 1
+        assert registry.counter("bot_upstream_retries_total", upstream="telegram").value == 1
+        assert registry.histogram("bot_upstream_seconds", upstream="telegram", call="sendMessage").count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,112 @@
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+# Add the parent directory to the path to import the bot
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsRegistry
+from webhook_server import SECRET_HEADER, WebhookServer
+
+SECRET = "s3cret-token"
+
+
+def update(update_id):
+    return {"update_id": update_id, "message": {"message_id": update_id, "text": "/status"}}
+
+
+async def post(client, server, body, secret=SECRET, path="/telegram"):
+    headers = {SECRET_HEADER: secret} if secret else {}
+    content = body if isinstance(body, bytes) else json.dumps(body).encode()
+    response = await client.post(f"http://127.0.0.1:{server.port}{path}", content=content, headers=headers)
+    return response.status_code
+
+
+class TestWebhookServer:
+
+    def test_validates_and_dispatches_updates(self):
+        """Test the secret check, request validation and hand-off of decoded updates"""
+        handled = []
+        registry = MetricsRegistry()
+
+        async def handle(data):
+            handled.append(data["update_id"])
+
+        async def scenario():
+            server = WebhookServer(handle, SECRET, host="127.0.0.1", port=0, workers=2, metrics=registry)
+            await server.start()
+            async with httpx.AsyncClient() as client:
+                statuses = [
+                    await post(client, server, update(1)),
+                    await post(client, server, update(2), secret="wrong"),
+                    await post(client, server, update(3), secret=None),
+                    await post(client, server, b"{not json"),
+                    await post(client, server, b"[1, 2]"),
+                    await post(client, server, update(4), path="/other"),
+                    (await client.get(f"http://127.0.0.1:{server.port}/telegram")).status_code,
+                    await post(client, server, update(5)),
+                ]
+            await server.stop()
+            return server, statuses
+
+        server, statuses = asyncio.run(scenario())
+        assert statuses == [200, 403, 403, 400, 400, 404, 405, 200]
+        assert sorted(handled) == [1, 5]
+        assert server.stats()["processed"] == 2
+        assert registry.counter("bot_webhook_responses_total", status="403").value == 2
+
+    def test_full_queue_pushes_back_and_stop_drains(self):
+        """Test that a full queue answers 429 and that stop() finishes queued updates first"""
+        release = asyncio.Event()
+        handled = []
+
+        async def handle(data):
+            await release.wait()
+            handled.append(data["update_id"])
+
+        async def scenario():
+            server = WebhookServer(handle, SECRET, host="127.0.0.1", port=0, workers=1, queue_size=2)
+            await server.start()
+            async with httpx.AsyncClient() as client:
+                statuses = []
+                for i in range(5):
+                    statuses.append(await post(client, server, update(i)))
+                    await asyncio.sleep(0.01)  # let the worker pick up the first update
+            stopping = asyncio.create_task(server.stop(drain_timeout=5))
+            await asyncio.sleep(0.05)
+            assert not stopping.done()  # still waiting for the queued updates
+            release.set()
+            await stopping
+            return server, statuses
+
+        server, statuses = asyncio.run(scenario())
+        assert statuses == [200, 200, 200, 429, 429]
+        assert handled == [0, 1, 2]
+        assert server.stats()["rejected"] == 2
+        assert server.stats()["max_depth"] == 2
+
+    def test_keep_alive_connection_serves_many_updates(self):
+        handled = []
+
+        async def handle(data):
+            handled.append(data["update_id"])
+
+        async def scenario():
+            server = WebhookServer(handle, None, host="127.0.0.1", port=0, workers=4)
+            await server.start()
+            limits = httpx.Limits(max_connections=1)
+            async with httpx.AsyncClient(limits=limits) as client:
+                statuses = await asyncio.gather(*(post(client, server, update(i), secret=None) for i in range(50)))
+            await server.stop()
+            return statuses
+
+        assert set(asyncio.run(scenario())) == {200}
+        assert sorted(handled) == list(range(50))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
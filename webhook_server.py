@@ -0,0 +1,208 @@
+"""Webhook ingress for Sajib Market Trading Monitor Bot
+
+Long polling ties each bot to one open getUpdates connection, so only
+one replica can run per token. In webhook mode Telegram POSTs every
+update to us instead, and any number of replicas can sit behind a load
+balancer.
+
+``WebhookServer`` is a small HTTP/1.1 server on asyncio streams, with
+keep-alive because Telegram reuses up to ``max_connections``
+connections. It checks the ``X-Telegram-Bot-Api-Secret-Token`` header,
+decodes the JSON body, and puts the update on a bounded queue. It
+answers at once, before the update is handled. A fixed pool of worker
+tasks drains the queue.
+
+When the queue is full the request gets a 429. Telegram then re-delivers
+the update later, so a burst is spread over time instead of growing
+memory without bound. ``stop`` stops accepting, lets the workers finish
+what is already queued (up to a drain timeout), and only then returns.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+from typing import Awaitable, Callable, Optional, Set
+
+from metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+DEFAULT_WORKERS = 32
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_MAX_BODY_BYTES = 1 << 20
+DEFAULT_IDLE_TIMEOUT_SECONDS = 75
+DEFAULT_DRAIN_TIMEOUT_SECONDS = 10
+
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+class WebhookServer:
+    """Accepts Telegram webhook POSTs and feeds them to a bounded pool of workers"""
+
+    def __init__(self, handle_update: Callable[[dict], Awaitable[None]], secret_token: Optional[str],
+                 host: str = "0.0.0.0", port: int = 8000, path: str = "/telegram",
+                 workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.handle_update = handle_update
+        self.secret_token = secret_token.encode() if secret_token else None
+        self.host = host
+        self.port = port
+        self.path = path
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_body_bytes = max_body_bytes
+        self.idle_timeout = idle_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._workers: list = []
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._draining = False
+
+        self.received = 0
+        self.queued = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+
+        registry = metrics or MetricsRegistry(enabled=False)
+        self._responses = {status: registry.counter("bot_webhook_responses_total", status=str(status))
+                           for status in REASONS}
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.queue_size)
+        self._draining = False
+        self._workers = [asyncio.create_task(self._worker(), name=f"webhook-worker-{i}")
+                         for i in range(self.workers)]
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Webhook listening on {self.host}:{self.port}{self.path} with {self.workers} workers")
+
+    async def stop(self, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT_SECONDS):
+        """Stop accepting updates, then wait for the queued ones to be handled"""
+        if self._server is None:
+            return
+        self._draining = True
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook drain timed out with {self._queue.qsize()} updates still queued")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        self._workers = []
+        logger.info(f"Webhook stopped: {self.stats()}")
+
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.handle_update(update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error handling webhook update {update.get('update_id')}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def accept(self, method: str, target: str, headers: dict, body: bytes) -> int:
+        """Validate one request and queue its update; returns the HTTP status to answer with"""
+        if target.split("?", 1)[0] != self.path:
+            return 404
+        if method != "POST":
+            return 405
+        if self.secret_token is not None and not hmac.compare_digest(
+                headers.get(SECRET_HEADER, "").encode(), self.secret_token):
+            return 403
+        if self._draining:
+            return 503
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return 400
+        if not isinstance(update, dict):
+            return 400
+
+        self.received += 1
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return 429
+        self.queued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return 200
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= self.max_body_bytes:
+                    await self._respond(writer, 413, keep_alive=False)
+                    break
+                body = await asyncio.wait_for(reader.readexactly(length), self.idle_timeout) if length else b""
+
+                status = self.accept(method, target, headers, body)
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                              and not self._draining)
+                await self._respond(writer, status, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, keep_alive: bool):
+        self._responses[status].inc()
+        head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Length: 0",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status in (429, 503):
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_depth": self.max_depth
+        }